@@ -0,0 +1,78 @@
+"""Throughput of the bat detector on synthetic 384 kHz audio.
+
+Run on the target (Pi 5) with:
+
+    PYTHONPATH=src python benchmarks/bench_bats.py --seconds 300
+
+Prints a JSON report and exits non-zero if the detector is slower than
+`--min-rtf` times real time, i.e. could not keep up with continuous capture
+while leaving the cores to BirdNET and the recorder.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+from silvasonic_birdnet.bats import BatDetector, iter_blocks
+
+RATE = 384000
+
+
+def synthetic_night(seconds: float, rate: int = RATE, seed: int = 0) -> np.ndarray:
+    """Noise plus a pipistrelle-like pass (10 pulses/s) and rain-like clicks."""
+    rng = np.random.default_rng(seed)
+    signal = rng.normal(0, 0.002, int(seconds * rate)).astype(np.float32)
+
+    t = np.arange(int(0.005 * rate)) / rate
+    k = (40e3 - 100e3) / 0.005
+    pulse = (0.05 * np.sin(2 * np.pi * (100e3 * t + 0.5 * k * t * t)) * np.hanning(len(t))).astype(
+        np.float32
+    )
+    for start in np.arange(0.05, seconds - 0.01, 0.1):
+        i = int(start * rate)
+        signal[i : i + len(pulse)] += pulse[: len(signal) - i]
+    for start in rng.uniform(0, seconds, int(seconds * 2)):
+        i = int(start * rate)
+        signal[i : i + 3] += 0.3
+    return signal
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0, help="audio length")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-rtf", type=float, default=10.0, help="required x real time")
+    args = parser.parse_args(argv)
+
+    signal = synthetic_night(args.seconds)
+    expected = len(np.arange(0.05, args.seconds - 0.01, 0.1))
+    detector = BatDetector()
+
+    timings = []
+    calls = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        calls = detector.detect(iter_blocks(signal, RATE), RATE)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    report = {
+        "benchmark": "bat_detector",
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "sample_rate": RATE,
+        "audio_sec": args.seconds,
+        "elapsed_sec": round(best, 3),
+        "realtime_factor": round(args.seconds / best, 1),
+        "calls_found": len(calls),
+        "calls_expected": expected,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["realtime_factor"] >= args.min_rtf else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
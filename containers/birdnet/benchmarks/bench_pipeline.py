@@ -0,0 +1,298 @@
+"""Per-stage timing of the BirdNET file pipeline on synthetic recordings.
+
+Run from containers/birdnet with:
+
+    PYTHONPATH=src python benchmarks/bench_pipeline.py --seconds 300 --output run.json
+
+Generates FLAC recordings (noise, tones, chirps at several sample rates) and
+feeds them through the service's own BirdNETAnalyzer.process_batch, in batches
+of `--batch` files. Its stages are timed where the analyzer calls them: decode,
+bat detection, silence gate, resample, inference, result parsing, clip
+extraction, embeddings and the DB transaction; "other" is the rest (registry
+lookup, records, archiving). Inference uses a stub interpreter by default (an
+FFT band-energy projection, so the numbers cover the pipeline around the
+model); `--model birdnet` uses the installed model. The DB is an in-memory
+SQLite stand-in unless `--db-url` points at Postgres.
+
+Prints a JSON report (real-time factor per stage and overall, peak RSS) and
+exits non-zero if the pipeline is slower than `--min-rtf` times real time.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable
+from contextlib import ExitStack
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import numpy.typing as npt
+from silvasonic_birdnet import analyzer as analyzer_module
+from silvasonic_birdnet.analyzer import BirdNETAnalyzer
+from silvasonic_birdnet.config import config
+from silvasonic_birdnet.database import db
+from silvasonic_birdnet.engine import InferenceEngine
+from silvasonic_birdnet.models import BirdDetection
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, col, create_engine, func, select
+from synthetic import KINDS, write_recording
+
+STAGES = (
+    "decode",
+    "bats",
+    "gate",
+    "resample",
+    "inference",
+    "parse",
+    "clips",
+    "embeddings",
+    "db",
+    "other",
+)
+STUB_CLASSES = 200
+STUB_BANDS = 32
+STUB_BIAS = 3.5  # Keeps the stub's hit rate in the range of real recordings
+
+
+class StubInterpreter:
+    """TFLite interpreter stand-in: log band energies times a fixed random projection."""
+
+    def __init__(self, n_classes: int = STUB_CLASSES, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(0, 1.5 / np.sqrt(STUB_BANDS), (STUB_BANDS, n_classes)).astype(
+            np.float32
+        )
+        self._input: npt.NDArray[np.float32] | None = None
+        self._features: npt.NDArray[np.float32] | None = None
+
+    def resize_tensor_input(self, index: int, shape: list[int]) -> None:
+        pass
+
+    def allocate_tensors(self) -> None:
+        pass
+
+    def set_tensor(self, index: int, value: npt.NDArray[np.float32]) -> None:
+        self._input = value
+
+    def invoke(self) -> None:
+        assert self._input is not None
+        power = np.abs(np.fft.rfft(self._input, axis=1)) ** 2
+        bands = np.array_split(power, STUB_BANDS, axis=1)
+        energies = np.log10(np.stack([b.sum(axis=1) for b in bands], axis=1) + 1e-9)
+        centred = energies - energies.mean(axis=1, keepdims=True)
+        self._features = (centred / (centred.std(axis=1, keepdims=True) + 1e-9)).astype(np.float32)
+
+    def get_tensor(self, index: int) -> npt.NDArray[np.float32]:
+        assert self._features is not None
+        if index == 0:  # embedding tensor (output index - 1)
+            return self._features
+        logits: npt.NDArray[np.float32] = self._features @ self.weights - STUB_BIAS
+        return logits
+
+
+def stub_engine() -> InferenceEngine:
+    engine = InferenceEngine(threads=1)
+    engine._interpreter = StubInterpreter()
+    engine._output_index = 1
+    engine._embedding_index = 0
+    engine.labels = [(f"Stub species {i}", f"Stub {i}") for i in range(STUB_CLASSES)]
+    return engine
+
+
+def open_database(db_url: str) -> None:
+    """Point the service's DB handler at Postgres, or at an in-memory SQLite stand-in."""
+    if db_url:
+        db.db_url = db_url
+        if not db.connect():
+            raise SystemExit(f"Cannot connect to {db_url}")
+        return
+
+    db.db_url = "sqlite:///:memory:"
+    db.engine = create_engine(db.db_url)
+    with db.engine.connect() as connection:
+        # SQLite has no schemas, attach databases under the schema names instead
+        connection.execute(text("ATTACH DATABASE ':memory:' AS birdnet"))
+        connection.execute(text("ATTACH DATABASE ':memory:' AS bats"))
+        connection.commit()
+    SQLModel.metadata.create_all(db.engine)
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = defaultdict(float)
+
+    def wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """`fn`, adding its run time to stage `name`."""
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - started
+
+        return timed
+
+
+def build_analyzer(engine: InferenceEngine) -> BirdNETAnalyzer:
+    """The service's analyzer on the given engine (paths and DB as configured by main)."""
+    with (
+        patch.object(analyzer_module, "InferenceEngine", lambda threads: engine),
+        patch.object(db, "connect", lambda: True),  # Opened by open_database
+    ):
+        return BirdNETAnalyzer()
+
+
+def run_pipeline(
+    files: list[Path], engine: InferenceEngine, batch: int
+) -> tuple[dict[str, float], int]:
+    """One pass over all files through BirdNETAnalyzer.process_batch, timed per stage."""
+    analyzer = build_analyzer(engine)
+    timer = StageTimer()
+    with ExitStack() as stack:
+        for name, target, attribute in (
+            ("decode", analyzer_module, "decode_audio"),
+            ("resample", analyzer_module, "to_model_input"),
+            ("parse", analyzer_module, "detections_from_array"),
+            ("clips", analyzer_module, "write_clips"),
+            ("bats", analyzer, "_detect_bats"),
+            ("parse", analyzer, "_build_scores"),
+            ("embeddings", analyzer, "_store_embeddings"),
+            ("inference", engine, "analyze_scored"),
+            ("db", db, "save_file_results"),
+        ):
+            stack.enter_context(
+                patch.object(target, attribute, timer.wrap(name, getattr(target, attribute)))
+            )
+        for gate in (analyzer.gate, analyzer.reanalysis_gate):
+            if gate is not None:
+                stack.enter_context(patch.object(gate, "check", timer.wrap("gate", gate.check)))
+
+        started = time.perf_counter()
+        for i in range(0, len(files), batch):
+            analyzer.process_batch([str(path) for path in files[i : i + batch]])
+        total = time.perf_counter() - started
+    analyzer.archiver.flush()
+
+    seconds = dict(timer.seconds)
+    seconds["other"] = max(total - sum(seconds.values()), 0.0)
+
+    assert db.engine is not None
+    with Session(db.engine) as session:
+        sources = list({path.parent.name for path in files})
+        detections = session.exec(
+            select(func.count())
+            .select_from(BirdDetection)
+            .where(col(BirdDetection.source_device).in_(sources))
+        ).one()
+    return seconds, int(detections)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of each recording")
+    parser.add_argument("--rates", default="48000,44100,96000", help="sample rates to generate")
+    parser.add_argument("--kinds", default="mixed", help=f"comma separated, of {KINDS}")
+    parser.add_argument("--repeats", type=int, default=3, help="best pass is reported")
+    parser.add_argument("--model", choices=["stub", "birdnet"], default="stub")
+    parser.add_argument("--min-conf", type=float, default=0.7)
+    parser.add_argument("--batch", type=int, default=config.BATCH_SIZE, help="files per batch")
+    parser.add_argument("--db-url", default="", help="Postgres URL (default: in-memory SQLite)")
+    parser.add_argument("--output", type=Path, help="also write the JSON report here")
+    parser.add_argument("--min-rtf", type=float, default=0.0, help="required x real time")
+    args = parser.parse_args(argv)
+
+    if args.model == "birdnet":
+        engine = InferenceEngine(threads=1)
+        if not engine.load():
+            print("BirdNET model not available, use --model stub", file=sys.stderr)
+            return 2
+    else:
+        engine = stub_engine()
+    open_database(args.db_url)
+
+    with tempfile.TemporaryDirectory(prefix="silvasonic-bench-") as tmp, ExitStack() as stack:
+        root = Path(tmp)
+        for setting, directory in (
+            ("INPUT_DIR", root / "recording"),
+            ("RESULTS_DIR", root / "results"),
+            ("CLIPS_DIR", root / "results" / "clips"),
+            ("EMBEDDINGS_DIR", root / "results" / "embeddings"),
+        ):
+            stack.enter_context(patch.object(config, setting, directory))
+        stack.enter_context(patch.object(config.birdnet, "min_conf", args.min_conf))
+
+        generated: list[Path] = []
+        described: list[dict[str, Any]] = []
+        for seed, (rate, kind) in enumerate(
+            (int(r), k) for r in args.rates.split(",") for k in args.kinds.split(",")
+        ):
+            name = f"2024-05-01_05-{seed:02d}-00.flac"
+            generated.append(
+                write_recording(root / "generated" / name, args.seconds, rate, kind, seed)
+            )
+            described.append({"name": name, "sample_rate": rate, "kind": kind})
+
+        best: dict[str, float] = {}
+        detections = 0
+        run_id = uuid.uuid4().hex[:8]
+        for repeat in range(args.repeats):
+            # A new source folder per pass, so the registry does not skip the files
+            source = config.INPUT_DIR / f"bench-{run_id}-{repeat}"
+            source.mkdir(parents=True)
+            files = [source / path.name for path in generated]
+            for path, link in zip(generated, files, strict=True):
+                os.link(path, link)
+            seconds, detections = run_pipeline(files, engine, args.batch)
+            for stage, value in seconds.items():
+                best[stage] = min(best.get(stage, value), value)
+
+    audio_sec = args.seconds * len(generated)
+    total = sum(best.values())
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "model": args.model,
+        "batch": args.batch,
+        "db": db.engine.dialect.name if db.engine is not None else None,
+        "files": described,
+        "audio_sec": audio_sec,
+        "stages": {
+            stage: {
+                "sec": round(best.get(stage, 0.0), 3),
+                "realtime_factor": round(audio_sec / best[stage], 1) if best.get(stage) else None,
+            }
+            for stage in STAGES
+        },
+        "elapsed_sec": round(total, 3),
+        "realtime_factor": round(audio_sec / total, 1) if total else None,
+        "detections": detections,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    rendered = json.dumps(report, indent=2)
+    print(rendered)
+    if args.output:
+        args.output.write_text(rendered + "\n")
+    return 0 if (report["realtime_factor"] or 0) >= args.min_rtf else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Synthetic field recordings for the benchmarks.
+
+Deterministic (seeded) mixtures of background noise, harmonic tones and
+bird-like FM chirps, so runs on different machines analyse the same audio.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import soundfile as sf
+
+KINDS = ("noise", "tones", "chirps", "mixed")
+
+
+def _chirp(duration: float, f0: float, f1: float, rate: int) -> npt.NDArray[np.float32]:
+    t = np.arange(int(duration * rate)) / rate
+    k = (f1 - f0) / duration
+    wave = np.sin(2 * np.pi * (f0 * t + 0.5 * k * t * t)) * np.hanning(len(t))
+    return wave.astype(np.float32)
+
+
+def synthetic_recording(
+    seconds: float, rate: int = 48000, kind: str = "mixed", seed: int = 0
+) -> npt.NDArray[np.float32]:
+    """Mono float32 signal of `seconds` at `rate`.
+
+    noise:  pink-ish background only (wind, distant traffic)
+    tones:  noise plus sustained harmonic tones (insects, machinery)
+    chirps: noise plus song-like bursts of downward FM sweeps every ~2 s
+    mixed:  all of the above
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind {kind!r}, expected one of {KINDS}")
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+
+    # Pink (1/f) background noise, shaped in the frequency domain
+    spectrum = np.fft.rfft(rng.normal(0, 1, n))
+    spectrum /= np.sqrt(np.maximum(np.fft.rfftfreq(n, d=1.0 / rate), 20.0))
+    pink = np.fft.irfft(spectrum, n)
+    signal = (0.01 * pink / (np.std(pink) or 1.0)).astype(np.float32)
+
+    nyquist = rate / 2
+    if kind in ("tones", "mixed"):
+        t = np.arange(n) / rate
+        for base in (900.0, 2400.0):
+            for harmonic in (1, 2, 3):
+                if base * harmonic < nyquist:
+                    signal += (0.01 / harmonic) * np.sin(2 * np.pi * base * harmonic * t).astype(
+                        np.float32
+                    )
+
+    if kind in ("chirps", "mixed"):
+        for start in np.arange(0.5, seconds - 1.0, 2.0) + rng.uniform(0, 0.5):
+            f0 = min(rng.uniform(3000, 8000), nyquist * 0.9)
+            burst = _chirp(0.12, f0, f0 * 0.5, rate)
+            for repeat in range(int(rng.integers(3, 7))):
+                i = int((start + repeat * 0.15) * rate)
+                if i + len(burst) > n:
+                    break
+                signal[i : i + len(burst)] += 0.2 * burst
+
+    peak = float(np.max(np.abs(signal))) or 1.0
+    return (signal / max(peak, 1.0)).astype(np.float32)
+
+
+def write_recording(
+    path: Path, seconds: float, rate: int = 48000, kind: str = "mixed", seed: int = 0
+) -> Path:
+    """Write a synthetic recording as 16-bit FLAC, like the recorder does."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sf.write(str(path), synthetic_recording(seconds, rate, kind, seed), rate, subtype="PCM_16")
+    return path
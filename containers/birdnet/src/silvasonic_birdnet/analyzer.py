@@ -1,48 +1,334 @@
-import csv
 import logging
 import os
-import shutil
-import subprocess
 import time
+from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
-import soundfile as sf
+import numpy as np
+import numpy.typing as npt
 
+from silvasonic_birdnet.archive import ResultArchiver
+from silvasonic_birdnet.audio import DecodedAudio, decode_audio, to_model_input
+from silvasonic_birdnet.bats import MIN_SAMPLE_RATE as MIN_BAT_RATE
+from silvasonic_birdnet.bats import BatDetector
+from silvasonic_birdnet.clips import ClipRef, write_clips
 from silvasonic_birdnet.config import config
 from silvasonic_birdnet.database import db
-from silvasonic_birdnet.models import BirdDetection
+from silvasonic_birdnet.embeddings import ROW_DTYPE, EmbeddingStore
+from silvasonic_birdnet.engine import (
+    Detection,
+    FileScores,
+    InferenceEngine,
+    birdnet_week,
+    detections_from_array,
+    installed_model_version,
+)
+from silvasonic_birdnet.loadshed import NO_OVERLAP, NORMAL, RAISED_GATE
+from silvasonic_birdnet.models import BatEvent, BirdDetection, ProcessedFile, WindowScores
+from silvasonic_birdnet.registry import FileKey, ProcessedRegistry
+from silvasonic_birdnet.scores import top_k_logits
+from silvasonic_birdnet.seams import Seam, SeamTracker, SegmentTail
+from silvasonic_birdnet.silence import SilenceGate
+from silvasonic_birdnet.stream import LiveAlertLog
+from silvasonic_birdnet.watchlist import WatchlistCache
 
-try:
-    import birdnet_analyzer.analyze as bn_analyze
-except ImportError:
-    bn_analyze = None
+logger = logging.getLogger("Analyzer")
 
 
-logger = logging.getLogger("Analyzer")
+class BatchFailed(RuntimeError):
+    """Files of a batch whose results were not stored; the rest of the batch was."""
+
+    def __init__(self, paths: list[str], reason: str) -> None:
+        super().__init__(f"{len(paths)} file(s) not stored: {reason}")
+        self.paths = paths
+        self.reason = reason
+
+
+@dataclass
+class PendingFile:
+    """A recording that has been decoded and is waiting for inference."""
+
+    path: Path
+    file_start_time: datetime | None
+    audio: DecodedAudio
+    prep_time: float
+    active: npt.NDArray[np.bool_] | None = None  # windows passing the silence gate
+    key: FileKey | None = None  # processed_files registry key
+    bat_events: list[BatEvent] = field(default_factory=list)  # stored with the results
 
 
 class BirdNETAnalyzer:
-    def __init__(self) -> None:
-        logger.info("Initializing BirdNET Analyzer (Simple Mode)...")
-        if bn_analyze is None:
-            logger.error("BirdNET-Analyzer module not found!")
+    def __init__(self, threads: int | None = None) -> None:
+        logger.info("Initializing BirdNET Analyzer (Warm Engine)...")
 
         # Ensure results dir exists
         config.RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
+        # Optional result tables, written off the hot path
+        self.archiver = ResultArchiver(config.RESULTS_DIR, config.RESULTS_FORMAT)
+
+        # Load the model once, it stays warm for the lifetime of the worker
+        self.engine = InferenceEngine(threads=threads or config.birdnet.threads)
+        if self.engine.load():
+            self.engine.set_location(config.birdnet.lat, config.birdnet.lon, config.birdnet.week)
+
         # Initialize Database
         logger.info("Connecting to Database...")
         db.connect()
 
+        # Stored with every result; files analysed by another version are re-analysed on request
+        self.model_version = installed_model_version(config.MODEL_VERSION)
+
+        # Already processed files are dropped before decoding
+        self.registry = ProcessedRegistry(
+            config.INPUT_DIR, hashing=config.CONTENT_HASH, model_version=self.model_version
+        )
+
+        # Watchlist is held in memory; the listener is started by the watcher service
+        self.watchlist = WatchlistCache()
+
+        # Window embeddings for the dashboard's "similar calls" search
+        self.embeddings = (
+            EmbeddingStore(config.EMBEDDINGS_DIR)
+            if config.EMBEDDINGS != "off" and config.EMBEDDINGS_DIR
+            else None
+        )
+
+        # Ultrasonic pulses are detected on the native-rate signal, before resampling
+        self.bats = BatDetector(config.BAT_THRESHOLD_DB) if config.BAT_DETECTION else None
+
+        # Alerts already sent by the stream analysis are not repeated for the recording
+        self.live_alerts = LiveAlertLog(config.STREAM_DEDUP_SEC) if config.STREAM_ANALYSIS else None
+
+        # Calls crossing a segment boundary are scored in one extra window per file
+        self.seams = SeamTracker() if config.SEGMENT_STITCHING else None
+
+        # Energy pre-filter: quiet windows (and fully quiet files) skip inference
+        self.gate = SilenceGate(config.SILENCE_MARGIN_DB) if config.SILENCE_GATE else None
+
+        # Historic files being re-analysed get their own noise floors and segment tails,
+        # so they never disturb those of the live recordings
+        self.reanalysis_seams = SeamTracker() if config.SEGMENT_STITCHING else None
+        self.reanalysis_gate = (
+            SilenceGate(config.SILENCE_MARGIN_DB) if config.SILENCE_GATE else None
+        )
+
+        # Degradation level set by the watcher's load shedder
+        self.load_level = NORMAL
+
+    def set_load_level(self, level: int) -> None:
+        """Apply the analysis side of a load shedding level (see loadshed)."""
+        self.load_level = level
+        boost = config.LOAD_SHED_GATE_BOOST_DB if level >= RAISED_GATE else 0.0
+        for gate in (self.gate, self.reanalysis_gate):
+            if gate is not None:
+                gate.margin_db = config.SILENCE_MARGIN_DB + boost
+
+    @property
+    def overlap(self) -> float:
+        return 0.0 if self.load_level >= NO_OVERLAP else config.birdnet.overlap
+
     def process_file(self, file_path: str) -> None:
-        """Analyze a single audio file and save CSV results."""
+        """Analyze a single audio file."""
+        self.process_batch([file_path])
+
+    def process_batch(self, file_paths: list[str]) -> float:
+        """Analyze several audio files with a single inference call.
+
+        Returns the seconds of audio analysed (for throughput reporting). Raises
+        BatchFailed, once the other files are stored, for files whose results could
+        not be stored, so their jobs can be retried.
+        """
+        pending = []
+        failed: list[str] = []
+        for file_path in file_paths:
+            try:
+                item = self._prepare_file(file_path)
+            except Exception as e:
+                # e.g. the DB being down while a silent file is registered
+                logger.error(f"Failed to prepare {os.path.basename(file_path)}: {e}")
+                failed.append(file_path)
+                continue
+            if item is not None:
+                pending.append(item)
+        if not pending:
+            if failed:
+                raise BatchFailed(failed, "preparation failed")
+            return 0.0
+
+        if not self.engine.loaded:
+            logger.error("BirdNET model not loaded, skipping analysis.")
+            return 0.0
+
+        settings = config.birdnet
+        logger.info(f"Running analysis on {len(pending)} file(s)...")
+        if self.gate is not None:
+            gated = [p.active for p in pending if p.active is not None]
+            skipped = sum(int((~mask).sum()) for mask in gated)
+            if skipped:
+                logger.info(
+                    f"Silence gate: skipping {skipped} of {sum(len(m) for m in gated)} window(s), "
+                    f"~{self.gate.inference_sec_saved:.1f}s inference saved so far."
+                )
+        species_masks = [self._species_mask_for(p) for p in pending]
+        seams = [self._next_segment(p) for p in pending]
+        # Boundary windows ride along in the same inference call, as extra one-window signals
+        seam_items = [(i, seam) for i, (seam, _) in enumerate(seams) if seam is not None]
+        inference_start = time.time()
+        try:
+            results = self.engine.analyze_scored(
+                [p.audio.samples for p in pending] + [seam.window for _, seam in seam_items],
+                min_conf=settings.min_conf,
+                overlap=self.overlap,
+                sensitivity=settings.sensitivity,
+                masks=[p.active for p in pending] + [None] * len(seam_items),
+                species_masks=species_masks + [species_masks[i] for i, _ in seam_items],
+                embeddings=self.embeddings is not None,
+            )
+        except Exception as e:
+            logger.error(f"BirdNET analysis crashed: {e}")
+            raise BatchFailed(failed + [str(p.path) for p in pending], str(e)) from e
+        seam_results = zip(seam_items, results[len(pending) :], strict=False)
+        seam_hits = {i: result.hits for (i, _), result in seam_results}
+        inference_time = time.time() - inference_start
+        windows = sum(int(p.active.sum()) for p in pending if p.active is not None)
+        for gate in (self.gate, self.reanalysis_gate):
+            if gate is not None:
+                gate.record_inference(windows, inference_time)
+
+        # Attribute the shared inference time to files by their share of audio
+        total_samples = sum(p.audio.samples.size for p in pending) or 1
+        first_new_embedding = self.embeddings.count() if self.embeddings is not None else 0
+        for i, (item, scored, species) in enumerate(
+            zip(pending, results[: len(pending)], species_masks, strict=True)
+        ):
+            inference_share = inference_time * item.audio.samples.size / total_samples
+            seam, tail = seams[i]
+            # One file's failure must not cost the other files of the batch their results
+            try:
+                scored.hits = SeamTracker.merge(
+                    scored.hits, item.audio.duration, seam, seam_hits.get(i), tail
+                )
+                self.archiver.submit(item.path, scored.hits, self.engine.labels)
+                detections = detections_from_array(scored.hits, self.engine.labels)
+                scores = self._build_scores(item, scored, species)
+                records = self._handle_detections(item, detections, inference_share, scores)
+                self._store_embeddings(item, scored, records)
+            except Exception as e:
+                logger.error(f"Failed to store results for {item.path.name}: {e}")
+                failed.append(str(item.path))
+
+        # Windows stored by earlier analyses of files whose results were just replaced
+        replaced = {
+            (p.path.parent.name, p.path.name)
+            for p in pending
+            if p.key is not None and p.key.replaces
+        }
+        if self.embeddings is not None and replaced:
+            self.embeddings.remove(replaced, before=first_new_embedding)
+
+        if failed:
+            raise BatchFailed(failed, "results not stored")
+
+        audio_seconds: float = sum(p.audio.duration for p in pending)
+        return audio_seconds
+
+    def _next_segment(self, item: PendingFile) -> tuple[Seam | None, SegmentTail | None]:
+        """Boundary window towards the source's previous segment, if it was continuous."""
+        seams = (
+            self.reanalysis_seams if item.key is not None and item.key.reanalysis else self.seams
+        )
+        if seams is None:
+            return None, None
+        segment: tuple[Seam | None, SegmentTail | None] = seams.next_segment(
+            item.path.parent.name, item.file_start_time, item.audio.samples, item.audio.duration
+        )
+        return segment
+
+    def _species_mask_for(self, item: PendingFile) -> npt.NDArray[np.bool_] | None:
+        """Seasonal species list for a recording (cached per location and week)."""
+        settings = config.birdnet
+        week = settings.week
+        # No fixed week configured: use the week the recording was made
+        if week == -1 and item.file_start_time is not None:
+            week = birdnet_week(item.file_start_time)
+        mask: npt.NDArray[np.bool_] | None = self.engine.species_mask(
+            settings.lat, settings.lon, week
+        )
+        return mask
+
+    def _build_scores(
+        self,
+        item: PendingFile,
+        scored: FileScores,
+        species_mask: npt.NDArray[np.bool_] | None,
+    ) -> WindowScores | None:
+        """Keep the top-K raw logits per window so thresholds can be changed later."""
+        if config.SCORE_TOP_K <= 0 or not scored.starts:
+            return None
+        top = top_k_logits(scored.logits, scored.starts, config.SCORE_TOP_K, species_mask)
+        starts, labels, logits = top.to_bytes()
+        return WindowScores(
+            filename=item.path.name,
+            filepath=str(item.path),
+            source=item.path.parent.name,
+            recorded_at=item.file_start_time,
+            top_k=top.k,
+            starts=starts,
+            labels=labels,
+            logits=logits,
+        )
+
+    def _store_embeddings(
+        self, item: PendingFile, scored: FileScores, records: list[BirdDetection]
+    ) -> None:
+        """Append the file's window embeddings, labelled by the best detection per window."""
+        if self.embeddings is None or scored.embeddings is None or not scored.starts:
+            return
+
+        best: dict[float, BirdDetection] = {}
+        for record in records:
+            key = round(record.start_time, 1)
+            if key not in best or record.confidence > best[key].confidence:
+                best[key] = record
+
+        keep = [
+            i
+            for i, start in enumerate(scored.starts)
+            if config.EMBEDDINGS == "all" or round(start, 1) in best
+        ]
+        if not keep:
+            return
+
+        rows = np.zeros(len(keep), dtype=ROW_DTYPE)
+        rows["source"] = item.path.parent.name.encode()
+        rows["filename"] = item.path.name.encode()
+        rows["label"] = -1
+        name_to_label = {scientific: i for i, (scientific, _) in enumerate(self.engine.labels)}
+        for row, i in enumerate(keep):
+            start = scored.starts[i]
+            rows["start"][row] = start
+            record = best.get(round(start, 1))
+            if record is not None:
+                rows["label"][row] = name_to_label.get(record.scientific_name, -1)
+                rows["confidence"][row] = record.confidence
+        self.embeddings.add(scored.embeddings[keep], rows)
+
+    def _prepare_file(self, file_path: str) -> PendingFile | None:
+        """Decode a recording into memory so it is ready for batched inference."""
         path = Path(file_path)
         if not path.exists():
             logger.error(f"File not found: {file_path}")
-            return
+            return None
+
+        key = self.registry.check(path)
+        if key is None:
+            logger.info(f"Skipping already processed file: {path.name}")
+            return None
 
-        logger.info(f"Processing: {path.name}")
+        logger.info(f"{'Re-analysing' if key.reanalysis else 'Processing'}: {path.name}")
+        prep_start = time.time()
 
         # Parse Timestamp from Filename (CRITICAL for Data Integrity)
         file_start_time = self._parse_timestamp_from_filename(path.name)
@@ -51,162 +337,228 @@ class BirdNETAnalyzer:
                 f"Could not parse timestamp from filename: {path.name}. defaulting to Processing Time (NOW)."
             )
 
-        # Setup temp paths
-        start_time_epoch = time.time()
-        temp_dir = Path("/tmp/birdnet_processing")
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        temp_resampled = temp_dir / f"{path.stem}_48k.wav"
-
-        # 1. Resample (Robustness)
-        if not self._run_ffmpeg_resampling(path, temp_resampled):
-            return
-
-        # 2. Run BirdNET Analysis
-        temp_output_dir = temp_dir / "results"
-        temp_output_dir.mkdir(parents=True, exist_ok=True)
-
+        # Decode once per file
         try:
-            logger.info(f"Running analysis on {temp_resampled.name}...")
-            # Use new Typed Config
-            settings = config.birdnet
-
-            # Sanitize location (None if disabled via -1 sentinel in default/env, but here validation ensures valid ranges or None)
-            # Our Pydantic model allows None. If value is None, we pass None.
-            # If value is -1 (from old default), we should treat as None?
-            # Pydantic validator handles it? In `config.py` we allowed None.
-            # Let's trust config.py logic.
-
-            if bn_analyze:
-                bn_analyze(
-                    audio_input=str(temp_resampled),
-                    min_conf=settings.min_conf,
-                    lat=settings.lat,
-                    lon=settings.lon,
-                    week=settings.week,
-                    overlap=settings.overlap,
-                    sensitivity=settings.sensitivity,
-                    threads=settings.threads,
-                    sf_thresh=0.0001,
-                    output=str(temp_output_dir),
-                    rtype="csv",
-                )
-            else:
-                logger.error("BirdNET Analyzer not loaded, skipping analysis.")
-                return
-
+            samples, source_rate = decode_audio(path)
         except Exception as e:
-            logger.error(f"BirdNET analysis crashed: {e}")
-            return
-
-        # 3. Locate and Move/Rename Result File
-        expected_result_name = f"{temp_resampled.stem}.BirdNET.results.csv"
-        temp_result_path = temp_output_dir / expected_result_name
+            logger.error(f"Failed to decode {path.name}: {e}")
+            return None
 
-        final_output_file = config.RESULTS_DIR / f"{path.name}.csv"
+        # Bat events do not depend on the BirdNET model, a re-analysis keeps them
+        bat_events: list[BatEvent] = []
+        if self.bats is not None and source_rate >= MIN_BAT_RATE and not key.reanalysis:
+            bat_events = self._detect_bats(path, file_start_time, samples, source_rate)
 
-        if temp_result_path.exists():
-            # Move to final destination
+        # Gate on the native-rate signal, so silent files are not even resampled
+        active = None
+        gate = self.reanalysis_gate if key.reanalysis else self.gate
+        if gate is not None:
             try:
-                shutil.move(str(temp_result_path), str(final_output_file))
-                logger.info(f"Saved results to: {final_output_file}")
-
-                # Verify content and log detection count
-                try:
-                    detection_count = 0
-
-                    with open(final_output_file, encoding="utf-8") as f:
-                        reader = csv.reader(f)
-                        next(reader, None)  # Skip header usage
-
-                        for row in reader:
-                            detection_count += 1
-                            if len(row) < 5:
-                                continue
-
-                            # Parse Row: Start (s), End (s), Scientific name, Common name, Confidence
-                            try:
-                                start_t = float(row[0])
-                                end_t = float(row[1])
-                                conf = float(row[4])
-                                common_name = row[3]
-                                scientific_name = row[2]
-
-                                # Calculate Exact Timestamp
-                                detection_timestamp = None
-                                if file_start_time:
-                                    # Timestamp = File Start + Detection Start Offset
-                                    detection_timestamp = file_start_time + timedelta(
-                                        seconds=start_t
-                                    )
-
-                                # Save Clip
-                                clip_path = self._save_clip(
-                                    temp_resampled, start_t, end_t, common_name
-                                )
-
-                                # Create Typed BirdDetection
-                                detection = BirdDetection(
-                                    filename=path.name,
-                                    filepath=str(path),
-                                    start_time=start_t,
-                                    end_time=end_t,
-                                    scientific_name=scientific_name,
-                                    common_name=common_name,
-                                    confidence=conf,
-                                    lat=config.birdnet.lat,
-                                    lon=config.birdnet.lon,
-                                    clip_path=clip_path or None,  # Ensure None if empty string
-                                    source_device=path.parent.name,  # Extract source from folder
-                                    timestamp=detection_timestamp,
-                                )
-
-                                db.save_detection(detection)
-
-                                # Check Watchlist & Alert
-                                if db.is_watched(scientific_name):
-                                    self._trigger_alert(detection)
-
-                            except ValueError as e:
-                                logger.warning(f"Skipping invalid row in {final_output_file}: {e}")
-                            except Exception as e:
-                                logger.error(f"Error processing detection: {e}")
-
-                    if detection_count == 0:
-                        logger.warning(f"Analysis produced 0 detections for {path.name}.")
-                    else:
-                        logger.info(
-                            f"Analysis finished for {path.name}: Found {detection_count} detections. Saved to DB."
-                        )
-
-                except Exception as e:
-                    logger.error(f"Failed to read result file for verification/DB: {e}")
-
+                active = gate.check(path.parent.name, samples, source_rate, self.overlap)
             except Exception as e:
-                logger.error(f"Failed to save results: {e}")
-        else:
-            logger.warning("No result file found. Input might be silent or too short.")
+                # Scored ungated rather than failing the batch
+                logger.error(f"Silence gate failed for {path.name}: {e}")
+        # Also files too short for a single window
+        if active is not None and not active.any():
+            self._log_silent_file(
+                path, key, len(samples) / source_rate, time.time() - prep_start, bat_events
+            )
+            return None
 
-        # Log Processing Stats (Always, even if no detections or silent)
+        return PendingFile(
+            path=path,
+            file_start_time=file_start_time,
+            audio=to_model_input(samples, source_rate),
+            prep_time=time.time() - prep_start,
+            active=active,
+            key=key,
+            bat_events=bat_events,
+        )
+
+    def _detect_bats(
+        self,
+        path: Path,
+        file_start_time: datetime | None,
+        samples: npt.NDArray[np.float32],
+        rate: int,
+    ) -> list[BatEvent]:
+        """Find bat call pulses; they are stored with the file's results."""
+        assert self.bats is not None
+        try:
+            calls = self.bats.detect_samples(samples, rate)
+        except Exception as e:
+            logger.error(f"Bat detection failed for {path.name}: {e}")
+            return []
+        if not calls:
+            return []
+
+        events = [
+            BatEvent(
+                timestamp=file_start_time + timedelta(seconds=call.start_time)
+                if file_start_time
+                else None,
+                filename=path.name,
+                filepath=str(path),
+                source_device=path.parent.name,
+                start_time=call.start_time,
+                end_time=call.end_time,
+                peak_freq=call.peak_freq,
+                bandwidth=call.bandwidth,
+                level_db=call.level_db,
+            )
+            for call in calls
+        ]
+        logger.info(f"Bat detector: {len(calls)} call(s) in {path.name}.")
+        return events
+
+    def _log_silent_file(
+        self,
+        path: Path,
+        key: FileKey,
+        duration: float,
+        prep_time: float,
+        bat_events: list[BatEvent] | None = None,
+    ) -> None:
+        """Record a file that the silence gate kept away from inference."""
+        logger.info(f"Skipping silent file: {path.name}")
         try:
-            # Estimate audio duration
-            try:
-                info = sf.info(str(path))
-                duration = info.duration
-            except Exception:
-                duration = 10.0  # Fallback
-
-            processing_time = time.time() - start_time_epoch
             file_size = os.path.getsize(str(path))
-            db.log_processed_file(path.name, duration, processing_time, file_size)
+        except OSError:
+            file_size = 0
+
+        processed = ProcessedFile(
+            filename=path.name,
+            audio_duration_sec=duration,
+            processing_time_sec=prep_time,
+            file_size_bytes=file_size,
+            processed_at=datetime.now(UTC),
+            skipped_silent=True,
+            source=key.source,
+            relpath=key.relpath,
+            content_hash=key.content_hash,
+            model_version=self.model_version or None,
+        )
+        db.save_file_results([], processed, bat_events=bat_events)
+        self.registry.mark(key)
+        if key.replaces and self.embeddings is not None:
+            self.embeddings.remove({(key.source, path.name)})
+
+    def _handle_detections(
+        self,
+        item: PendingFile,
+        detections: list[Detection],
+        inference_share: float,
+        scores: WindowScores | None = None,
+    ) -> list[BirdDetection]:
+        """Extract clips and persist the file's detections in one transaction.
+
+        Returns the stored records (with their DB IDs).
+        """
+        handling_start = time.time()
+        path = item.path
+
+        # Clips: overlapping detections of a species share one compressed file
+        try:
+            clip_refs = write_clips(
+                path, item.audio, detections, config.CLIPS_DIR, config.CLIP_FORMAT
+            )
         except Exception as e:
-            logger.error(f"Failed to log processing stats: {e}")
+            logger.error(f"Failed to save clips for {path.name}: {e}")
+            clip_refs = [None] * len(detections)
+
+        records: list[BirdDetection] = []
+        for det, clip in zip(detections, clip_refs, strict=True):
+            try:
+                records.append(self._build_record(item, det, clip))
+            except Exception as e:
+                logger.error(f"Error processing detection: {e}")
 
-        # Cleanup
         try:
-            if temp_resampled.exists():
-                temp_resampled.unlink()
-        except Exception:
-            pass
+            file_size = os.path.getsize(str(path))
+        except OSError:
+            file_size = 0
+
+        processed = ProcessedFile(
+            filename=path.name,
+            audio_duration_sec=item.audio.duration,
+            processing_time_sec=item.prep_time + inference_share + (time.time() - handling_start),
+            file_size_bytes=file_size,
+            processed_at=datetime.now(UTC),
+            model_version=self.model_version or None,
+        )
+        if item.key is not None:
+            processed.source = item.key.source
+            processed.relpath = item.key.relpath
+            processed.content_hash = item.key.content_hash
+
+        # Detections + processed_files row: single transaction, IDs come back for alerting.
+        # Raises if nothing was stored: the file is neither registered nor alerted on
+        ids = db.save_file_results(records, processed, scores, item.bat_events)
+        if item.key is not None:
+            self.registry.mark(item.key)
+        if ids is None:
+            # Registered meanwhile (e.g. by another worker): nothing stored, no alerts
+            return []
+        for record, detection_id in zip(records, ids, strict=False):
+            record.id = detection_id
+        if item.key is not None and item.key.reanalysis:
+            # Historic recordings: results are swapped in, nobody is alerted
+            logger.info(f"Re-analysis of {path.name} stored ({len(records)} detection(s)).")
+            return records
+
+        # Check Watchlist & Alert (after the commit, in-memory lookup)
+        for record in records:
+            if not self.watchlist.should_alert(record.scientific_name, record.confidence):
+                continue
+            if (
+                self.live_alerts is not None
+                and record.timestamp is not None
+                and self.live_alerts.seen(
+                    record.source_device, record.scientific_name, record.timestamp
+                )
+            ):
+                # Already alerted from the live stream, the recording confirms it
+                logger.info(f"Live alert for {record.common_name} confirmed by {path.name}.")
+                continue
+            self._trigger_alert(record)
+
+        if not detections:
+            logger.warning(f"Analysis produced 0 detections for {path.name}.")
+        else:
+            logger.info(
+                f"Analysis finished for {path.name}: Found {len(detections)} detections. Saved to DB."
+            )
+        return records
+
+    def _build_record(
+        self, item: PendingFile, det: Detection, clip: ClipRef | None
+    ) -> BirdDetection:
+        """Build the typed DB record for one detection."""
+        path = item.path
+
+        # Calculate Exact Timestamp
+        detection_timestamp = None
+        if item.file_start_time:
+            # Timestamp = File Start + Detection Start Offset
+            detection_timestamp = item.file_start_time + timedelta(seconds=det.start_time)
+
+        # Create Typed BirdDetection
+        return BirdDetection(
+            filename=path.name,
+            filepath=str(path),
+            start_time=det.start_time,
+            end_time=det.end_time,
+            scientific_name=det.scientific_name,
+            common_name=det.common_name,
+            confidence=det.confidence,
+            lat=config.birdnet.lat,
+            lon=config.birdnet.lon,
+            clip_path=clip.path if clip else None,
+            clip_offset=clip.offset if clip else None,
+            source_device=path.parent.name,  # Extract source from folder
+            timestamp=detection_timestamp,
+            model_version=self.model_version or None,
+        )
 
     def _parse_timestamp_from_filename(
         self, filename: str, format_str: str = "%Y-%m-%d_%H-%M-%S"
@@ -225,96 +577,41 @@ class BirdNETAnalyzer:
             # Try to handle potential variations or fail gracefully
             return None
 
-    def _save_clip(self, audio_path: Path, start_time: float, end_time: float, species: str) -> str:
-        """Extracts and saves the audio clip for a detection.
-        Returns the relative path to the clip or None if failed.
-        """
-        try:
-            # Create clips directory if it doesn't exist
-            # Note: CLIPS_DIR is guaranteed to be set by model_post_init
-            config.CLIPS_DIR.mkdir(parents=True, exist_ok=True)
-
-            # Generate filename: {original_name}_{start}_{end}_{species}.wav
-            # Sanitize species name for filename
-            safe_species = (
-                "".join([c for c in species if c.isalnum() or c in (" ", "_")])
-                .strip()
-                .replace(" ", "_")
-            )
-            clip_name = f"{audio_path.stem}_{start_time:.1f}_{end_time:.1f}_{safe_species}.wav"
-            clip_path = config.CLIPS_DIR / clip_name
-
-            # Read the specific segment with padding
-            # We use soundfile for precision reading
-            # Note: start/end are in seconds
-            PADDING = 3.0
-            clip_start = max(0.0, start_time - PADDING)
-            clip_end = end_time + PADDING
-
-            data, samplerate = sf.read(
-                str(audio_path),
-                start=int(clip_start * 48000),
-                stop=int(clip_end * 48000),
-                always_2d=True,
-            )
-
-            sf.write(str(clip_path), data, samplerate)
+    def _trigger_alert(self, detection: BirdDetection) -> None:
+        """Creates a notification event in the shared queue."""
+        trigger_alert(detection)
 
-            # Return absolute path as string
-            return str(clip_path)
 
-        except Exception as e:
-            logger.error(f"Failed to save clip for {audio_path.name}: {e}")
-            return ""
-
-    def _run_ffmpeg_resampling(self, input_path: Path, output_path: Path) -> bool:
-        """Resample to 48kHz mono using ffmpeg (robust against formats)"""
-        try:
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-i",
-                str(input_path.absolute()),
-                "-ar",
-                "48000",
-                "-ac",
-                "1",
-                "-c:a",
-                "pcm_s16le",
-                str(output_path),
-            ]
-            # Suppress output unless error
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            return True
-        except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg failed for {input_path.name}: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Resampling error: {e}")
-            return False
+def trigger_alert(detection: BirdDetection, live: bool = False) -> None:
+    """Creates a notification event in the shared queue.
 
-    def _trigger_alert(self, detection: BirdDetection) -> None:
-        """Creates a notification event in the shared queue."""
-        try:
-            # Shared notification queue path
-            # Using /data/notifications (mapped volume)
-            queue_dir = Path("/data/notifications")
-            queue_dir.mkdir(parents=True, exist_ok=True)
+    `live` marks alerts raised from the stream analysis, before the recording exists.
+    """
+    try:
+        # Shared notification queue path
+        # Using /data/notifications (mapped volume)
+        queue_dir = Path("/data/notifications")
+        queue_dir.mkdir(parents=True, exist_ok=True)
 
-            import json
+        import json
 
-            event_id = f"{int(time.time() * 1000)}_{detection.scientific_name.replace(' ', '_')}"
-            event_path = queue_dir / f"{event_id}.json"
+        event_id = f"{int(time.time() * 1000)}_{detection.scientific_name.replace(' ', '_')}"
+        event_path = queue_dir / f"{event_id}.json"
 
-            # Use model_dump for clean dict, preserving aliases (lat/lon) and serializing datetimes
-            data_dict = detection.model_dump(mode="json", by_alias=True)
+        # Use model_dump for clean dict, preserving aliases (lat/lon) and serializing datetimes
+        data_dict = detection.model_dump(mode="json", by_alias=True)
 
-            payload = {"type": "bird_detection", "timestamp": time.time(), "data": data_dict}
+        payload = {
+            "type": "bird_detection",
+            "timestamp": time.time(),
+            "live": live,
+            "data": data_dict,
+        }
 
-            with open(event_path, "w") as f:
-                json.dump(payload, f)
+        with open(event_path, "w") as f:
+            json.dump(payload, f)
 
-            logger.info(f"Triggered notification alert for {detection.common_name}")
+        logger.info(f"Triggered notification alert for {detection.common_name}")
 
-        except Exception as e:
-            logger.error(f"Failed to trigger alert: {e}")
+    except Exception as e:
+        logger.error(f"Failed to trigger alert: {e}")
@@ -0,0 +1,100 @@
+import csv
+import json
+import logging
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from silvasonic_birdnet.engine import detections_from_array
+
+logger = logging.getLogger("Archive")
+
+
+class ResultArchiver:
+    """Writes per-file result tables (CSV or JSON) on a background thread.
+
+    Archival output is optional and never on the analysis hot path: the worker only
+    enqueues the structured result array. If the writer falls behind, files are
+    dropped from the archive rather than slowing down analysis.
+    """
+
+    def __init__(self, results_dir: Path, fmt: str = "csv", max_pending: int = 256) -> None:
+        self.results_dir = results_dir
+        self.fmt = fmt
+        self._queue: queue.Queue[tuple[Path, npt.NDArray[np.void], list[tuple[str, str]]]] = (
+            queue.Queue(maxsize=max_pending)
+        )
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.fmt in ("csv", "json")
+
+    def submit(self, path: Path, hits: npt.NDArray[np.void], labels: list[tuple[str, str]]) -> None:
+        """Queue a file's results for archival (non-blocking)."""
+        if not self.enabled:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait((path, hits, labels))
+        except queue.Full:
+            logger.warning(f"Result archive backlog full, not archiving {path.name}")
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            path, hits, labels = self._queue.get()
+            try:
+                self.write(path, hits, labels)
+            except Exception as e:
+                logger.error(f"Failed to archive results for {path.name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def write(self, path: Path, hits: npt.NDArray[np.void], labels: list[tuple[str, str]]) -> Path:
+        """Write the result file for one recording and return its path."""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        detections = detections_from_array(hits, labels)
+
+        if self.fmt == "json":
+            output = self.results_dir / f"{path.name}.json"
+            rows = [
+                {
+                    "start": d.start_time,
+                    "end": d.end_time,
+                    "scientific_name": d.scientific_name,
+                    "common_name": d.common_name,
+                    "confidence": round(d.confidence, 4),
+                }
+                for d in detections
+            ]
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump({"file": str(path), "detections": rows}, f)
+        else:
+            # BirdNET CSV layout
+            output = self.results_dir / f"{path.name}.csv"
+            with open(output, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(
+                    ["Start (s)", "End (s)", "Scientific name", "Common name", "Confidence", "File"]
+                )
+                for d in detections:
+                    writer.writerow(
+                        [
+                            d.start_time,
+                            d.end_time,
+                            d.scientific_name,
+                            d.common_name,
+                            f"{d.confidence:.4f}",
+                            str(path),
+                        ]
+                    )
+        return output
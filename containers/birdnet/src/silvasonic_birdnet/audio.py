@@ -0,0 +1,59 @@
+import logging
+from dataclasses import dataclass
+from math import gcd
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from silvasonic_birdnet.engine import SAMPLE_RATE
+
+logger = logging.getLogger("Audio")
+
+
+@dataclass
+class DecodedAudio:
+    """A recording decoded once into memory as 48 kHz mono float32."""
+
+    samples: npt.NDArray[np.float32]
+    source_rate: int
+    duration: float  # seconds
+
+
+def resample(
+    samples: npt.NDArray[np.float32], source_rate: int, target_rate: int = SAMPLE_RATE
+) -> npt.NDArray[np.float32]:
+    """Polyphase resampling; a no-op when the rates already match."""
+    if source_rate == target_rate:
+        return samples
+    divisor = gcd(source_rate, target_rate)
+    resampled: npt.NDArray[np.float32] = resample_poly(
+        samples, target_rate // divisor, source_rate // divisor
+    ).astype(np.float32, copy=False)
+    return resampled
+
+
+def decode_audio(path: Path) -> tuple[npt.NDArray[np.float32], int]:
+    """Decode an audio file to mono float32 at its native sample rate."""
+    data, source_rate = sf.read(str(path), dtype="float32", always_2d=True)
+    mono = data[:, 0] if data.shape[1] == 1 else data.mean(axis=1, dtype=np.float32)
+    return np.ascontiguousarray(mono), source_rate
+
+
+def to_model_input(samples: npt.NDArray[np.float32], source_rate: int) -> DecodedAudio:
+    """Resample a decoded native-rate signal to BirdNET's input format."""
+    duration = len(samples) / source_rate if source_rate else 0.0
+    return DecodedAudio(
+        samples=resample(samples, source_rate), source_rate=source_rate, duration=duration
+    )
+
+
+def load_audio(path: Path) -> DecodedAudio:
+    """Decode an audio file in-process and bring it to BirdNET's input format.
+
+    Replaces the former ffmpeg subprocess + temporary WAV: the returned buffer is
+    shared by inference, clip extraction and duration logging.
+    """
+    return to_model_input(*decode_audio(path))
@@ -0,0 +1,184 @@
+import logging
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import soundfile as sf
+
+logger = logging.getLogger("Bats")
+
+BAND_HZ = (15000.0, 120000.0)  # Echolocation and social calls of European bats
+MIN_SAMPLE_RATE = 96000  # Below this there is no usable ultrasonic band
+FRAME_SEC = 0.0013  # ~1.3 ms analysis frames (512 samples at 384 kHz), 50 % hop
+BLOCK_SEC = 1.0  # Audio streamed per block; also the span of one noise estimate
+
+THRESHOLD_DB = 12.0  # Band level above the block's median that marks a frame active
+MAX_GAP_FRAMES = 1  # Active runs separated by at most this many frames are merged
+MIN_CALL_SEC = 0.001
+MAX_CALL_SEC = 0.08  # Longer events are insect song or electrical noise, not pulses
+MAX_FLATNESS = 0.5  # Spectral flatness above this is a broadband click (rain, rustle)
+BANDWIDTH_DB = 12.0  # Bandwidth measured this far below the spectral peak
+EPS = 1e-12
+
+
+@dataclass
+class BatCall:
+    """One detected ultrasonic pulse."""
+
+    start_time: float  # seconds from file start
+    end_time: float
+    peak_freq: float  # Hz
+    bandwidth: float  # Hz, -BANDWIDTH_DB extent around the peak
+    level_db: float  # peak frame band level, dBFS
+
+
+@dataclass
+class _OpenRun:
+    first: int  # global frame index
+    last: int
+    spectrum: npt.NDArray[np.float64]  # summed power spectrum of the run's frames
+    peak_db: float
+
+
+def frame_size(rate: int) -> int:
+    """FFT size for ~FRAME_SEC frames (power of two)."""
+    return int(2 ** np.ceil(np.log2(rate * FRAME_SEC)))
+
+
+def iter_blocks(samples: npt.NDArray[np.float32], block: int) -> Iterator[npt.NDArray[np.float32]]:
+    for offset in range(0, len(samples), block):
+        yield samples[offset : offset + block]
+
+
+def iter_file_blocks(path: Path, block: int) -> Iterator[npt.NDArray[np.float32]]:
+    """Stream a recording as mono float32 blocks without decoding it all at once."""
+    for data in sf.blocks(str(path), blocksize=block, dtype="float32", always_2d=True):
+        yield data[:, 0] if data.shape[1] == 1 else data.mean(axis=1, dtype=np.float32)
+
+
+class BatDetector:
+    """Energy + shape detector for bat call pulses in ultrasonic recordings.
+
+    Audio is streamed in blocks through a vectorised short-time FFT that only
+    keeps the 15-120 kHz bins. Frames whose band level rises THRESHOLD_DB above
+    the block's median (the noise floor; calls occupy a small share of frames)
+    form runs; a run becomes a call if its duration fits a pulse and its
+    spectrum is tonal rather than a broadband click. Runs crossing a block
+    boundary are carried over, so results do not depend on the block size.
+    """
+
+    def __init__(self, threshold_db: float = THRESHOLD_DB) -> None:
+        self.threshold_db = threshold_db
+
+    def detect_file(self, path: Path) -> list[BatCall]:
+        rate = sf.info(str(path)).samplerate
+        return self.detect(iter_file_blocks(path, int(rate * BLOCK_SEC)), rate)
+
+    def detect_samples(self, samples: npt.NDArray[np.float32], rate: int) -> list[BatCall]:
+        return self.detect(iter_blocks(samples, int(rate * BLOCK_SEC)), rate)
+
+    def detect(self, blocks: Iterable[npt.NDArray[np.float32]], rate: int) -> list[BatCall]:
+        """Detect calls in a stream of mono blocks at `rate`."""
+        if rate < MIN_SAMPLE_RATE:
+            return []
+
+        nfft = frame_size(rate)
+        hop = nfft // 2
+        window = np.hanning(nfft).astype(np.float32)
+        # One-sided Parseval scaling: band level as mean power of the windowed frame
+        power_scale = 2.0 / (nfft * float(np.sum(window**2)))
+        freqs = np.fft.rfftfreq(nfft, d=1.0 / rate)
+        band = np.flatnonzero((freqs >= BAND_HZ[0]) & (freqs <= min(BAND_HZ[1], rate / 2)))
+        lo, hi = int(band[0]), int(band[-1]) + 1
+        band_freqs = freqs[lo:hi]
+
+        calls: list[BatCall] = []
+        carry = np.zeros(0, dtype=np.float32)
+        frame_offset = 0  # global index of the first frame in the current buffer
+        open_run: _OpenRun | None = None
+
+        for block in blocks:
+            buffer = np.concatenate((carry, block)) if carry.size else block
+            n_frames = (len(buffer) - nfft) // hop + 1 if len(buffer) >= nfft else 0
+            if n_frames <= 0:
+                carry = buffer
+                continue
+
+            frames = np.lib.stride_tricks.sliding_window_view(buffer, nfft)[::hop][:n_frames]
+            spectra = np.abs(np.fft.rfft(frames * window, axis=1)[:, lo:hi]) ** 2
+            level_db = 10 * np.log10(spectra.sum(axis=1) * power_scale + EPS)
+            floor_db = float(np.median(level_db))
+            active = np.flatnonzero(level_db > floor_db + self.threshold_db)
+
+            for run in self._split_runs(active):
+                first, last = frame_offset + int(run[0]), frame_offset + int(run[-1])
+                spectrum = spectra[run].sum(axis=0, dtype=np.float64)
+                peak_db = float(level_db[run].max())
+                if open_run is not None and first - open_run.last <= MAX_GAP_FRAMES + 1:
+                    open_run.last = last
+                    open_run.spectrum += spectrum
+                    open_run.peak_db = max(open_run.peak_db, peak_db)
+                    continue
+                if open_run is not None:
+                    self._close(open_run, hop, nfft, rate, band_freqs, calls)
+                open_run = _OpenRun(first, last, spectrum, peak_db)
+
+            frame_offset += n_frames
+            carry = buffer[n_frames * hop :]
+            # A run that ended well before the block edge can no longer grow
+            if open_run is not None and frame_offset - 1 - open_run.last > MAX_GAP_FRAMES:
+                self._close(open_run, hop, nfft, rate, band_freqs, calls)
+                open_run = None
+
+        if open_run is not None:
+            self._close(open_run, hop, nfft, rate, band_freqs, calls)
+        return calls
+
+    @staticmethod
+    def _split_runs(active: npt.NDArray[np.intp]) -> list[npt.NDArray[np.intp]]:
+        if len(active) == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(active) > MAX_GAP_FRAMES + 1) + 1
+        return np.split(active, breaks)
+
+    @staticmethod
+    def _close(
+        run: _OpenRun,
+        hop: int,
+        nfft: int,
+        rate: int,
+        band_freqs: npt.NDArray[np.floating[Any]],
+        calls: list[BatCall],
+    ) -> None:
+        """Turn a finished run into a call if it has the shape of a pulse."""
+        start = run.first * hop / rate
+        end = (run.last * hop + nfft) / rate
+        if not MIN_CALL_SEC <= end - start <= MAX_CALL_SEC:
+            return
+
+        spectrum = run.spectrum + EPS
+        flatness = np.exp(np.mean(np.log(spectrum))) / np.mean(spectrum)
+        if flatness > MAX_FLATNESS:
+            return
+
+        peak = int(np.argmax(spectrum))
+        above = spectrum >= spectrum[peak] * 10 ** (-BANDWIDTH_DB / 10)
+        low = peak
+        while low > 0 and above[low - 1]:
+            low -= 1
+        high = peak
+        while high < len(spectrum) - 1 and above[high + 1]:
+            high += 1
+
+        calls.append(
+            BatCall(
+                start_time=round(start, 4),
+                end_time=round(end, 4),
+                peak_freq=float(band_freqs[peak]),
+                bandwidth=float(band_freqs[high] - band_freqs[low]),
+                level_db=round(run.peak_db, 1),
+            )
+        )
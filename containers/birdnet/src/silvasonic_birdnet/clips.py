@@ -0,0 +1,109 @@
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import soundfile as sf
+
+from silvasonic_birdnet.audio import DecodedAudio
+from silvasonic_birdnet.engine import SAMPLE_RATE, Detection
+
+logger = logging.getLogger("Clips")
+
+CLIP_PADDING = 3.0  # seconds of context before/after each detection
+
+# soundfile (format, subtype) per configured clip format
+CLIP_FORMATS: dict[str, tuple[str, str, str]] = {
+    "flac": ("FLAC", "PCM_16", ".flac"),
+    "opus": ("OGG", "OPUS", ".opus"),
+}
+
+
+@dataclass
+class ClipInterval:
+    """A merged, padded audio span covering one or more detections of a species."""
+
+    species: str
+    start: float
+    end: float
+    members: list[int] = field(default_factory=list)  # indices into the detection list
+
+
+@dataclass
+class ClipRef:
+    """Where a detection ended up: the clip file and its start offset inside the clip."""
+
+    path: str
+    offset: float
+
+
+def plan_clips(
+    detections: list[Detection], duration: float, padding: float = CLIP_PADDING
+) -> list[ClipInterval]:
+    """Merge overlapping or adjacent padded detection intervals per species."""
+    by_species: dict[str, list[int]] = {}
+    for idx, det in enumerate(detections):
+        by_species.setdefault(det.scientific_name, []).append(idx)
+
+    intervals: list[ClipInterval] = []
+    for species, indices in by_species.items():
+        current: ClipInterval | None = None
+        for idx in sorted(indices, key=lambda i: detections[i].start_time):
+            det = detections[idx]
+            start = max(0.0, det.start_time - padding)
+            end = min(duration, det.end_time + padding) if duration > 0 else det.end_time + padding
+            if current is not None and start <= current.end:
+                current.end = max(current.end, end)
+                current.members.append(idx)
+            else:
+                current = ClipInterval(species=species, start=start, end=end, members=[idx])
+                intervals.append(current)
+    return intervals
+
+
+def _safe_name(name: str) -> str:
+    return "".join([c for c in name if c.isalnum() or c in (" ", "_")]).strip().replace(" ", "_")
+
+
+def write_clips(
+    audio_path: Path,
+    audio: DecodedAudio,
+    detections: list[Detection],
+    clips_dir: Path,
+    clip_format: str = "flac",
+) -> list[ClipRef | None]:
+    """Write one compressed clip per merged interval, sliced from the decoded buffer.
+
+    Returns one entry per detection (None if its clip could not be written).
+    """
+    refs: list[ClipRef | None] = [None] * len(detections)
+    if not detections:
+        return refs
+
+    fmt, subtype, ext = CLIP_FORMATS.get(clip_format, CLIP_FORMATS["flac"])
+    if not sf.check_format(fmt, subtype):
+        logger.warning(f"Clip format '{clip_format}' not supported by libsndfile, using FLAC.")
+        fmt, subtype, ext = CLIP_FORMATS["flac"]
+
+    clips_dir.mkdir(parents=True, exist_ok=True)
+
+    for interval in plan_clips(detections, audio.duration):
+        first = detections[interval.members[0]]
+        # Sources record segments with the same names, the folder keeps their clips apart
+        clip_name = (
+            f"{_safe_name(audio_path.parent.name)}_{audio_path.stem}_"
+            f"{interval.start:.1f}_{interval.end:.1f}_{_safe_name(first.common_name)}{ext}"
+        )
+        clip_path = clips_dir / clip_name
+        data = audio.samples[int(interval.start * SAMPLE_RATE) : int(interval.end * SAMPLE_RATE)]
+
+        try:
+            sf.write(str(clip_path), data, SAMPLE_RATE, format=fmt, subtype=subtype)
+        except Exception as e:
+            logger.error(f"Failed to save clip for {audio_path.name}: {e}")
+            continue
+
+        for idx in interval.members:
+            offset = round(detections[idx].start_time - interval.start, 2)
+            refs[idx] = ClipRef(path=str(clip_path), offset=offset)
+
+    return refs
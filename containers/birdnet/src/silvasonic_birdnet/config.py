@@ -36,6 +36,12 @@ class Settings(BaseSettings):
     INPUT_DIR: Path = Field(default=Path("/data/recording"), alias="INPUT_DIR")
     RESULTS_DIR: Path = Field(default=Path("/data/db/results"), alias="RESULTS_DIR")
     CLIPS_DIR: Path | None = Field(default=None, validate_default=False)  # Computed in __init__
+    EMBEDDINGS_DIR: Path | None = Field(default=None, validate_default=False)  # Computed
+    CLIP_FORMAT: typing.Literal["flac", "opus"] = Field(default="flac", alias="CLIP_FORMAT")
+    # Optional per-file result tables in RESULTS_DIR (archival only, written asynchronously)
+    RESULTS_FORMAT: typing.Literal["none", "csv", "json"] = Field(
+        default="csv", alias="RESULTS_FORMAT"
+    )
 
     # Config Files
     CONFIG_FILE: Path = Field(default=Path("/etc/birdnet/config.yml"), alias="CONFIG_FILE")
@@ -44,6 +50,74 @@ class Settings(BaseSettings):
     # Watcher
     RECURSIVE_WATCH: bool = Field(default=True, alias="RECURSIVE_WATCH")
 
+    # Job queue: durable Redis Stream, or in-process (lost on restart)
+    JOB_QUEUE: typing.Literal["redis", "memory"] = Field(default="redis", alias="JOB_QUEUE")
+    # Analyses of a recording before a failing job is dropped (re-queued at the back)
+    JOB_MAX_ATTEMPTS: int = Field(default=3, ge=1, alias="JOB_MAX_ATTEMPTS")
+
+    # Hash recordings so a registered file whose content changed is analysed again
+    CONTENT_HASH: bool = Field(default=False, alias="CONTENT_HASH")
+
+    # Backlog reconciliation at startup: order, max files/s fed to the worker queue
+    BACKLOG_POLICY: typing.Literal["oldest", "newest", "off"] = Field(
+        default="oldest", alias="BACKLOG_POLICY"
+    )
+    BACKLOG_RATE: float = Field(default=2.0, gt=0.0, alias="BACKLOG_RATE")
+
+    # Re-analysis jobs (queued from the dashboard): max files/s fed to the worker queue.
+    # MODEL_VERSION overrides the installed model's version tag (e.g. for a custom model).
+    REANALYSIS: bool = Field(default=True, alias="REANALYSIS")
+    REANALYSIS_RATE: float = Field(default=1.0, gt=0.0, alias="REANALYSIS_RATE")
+    MODEL_VERSION: str = Field(default="", alias="MODEL_VERSION")
+
+    # Batching: files analysed per inference call and max wait (s) to fill a batch
+    BATCH_SIZE: int = Field(default=4, ge=1, alias="BATCH_SIZE")
+    BATCH_MAX_WAIT: float = Field(default=1.0, ge=0.0, alias="BATCH_MAX_WAIT")
+
+    # Raw logits kept per window for re-deriving detections later (0 disables)
+    SCORE_TOP_K: int = Field(default=10, ge=0, alias="SCORE_TOP_K")
+
+    # Score one extra window across the boundary of consecutive segments of a source
+    SEGMENT_STITCHING: bool = Field(default=True, alias="SEGMENT_STITCHING")
+
+    # Window embeddings for "similar calls": windows with detections, every scored window, or none
+    EMBEDDINGS: typing.Literal["detections", "all", "off"] = Field(
+        default="detections", alias="EMBEDDINGS"
+    )
+
+    # Bat call detection on ultrasonic recordings (>= 96 kHz), band threshold above the noise floor
+    BAT_DETECTION: bool = Field(default=True, alias="BAT_DETECTION")
+    BAT_THRESHOLD_DB: float = Field(default=12.0, gt=0.0, alias="BAT_THRESHOLD_DB")
+
+    # Near-real-time analysis of the recorders' PCM streams (recorder ANALYSIS_STREAM_TARGET).
+    # STREAM_PORTS maps sources to UDP ports ("front:12001,back:12002"); names must match the
+    # recording folders so the file pass can confirm live alerts instead of repeating them.
+    STREAM_ANALYSIS: bool = Field(default=False, alias="STREAM_ANALYSIS")
+    STREAM_PORTS: str = Field(default="default:8010", alias="STREAM_PORTS")
+    STREAM_HOP_SEC: float = Field(default=1.0, ge=0.5, le=3.0, alias="STREAM_HOP_SEC")
+    STREAM_DEDUP_SEC: float = Field(default=300.0, gt=0.0, alias="STREAM_DEDUP_SEC")
+
+    # Silence gate: skip windows whose 1-12 kHz level is within this margin of the noise floor
+    SILENCE_GATE: bool = Field(default=True, alias="SILENCE_GATE")
+    SILENCE_MARGIN_DB: float = Field(default=6.0, ge=0.0, alias="SILENCE_MARGIN_DB")
+
+    # Load shedding: degrade step by step while the processing ratio (s per s of audio, per
+    # worker) or the oldest queued job exceed their limits. Night hours (UTC, "22-4") are
+    # dropped at the last level; empty keeps them.
+    LOAD_SHEDDING: bool = Field(default=True, alias="LOAD_SHEDDING")
+    LOAD_SHED_MAX_LOAD: float = Field(default=0.9, gt=0.0, alias="LOAD_SHED_MAX_LOAD")
+    LOAD_SHED_MAX_QUEUE_AGE: float = Field(default=900.0, gt=0.0, alias="LOAD_SHED_MAX_QUEUE_AGE")
+    LOAD_SHED_HOLD_SEC: float = Field(default=120.0, ge=0.0, alias="LOAD_SHED_HOLD_SEC")
+    LOAD_SHED_GATE_BOOST_DB: float = Field(default=6.0, ge=0.0, alias="LOAD_SHED_GATE_BOOST_DB")
+    LOAD_SHED_EVERY_NTH: int = Field(default=2, ge=2, alias="LOAD_SHED_EVERY_NTH")
+    LOAD_SHED_NIGHT: str = Field(default="22-4", alias="LOAD_SHED_NIGHT")
+
+    # Worker pool: >1 runs analyzers in separate processes, optionally pinned to cores.
+    # RESERVED_CORES are kept free for the recorder's ffmpeg.
+    ANALYZER_WORKERS: int = Field(default=1, ge=1, alias="ANALYZER_WORKERS")
+    CPU_PINNING: bool = Field(default=False, alias="CPU_PINNING")
+    RESERVED_CORES: int = Field(default=1, ge=0, alias="RESERVED_CORES")
+
     # The actual BirdNET parameters (loaded from files/env)
     birdnet: BirdNETParameters = Field(default_factory=lambda: BirdNETParameters())
 
@@ -51,10 +125,24 @@ class Settings(BaseSettings):
         """Calculate derived paths and load detailed BirdNET config."""
         if self.CLIPS_DIR is None:
             self.CLIPS_DIR = self.RESULTS_DIR / "clips"
+        if self.EMBEDDINGS_DIR is None:
+            self.EMBEDDINGS_DIR = self.RESULTS_DIR / "embeddings"
 
         # Load and merge BirdNET parameters
         self.reload_birdnet_config()
 
+    def stream_ports(self) -> dict[str, int]:
+        """STREAM_PORTS as {source: port}; malformed entries are skipped."""
+        ports: dict[str, int] = {}
+        for part in self.STREAM_PORTS.split(","):
+            name, _, port = part.partition(":")
+            try:
+                ports[name.strip()] = int(port)
+            except ValueError:
+                if part.strip():
+                    logger.warning(f"Ignoring invalid STREAM_PORTS entry: {part!r}")
+        return ports
+
     def reload_birdnet_config(self) -> None:
         """
         Loads the BirdNET parameters with the following priority:
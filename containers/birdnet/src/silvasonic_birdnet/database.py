@@ -1,17 +1,51 @@
 import logging
 import os
 import time
+from collections.abc import Iterator
 from datetime import UTC, datetime
+from typing import Any
 
+from sqlalchemy import and_, delete, func, insert, or_, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import OperationalError
-from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel import Session, SQLModel, col, create_engine, select
 
-from silvasonic_birdnet.models import BirdDetection, ProcessedFile, Watchlist
+from silvasonic_birdnet.models import (
+    BatEvent,
+    BirdDetection,
+    ProcessedFile,
+    ReanalysisJob,
+    Watchlist,
+    WindowScores,
+)
 
 # Setup logging
 logger = logging.getLogger("Database")
 
+# Postgres NOTIFY channel signalling watchlist changes (also used by the dashboard)
+WATCHLIST_CHANNEL = "birdnet_watchlist"
+
+# Columns added after the initial schema (create_all() does not alter existing tables)
+SCHEMA_MIGRATIONS = [
+    "ALTER TABLE birdnet.detections ADD COLUMN IF NOT EXISTS clip_offset DOUBLE PRECISION",
+    "ALTER TABLE birdnet.processed_files "
+    "ADD COLUMN IF NOT EXISTS skipped_silent BOOLEAN NOT NULL DEFAULT FALSE",
+    "ALTER TABLE birdnet.processed_files ADD COLUMN IF NOT EXISTS source VARCHAR(50)",
+    "ALTER TABLE birdnet.processed_files ADD COLUMN IF NOT EXISTS relpath VARCHAR(1024)",
+    "ALTER TABLE birdnet.processed_files ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    # Rows from before the registry have no key (NULLs never conflict)
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_processed_files_source_relpath "
+    "ON birdnet.processed_files (source, relpath)",
+    "ALTER TABLE birdnet.processed_files ADD COLUMN IF NOT EXISTS model_version VARCHAR(50)",
+    "ALTER TABLE birdnet.window_scores ADD COLUMN IF NOT EXISTS source VARCHAR(50)",
+    # Older rows: the source is the recording folder in filepath
+    "UPDATE birdnet.window_scores SET source = substring(filepath from '([^/]+)/[^/]+$') "
+    "WHERE source IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_window_scores_source_filename "
+    "ON birdnet.window_scores (source, filename)",
+]
+
 
 class DatabaseHandler:
     def __init__(self) -> None:
@@ -36,14 +70,18 @@ class DatabaseHandler:
 
                 # Check connection and initialize
                 with self.engine.connect() as connection:
-                    from sqlalchemy import text
-
                     connection.execute(text("CREATE SCHEMA IF NOT EXISTS birdnet"))
+                    connection.execute(text("CREATE SCHEMA IF NOT EXISTS bats"))
                     connection.commit()
 
                 # Create Tables
                 SQLModel.metadata.create_all(self.engine)
 
+                with self.engine.connect() as connection:
+                    for migration in SCHEMA_MIGRATIONS:
+                        connection.execute(text(migration))
+                    connection.commit()
+
                 logger.info("Database connected and initialized.")
                 return True
 
@@ -75,11 +113,268 @@ class DatabaseHandler:
             except Exception as e:
                 logger.error(f"Failed to save detection: {e}")
 
-    def get_watchlist(self) -> list[Watchlist]:
-        """Returns all enabled watchlist items."""
+    @staticmethod
+    def _insert_detections(session: Session, detections: list[BirdDetection]) -> list[int]:
+        """Single executemany INSERT ... RETURNING; IDs come back in input order."""
+        if not detections:
+            return []
+        now = datetime.now(UTC)
+        rows = []
+        for detection in detections:
+            row = detection.model_dump(exclude={"id"})
+            if not row.get("timestamp"):
+                row["timestamp"] = now
+            rows.append(row)
+
+        stmt = insert(BirdDetection).returning(BirdDetection.id, sort_by_parameter_order=True)
+        return list(session.scalars(stmt, rows).all())
+
+    def _claim_processed(self, session: Session, processed: ProcessedFile) -> set[str] | None:
+        """Register a file in processed_files; None if it is already registered.
+
+        The (source, relpath) key makes re-deliveries idempotent. A registered file
+        whose content hash or model version changed is taken over: its old detections
+        and scores are removed and the row is updated in place, in the caller's
+        transaction, so readers see either the old or the new results of the file.
+        Bat calls only depend on the audio, they are replaced when the content changed.
+        Returns the clip files the removed detections referred to.
+        """
+        if processed.source is None or processed.relpath is None:
+            session.add(processed)
+            return set()
+
+        # Row lock: a concurrent take-over of the same file waits and then sees ours
+        existing = session.exec(
+            select(ProcessedFile)
+            .where(
+                ProcessedFile.source == processed.source,
+                ProcessedFile.relpath == processed.relpath,
+            )
+            .with_for_update()
+        ).first()
+        if existing is not None:
+            changed = (
+                processed.content_hash is not None
+                and existing.content_hash != processed.content_hash
+            )
+            upgraded = (
+                processed.model_version is not None
+                and existing.model_version != processed.model_version
+            )
+            if not (changed or upgraded):
+                return None
+            reason = "changed since its analysis" if changed else "re-analysed"
+            logger.info(f"{processed.relpath} {reason}, replacing results.")
+            clips = session.exec(
+                select(BirdDetection.clip_path).where(
+                    col(BirdDetection.filename) == existing.filename,
+                    col(BirdDetection.source_device) == existing.source,
+                    col(BirdDetection.clip_path).is_not(None),
+                )
+            ).all()
+            session.execute(
+                delete(BirdDetection).where(
+                    col(BirdDetection.filename) == existing.filename,
+                    col(BirdDetection.source_device) == existing.source,
+                )
+            )
+            session.execute(
+                delete(WindowScores).where(
+                    col(WindowScores.filename) == existing.filename,
+                    col(WindowScores.source) == existing.source,
+                )
+            )
+            if changed:
+                session.execute(
+                    delete(BatEvent).where(
+                        col(BatEvent.filename) == existing.filename,
+                        col(BatEvent.source_device) == existing.source,
+                    )
+                )
+            for name, value in processed.model_dump(exclude={"id"}).items():
+                setattr(existing, name, value)
+            session.add(existing)
+            return {clip for clip in clips if clip}
+
+        # A concurrent worker may register the same file between the SELECT and here
+        assert self.engine is not None
+        dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+        stmt = (
+            dialect.insert(ProcessedFile)
+            .values(**processed.model_dump(exclude={"id"}))
+            .on_conflict_do_nothing(index_elements=["source", "relpath"])
+            .returning(col(ProcessedFile.id))
+        )
+        return set() if session.execute(stmt).first() is not None else None
+
+    def _unreferenced_clips(self, session: Session, clips: set[str]) -> set[str]:
+        """Those of `clips` no detection refers to (anymore), in the session's view."""
+        if not clips:
+            return set()
+        referenced = session.exec(
+            select(BirdDetection.clip_path).where(col(BirdDetection.clip_path).in_(clips))
+        ).all()
+        return clips - set(referenced)
+
+    @staticmethod
+    def _remove_clips(clips: set[str]) -> None:
+        """Delete clip files after the detections referring to them are gone."""
+        for clip in clips:
+            try:
+                os.remove(clip)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove clip {clip}: {e}")
+
+    def save_file_results(
+        self,
+        detections: list[BirdDetection],
+        processed: ProcessedFile,
+        scores: WindowScores | None = None,
+        bat_events: list[BatEvent] | None = None,
+    ) -> list[int] | None:
+        """Persist all detections of a file plus its processed_files row in one transaction.
+
+        Detections are written with a single executemany INSERT ... RETURNING, so a busy
+        file costs one round trip instead of one session per row. The file's top-K
+        window scores and bat calls, if given, are stored in the same transaction.
+        Clips of replaced detections that no new detection reuses are deleted after
+        the commit. Returns the new detection IDs in input order, or None if the file
+        was already registered (nothing is written). Raises if nothing could be
+        stored, so the caller neither registers the file nor alerts and the job can
+        be retried.
+        """
+        if not self.engine:
+            raise RuntimeError("DB Engine not initialized.")
+
+        with Session(self.engine) as session:
+            try:
+                replaced_clips = self._claim_processed(session, processed)
+                if replaced_clips is None:
+                    session.rollback()
+                    logger.info(f"{processed.relpath} was already processed, results discarded.")
+                    return None
+                ids = self._insert_detections(session, detections)
+                if scores is not None:
+                    session.add(scores)
+                if bat_events:
+                    session.execute(
+                        insert(BatEvent), [event.model_dump(exclude={"id"}) for event in bat_events]
+                    )
+                orphaned = self._unreferenced_clips(session, replaced_clips)
+                session.commit()
+                self._remove_clips(orphaned)
+                return ids
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to save results for {processed.filename}: {e}")
+                raise
+
+    def get_window_scores(
+        self, start: datetime, end: datetime, after_id: int = 0, limit: int = 200
+    ) -> list[WindowScores]:
+        """One page of stored window scores for files recorded in [start, end), by id."""
         if not self.engine:
             return []
 
+        with Session(self.engine) as session:
+            try:
+                statement = (
+                    select(WindowScores)
+                    .where(
+                        col(WindowScores.recorded_at) >= start,
+                        col(WindowScores.recorded_at) < end,
+                        col(WindowScores.id) > after_id,
+                    )
+                    .order_by(col(WindowScores.id))
+                    .limit(limit)
+                )
+                return list(session.exec(statement).all())
+            except Exception as e:
+                logger.error(f"Failed to read window scores: {e}")
+                return []
+
+    def replace_detections(
+        self, detections_by_file: dict[tuple[str, str], list[BirdDetection]]
+    ) -> int:
+        """Swap the detections of several files in one transaction.
+
+        Files are keyed by (source_device, filename), since segment names repeat
+        across sources. Clip references of detections that survive (same species
+        and window) are carried over, since clips are only cut during the original
+        analysis; clips no detection refers to anymore are deleted. The model
+        version is the one registered for the file's scores.
+        Returns the number of detections written (0 on failure).
+        """
+        if not self.engine or not detections_by_file:
+            return 0
+
+        detection_match = or_(
+            *(
+                and_(
+                    col(BirdDetection.source_device) == source,
+                    col(BirdDetection.filename) == filename,
+                )
+                for source, filename in detections_by_file
+            )
+        )
+        with Session(self.engine) as session:
+            try:
+                existing = session.exec(select(BirdDetection).where(detection_match)).all()
+                clips = {
+                    (d.source_device, d.filename, d.scientific_name, round(d.start_time, 1)): (
+                        d.clip_path,
+                        d.clip_offset,
+                    )
+                    for d in existing
+                    if d.clip_path
+                }
+                old_clips = {d.clip_path for d in existing if d.clip_path}
+                processed = session.exec(
+                    select(ProcessedFile).where(
+                        or_(
+                            *(
+                                and_(
+                                    col(ProcessedFile.source) == source,
+                                    col(ProcessedFile.filename) == filename,
+                                )
+                                for source, filename in detections_by_file
+                            )
+                        )
+                    )
+                ).all()
+                versions = {(p.source, p.filename): p.model_version for p in processed}
+
+                new_rows = []
+                for (source, filename), rows in detections_by_file.items():
+                    for det in rows:
+                        clip = clips.get(
+                            (source, filename, det.scientific_name, round(det.start_time, 1))
+                        )
+                        if clip:
+                            det.clip_path, det.clip_offset = clip
+                        if det.model_version is None:
+                            det.model_version = versions.get((source, filename))
+                        new_rows.append(det)
+
+                session.execute(delete(BirdDetection).where(detection_match))
+                written = len(self._insert_detections(session, new_rows))
+                # Clips of species that dropped out under the new settings
+                orphaned = self._unreferenced_clips(session, old_clips)
+                session.commit()
+                self._remove_clips(orphaned)
+                return written
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to replace detections: {e}")
+                return 0
+
+    def get_watchlist(self) -> list[Watchlist] | None:
+        """Returns all enabled watchlist items, None if they could not be read."""
+        if not self.engine:
+            return None
+
         with Session(self.engine) as session:
             try:
                 statement = select(Watchlist).where(Watchlist.enabled == 1)
@@ -87,7 +382,7 @@ class DatabaseHandler:
                 return list(results)
             except Exception as e:
                 logger.error(f"Failed to get watchlist: {e}")
-                return []
+                return None
 
     def update_watchlist(
         self, scientific_name: str, common_name: str, enabled: bool = True
@@ -113,6 +408,13 @@ class DatabaseHandler:
                     )
                     session.add(item)
 
+                # Delivered on commit, invalidates cached watchlists in the workers
+                if self.engine.dialect.name == "postgresql":
+                    session.execute(
+                        text("SELECT pg_notify(:channel, :sci)"),
+                        {"channel": WATCHLIST_CHANNEL, "sci": scientific_name},
+                    )
+
                 session.commit()
                 return True
             except Exception as e:
@@ -135,6 +437,215 @@ class DatabaseHandler:
                 logger.error(f"Failed to check watchlist: {e}")
                 return False
 
+    def get_processed_state(self, source: str, relpath: str) -> tuple[str, str] | None:
+        """(content hash, model version) of a registered file, "" for missing values.
+
+        None if the file is not registered.
+        """
+        if not self.engine:
+            return None
+
+        with Session(self.engine) as session:
+            try:
+                row = session.exec(
+                    select(ProcessedFile.content_hash, ProcessedFile.model_version).where(
+                        ProcessedFile.source == source, ProcessedFile.relpath == relpath
+                    )
+                ).first()
+            except Exception as e:
+                logger.error(f"Failed to look up processed file: {e}")
+                return None
+            if row is None:
+                return None
+            return row[0] or "", row[1] or ""
+
+    def create_reanalysis_job(
+        self,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        source: str | None = None,
+    ) -> int | None:
+        """Queue a re-analysis of processed recordings. Returns the job ID."""
+        if not self.engine:
+            return None
+
+        with Session(self.engine) as session:
+            try:
+                job = ReanalysisJob(date_from=date_from, date_to=date_to, source=source)
+                session.add(job)
+                session.commit()
+                job_id: int | None = job.id
+                return job_id
+            except Exception as e:
+                logger.error(f"Failed to create re-analysis job: {e}")
+                return None
+
+    def next_reanalysis_job(self) -> ReanalysisJob | None:
+        """The oldest unfinished re-analysis job (a running one is resumed first)."""
+        if not self.engine:
+            return None
+
+        with Session(self.engine) as session:
+            try:
+                statement = (
+                    select(ReanalysisJob)
+                    .where(col(ReanalysisJob.status).in_(["running", "pending"]))
+                    .order_by(col(ReanalysisJob.status).desc(), col(ReanalysisJob.id))
+                )
+                return session.exec(statement).first()
+            except Exception as e:
+                logger.error(f"Failed to read re-analysis jobs: {e}")
+                return None
+
+    def get_reanalysis_status(self, job_id: int) -> str | None:
+        if not self.engine:
+            return None
+
+        with Session(self.engine) as session:
+            try:
+                job = session.get(ReanalysisJob, job_id)
+                return job.status if job is not None else None
+            except Exception as e:
+                logger.error(f"Failed to read re-analysis job {job_id}: {e}")
+                return None
+
+    def save_reanalysis_job(self, job: ReanalysisJob) -> bool:
+        """Checkpoint a job's progress. A job cancelled meanwhile stays cancelled."""
+        if not self.engine:
+            return False
+
+        with Session(self.engine) as session:
+            try:
+                stored = session.get(ReanalysisJob, job.id, with_for_update=True)
+                if stored is None or stored.status == "cancelled":
+                    return False
+                for name, value in job.model_dump(exclude={"id", "created_at"}).items():
+                    setattr(stored, name, value)
+                stored.updated_at = datetime.now(UTC)
+                session.add(stored)
+                session.commit()
+                return True
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to save re-analysis job {job.id}: {e}")
+                return False
+
+    @staticmethod
+    def _reanalysis_filter(job: ReanalysisJob, model_version: str, format_str: str) -> list[Any]:
+        """processed_files rows selected by a job that are not yet on `model_version`."""
+        # Legacy rows without a relpath cannot be located on disk again
+        conditions = [
+            col(ProcessedFile.relpath).is_not(None),
+            or_(
+                col(ProcessedFile.model_version).is_(None),
+                col(ProcessedFile.model_version) != model_version,
+            ),
+        ]
+        if job.source:
+            conditions.append(col(ProcessedFile.source) == job.source)
+        # Recorder filenames are timestamps, so the range is a filename range
+        if job.date_from:
+            conditions.append(col(ProcessedFile.filename) >= job.date_from.strftime(format_str))
+        if job.date_to:
+            conditions.append(col(ProcessedFile.filename) < job.date_to.strftime(format_str))
+        return conditions
+
+    def get_reanalysis_files(
+        self,
+        job: ReanalysisJob,
+        model_version: str,
+        after_id: int = 0,
+        limit: int = 200,
+        format_str: str = "%Y-%m-%d_%H-%M-%S",
+    ) -> list[tuple[int, str]]:
+        """One page of (id, relpath) still to re-analyse for a job, by id."""
+        if not self.engine:
+            return []
+
+        with Session(self.engine) as session:
+            try:
+                statement = (
+                    select(ProcessedFile.id, ProcessedFile.relpath)
+                    .where(
+                        col(ProcessedFile.id) > after_id,
+                        *self._reanalysis_filter(job, model_version, format_str),
+                    )
+                    .order_by(col(ProcessedFile.id))
+                    .limit(limit)
+                )
+                return [(int(row[0]), str(row[1])) for row in session.exec(statement)]
+            except Exception as e:
+                logger.error(f"Failed to read files for re-analysis: {e}")
+                return []
+
+    def count_reanalysis_files(
+        self, job: ReanalysisJob, model_version: str, format_str: str = "%Y-%m-%d_%H-%M-%S"
+    ) -> int | None:
+        """Files of a job not yet on `model_version` (None on failure)."""
+        if not self.engine:
+            return None
+
+        with Session(self.engine) as session:
+            try:
+                statement = (
+                    select(func.count())
+                    .select_from(ProcessedFile)
+                    .where(*self._reanalysis_filter(job, model_version, format_str))
+                )
+                return int(session.exec(statement).one())
+            except Exception as e:
+                logger.error(f"Failed to count files for re-analysis: {e}")
+                return None
+
+    def iter_processed_keys(
+        self, descending: bool = False, page_size: int = 1000
+    ) -> Iterator[tuple[str, str, str]]:
+        """Stream (filename, source, relpath) of registered files, sorted, page by page.
+
+        Used by the backlog reconciler for a sorted merge against the recording tree,
+        so memory use does not grow with the size of the table. Each page is read
+        with its own short session and continues after the last key of the one
+        before, so no cursor is held open while the caller works through the rows.
+        Rows registered before files had a (source, relpath) key are left out, the
+        registry does not match them either.
+        """
+        if not self.engine:
+            return
+
+        columns = [
+            col(ProcessedFile.filename),
+            col(ProcessedFile.source),
+            col(ProcessedFile.relpath),
+        ]
+        ordered = columns
+        if self.engine.dialect.name == "postgresql":
+            # Byte order, matching Python's string sort on the filesystem side
+            ordered = [column.collate("C") for column in columns]
+        base = (
+            select(*columns)
+            .where(col(ProcessedFile.source).is_not(None), col(ProcessedFile.relpath).is_not(None))
+            .order_by(*(c.desc() if descending else c.asc() for c in ordered))
+            .limit(page_size)
+        )
+        last: tuple[str, str, str] | None = None
+        while True:
+            statement = base
+            if last is not None:
+                key = tuple_(*ordered)
+                statement = statement.where(
+                    key < tuple_(*last) if descending else key > tuple_(*last)
+                )
+            with Session(self.engine) as session:
+                try:
+                    page = [(row[0], row[1], row[2]) for row in session.exec(statement)]
+                except Exception as e:
+                    logger.error(f"Failed to read processed files: {e}")
+                    return
+            yield from page
+            if len(page) < page_size:
+                return
+            last = page[-1]
+
     def log_processed_file(
         self, filename: str, duration: float, processing_time: float, file_size: int = 0
     ) -> None:
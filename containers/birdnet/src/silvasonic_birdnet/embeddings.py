@@ -0,0 +1,266 @@
+import fcntl
+import json
+import logging
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+logger = logging.getLogger("Embeddings")
+
+# On-disk layout of the store (read by the dashboard's similar-calls search):
+#   header.json  {"dim": D, "trained_rows": n}
+#   vectors.f16  float16 (n, D), L2-normalised, so cosine similarity is a dot product
+#   windows.bin  ROW_DTYPE (n,); its length is the committed row count
+#   ivf.npy      float32 (nlist, D) IVF centroids
+#   assign.i2    int16 (n,) IVF list of each row, -1 = not assigned yet
+# A window is identified by (source, filename, start), like its detections; detections
+# are looked up at query time, so re-derived or re-analysed results never go stale.
+ROW_DTYPE = np.dtype(
+    [
+        ("source", "S50"),  # = source_device of the detections
+        ("filename", "S64"),  # empty: removed (the file was re-analysed)
+        ("start", "<f4"),
+        ("label", "<i2"),  # top class of the window
+        ("confidence", "<f4"),
+    ]
+)
+ROWS_FILE = "windows.bin"
+
+# Rows of stores written before windows were keyed by source, converted on first write
+LEGACY_ROWS_FILE = "rows.bin"
+LEGACY_ROW_DTYPE = np.dtype(
+    [
+        ("detection_id", "<i8"),
+        ("filename", "S64"),
+        ("start", "<f4"),
+        ("label", "<i2"),
+        ("confidence", "<f4"),
+    ]
+)
+
+MIN_TRAIN_ROWS = 2048  # Below this, searches simply scan everything
+RETRAIN_GROWTH = 4  # Re-train centroids when the store has grown this much since
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+CHUNK_ROWS = 65536
+
+
+def normalize(vectors: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized: npt.NDArray[np.float32] = vectors / np.maximum(norms, 1e-12)
+    return normalized
+
+
+def list_count(rows: int) -> int:
+    """IVF lists for a store of `rows` vectors (~sqrt(n), fits in int16)."""
+    return int(min(max(16, np.sqrt(rows)), 4096))
+
+
+def train_centroids(
+    sample: npt.NDArray[np.float32], nlist: int, seed: int = 0
+) -> npt.NDArray[np.float32]:
+    """Spherical k-means on a sample of normalised vectors."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        # Empty lists keep their old centroid
+        sums[empty] = centroids[empty]
+        centroids = normalize(sums)
+    return centroids
+
+
+class EmbeddingStore:
+    """Append-only store of BirdNET window embeddings with an IVF index.
+
+    Vectors go into a float16 file that readers memory-map, so months of data
+    cost ~2 KB per window on disk and nothing in RAM. Each new row is assigned to
+    its nearest IVF centroid on write; the centroids are re-trained only when the
+    store has grown RETRAIN_GROWTH-fold, so writes stay cheap. All writers
+    (one per analyzer process) serialise on a file lock.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._centroids: npt.NDArray[np.float32] | None = None
+        self._centroids_mtime = 0.0
+
+    def _path(self, name: str) -> Path:
+        return self.root / name
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self._path(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _header(self) -> dict[str, int]:
+        try:
+            header: dict[str, int] = json.loads(self._path("header.json").read_text())
+            return header
+        except (OSError, ValueError):
+            return {}
+
+    def _write_header(self, header: dict[str, int]) -> None:
+        tmp = self._path("header.json.tmp")
+        tmp.write_text(json.dumps(header))
+        os.replace(tmp, self._path("header.json"))
+
+    def count(self) -> int:
+        try:
+            return os.path.getsize(self._path(ROWS_FILE)) // ROW_DTYPE.itemsize
+        except OSError:
+            return 0
+
+    def _upgrade_rows(self) -> None:
+        """Convert legacy rows (keyed by detection ID) to ROW_DTYPE.
+
+        Their source is unknown and left empty; readers match such rows by filename.
+        """
+        legacy = self._path(LEGACY_ROWS_FILE)
+        if not legacy.exists() or self._path(ROWS_FILE).exists():
+            return
+        old = np.fromfile(legacy, dtype=LEGACY_ROW_DTYPE)
+        rows = np.zeros(len(old), dtype=ROW_DTYPE)
+        for name in ("filename", "start", "label", "confidence"):
+            rows[name] = old[name]
+        tmp = self._path(ROWS_FILE + ".tmp")
+        rows.tofile(tmp)
+        os.replace(tmp, self._path(ROWS_FILE))
+        legacy.unlink()
+        logger.info(f"Converted {len(rows)} embedding row(s) to the source-keyed layout.")
+
+    def add(self, vectors: npt.NDArray[np.float32], rows: npt.NDArray[np.void]) -> bool:
+        """Append embeddings (n, D) with their ROW_DTYPE metadata."""
+        if len(vectors) == 0:
+            return True
+        try:
+            with self._locked():
+                header = self._header()
+                dim = header.get("dim")
+                if dim is None:
+                    dim = int(vectors.shape[1])
+                    header = {"dim": dim, "trained_rows": 0}
+                    self._write_header(header)
+                elif vectors.shape[1] != dim:
+                    logger.error(f"Embedding size {vectors.shape[1]} does not match store ({dim}).")
+                    return False
+
+                vectors = normalize(vectors.astype(np.float32, copy=False))
+                self._upgrade_rows()
+                n = self._truncate_to_committed(dim)
+                assign = self._assign(vectors)
+
+                # Vectors and assignments first, rows last: a row only counts once
+                # everything it refers to is on disk
+                with open(self._path("vectors.f16"), "ab") as f:
+                    f.write(vectors.astype("<f2").tobytes())
+                with open(self._path("assign.i2"), "ab") as f:
+                    f.write(assign.astype("<i2").tobytes())
+                with open(self._path(ROWS_FILE), "ab") as f:
+                    f.write(rows.astype(ROW_DTYPE).tobytes())
+
+                total = n + len(vectors)
+                if total >= MIN_TRAIN_ROWS and total >= RETRAIN_GROWTH * header.get(
+                    "trained_rows", 0
+                ):
+                    self._train(dim, total)
+                    header["trained_rows"] = total
+                    self._write_header(header)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to store embeddings: {e}")
+            return False
+
+    def remove(self, files: set[tuple[str, str]], before: int | None = None) -> int:
+        """Mark the windows of re-analysed files as removed (their filename is cleared).
+
+        `files` are (source, filename) pairs; only rows below `before` are touched, so
+        a file's fresh windows appended meanwhile stay. Returns the rows removed.
+        """
+        if not files:
+            return 0
+        keys = {(source.encode(), filename.encode()) for source, filename in files}
+        removed = 0
+        try:
+            with self._locked():
+                self._upgrade_rows()
+                n = self.count() if before is None else min(before, self.count())
+                if n == 0:
+                    return 0
+                rows = np.memmap(self._path(ROWS_FILE), dtype=ROW_DTYPE, mode="r+", shape=(n,))
+                names = np.array([name for _, name in keys])
+                for offset in range(0, n, CHUNK_ROWS):
+                    chunk = rows[offset : offset + CHUNK_ROWS]
+                    # Cheap vectorised prefilter on the filename, exact pairs checked after
+                    for i in np.flatnonzero(np.isin(chunk["filename"], names)):
+                        if (bytes(chunk["source"][i]), bytes(chunk["filename"][i])) in keys:
+                            chunk["source"][i] = chunk["filename"][i] = b""
+                            removed += 1
+                rows.flush()
+                del rows
+        except Exception as e:
+            logger.error(f"Failed to remove embeddings: {e}")
+        return removed
+
+    def _truncate_to_committed(self, dim: int) -> int:
+        """Drop bytes of a write that crashed before its rows were committed."""
+        n = self.count()
+        for name, size in (("vectors.f16", n * dim * 2), ("assign.i2", n * 2)):
+            path = self._path(name)
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+        return n
+
+    def _load_centroids(self) -> npt.NDArray[np.float32] | None:
+        path = self._path("ivf.npy")
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        if self._centroids is None or mtime != self._centroids_mtime:
+            self._centroids = np.load(path)
+            self._centroids_mtime = mtime
+        return self._centroids
+
+    def _assign(self, vectors: npt.NDArray[np.float32]) -> npt.NDArray[np.int16]:
+        centroids = self._load_centroids()
+        if centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int16)
+        assign: npt.NDArray[np.int16] = np.argmax(vectors @ centroids.T, axis=1).astype(np.int16)
+        return assign
+
+    def _train(self, dim: int, total: int) -> None:
+        """Re-train the centroids and re-assign every row (rare, see RETRAIN_GROWTH)."""
+        vectors = np.memmap(self._path("vectors.f16"), dtype="<f2", mode="r", shape=(total, dim))
+        nlist = list_count(total)
+        rng = np.random.default_rng(total)
+        sample_size = min(total, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample_idx = np.sort(rng.choice(total, size=sample_size, replace=False))
+        centroids = train_centroids(np.asarray(vectors[sample_idx], dtype=np.float32), nlist)
+
+        assign = np.empty(total, dtype="<i2")
+        for offset in range(0, total, CHUNK_ROWS):
+            chunk = np.asarray(vectors[offset : offset + CHUNK_ROWS], dtype=np.float32)
+            assign[offset : offset + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+
+        # Assignments first: a reader briefly seeing new lists with old centroids
+        # only probes slightly worse lists, never reads out of bounds
+        tmp = self._path("assign.i2.tmp")
+        assign.tofile(tmp)
+        os.replace(tmp, self._path("assign.i2"))
+        with open(self._path("ivf.npy.tmp"), "wb") as f:
+            np.save(f, centroids)
+        os.replace(self._path("ivf.npy.tmp"), self._path("ivf.npy"))
+        logger.info(f"Re-trained embedding index: {total} vectors in {nlist} lists.")
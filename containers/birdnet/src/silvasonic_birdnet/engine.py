@@ -0,0 +1,394 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import birdnet_analyzer.config as bn_cfg
+except ImportError:
+    bn_cfg = None
+
+try:
+    import tflite_runtime.interpreter as tflite
+except ImportError:
+    try:
+        from tensorflow import lite as tflite
+    except ImportError:
+        tflite = None
+
+
+logger = logging.getLogger("Engine")
+
+# BirdNET model constants (V2.4): 3 s windows of 48 kHz mono audio
+SAMPLE_RATE = 48000
+WINDOW_SEC = 3.0
+WINDOW_SAMPLES = int(SAMPLE_RATE * WINDOW_SEC)
+MIN_WINDOW_SEC = 1.0  # Trailing windows shorter than this are dropped (BirdNET SIG_MINLEN)
+
+# Location filter threshold used by the previous CLI-based integration
+SPECIES_FILTER_THRESHOLD = 0.0001
+SPECIES_MASK_CACHE_SIZE = 64  # (lat, lon, week) combinations kept in memory
+
+
+# One row per (window, species) hit, as produced straight from the score matrix
+DETECTION_DTYPE = np.dtype(
+    [("start", np.float32), ("end", np.float32), ("label", np.int32), ("confidence", np.float32)]
+)
+
+
+def installed_model_version(override: str = "") -> str:
+    """Version tag written with results: `override`, else the installed model's ("" if none)."""
+    if override:
+        return override
+    if bn_cfg is None:
+        return ""
+    version = getattr(bn_cfg, "MODEL_VERSION", None) or Path(bn_cfg.MODEL_PATH).stem
+    return str(version)
+
+
+@dataclass
+class Detection:
+    """A single species hit inside one analysis window."""
+
+    start_time: float
+    end_time: float
+    scientific_name: str
+    common_name: str
+    confidence: float
+
+
+def birdnet_week(timestamp: datetime) -> int:
+    """Week of year in BirdNET's 48-week calendar (4 weeks per month, 1-48)."""
+    return (timestamp.month - 1) * 4 + min(4, (timestamp.day - 1) // 7 + 1)
+
+
+@dataclass
+class FileScores:
+    """Analysis output of one file: detections plus the raw logits behind them."""
+
+    hits: npt.NDArray[np.void]  # DETECTION_DTYPE
+    starts: list[float]  # start (s) of each scored window
+    logits: npt.NDArray[np.float32]  # (n_windows, n_classes), no species mask applied
+    embeddings: npt.NDArray[np.float32] | None = None  # (n_windows, dim), if requested
+
+
+def split_windows(
+    signal: npt.NDArray[np.float32], overlap: float = 0.0, rate: int = SAMPLE_RATE
+) -> tuple[npt.NDArray[np.float32], list[float]]:
+    """Splits a mono signal (48 kHz unless `rate` says otherwise) into 3 s windows.
+
+    Mirrors BirdNET's own splitting: windows advance by (3 s - overlap), the tail
+    is zero padded and a last window shorter than MIN_WINDOW_SEC is dropped.
+    Returns the stacked windows and their start offsets in seconds; a signal
+    shorter than MIN_WINDOW_SEC has no windows (an empty (0, window) array).
+    """
+    overlap = min(max(overlap, 0.0), WINDOW_SEC - 0.01)
+    window_samples = int(rate * WINDOW_SEC)
+    step = int(rate * (WINDOW_SEC - overlap))
+    min_size = int(rate * MIN_WINDOW_SEC)
+
+    last_pos = int((signal.size - window_samples + step - 1) / step) * step
+    if last_pos < 0:
+        last_pos = 0
+    elif signal.size - last_pos < min_size:
+        last_pos -= step
+
+    if last_pos < 0:
+        return np.empty((0, window_samples), dtype=np.float32), []
+
+    padded = np.concatenate((signal, np.zeros(window_samples, dtype=np.float32)))
+    positions = range(0, last_pos + 1, step)
+    windows = np.stack([padded[pos : pos + window_samples] for pos in positions])
+    starts = [round(i * (WINDOW_SEC - overlap), 1) for i in range(len(positions))]
+    return windows.astype(np.float32, copy=False), starts
+
+
+def flat_sigmoid(logits: npt.NDArray[np.float32], sensitivity: float) -> npt.NDArray[np.float32]:
+    """BirdNET's activation: sensitivity shifts the sigmoid along the logit axis."""
+    shifted = np.clip(logits + (sensitivity - 1.0) * 10.0, -20, 20)
+    scores: npt.NDArray[np.float32] = (1.0 / (1.0 + np.exp(-shifted))).astype(np.float32)
+    return scores
+
+
+class InferenceEngine:
+    """Long-lived BirdNET TFLite interpreter.
+
+    The model and labels are loaded once per process. Windows from any number of
+    files are scored together, so a batch of queued recordings costs a single
+    interpreter invocation instead of one CLI run per file.
+    """
+
+    def __init__(self, threads: int = 1, max_batch_windows: int = 32) -> None:
+        self.threads = threads
+        self.max_batch_windows = max_batch_windows
+        self.labels: list[tuple[str, str]] = []  # (scientific, common)
+        self._interpreter: Any = None
+        self._input_index = 0
+        self._output_index = 0
+        self._embedding_index = 0
+        self._batch_shape = 0
+        self._species_mask: npt.NDArray[np.bool_] | None = None  # default (set_location)
+        self._meta: Any = None
+        self._mask_cache: OrderedDict[tuple[float, float, int], npt.NDArray[np.bool_] | None] = (
+            OrderedDict()
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return self._interpreter is not None
+
+    def load(self) -> bool:
+        """Load the TFLite model and labels (no-op if already warm)."""
+        if self.loaded:
+            return True
+        if tflite is None or bn_cfg is None:
+            logger.error("TFLite runtime or BirdNET-Analyzer not available!")
+            return False
+
+        try:
+            interpreter = tflite.Interpreter(model_path=bn_cfg.MODEL_PATH, num_threads=self.threads)
+            interpreter.allocate_tensors()
+            self._input_index = interpreter.get_input_details()[0]["index"]
+            self._output_index = interpreter.get_output_details()[0]["index"]
+            # Feature vector feeding the classification layer (same tensor BirdNET-Analyzer
+            # reads for its embeddings export)
+            self._embedding_index = self._output_index - 1
+            self.labels = self._read_labels(Path(bn_cfg.LABELS_FILE))
+            self._interpreter = interpreter
+            self._batch_shape = 0
+            logger.info(f"BirdNET model loaded ({len(self.labels)} classes).")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load BirdNET model: {e}")
+            return False
+
+    @staticmethod
+    def _read_labels(path: Path) -> list[tuple[str, str]]:
+        labels = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            scientific, _, common = line.partition("_")
+            labels.append((scientific, common or scientific))
+        return labels
+
+    @staticmethod
+    def read_default_labels() -> list[tuple[str, str]]:
+        """Labels of the installed BirdNET model, without loading the interpreter."""
+        if bn_cfg is None:
+            return []
+        return InferenceEngine._read_labels(Path(bn_cfg.LABELS_FILE))
+
+    def set_location(self, lat: float | None, lon: float | None, week: int = -1) -> None:
+        """Set the default species mask, used when analyze() gets no per-file masks."""
+        self._species_mask = self.species_mask(lat, lon, week)
+        if self._species_mask is not None:
+            logger.info(
+                f"Location filter active: {int(self._species_mask.sum())} species "
+                f"(lat={lat}, lon={lon}, week={week})"
+            )
+
+    def species_mask(
+        self, lat: float | None, lon: float | None, week: int = -1
+    ) -> npt.NDArray[np.bool_] | None:
+        """Species plausible at a location and week (-1: whole year), or None for all.
+
+        Runs BirdNET's meta model once per (lat, lon, week); results are kept in a
+        small LRU, so seasonal filtering costs a dict lookup per file.
+        """
+        if lat is None or lon is None:
+            return None
+
+        key = (round(lat, 4), round(lon, 4), week)
+        if key in self._mask_cache:
+            self._mask_cache.move_to_end(key)
+            return self._mask_cache[key]
+
+        mask = self._compute_species_mask(lat, lon, week)
+        self._mask_cache[key] = mask
+        if len(self._mask_cache) > SPECIES_MASK_CACHE_SIZE:
+            self._mask_cache.popitem(last=False)
+        return mask
+
+    def _compute_species_mask(
+        self, lat: float, lon: float, week: int
+    ) -> npt.NDArray[np.bool_] | None:
+        if tflite is None or bn_cfg is None:
+            return None
+
+        try:
+            if self._meta is None:
+                meta = tflite.Interpreter(model_path=bn_cfg.MDATA_MODEL_PATH, num_threads=1)
+                meta.allocate_tensors()
+                self._meta = meta
+            sample = np.array([[lat, lon, week]], dtype=np.float32)
+            self._meta.set_tensor(self._meta.get_input_details()[0]["index"], sample)
+            self._meta.invoke()
+            scores = self._meta.get_tensor(self._meta.get_output_details()[0]["index"])[0]
+            mask: npt.NDArray[np.bool_] = scores >= SPECIES_FILTER_THRESHOLD
+            logger.info(f"Species list for week {week}: {int(mask.sum())} species.")
+            return mask
+        except Exception as e:
+            logger.error(f"Failed to compute location filter, analysing all species: {e}")
+            return None
+
+    def predict(
+        self, windows: npt.NDArray[np.float32], sensitivity: float = 1.0
+    ) -> npt.NDArray[np.float32]:
+        """Score a stack of 3 s windows. Returns (n_windows, n_classes) confidences.
+
+        No species filter is applied here; analyze() masks the results per file.
+        """
+        return flat_sigmoid(self.predict_logits(windows), sensitivity)
+
+    def predict_logits(self, windows: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+        """Raw model output (before BirdNET's sigmoid) for a stack of 3 s windows."""
+        logits, _ = self._invoke(windows, embeddings=False)
+        return logits
+
+    def predict_with_embeddings(
+        self, windows: npt.NDArray[np.float32]
+    ) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]:
+        """Raw logits plus the model's feature embedding of every window."""
+        logits, embeddings = self._invoke(windows, embeddings=True)
+        assert embeddings is not None
+        return logits, embeddings
+
+    def _invoke(
+        self, windows: npt.NDArray[np.float32], embeddings: bool
+    ) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float32] | None]:
+        if not self.loaded:
+            raise RuntimeError("Inference engine not loaded")
+
+        outputs = []
+        features = []
+        for offset in range(0, len(windows), self.max_batch_windows):
+            chunk = np.ascontiguousarray(windows[offset : offset + self.max_batch_windows])
+            # Re-allocating tensors is expensive, only do it when the batch size changes
+            if len(chunk) != self._batch_shape:
+                self._interpreter.resize_tensor_input(self._input_index, list(chunk.shape))
+                self._interpreter.allocate_tensors()
+                self._batch_shape = len(chunk)
+            self._interpreter.set_tensor(self._input_index, chunk)
+            self._interpreter.invoke()
+            outputs.append(np.array(self._interpreter.get_tensor(self._output_index)))
+            if embeddings:
+                features.append(np.array(self._interpreter.get_tensor(self._embedding_index)))
+
+        logits: npt.NDArray[np.float32] = np.concatenate(outputs).astype(np.float32, copy=False)
+        if not embeddings:
+            return logits, None
+        return logits, np.concatenate(features).astype(np.float32, copy=False)
+
+    def analyze(
+        self,
+        signals: list[npt.NDArray[np.float32]],
+        min_conf: float,
+        overlap: float = 0.0,
+        sensitivity: float = 1.0,
+        masks: list[npt.NDArray[np.bool_] | None] | None = None,
+        species_masks: list[npt.NDArray[np.bool_] | None] | None = None,
+    ) -> list[npt.NDArray[np.void]]:
+        """Analyze several 48 kHz mono signals in one batch (see analyze_scored)."""
+        scored = self.analyze_scored(
+            signals, min_conf, overlap, sensitivity, masks=masks, species_masks=species_masks
+        )
+        return [file_scores.hits for file_scores in scored]
+
+    def analyze_scored(
+        self,
+        signals: list[npt.NDArray[np.float32]],
+        min_conf: float,
+        overlap: float = 0.0,
+        sensitivity: float = 1.0,
+        masks: list[npt.NDArray[np.bool_] | None] | None = None,
+        species_masks: list[npt.NDArray[np.bool_] | None] | None = None,
+        embeddings: bool = False,
+    ) -> list["FileScores"]:
+        """Analyze several 48 kHz mono signals in one batch.
+
+        `masks` optionally marks, per signal, which windows to score (e.g. from the
+        silence gate); unmarked windows never reach the interpreter.
+        `species_masks` restricts each signal's results to plausible species
+        (default: the mask from set_location()).
+        With `embeddings`, each result also carries the feature vectors of its windows.
+        Returns one FileScores per input signal (same order): the DETECTION_DTYPE
+        hits, sorted by window and then by descending confidence, plus the raw
+        logits of every scored window.
+        """
+        if not signals:
+            return []
+
+        splits = []
+        for i, signal in enumerate(signals):
+            windows, starts = split_windows(signal, overlap)
+            mask = masks[i] if masks is not None else None
+            if mask is not None and len(mask) == len(windows):
+                windows = windows[mask]
+                starts = [start for start, keep in zip(starts, mask, strict=True) if keep]
+            splits.append((windows, starts))
+
+        stacked = np.concatenate([windows for windows, _ in splits])
+        if len(stacked) == 0:
+            n_classes = len(self.labels)
+            return [
+                FileScores(
+                    np.empty(0, dtype=DETECTION_DTYPE),
+                    [],
+                    np.empty((0, n_classes), dtype=np.float32),
+                )
+                for _ in signals
+            ]
+        features = None
+        if embeddings:
+            logits, features = self.predict_with_embeddings(stacked)
+        else:
+            logits = self.predict_logits(stacked)
+        scores = flat_sigmoid(logits, sensitivity)
+
+        results: list[FileScores] = []
+        row = 0
+        for i, (windows, starts) in enumerate(splits):
+            block = scores[row : row + len(windows)]
+            file_logits = logits[row : row + len(windows)]
+            file_features = features[row : row + len(windows)] if features is not None else None
+            row += len(windows)
+
+            above = block >= min_conf
+            species = species_masks[i] if species_masks is not None else self._species_mask
+            if species is not None:
+                above &= species
+            win_idx, label_idx = np.nonzero(above)
+            confidences = block[win_idx, label_idx]
+            order = np.lexsort((-confidences, win_idx))
+
+            hits = np.empty(len(order), dtype=DETECTION_DTYPE)
+            window_starts = np.asarray(starts, dtype=np.float32)[win_idx[order]]
+            hits["start"] = window_starts
+            hits["end"] = window_starts + WINDOW_SEC
+            hits["label"] = label_idx[order]
+            hits["confidence"] = confidences[order]
+            results.append(FileScores(hits, starts, file_logits, file_features))
+        return results
+
+
+def detections_from_array(
+    hits: npt.NDArray[np.void], labels: list[tuple[str, str]]
+) -> list[Detection]:
+    """Resolve label indices of a DETECTION_DTYPE array into Detection objects."""
+    detections = []
+    for start, end, label, confidence in hits.tolist():
+        scientific, common = labels[label]
+        detections.append(
+            Detection(
+                start_time=round(start, 1),
+                end_time=round(end, 1),
+                scientific_name=scientific,
+                common_name=common,
+                confidence=confidence,
+            )
+        )
+    return detections
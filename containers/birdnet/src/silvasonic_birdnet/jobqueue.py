@@ -0,0 +1,324 @@
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+import redis
+
+logger = logging.getLogger("JobQueue")
+
+# Redis Stream holding pending analysis jobs (read by dashboard/healthchecker too)
+JOB_STREAM = "birdnet:jobs"
+JOB_GROUP = "birdnet"
+
+RECLAIM_IDLE_MS = 300_000  # Jobs unacked this long belong to a dead consumer
+RECLAIM_INTERVAL = 30.0  # seconds between XAUTOCLAIM sweeps per consumer
+
+
+@dataclass
+class Job:
+    """One recording waiting for analysis. `id` is the stream entry ID (Redis only)."""
+
+    path: str
+    id: str | None = None
+    attempts: int = 0  # Failed analyses so far (the job was re-queued after each)
+
+
+class JobQueue(ABC):
+    """Work queue between file discovery (watchdog, reconciler) and the analyzers."""
+
+    @abstractmethod
+    def put(self, path: str, attempts: int = 0) -> None:
+        """Queue a recording for analysis (`attempts`: failed analyses so far)."""
+        pass
+
+    @abstractmethod
+    def get_batch(self, consumer: str, max_items: int, max_wait: float) -> list[Job]:
+        """Wait up to 1 s for a job, then collect up to max_items within max_wait seconds.
+
+        Raises queue.Empty if nothing arrived.
+        """
+        pass
+
+    @abstractmethod
+    def ack(self, jobs: list[Job]) -> None:
+        """Mark jobs as done, they are not handed out again."""
+        pass
+
+    @abstractmethod
+    def qsize(self) -> int:
+        """Number of jobs in the queue."""
+        pass
+
+    @abstractmethod
+    def oldest_age(self) -> float | None:
+        """Seconds since the oldest outstanding job was queued."""
+        pass
+
+
+class LocalJobQueue(JobQueue):
+    """In-process queue (not durable); used when Redis is not wanted."""
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[tuple[float, str, int]] = queue.Queue()
+
+    def put(self, path: str, attempts: int = 0) -> None:
+        self._queue.put((time.time(), path, attempts))
+
+    def get_batch(self, consumer: str, max_items: int, max_wait: float) -> list[Job]:
+        _, path, attempts = self._queue.get(timeout=1.0)
+        batch = [Job(path, attempts=attempts)]
+        deadline = time.time() + max_wait
+        while len(batch) < max_items:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                _, path, attempts = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(Job(path, attempts=attempts))
+        return batch
+
+    def ack(self, jobs: list[Job]) -> None:
+        for _ in jobs:
+            self._queue.task_done()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def oldest_age(self) -> float | None:
+        with self._queue.mutex:
+            if not self._queue.queue:
+                return None
+            queued_at: float = self._queue.queue[0][0]
+        return time.time() - queued_at
+
+
+class RedisJobQueue(JobQueue):
+    """Durable queue on a Redis Stream with a consumer group.
+
+    Each analyzer worker is a consumer with a stable name, so after a restart it
+    first re-reads its own unacknowledged jobs. Jobs left pending by consumers that
+    no longer exist are taken over with XAUTOCLAIM once idle for RECLAIM_IDLE_MS.
+    Acked entries are deleted, so XLEN is the outstanding job count and the first
+    entry ID gives the age of the oldest job, both O(1).
+    """
+
+    def __init__(
+        self,
+        client: "redis.Redis | None" = None,
+        stream: str = JOB_STREAM,
+        group: str = JOB_GROUP,
+        reclaim_idle_ms: int = RECLAIM_IDLE_MS,
+    ) -> None:
+        self._redis = client or redis.Redis(
+            host="silvasonic_redis", port=6379, db=0, socket_connect_timeout=1
+        )
+        self.stream = stream
+        self.group = group
+        self.reclaim_idle_ms = reclaim_idle_ms
+        self._group_ready = False
+        self._recovered: set[str] = set()
+        # Per consumer: last pending entry handed out during recovery
+        self._recover_after: dict[str, str] = {}
+        self._last_reclaim: dict[str, float] = {}
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            self._redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"Created consumer group '{self.group}' on '{self.stream}'.")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def put(self, path: str, attempts: int = 0) -> None:
+        fields: dict[Any, Any] = {"path": path}
+        if attempts:
+            fields["attempts"] = attempts
+        self._redis.xadd(self.stream, fields)
+
+    def get_batch(self, consumer: str, max_items: int, max_wait: float) -> list[Job]:
+        self._ensure_group()
+
+        # 1. After a restart: our own jobs that were delivered but never acked, paged
+        # by ID so each is handed out once even if the caller does not ack in between
+        if consumer not in self._recovered:
+            own = self._read(consumer, self._recover_after.get(consumer, "0"), max_items, None)
+            if own:
+                self._recover_after[consumer] = own[-1].id or "0"
+                logger.info(f"Recovered {len(own)} unacked job(s) for {consumer}.")
+                return own
+            self._recovered.add(consumer)
+            self._recover_after.pop(consumer, None)
+
+        # 2. Periodically take over jobs stuck with dead consumers
+        now = time.time()
+        if now - self._last_reclaim.get(consumer, 0.0) > RECLAIM_INTERVAL:
+            self._last_reclaim[consumer] = now
+            claimed = self._reclaim(consumer, max_items)
+            if claimed:
+                return claimed
+
+        # 3. New jobs, same batching window as the in-process queue
+        batch = self._read(consumer, ">", max_items, block_ms=1000)
+        if not batch:
+            raise queue.Empty
+        deadline = time.time() + max_wait
+        while len(batch) < max_items:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            more = self._read(
+                consumer, ">", max_items - len(batch), block_ms=max(1, int(remaining * 1000))
+            )
+            if not more:
+                break
+            batch.extend(more)
+        return batch
+
+    def _read(self, consumer: str, start: str, count: int, block_ms: int | None) -> list[Job]:
+        response: Any = self._redis.xreadgroup(
+            self.group, consumer, {self.stream: start}, count=count, block=block_ms
+        )
+        if not response:
+            return []
+        _, entries = response[0]
+        return self._to_jobs(entries)
+
+    def _reclaim(self, consumer: str, count: int) -> list[Job]:
+        response: Any = self._redis.xautoclaim(
+            self.stream, self.group, consumer, self.reclaim_idle_ms, start_id="0-0", count=count
+        )
+        jobs = self._to_jobs(response[1])
+        if jobs:
+            logger.warning(f"Reclaimed {len(jobs)} job(s) from dead consumers for {consumer}.")
+        return jobs
+
+    def _to_jobs(self, entries: list[Any]) -> list[Job]:
+        jobs = []
+        for entry_id, fields in entries:
+            entry = _decode(entry_id)
+            path = fields.get(b"path") or fields.get("path") if fields else None
+            if path is None:
+                # Deleted or malformed entry, drop it so it is not redelivered forever
+                self.ack([Job("", entry)])
+                continue
+            attempts = fields.get(b"attempts") or fields.get("attempts") or 0
+            jobs.append(Job(path=_decode(path), id=entry, attempts=int(attempts)))
+        return jobs
+
+    def ack(self, jobs: list[Job]) -> None:
+        ids = [job.id for job in jobs if job.id]
+        if not ids:
+            return
+        pipe = self._redis.pipeline()
+        pipe.xack(self.stream, self.group, *ids)
+        pipe.xdel(self.stream, *ids)
+        pipe.execute()
+
+    def qsize(self) -> int:
+        return int(self._redis.xlen(self.stream))
+
+    def oldest_age(self) -> float | None:
+        first: Any = self._redis.xrange(self.stream, "-", "+", count=1)
+        if not first:
+            return None
+        millis = int(_decode(first[0][0]).split("-")[0])
+        return max(0.0, time.time() - millis / 1000)
+
+
+def worker_for(path: str, workers: int) -> int:
+    """Worker that analyses a recording, fixed per source (its folder).
+
+    Segment tails for stitching and silence gate noise floors are kept per source
+    inside an analyzer process, so all segments of a source must go to the same one.
+    """
+    source = os.path.basename(os.path.dirname(path))
+    return zlib.crc32(source.encode()) % workers
+
+
+class SourceRouter:
+    """Reads the shared queue and hands each job to the inbox of its source's worker.
+
+    Used with more than one analyzer worker. Inboxes hold a few batches each, so
+    jobs stay in the shared queue (durable, counted by qsize/oldest_age) until a
+    worker is about to take them; a full inbox holds the router back. A source's
+    jobs keep their order. Workers ack through the router, which remembers the
+    jobs handed out until then, so a job the shared queue delivers again (pending
+    recovery, reclaim of long-waiting entries) is not analysed twice.
+    """
+
+    def __init__(self, jobs: JobQueue, workers: int, consumer: str, inbox_size: int) -> None:
+        self.jobs = jobs
+        self.consumer = consumer
+        self.inboxes: list[queue.Queue[Job]] = [
+            queue.Queue(maxsize=max(inbox_size, 1)) for _ in range(workers)
+        ]
+        self._in_flight: set[str] = set()
+        self._lock = threading.Lock()
+
+    def run(self, stop: threading.Event, max_items: int) -> None:
+        """Router thread: move jobs from the shared queue to the inboxes until stopped."""
+        while not stop.is_set():
+            try:
+                # No batching window here, the workers wait for their own batches
+                jobs = self.jobs.get_batch(self.consumer, max_items, 0.0)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                logger.error(f"Job router error: {e}")
+                stop.wait(1.0)
+                continue
+            for job in jobs:
+                if job.id is not None:
+                    with self._lock:
+                        if job.id in self._in_flight:
+                            continue
+                        self._in_flight.add(job.id)
+                inbox = self.inboxes[worker_for(job.path, len(self.inboxes))]
+                while not stop.is_set():
+                    try:
+                        inbox.put(job, timeout=1.0)
+                        break
+                    except queue.Full:
+                        continue
+
+    def ack(self, jobs: list[Job]) -> None:
+        """Ack on the shared queue; the jobs may be delivered again after that."""
+        self.jobs.ack(jobs)
+        with self._lock:
+            self._in_flight.difference_update(job.id for job in jobs if job.id is not None)
+
+    def get_batch(self, worker: int, max_items: int, max_wait: float) -> list[Job]:
+        """Jobs of one worker, batched like JobQueue.get_batch (raises queue.Empty)."""
+        inbox = self.inboxes[worker]
+        batch = [inbox.get(timeout=1.0)]
+        deadline = time.time() + max_wait
+        while len(batch) < max_items:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(inbox.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_job_queue(backend: str) -> JobQueue:
+    if backend == "redis":
+        return RedisJobQueue()
+    return LocalJobQueue()
@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+logger = logging.getLogger("LoadShed")
+
+# Degradation levels, each includes the ones before it
+NORMAL = 0
+NO_OVERLAP = 1  # Windows without overlap (fewer windows per file)
+RAISED_GATE = 2  # Silence gate margin raised (more windows skipped as quiet)
+EVERY_NTH = 3  # Only every Nth file per source is analysed
+SKIP_NIGHT = 4  # Recordings from night hours are not analysed
+LEVEL_NAMES = ["normal", "no_overlap", "raised_gate", "every_nth", "skip_night"]
+
+ROLLING_BATCHES = 20  # Batches in the rolling processing ratio
+ROLLING_FILES = 100  # Admission decisions in the rolling admitted share
+RELAX_FACTOR = 0.7  # Step down only once the load is this far below the limit
+
+
+def parse_hours(spec: str) -> tuple[int, int] | None:
+    """'22-4' -> (22, 4): hours from 22:00 up to (not including) 04:00. Empty disables."""
+    if not spec:
+        return None
+    try:
+        start, end = (int(part) % 24 for part in spec.split("-"))
+    except ValueError:
+        logger.warning(f"Invalid hour range {spec!r}, night shedding disabled.")
+        return None
+    return start, end
+
+
+def in_hours(hour: int, hours: tuple[int, int]) -> bool:
+    start, end = hours
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+class LoadShedder:
+    """Steps analysis quality down when the worker falls behind, and back up.
+
+    The load is the rolling processing ratio (processing seconds per second of
+    analysed audio, per worker) scaled by the share of files still admitted, i.e.
+    the estimated share of capacity needed to keep up. Above `max_load`, or with
+    the oldest queued job older than `max_queue_age`, one more degradation level
+    is applied; once both are comfortably below their limits, one level is lifted.
+    Level changes are at least `hold_sec` apart so every level gets time to act.
+
+    Files shed at EVERY_NTH/SKIP_NIGHT are not registered as processed, so the
+    backlog reconciler offers them again after a restart.
+    Safe to share between the dispatcher threads: state changes under one lock.
+    """
+
+    def __init__(
+        self,
+        max_load: float = 0.9,
+        max_queue_age: float = 900.0,
+        hold_sec: float = 120.0,
+        every_nth: int = 2,
+        night_hours: tuple[int, int] | None = (22, 4),
+        workers: int = 1,
+    ) -> None:
+        self.max_load = max_load
+        self.max_queue_age = max_queue_age
+        self.hold_sec = hold_sec
+        self.every_nth = max(every_nth, 2)
+        self.night_hours = night_hours
+        self.workers = max(workers, 1)
+
+        self.level = NORMAL
+        self.files_shed = 0
+        self._changed_at = 0.0
+        self._batches: deque[tuple[float, float]] = deque(maxlen=ROLLING_BATCHES)
+        self._admitted: deque[bool] = deque(maxlen=ROLLING_FILES)
+        self._counters: dict[str, int] = {}
+        # Re-entrant: update() and status() read the load properties
+        self._lock = threading.RLock()
+
+    def record(self, audio_sec: float, busy_sec: float) -> None:
+        """Account one finished batch."""
+        if audio_sec > 0:
+            with self._lock:
+                self._batches.append((audio_sec, busy_sec))
+
+    @property
+    def processing_ratio(self) -> float | None:
+        """Processing seconds per second of analysed audio (> 1: slower than real time)."""
+        with self._lock:
+            audio = sum(a for a, _ in self._batches)
+            if not audio:
+                return None
+            return sum(b for _, b in self._batches) / audio / self.workers
+
+    @property
+    def load(self) -> float | None:
+        with self._lock:
+            ratio = self.processing_ratio
+            if ratio is None:
+                return None
+            admitted = sum(self._admitted) / len(self._admitted) if self._admitted else 1.0
+            return ratio * admitted
+
+    def update(self, queue_age: float | None, now: float | None = None) -> int:
+        """Re-evaluate the level from the current load and queue age."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now - self._changed_at < self.hold_sec:
+                return self.level
+
+            load = self.load
+            age = queue_age or 0.0
+            overloaded = (load is not None and load > self.max_load) or age > self.max_queue_age
+            relaxed = (load is None or load < self.max_load * RELAX_FACTOR) and (
+                age < self.max_queue_age / 2
+            )
+
+            if overloaded and self.level < SKIP_NIGHT:
+                self._set_level(self.level + 1, now, load, age)
+            elif relaxed and self.level > NORMAL:
+                self._set_level(self.level - 1, now, load, age)
+            return self.level
+
+    def _set_level(self, level: int, now: float, load: float | None, age: float) -> None:
+        direction = "raised" if level > self.level else "lowered"
+        self.level = level
+        self._changed_at = now
+        load_text = f"{load:.2f}" if load is not None else "n/a"
+        logger.warning(
+            f"Load shedding {direction} to '{LEVEL_NAMES[level]}' "
+            f"(load {load_text}, oldest job {age:.0f}s)."
+        )
+
+    def admit(self, path: str) -> bool:
+        """Whether a queued file is analysed at the current level."""
+        with self._lock:
+            admitted = True
+            if self.level >= EVERY_NTH:
+                source = os.path.basename(os.path.dirname(path))
+                count = self._counters.get(source, 0)
+                self._counters[source] = count + 1
+                admitted = count % self.every_nth == 0
+            if admitted and self.level >= SKIP_NIGHT and self.night_hours is not None:
+                recorded = self._recorded_at(path)
+                admitted = recorded is None or not in_hours(recorded.hour, self.night_hours)
+
+            self._admitted.append(admitted)
+            if not admitted:
+                self.files_shed += 1
+            return admitted
+
+    @staticmethod
+    def _recorded_at(path: str, format_str: str = "%Y-%m-%d_%H-%M-%S") -> datetime | None:
+        try:
+            return datetime.strptime(os.path.splitext(os.path.basename(path))[0], format_str)
+        except ValueError:
+            return None
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            load = self.load
+            ratio = self.processing_ratio
+        return {
+            "level": self.level,
+            "level_name": LEVEL_NAMES[self.level],
+            "load": round(load, 2) if load is not None else None,
+            "processing_ratio": round(ratio, 2) if ratio is not None else None,
+            "files_shed": self.files_shed,
+        }
@@ -2,7 +2,7 @@ from datetime import UTC, datetime
 from typing import Any
 
 from pydantic import field_validator
-from sqlalchemy import Text
+from sqlalchemy import Index, LargeBinary, Text
 from sqlmodel import Field, SQLModel
 
 
@@ -41,6 +41,7 @@ class BirdDetection(SQLModel, table=True):
     longitude: float | None = Field(default=None, alias="lon")  # Alias for Pydantic compat
     model_version: str | None = Field(default=None, max_length=50)
     clip_path: str | None = Field(default=None, max_length=1024)
+    clip_offset: float | None = Field(default=None)  # Detection start within the clip (s)
 
     # Additional Pydantic Validation logic if needed (e.g. for API inputs)
     @field_validator("end_time")
@@ -104,12 +105,97 @@ class Watchlist(SQLModel, table=True):
 
 class ProcessedFile(SQLModel, table=True):
     __tablename__ = "processed_files"
-    __table_args__ = {"schema": "birdnet"}
+    # A recording is registered once per source and path relative to the recording root
+    __table_args__ = (
+        Index("uq_processed_files_source_relpath", "source", "relpath", unique=True),
+        {"schema": "birdnet"},
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     filename: str = Field(max_length=255)
+    source: str | None = Field(default=None, max_length=50)
+    relpath: str | None = Field(default=None, max_length=1024)
+    content_hash: str | None = Field(default=None, max_length=64)  # Optional, see CONTENT_HASH
     processed_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
     processing_time_sec: float | None = Field(default=None)
     audio_duration_sec: float | None = Field(default=None)
     file_size_bytes: int | None = Field(default=None)
+    skipped_silent: bool = Field(default=False)  # Silence gate skipped inference
+    model_version: str | None = Field(default=None, max_length=50)  # Model of the stored results
+
+
+class WindowScores(SQLModel, table=True):
+    """Top-K raw logits per analysed 3 s window of one file (compact binary arrays).
+
+    Lets detections be re-derived at a new threshold/sensitivity without re-inference.
+    """
+
+    __tablename__ = "window_scores"
+    # Segment names repeat across sources: a file is (source, filename)
+    __table_args__ = (
+        Index("ix_window_scores_source_filename", "source", "filename"),
+        {"schema": "birdnet"},
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    filename: str = Field(max_length=255, index=True)
+    filepath: str = Field(max_length=1024)
+    source: str | None = Field(default=None, max_length=50)  # = source_device of detections
+    recorded_at: datetime | None = Field(default=None, index=True)  # File start (from name)
+
+    top_k: int = Field(ge=1)
+    starts: bytes = Field(sa_type=LargeBinary)  # float32[n_windows]
+    labels: bytes = Field(sa_type=LargeBinary)  # int16[n_windows, top_k]
+    logits: bytes = Field(sa_type=LargeBinary)  # float16[n_windows, top_k]
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class BatEvent(SQLModel, table=True):
+    """A single ultrasonic call pulse found by the bat detector."""
+
+    __tablename__ = "events"
+    __table_args__ = {"schema": "bats"}
+
+    id: int | None = Field(default=None, primary_key=True)
+    timestamp: datetime | None = Field(default=None, index=True)  # File start + offset
+    filename: str = Field(max_length=255, index=True)
+    filepath: str = Field(max_length=1024)
+    source_device: str | None = Field(default=None, max_length=50)
+
+    start_time: float = Field(ge=0.0)  # seconds from file start
+    end_time: float = Field(ge=0.0)
+    peak_freq: float  # Hz
+    bandwidth: float  # Hz
+    level_db: float | None = Field(default=None)  # dBFS
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class ReanalysisJob(SQLModel, table=True):
+    """Re-analysis of already processed recordings with the current model.
+
+    Created by the dashboard, worked off by the birdnet service at low priority.
+    `cursor` is the last processed_files.id handed to the queue (checkpoint).
+    """
+
+    __tablename__ = "reanalysis_jobs"
+    __table_args__ = {"schema": "birdnet"}
+
+    id: int | None = Field(default=None, primary_key=True)
+    status: str = Field(default="pending", max_length=20)  # pending/running/done/failed/cancelled
+    # Selection: recording time from the filename, [date_from, date_to), and/or one source
+    date_from: datetime | None = Field(default=None)
+    date_to: datetime | None = Field(default=None)
+    source: str | None = Field(default=None, max_length=50)
+
+    model_version: str | None = Field(default=None, max_length=50)  # Set when the job starts
+    cursor: int = Field(default=0)
+    passes: int = Field(default=0)
+    files_total: int | None = Field(default=None)
+    files_done: int = Field(default=0)
+    error: str | None = Field(default=None, sa_type=Text)
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime | None = Field(default=None)
@@ -0,0 +1,286 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from multiprocessing.connection import Connection
+from typing import Any
+
+from silvasonic_birdnet.analyzer import BatchFailed, BirdNETAnalyzer
+
+logger = logging.getLogger("Pool")
+
+WORKER_START_TIMEOUT = 120.0  # seconds to load the model in a fresh worker process
+
+
+def available_cores() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_core_sets(workers: int, reserved: int = 1) -> list[list[int]]:
+    """Split the usable cores between workers.
+
+    The first `reserved` cores are left to the recorder's ffmpeg. With more
+    workers than usable cores, workers share cores round-robin.
+    """
+    cores = available_cores()
+    usable = cores[reserved:] if len(cores) > reserved else cores[-1:]
+
+    if workers >= len(usable):
+        return [[usable[i % len(usable)]] for i in range(workers)]
+
+    # Contiguous chunks, the first workers get the remainder
+    size, extra = divmod(len(usable), workers)
+    core_sets = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        core_sets.append(usable[start:end])
+        start = end
+    return core_sets
+
+
+def pin_to_cores(cores: list[int]) -> None:
+    """Restrict the calling process (all its threads) to the given cores."""
+    if not hasattr(os, "sched_setaffinity"):
+        logger.warning("CPU pinning not supported on this platform.")
+        return
+    try:
+        os.sched_setaffinity(0, cores)
+        logger.info(f"Pinned process {os.getpid()} to cores {cores}.")
+    except OSError as e:
+        logger.warning(f"Failed to pin process to cores {cores}: {e}")
+
+
+class AnalyzerWorker(ABC):
+    """Bookkeeping shared by all worker kinds: state and throughput for the status.
+
+    Subclasses decide where the analyzer runs by implementing `_run_batch`.
+    """
+
+    def __init__(self, worker_id: int, cores: list[int] | None = None) -> None:
+        self.worker_id = worker_id
+        self.cores = cores
+        self.pid: int | None = None
+        self.state = "starting"
+        self.current_file: str | None = None
+        self.batch_size = 0
+        self.batch_started: float | None = None
+
+        self.files_done = 0
+        self.errors = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.silence: dict[str, Any] = {}  # Silence gate counters of the analyzer
+        self.load_level = 0  # Load shedding level to apply (see loadshed)
+        self._created_at = time.time()
+
+    def start(self) -> bool:
+        self.state = "idle"
+        return True
+
+    def stop(self) -> None:
+        self.state = "stopped"
+
+    def set_load_level(self, level: int) -> None:
+        self.load_level = level
+
+    def process_batch(self, files: list[str]) -> None:
+        self.state = "busy"
+        self.current_file = os.path.basename(files[0])
+        self.batch_size = len(files)
+        self.batch_started = time.time()
+        try:
+            self.audio_seconds += self._run_batch(files)
+            self.files_done += len(files)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.busy_seconds += time.time() - self.batch_started
+            if self.state == "busy":
+                self.state = "idle"
+            self.current_file = None
+            self.batch_size = 0
+            self.batch_started = None
+
+    @abstractmethod
+    def _run_batch(self, files: list[str]) -> float:
+        """Analyse the files; returns the seconds of audio analysed."""
+        pass
+
+    def status(self) -> dict[str, Any]:
+        uptime_min = max(time.time() - self._created_at, 1.0) / 60
+        return {
+            "id": self.worker_id,
+            "pid": self.pid,
+            "cores": self.cores,
+            "state": self.state,
+            "current_file": self.current_file,
+            "batch_size": self.batch_size,
+            "files": self.files_done,
+            "errors": self.errors,
+            "files_per_min": round(self.files_done / uptime_min, 2),
+            # Seconds of audio analysed per second of work
+            "realtime_factor": round(self.audio_seconds / self.busy_seconds, 1)
+            if self.busy_seconds
+            else None,
+            "silence": self.silence,
+        }
+
+
+class LocalWorker(AnalyzerWorker):
+    """Runs the analyzer in the calling process (single worker setup)."""
+
+    def __init__(self, analyzer: BirdNETAnalyzer, cores: list[int] | None = None) -> None:
+        super().__init__(0, cores)
+        self.analyzer = analyzer
+        self.pid = os.getpid()
+
+    def _run_batch(self, files: list[str]) -> float:
+        if self.analyzer.load_level != self.load_level:
+            self.analyzer.set_load_level(self.load_level)
+        audio_seconds = float(self.analyzer.process_batch(files) or 0.0)
+        if self.analyzer.gate is not None:
+            self.silence = self.analyzer.gate.stats()
+        return audio_seconds
+
+
+class ProcessWorker(AnalyzerWorker):
+    """An analyzer in its own process with its own warm interpreter.
+
+    Pre/post-processing in Python is GIL-bound, so separate processes are the only
+    way to keep several cores busy. Batches are handed over through a pipe; the
+    audio is decoded inside the worker, only file paths cross the process boundary.
+    """
+
+    def __init__(self, worker_id: int, cores: list[int] | None = None, threads: int = 1) -> None:
+        super().__init__(worker_id, cores)
+        self.threads = threads
+        self._process: multiprocessing.process.BaseProcess | None = None
+        self._conn: Connection | None = None
+        self._sent_level = 0  # Load level the worker process currently applies
+
+    def start(self) -> bool:
+        """Spawn the worker process and wait until its model is loaded."""
+        self.stop()
+        self.state = "starting"
+
+        # spawn: the parent runs watchdog/Redis threads, forking those is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(
+            target=serve_worker,
+            args=(child_conn, self.worker_id, self.cores, self.threads),
+            name=f"birdnet-worker-{self.worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._process = process
+        self._conn = parent_conn
+        self.pid = process.pid
+        self._sent_level = 0
+
+        deadline = time.time() + WORKER_START_TIMEOUT
+        while time.time() < deadline:
+            if parent_conn.poll(1.0):
+                try:
+                    message = parent_conn.recv()
+                except EOFError:
+                    break
+                if message[0] == "ready":
+                    logger.info(f"Worker {self.worker_id} ready (pid {self.pid}).")
+                    self.state = "idle"
+                    return True
+            elif not process.is_alive():
+                break
+
+        logger.error(f"Worker {self.worker_id} failed to start.")
+        self.stop()
+        self.state = "dead"
+        return False
+
+    def stop(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except (OSError, ValueError):
+                pass
+        if self._process is not None:
+            self._process.join(timeout=5.0)
+            if self._process.is_alive():
+                self._process.terminate()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+        self.state = "stopped"
+
+    def _run_batch(self, files: list[str]) -> float:
+        if self._process is None or not self._process.is_alive():
+            if not self.start():
+                raise RuntimeError(f"Worker {self.worker_id} not available")
+            self.state = "busy"
+
+        assert self._conn is not None and self._process is not None
+        # Sent from the dispatcher thread, ahead of the batch, so pipe writes never interleave
+        if self._sent_level != self.load_level:
+            self._conn.send(("level", self.load_level))
+            self._sent_level = self.load_level
+        self._conn.send(files)
+        while not self._conn.poll(1.0):
+            if not self._process.is_alive():
+                self.state = "dead"
+                raise RuntimeError(f"Worker {self.worker_id} died while processing {files}")
+
+        status, payload, silence = self._conn.recv()
+        if status == "error":
+            raise RuntimeError(payload)
+        if status == "failed":
+            self.silence = silence
+            paths, reason = payload
+            raise BatchFailed(paths, reason)
+        self.silence = silence
+        return float(payload)
+
+
+def serve_worker(conn: Connection, worker_id: int, cores: list[int] | None, threads: int) -> None:
+    """Entry point of a worker process: load the model once, then serve batches."""
+    logging.basicConfig(
+        level=logging.INFO,
+        stream=sys.stdout,
+        format=f"%(asctime)s [worker-{worker_id}] %(name)s %(levelname)s: %(message)s",
+        force=True,
+    )
+    if cores:
+        pin_to_cores(cores)
+
+    analyzer = BirdNETAnalyzer(threads=threads)
+    analyzer.watchlist.start()
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            files = conn.recv()
+        except EOFError:
+            break  # Parent went away
+        if files is None:
+            break
+        if isinstance(files, tuple):
+            analyzer.set_load_level(files[1])
+            continue
+        try:
+            audio_seconds = analyzer.process_batch(files)
+            silence = analyzer.gate.stats() if analyzer.gate is not None else {}
+            conn.send(("done", audio_seconds, silence))
+        except BatchFailed as e:
+            silence = analyzer.gate.stats() if analyzer.gate is not None else {}
+            conn.send(("failed", (e.paths, e.reason), silence))
+        except Exception as e:
+            conn.send(("error", str(e), {}))
+
+    analyzer.watchlist.stop()
@@ -0,0 +1,218 @@
+import argparse
+import logging
+import sys
+import threading
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from silvasonic_birdnet.database import db
+from silvasonic_birdnet.jobqueue import JobQueue
+from silvasonic_birdnet.models import ReanalysisJob
+
+logger = logging.getLogger("Reanalysis")
+
+POLL_INTERVAL = 30.0  # seconds between looks for new jobs
+PAGE_SIZE = 200  # files queued per checkpoint
+MAX_PASSES = 3  # sweeps over a job; later ones pick up files lost from the queue
+DRAIN_TIMEOUT = 600.0  # max seconds to wait for the queue to empty after a sweep
+
+
+class ReanalysisRunner:
+    """Works off re-analysis jobs by feeding their recordings to the normal queue.
+
+    Files go to the same queue (and worker pool) as fresh recordings, but only while
+    that queue is short and at no more than `rate` files/s, so live analysis always
+    comes first; while load shedding is active (`paused`) nothing is fed. The analyzer
+    re-analyses a registered file whose stored model version differs from its own and
+    swaps the file's results in one transaction.
+
+    Progress is checkpointed in birdnet.reanalysis_jobs after every page: `cursor` is
+    the last processed_files.id queued, so a restarted service resumes there. Files
+    queued but lost before analysis (in-memory queue) are still on the old version
+    and are picked up by the next sweep over the job.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        file_queue: JobQueue,
+        model_version: str,
+        rate: float = 1.0,
+        low_water: int = 4,
+        paused: Callable[[], bool] | None = None,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.root = root
+        self.file_queue = file_queue
+        self.model_version = model_version
+        self.rate = rate
+        self.low_water = low_water
+        self.paused = paused or (lambda: False)
+        self.poll_interval = poll_interval
+
+        self.job: ReanalysisJob | None = None
+        self.fed = 0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if not self.model_version:
+            logger.warning("Model version unknown, re-analysis jobs disabled.")
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def status(self) -> dict[str, Any] | None:
+        """Progress of the running job for the Redis status meta."""
+        job = self.job
+        if job is None:
+            return None
+        return {
+            "job": job.id,
+            "model_version": job.model_version,
+            "files_total": job.files_total,
+            "files_done": job.files_done,
+            "pass": job.passes + 1,
+            "fed": self.fed,
+        }
+
+    def run(self) -> None:
+        """Poll for jobs and run them one after the other."""
+        while not self._stop_event.is_set():
+            job = db.next_reanalysis_job()
+            if job is None:
+                self._stop_event.wait(self.poll_interval)
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                logger.error(f"Re-analysis job {job.id} failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+                db.save_reanalysis_job(job)
+                self._stop_event.wait(self.poll_interval)
+            finally:
+                self.job = None
+
+    def run_job(self, job: ReanalysisJob) -> None:
+        """Feed one job's files page by page until none is left on the old version."""
+        if job.model_version != self.model_version:
+            # New job, or the model changed since it started: (re)start from the top
+            job.model_version = self.model_version
+            job.cursor = 0
+            job.passes = 0
+            job.files_total = None
+        if job.files_total is None:
+            job.files_total = db.count_reanalysis_files(job, self.model_version) or 0
+            job.files_done = 0
+        job.status = "running"
+        if not db.save_reanalysis_job(job):
+            return
+        self.job = job
+        logger.info(
+            f"Re-analysis job {job.id}: {job.files_total} file(s) to model "
+            f"{self.model_version}, resuming after id {job.cursor}."
+        )
+
+        interval = 1.0 / self.rate
+        while not self._stop_event.is_set():
+            rows = db.get_reanalysis_files(
+                job, self.model_version, after_id=job.cursor, limit=PAGE_SIZE
+            )
+            if not rows:
+                if not self._finish_pass(job):
+                    return
+                continue
+
+            for file_id, relpath in rows:
+                if not self._wait_for_capacity():
+                    break
+                path = self.root / relpath
+                # Removed in the meantime (e.g. by the uploader's cleanup): counted at the end
+                if path.exists():
+                    self.file_queue.put(str(path))
+                    self.fed += 1
+                job.cursor = file_id
+                if self._stop_event.wait(interval):
+                    break
+
+            self._update_progress(job)
+            if not db.save_reanalysis_job(job):
+                logger.info(f"Re-analysis job {job.id} cancelled.")
+                return
+
+    def _wait_for_capacity(self) -> bool:
+        """Block while the live queue is busy or load is shed; False once stopping."""
+        while self.file_queue.qsize() >= self.low_water or self.paused():
+            if self._stop_event.wait(1.0):
+                return False
+        return not self._stop_event.is_set()
+
+    def _update_progress(self, job: ReanalysisJob) -> None:
+        remaining = db.count_reanalysis_files(job, self.model_version)
+        if remaining is not None and job.files_total is not None:
+            job.files_done = max(0, job.files_total - remaining)
+
+    def _finish_pass(self, job: ReanalysisJob) -> bool:
+        """End of a sweep: finish the job, or start another sweep for files still left."""
+        waited = 0.0
+        while self.file_queue.qsize() > 0 and waited < DRAIN_TIMEOUT:
+            if self._stop_event.wait(5.0):
+                return False
+            waited += 5.0
+
+        remaining = db.count_reanalysis_files(job, self.model_version)
+        if remaining is None:
+            return False
+        job.files_done = max(0, (job.files_total or 0) - remaining)
+        if remaining and job.passes + 1 < MAX_PASSES:
+            job.passes += 1
+            job.cursor = 0
+            logger.info(f"Re-analysis job {job.id}: {remaining} file(s) left, sweeping again.")
+            saved: bool = db.save_reanalysis_job(job)
+            return saved
+
+        job.status = "done"
+        if remaining:
+            job.error = f"{remaining} file(s) could not be re-analysed"
+        db.save_reanalysis_job(job)
+        logger.info(
+            f"Re-analysis job {job.id} finished: {job.files_done} of {job.files_total} file(s)."
+        )
+        return False
+
+
+def _parse_date(value: str) -> datetime:
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=UTC)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Queue a re-analysis of processed recordings with the current model."
+    )
+    parser.add_argument("--start", type=_parse_date, help="ISO date/time (recording time)")
+    parser.add_argument("--end", type=_parse_date, help="ISO date/time (recording time)")
+    parser.add_argument("--source", help="recording folder, default: all sources")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+
+    if not db.connect():
+        return 1
+    job_id = db.create_reanalysis_job(args.start, args.end, args.source)
+    if job_id is None:
+        return 1
+    logger.info(f"Queued re-analysis job {job_id}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from silvasonic_birdnet.database import db
+from silvasonic_birdnet.jobqueue import JobQueue
+
+logger = logging.getLogger("Reconciler")
+
+AUDIO_EXTENSIONS = (".flac", ".wav")
+
+
+class BacklogReconciler:
+    """Finds recordings that were never analysed and feeds them to the work queue.
+
+    Recordings are identified like in the registry, by source folder and path below
+    the input dir. The recording tree and birdnet.processed_files are both walked
+    ordered by (filename, source, relpath) (recorder filenames are timestamps) and
+    compared with one sorted merge, so no per-file queries are issued and neither
+    side is held in memory: the DB side is read page by page, the tree one folder
+    at a time. The merge runs twice, once to count the backlog and once to feed it.
+    Files are fed at no more than `rate` files/s and only while the live queue is
+    short, so fresh recordings always take priority over the backlog.
+    """
+
+    def __init__(
+        self,
+        input_dir: Path,
+        file_queue: JobQueue,
+        policy: str = "oldest",
+        rate: float = 2.0,
+        recursive: bool = True,
+        low_water: int = 4,
+        settle_seconds: float = 30.0,
+    ) -> None:
+        self.input_dir = input_dir
+        self.file_queue = file_queue
+        self.policy = policy
+        self.rate = rate
+        self.recursive = recursive
+        self.low_water = low_water
+        self.settle_seconds = settle_seconds
+
+        self.remaining = 0
+        self.fed = 0
+        self.running = False
+        self._started_at: float | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def newest_first(self) -> bool:
+        return self.policy == "newest"
+
+    def start(self) -> None:
+        if self.policy == "off":
+            logger.info("Backlog reconciliation disabled.")
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def status(self) -> dict[str, object]:
+        """Progress for the Redis status meta."""
+        eta = None
+        if self.running and self.fed and self._started_at:
+            files_per_sec = self.fed / (time.time() - self._started_at)
+            eta = round(self.remaining / files_per_sec) if files_per_sec > 0 else None
+        return {
+            "backlog_policy": self.policy,
+            "backlog_running": self.running,
+            "backlog_remaining": self.remaining,
+            "backlog_fed": self.fed,
+            "backlog_eta_sec": eta,
+        }
+
+    def run(self) -> None:
+        """Count the backlog, then feed it to the queue at the configured rate."""
+        if not self.input_dir.exists():
+            logger.warning(f"Input dir {self.input_dir} not found, skipping reconciliation.")
+            return
+
+        self.running = True
+        # Anything newer than this is (or will be) picked up by the live watcher
+        cutoff = time.time() - self.settle_seconds
+        try:
+            # Counting pass for the progress meta; only the count is kept
+            self.remaining = sum(1 for _ in self.iter_unprocessed())
+            logger.info(
+                f"Backlog: {self.remaining} unanalysed recording(s), "
+                f"feeding {self.policy}-first at <= {self.rate} files/s."
+            )
+
+            self._started_at = time.time()
+            interval = 1.0 / self.rate
+            # Fed straight from a second merge; files registered since the count are skipped
+            for path in self.iter_unprocessed():
+                # Only top up the queue when the worker has caught up with live files
+                while self.file_queue.qsize() >= self.low_water:
+                    if self._stop_event.wait(0.5):
+                        return
+                if self._stop_event.is_set():
+                    return
+
+                self.remaining = max(0, self.remaining - 1)
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                except OSError:
+                    # Removed in the meantime (e.g. by the uploader's cleanup)
+                    continue
+
+                self.file_queue.put(path)
+                self.fed += 1
+                if self._stop_event.wait(interval):
+                    return
+
+            logger.info(f"Backlog reconciliation finished ({self.fed} file(s) queued).")
+        except Exception as e:
+            logger.error(f"Backlog reconciliation failed: {e}")
+        finally:
+            self.running = False
+            self.remaining = 0
+
+    def iter_unprocessed(self) -> Iterator[str]:
+        """Yield paths of recordings without a processed_files row, in policy order."""
+        newest_first = self.newest_first
+
+        def before(a: tuple[str, str, str], b: tuple[str, str, str]) -> bool:
+            return a > b if newest_first else a < b
+
+        processed = iter(db.iter_processed_keys(descending=newest_first))
+        current = next(processed, None)
+
+        for key in heapq.merge(*self._streams(), reverse=newest_first):
+            while current is not None and before(current, key):
+                current = next(processed, None)
+            if current == key:
+                continue
+            yield os.path.join(self.input_dir, key[2])
+
+    def _streams(self) -> list[Iterator[tuple[str, str, str]]]:
+        """Sorted (filename, source, relpath) streams: the top-level files, one per folder.
+
+        A stream lists one directory at a time when it gets there, so only the
+        current directory of each source folder is held in memory, not the tree.
+        """
+        root = str(self.input_dir)
+        streams = [self._sorted_files(root, "")]
+        if self.recursive:
+            streams += [self._walk(path, name) for path, name in self._subdirectories(root)]
+        return streams
+
+    def _walk(self, directory: str, rel: str) -> Iterator[tuple[str, str, str]]:
+        """A folder's files, then its subfolders', each in sort order.
+
+        Recorder folders are flat per source, so this is filename order. In other
+        layouts a processed file may come out of the merge unmatched, the registry
+        still drops it; an unprocessed file is never hidden.
+        """
+        yield from self._sorted_files(directory, rel)
+        for path, name in self._subdirectories(directory):
+            yield from self._walk(path, f"{rel}/{name}")
+
+    def _subdirectories(self, directory: str) -> list[tuple[str, str]]:
+        try:
+            with os.scandir(directory) as entries:
+                found = [(entry.path, entry.name) for entry in entries if entry.is_dir()]
+        except OSError as e:
+            logger.warning(f"Cannot list {directory}: {e}")
+            return []
+        found.sort(key=lambda item: item[1], reverse=self.newest_first)
+        return found
+
+    def _sorted_files(self, directory: str, rel: str) -> Iterator[tuple[str, str, str]]:
+        """One directory's audio files as merge keys, sorted like the merge."""
+        try:
+            with os.scandir(directory) as entries:
+                names = [
+                    entry.name
+                    for entry in entries
+                    if entry.name.endswith(AUDIO_EXTENSIONS) and entry.is_file()
+                ]
+        except OSError as e:
+            logger.warning(f"Cannot list {directory}: {e}")
+            return
+        names.sort(reverse=self.newest_first)
+        # Same key as the registry: folder name and posix path below the input dir
+        source = os.path.basename(directory)
+        for name in names:
+            yield name, source, f"{rel}/{name}" if rel else name
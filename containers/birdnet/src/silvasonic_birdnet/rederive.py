@@ -0,0 +1,115 @@
+import argparse
+import logging
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from silvasonic_birdnet.config import config
+from silvasonic_birdnet.database import db
+from silvasonic_birdnet.engine import InferenceEngine, detections_from_array
+from silvasonic_birdnet.models import BirdDetection, WindowScores
+from silvasonic_birdnet.scores import TopKScores, derive_hits
+
+logger = logging.getLogger("Rederive")
+
+
+def detections_for(
+    row: WindowScores, labels: list[tuple[str, str]], min_conf: float, sensitivity: float
+) -> list[BirdDetection]:
+    """Detections of one file as they would come out of the engine with these settings."""
+    scores = TopKScores.from_bytes(row.starts, row.labels, row.logits, row.top_k)
+    hits = derive_hits(scores, min_conf, sensitivity)
+
+    source = row.source or Path(row.filepath).parent.name
+    records = []
+    for det in detections_from_array(hits, labels):
+        timestamp = None
+        if row.recorded_at:
+            timestamp = row.recorded_at + timedelta(seconds=det.start_time)
+        records.append(
+            BirdDetection(
+                filename=row.filename,
+                filepath=row.filepath,
+                start_time=det.start_time,
+                end_time=det.end_time,
+                scientific_name=det.scientific_name,
+                common_name=det.common_name,
+                confidence=det.confidence,
+                lat=config.birdnet.lat,
+                lon=config.birdnet.lon,
+                source_device=source,
+                timestamp=timestamp,
+            )
+        )
+    return records
+
+
+def rederive_detections(
+    start: datetime,
+    end: datetime,
+    min_conf: float,
+    sensitivity: float,
+    labels: list[tuple[str, str]],
+    chunk_size: int = 200,
+) -> int:
+    """Rebuild birdnet.detections for files recorded in [start, end) from stored scores.
+
+    Works chunk by chunk (one transaction each), so memory stays flat and an
+    interrupted run leaves every file either fully old or fully re-derived. Files
+    are keyed by (source, filename); the new rows keep the file's model version.
+    Returns the number of detections written.
+    """
+    written = 0
+    files = 0
+    after_id = 0
+    while True:
+        rows = db.get_window_scores(start, end, after_id=after_id, limit=chunk_size)
+        if not rows:
+            break
+        after_id = rows[-1].id or after_id
+
+        batch = {
+            (row.source or Path(row.filepath).parent.name, row.filename): detections_for(
+                row, labels, min_conf, sensitivity
+            )
+            for row in rows
+        }
+        written += db.replace_detections(batch)
+        files += len(batch)
+
+    logger.info(
+        f"Re-derived {written} detection(s) for {files} file(s) "
+        f"(min_conf={min_conf}, sensitivity={sensitivity})."
+    )
+    return written
+
+
+def _parse_date(value: str) -> datetime:
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=UTC)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-derive BirdNET detections from stored window scores (no re-inference)."
+    )
+    parser.add_argument("--start", type=_parse_date, required=True, help="ISO date/time")
+    parser.add_argument("--end", type=_parse_date, required=True, help="ISO date/time")
+    parser.add_argument("--min-conf", type=float, default=config.birdnet.min_conf)
+    parser.add_argument("--sensitivity", type=float, default=config.birdnet.sensitivity)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+
+    labels = InferenceEngine.read_default_labels()
+    if not labels:
+        logger.error("No labels available, aborting.")
+        return 1
+
+    db.connect()
+    rederive_detections(args.start, args.end, args.min_conf, args.sensitivity, labels)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from silvasonic_birdnet.database import db
+
+logger = logging.getLogger("Registry")
+
+RECENT_KEYS = 4096  # Recently processed files remembered in memory (per worker)
+HASH_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True)
+class FileKey:
+    """Identity of a recording in birdnet.processed_files."""
+
+    source: str  # recording folder (= source_device of its detections)
+    relpath: str  # path below the recording root
+    content_hash: str | None = None
+    reanalysis: bool = False  # Registered with another model version, results are replaced
+    replaces: bool = False  # Already registered: stored results, clips and embeddings go
+
+    @property
+    def ident(self) -> tuple[str, str]:
+        return self.source, self.relpath
+
+
+class ProcessedRegistry:
+    """Drops recordings that were already analysed before they are decoded.
+
+    Re-deliveries (watchdog double events, redelivered queue jobs, manual re-queues)
+    are caught by an in-memory LRU of recently processed keys; anything older is
+    looked up by its unique (source, relpath) key in the database. With hashing
+    enabled, a registered file whose content changed is analysed again; so is a
+    file analysed by another model version (only re-analysis jobs queue those).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        hashing: bool = False,
+        capacity: int = RECENT_KEYS,
+        model_version: str = "",
+    ) -> None:
+        self.root = root
+        self.hashing = hashing
+        self.capacity = capacity
+        self.model_version = model_version
+        self._recent: OrderedDict[tuple[str, str], None] = OrderedDict()
+
+    def key(self, path: Path) -> FileKey:
+        try:
+            relpath = path.relative_to(self.root).as_posix()
+        except ValueError:
+            relpath = f"{path.parent.name}/{path.name}"
+        return FileKey(path.parent.name, relpath)
+
+    def check(self, path: Path) -> FileKey | None:
+        """The file's key if it still needs analysis, None if it was already processed."""
+        key = self.key(path)
+        if key.ident in self._recent:
+            self._recent.move_to_end(key.ident)
+            return None
+
+        if self.hashing:
+            key = FileKey(key.source, key.relpath, self._content_hash(path))
+
+        stored = db.get_processed_state(key.source, key.relpath)
+        if stored is None:
+            return key
+        stored_hash, stored_version = stored
+        if key.content_hash and stored_hash and stored_hash != key.content_hash:
+            return FileKey(key.source, key.relpath, key.content_hash, replaces=True)
+        if self.model_version and stored_version != self.model_version:
+            return FileKey(
+                key.source, key.relpath, key.content_hash, reanalysis=True, replaces=True
+            )
+        self.mark(key)
+        return None
+
+    def mark(self, key: FileKey) -> None:
+        """Remember a file as processed."""
+        self._recent[key.ident] = None
+        self._recent.move_to_end(key.ident)
+        if len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+
+    @staticmethod
+    def _content_hash(path: Path) -> str | None:
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, "rb") as f:
+                while chunk := f.read(HASH_CHUNK):
+                    digest.update(chunk)
+        except OSError as e:
+            logger.warning(f"Could not hash {path.name}: {e}")
+            return None
+        return digest.hexdigest()
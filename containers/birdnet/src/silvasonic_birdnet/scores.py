@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from silvasonic_birdnet.engine import DETECTION_DTYPE, WINDOW_SEC, flat_sigmoid
+
+
+@dataclass
+class TopKScores:
+    """The K highest raw logits of every analysed 3 s window of one file.
+
+    Logits are kept before the sigmoid, so detections can be re-derived later
+    for any sensitivity and threshold without the audio or the model.
+    """
+
+    starts: npt.NDArray[np.float32]  # (n,) window start in seconds
+    labels: npt.NDArray[np.int16]  # (n, k) class indices, best first
+    logits: npt.NDArray[np.float16]  # (n, k)
+
+    @property
+    def k(self) -> int:
+        return int(self.labels.shape[1]) if self.labels.ndim == 2 else 0
+
+    def to_bytes(self) -> tuple[bytes, bytes, bytes]:
+        return self.starts.tobytes(), self.labels.tobytes(), self.logits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, starts: bytes, labels: bytes, logits: bytes, k: int) -> "TopKScores":
+        start_arr = np.frombuffer(starts, dtype=np.float32)
+        return cls(
+            starts=start_arr,
+            labels=np.frombuffer(labels, dtype=np.int16).reshape(len(start_arr), k),
+            logits=np.frombuffer(logits, dtype=np.float16).reshape(len(start_arr), k),
+        )
+
+
+def top_k_logits(
+    logits: npt.NDArray[np.float32],
+    starts: list[float],
+    k: int,
+    species_mask: npt.NDArray[np.bool_] | None = None,
+) -> TopKScores:
+    """Select the top-k logits per window (species outside the mask excluded)."""
+    k = min(k, logits.shape[1])
+    if species_mask is not None:
+        logits = np.where(species_mask, logits, -np.inf)
+
+    # argpartition is O(n_classes) per window, then only k entries are sorted
+    idx = np.argpartition(-logits, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(logits, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    idx = np.take_along_axis(idx, order, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+
+    # Masked-out slots (fewer plausible species than k) are stored as the minimum
+    top = np.where(np.isfinite(top), top, np.finfo(np.float16).min)
+    return TopKScores(
+        starts=np.asarray(starts, dtype=np.float32),
+        labels=idx.astype(np.int16),
+        logits=top.astype(np.float16),
+    )
+
+
+def derive_hits(scores: TopKScores, min_conf: float, sensitivity: float) -> npt.NDArray[np.void]:
+    """Re-derive a DETECTION_DTYPE array from stored logits, like the engine would."""
+    confidences = flat_sigmoid(scores.logits.astype(np.float32), sensitivity)
+    win_idx, slot = np.nonzero(confidences >= min_conf)
+    # Slots are sorted best first per window, so this keeps the engine's order
+    hits = np.empty(len(win_idx), dtype=DETECTION_DTYPE)
+    hits["start"] = scores.starts[win_idx]
+    hits["end"] = scores.starts[win_idx] + WINDOW_SEC
+    hits["label"] = scores.labels[win_idx, slot]
+    hits["confidence"] = confidences[win_idx, slot]
+    return hits
@@ -0,0 +1,110 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+import numpy.typing as npt
+
+from silvasonic_birdnet.engine import DETECTION_DTYPE, SAMPLE_RATE, WINDOW_SAMPLES, WINDOW_SEC
+
+logger = logging.getLogger("Seams")
+
+SEAM_SEC = WINDOW_SEC / 2  # The seam window covers this much of each neighbouring segment
+SEAM_SAMPLES = int(SEAM_SEC * SAMPLE_RATE)
+CONTIGUITY_SEC = 1.0  # Max gap/overlap between segments that still counts as continuous
+
+
+@dataclass
+class SegmentTail:
+    """The end of the latest analysed segment of a source."""
+
+    samples: npt.NDArray[np.float32]  # last SEAM_SEC of 48 kHz audio
+    ends_at: datetime
+    # Labels detected in the segment's windows that overlap the tail, filled in after inference
+    labels: set[int] = field(default_factory=set)
+
+
+@dataclass
+class Seam:
+    """One 3 s window centred on the boundary between two segments."""
+
+    window: npt.NDArray[np.float32]
+    previous: SegmentTail
+
+
+class SeamTracker:
+    """Analyses the boundary between consecutive segments of a source.
+
+    Recordings are split into short files and every file is windowed on its own,
+    so a call crossing a file boundary ends up as two partial windows. The tracker
+    keeps the last SEAM_SEC of each source's latest segment in memory; when the
+    next segment follows on without a gap, one extra window straddling the
+    boundary is scored. Its hits are only kept for species that neither
+    neighbouring window detected, so nothing is counted twice.
+    """
+
+    def __init__(self) -> None:
+        self._tails: dict[str, SegmentTail] = {}
+
+    def next_segment(
+        self,
+        source: str,
+        starts_at: datetime | None,
+        samples: npt.NDArray[np.float32],
+        duration: float,
+    ) -> tuple[Seam | None, SegmentTail | None]:
+        """Seam towards the previous segment (if continuous), and this segment's tail."""
+        if starts_at is None:
+            self._tails.pop(source, None)
+            return None, None
+
+        previous = self._tails.get(source)
+        seam = None
+        if (
+            previous is not None
+            and abs((starts_at - previous.ends_at).total_seconds()) <= CONTIGUITY_SEC
+        ):
+            window = np.zeros(WINDOW_SAMPLES, dtype=np.float32)
+            head = samples[:SEAM_SAMPLES]
+            window[SEAM_SAMPLES - len(previous.samples) : SEAM_SAMPLES] = previous.samples
+            window[SEAM_SAMPLES : SEAM_SAMPLES + len(head)] = head
+            seam = Seam(window, previous)
+
+        tail = SegmentTail(
+            samples=samples[-SEAM_SAMPLES:].copy(),
+            ends_at=starts_at + timedelta(seconds=duration),
+        )
+        self._tails[source] = tail
+        return seam, tail
+
+    @staticmethod
+    def merge(
+        hits: npt.NDArray[np.void],
+        duration: float,
+        seam: Seam | None,
+        seam_hits: npt.NDArray[np.void] | None,
+        tail: SegmentTail | None,
+    ) -> npt.NDArray[np.void]:
+        """Add the seam's new species to a segment's hits (DETECTION_DTYPE).
+
+        Also records which labels the segment detected near its end, for the seam
+        towards the next segment. Seam hits are placed at the start of the segment
+        (0 to SEAM_SEC), the part of the boundary window inside this file.
+        """
+        if tail is not None:
+            tail.labels = set(hits["label"][hits["end"] > duration - SEAM_SEC].tolist())
+        if seam is None or seam_hits is None or len(seam_hits) == 0:
+            return hits
+
+        known = seam.previous.labels | set(hits["label"][hits["start"] < SEAM_SEC].tolist())
+        new = seam_hits[~np.isin(seam_hits["label"], list(known))]
+        if len(new) == 0:
+            return hits
+
+        added = new.copy()
+        added["start"] = 0.0
+        added["end"] = SEAM_SEC
+        logger.info(f"Seam window added {len(added)} detection(s) across the segment boundary.")
+        merged = np.concatenate((added.astype(DETECTION_DTYPE), hits))
+        ordered: npt.NDArray[np.void] = merged[np.lexsort((-merged["confidence"], merged["start"]))]
+        return ordered
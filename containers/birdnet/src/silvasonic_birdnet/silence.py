@@ -0,0 +1,113 @@
+import logging
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from silvasonic_birdnet.engine import split_windows
+
+logger = logging.getLogger("Silence")
+
+BAND_HZ = (1000.0, 12000.0)  # Where BirdNET's target vocalisations carry their energy
+DIGITAL_SILENCE_DB = -90.0  # RMS below this is treated as silent regardless of the floor
+WARMUP_FILES = 3  # Files per source analysed ungated while the floor settles
+FLOOR_RISE = 0.02  # Per-file weight when the floor moves up (falls immediately)
+EPS = 1e-12
+
+
+def window_levels(
+    samples: npt.NDArray[np.float32], rate: int, overlap: float = 0.0
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """Per-window RMS level and 1-12 kHz band level in dBFS.
+
+    Uses the same window layout as the inference engine, so the result lines up
+    with the windows BirdNET would score.
+    """
+    windows, _ = split_windows(samples, overlap, rate)
+    rms_db = 10 * np.log10(np.mean(np.square(windows, dtype=np.float64), axis=1) + EPS)
+
+    spectrum = np.abs(np.fft.rfft(windows, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(windows.shape[1], d=1.0 / rate)
+    band = (freqs >= BAND_HZ[0]) & (freqs <= min(BAND_HZ[1], rate / 2))
+    # Parseval: mean power of the band-limited signal
+    band_power = 2 * spectrum[:, band].sum(axis=1) / windows.shape[1] ** 2
+    band_db = 10 * np.log10(band_power + EPS)
+    return rms_db, band_db
+
+
+class SilenceGate:
+    """Cheap pre-filter that keeps quiet windows away from the interpreter.
+
+    A window is active when its 1-12 kHz band level exceeds the source's noise
+    floor by `margin_db` (wind and rumble mostly live below 1 kHz). The floor is
+    tracked per source: it drops to any quieter window at once and creeps up
+    slowly, so a long dawn chorus does not become "noise" within minutes.
+    """
+
+    def __init__(self, margin_db: float = 6.0) -> None:
+        self.margin_db = margin_db
+        self._floors: dict[str, float] = {}
+        self._files_seen: dict[str, int] = {}
+
+        self.windows_checked = 0
+        self.windows_skipped = 0
+        self.files_skipped = 0
+        self.inference_sec_saved = 0.0
+        self._sec_per_window: float | None = None
+
+    def check(
+        self, source: str, samples: npt.NDArray[np.float32], rate: int, overlap: float = 0.0
+    ) -> npt.NDArray[np.bool_]:
+        """Return the mask of windows worth scoring and update the source's floor.
+
+        A recording too short for a single window gets an empty mask (it is silent
+        for the analyzer) and leaves the floor alone.
+        """
+        rms_db, band_db = window_levels(samples, rate, overlap)
+        if len(band_db) == 0:
+            self.files_skipped += 1
+            return np.zeros(0, dtype=bool)
+
+        floor = self._floors.get(source)
+        seen = self._files_seen.get(source, 0)
+        quietest = float(band_db.min())
+
+        if floor is None or seen < WARMUP_FILES:
+            active = np.ones(len(band_db), dtype=bool)
+        else:
+            active = band_db >= floor + self.margin_db
+        active &= rms_db > DIGITAL_SILENCE_DB
+
+        if floor is None or quietest < floor:
+            self._floors[source] = quietest
+        else:
+            self._floors[source] = floor + FLOOR_RISE * (quietest - floor)
+        self._files_seen[source] = seen + 1
+
+        skipped = int((~active).sum())
+        self.windows_checked += len(active)
+        self.windows_skipped += skipped
+        if not active.any():
+            self.files_skipped += 1
+        if self._sec_per_window is not None:
+            self.inference_sec_saved += skipped * self._sec_per_window
+        return active
+
+    def record_inference(self, windows: int, seconds: float) -> None:
+        """Feed measured inference cost, used to estimate the time saved by skipping."""
+        if windows <= 0:
+            return
+        per_window = seconds / windows
+        if self._sec_per_window is None:
+            self._sec_per_window = per_window
+        else:
+            self._sec_per_window += 0.1 * (per_window - self._sec_per_window)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "silence_windows_checked": self.windows_checked,
+            "silence_windows_skipped": self.windows_skipped,
+            "silence_files_skipped": self.files_skipped,
+            "silence_inference_sec_saved": round(self.inference_sec_saved, 1),
+            "noise_floor_db": {source: round(db, 1) for source, db in self._floors.items()},
+        }
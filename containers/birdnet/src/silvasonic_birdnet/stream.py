@@ -0,0 +1,299 @@
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import numpy as np
+import numpy.typing as npt
+import redis
+
+from silvasonic_birdnet.config import config
+from silvasonic_birdnet.engine import (
+    SAMPLE_RATE,
+    WINDOW_SAMPLES,
+    WINDOW_SEC,
+    InferenceEngine,
+    birdnet_week,
+)
+from silvasonic_birdnet.models import BirdDetection
+from silvasonic_birdnet.watchlist import WatchlistCache
+
+logger = logging.getLogger("Stream")
+
+LIVE_CHANNEL = "birdnet:live"  # Redis pub/sub channel for provisional detections
+LIVE_LOG_PREFIX = "birdnet:live_hits"
+LIVE_LOG_TTL = 3600  # Live hits are kept for the file pass for up to an hour
+GAP_SEC = 1.0  # A pause longer than this restarts the window (recorder restart, packet loss)
+MAX_QUEUED_WINDOWS = 16  # Older windows are dropped if inference falls behind
+MAX_BATCH_WINDOWS = 8
+PACKET_BYTES = 65536
+
+
+class LiveAlertLog:
+    """Shared record of watchlist species heard on the live stream.
+
+    Hits are kept per source and species in a Redis sorted set (scored by time),
+    so the live path suppresses repeats while a bird keeps singing and the file
+    pass can tell that an alert has already gone out for the same event.
+    """
+
+    def __init__(self, dedup_sec: float = 300.0, client: "redis.Redis | None" = None) -> None:
+        self.dedup_sec = dedup_sec
+        self._redis = client or redis.Redis(
+            host="silvasonic_redis", port=6379, db=0, socket_connect_timeout=1
+        )
+
+    @staticmethod
+    def _key(source: str | None, scientific_name: str | None) -> str:
+        return f"{LIVE_LOG_PREFIX}:{source or 'default'}:{scientific_name}"
+
+    def record(self, source: str | None, scientific_name: str | None, timestamp: datetime) -> None:
+        key = self._key(source, scientific_name)
+        ts = timestamp.timestamp()
+        try:
+            pipe = self._redis.pipeline()
+            pipe.zadd(key, {str(ts): ts})
+            pipe.zremrangebyscore(key, "-inf", ts - LIVE_LOG_TTL)
+            pipe.expire(key, LIVE_LOG_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to record live hit: {e}")
+
+    def seen(self, source: str | None, scientific_name: str | None, timestamp: datetime) -> bool:
+        """True if the species was heard live on this source within dedup_sec of `timestamp`."""
+        ts = timestamp.timestamp()
+        try:
+            count = self._redis.zcount(
+                self._key(source, scientific_name), ts - self.dedup_sec, ts + self.dedup_sec
+            )
+            return int(count) > 0
+        except Exception as e:
+            logger.error(f"Failed to look up live hits: {e}")
+            return False
+
+
+class SlidingWindow:
+    """Turns a continuous PCM stream into 3 s windows, one every `hop` samples."""
+
+    def __init__(self, hop: int) -> None:
+        self.hop = min(max(hop, 1), WINDOW_SAMPLES)
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._received = 0  # samples since the last reset
+        self._next_end = WINDOW_SAMPLES  # end (exclusive) of the next window to emit
+
+    def push(self, samples: npt.NDArray[np.float32]) -> list[npt.NDArray[np.float32]]:
+        """Append samples; returns the windows completed by them (oldest first)."""
+        data = np.concatenate((self._buffer, samples))
+        base = self._received - len(self._buffer)  # stream index of data[0]
+        self._received += len(samples)
+
+        windows = []
+        while self._next_end <= self._received:
+            end = self._next_end - base
+            windows.append(data[end - WINDOW_SAMPLES : end].copy())
+            self._next_end += self.hop
+
+        # Everything the next window can still need (hop <= window length)
+        self._buffer = data[-WINDOW_SAMPLES:]
+        return windows
+
+
+class StreamAnalyzer:
+    """Near-real-time BirdNET on the recorders' live PCM streams.
+
+    One thread per source receives s16le mono 48 kHz UDP packets and cuts them
+    into 3 s windows every `hop_sec`; a single inference thread scores them with
+    its own (single-threaded) interpreter. Hits are published on LIVE_CHANNEL,
+    watchlist species alert immediately. Results are provisional: the file pass
+    stays the source of record and skips alerts already sent from here.
+    If inference falls behind, the oldest windows are dropped, never the newest.
+    """
+
+    def __init__(
+        self,
+        ports: dict[str, int],
+        hop_sec: float,
+        alert: Callable[[BirdDetection], None],
+        watchlist: WatchlistCache | None = None,
+        live_log: LiveAlertLog | None = None,
+        client: "redis.Redis | None" = None,
+    ) -> None:
+        self.ports = ports
+        self.hop = int(hop_sec * SAMPLE_RATE)
+        self.alert = alert
+        self._own_watchlist = watchlist is None
+        self.watchlist = watchlist or WatchlistCache()
+        self.live_log = live_log or LiveAlertLog(config.STREAM_DEDUP_SEC)
+        self._redis = client or redis.Redis(
+            host="silvasonic_redis", port=6379, db=0, socket_connect_timeout=1
+        )
+        self.engine = InferenceEngine(threads=1, max_batch_windows=MAX_BATCH_WINDOWS)
+        self.windows: queue.Queue[tuple[str, float, npt.NDArray[np.float32]]] = queue.Queue(
+            maxsize=MAX_QUEUED_WINDOWS
+        )
+        self._stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        self.analysed = 0
+        self.dropped = 0
+        self.detections = 0
+        self._latency = 0.0  # exponential moving average (s), window end -> result
+
+    def start(self) -> bool:
+        if not self.engine.load():
+            logger.error("Stream analysis disabled: BirdNET model not available.")
+            return False
+        if self._own_watchlist:
+            self.watchlist.start()
+
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._receive_loop, args=(source, port), daemon=True)
+            for source, port in self.ports.items()
+        ]
+        self._threads.append(threading.Thread(target=self._inference_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Stream analysis started on {self.ports} (hop {self.hop / SAMPLE_RATE}s).")
+        return True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._own_watchlist:
+            self.watchlist.stop()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    def status(self) -> dict[str, object]:
+        return {
+            "sources": list(self.ports),
+            "windows_analysed": self.analysed,
+            "windows_dropped": self.dropped,
+            "detections": self.detections,
+            "latency_sec": round(self._latency, 2),
+        }
+
+    def enqueue(self, source: str, window: npt.NDArray[np.float32], ended_at: float) -> None:
+        """Queue a window for inference, dropping the oldest one if the queue is full."""
+        while True:
+            try:
+                self.windows.put_nowait((source, ended_at, window))
+                return
+            except queue.Full:
+                try:
+                    self.windows.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _receive_loop(self, source: str, port: int) -> None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.settimeout(1.0)
+        try:
+            sock.bind(("0.0.0.0", port))
+        except OSError as e:
+            logger.error(f"Cannot listen for stream '{source}' on UDP {port}: {e}")
+            return
+
+        logger.info(f"Listening for stream '{source}' on UDP {port}.")
+        windowing = SlidingWindow(self.hop)
+        last_packet = 0.0
+        with sock:
+            while not self._stop_event.is_set():
+                try:
+                    data = sock.recv(PACKET_BYTES)
+                except TimeoutError:
+                    continue
+                except OSError as e:
+                    logger.error(f"Stream '{source}' receive error: {e}")
+                    self._stop_event.wait(1)
+                    continue
+
+                now = time.time()
+                if now - last_packet > GAP_SEC:
+                    windowing.reset()
+                last_packet = now
+
+                samples = np.frombuffer(data[: len(data) // 2 * 2], dtype="<i2")
+                for window in windowing.push(samples.astype(np.float32) / 32768.0):
+                    self.enqueue(source, window, now)
+
+    def _next_batch(self) -> list[tuple[str, float, npt.NDArray[np.float32]]]:
+        batch = [self.windows.get(timeout=1.0)]
+        while len(batch) < MAX_BATCH_WINDOWS:
+            try:
+                batch.append(self.windows.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _inference_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                continue
+            try:
+                self.process(batch)
+            except Exception as e:
+                logger.error(f"Stream inference failed: {e}")
+                self._stop_event.wait(1)
+
+    def process(self, batch: list[tuple[str, float, npt.NDArray[np.float32]]]) -> None:
+        """Score a batch of windows and publish/alert their hits."""
+        settings = config.birdnet
+        scores = self.engine.predict(np.stack([w for _, _, w in batch]), settings.sensitivity)
+        now = datetime.now(UTC)
+        week = settings.week if settings.week != -1 else birdnet_week(now)
+        species = self.engine.species_mask(settings.lat, settings.lon, week)
+
+        finished = time.time()
+        for (source, ended_at, _), window_scores in zip(batch, scores, strict=True):
+            above = window_scores >= settings.min_conf
+            if species is not None:
+                above &= species
+            started = datetime.fromtimestamp(ended_at - WINDOW_SEC, UTC)
+            for label in np.flatnonzero(above):
+                self._handle_hit(source, started, int(label), float(window_scores[label]))
+            self._latency = 0.8 * self._latency + 0.2 * (finished - ended_at)
+        self.analysed += len(batch)
+
+    def _handle_hit(self, source: str, started: datetime, label: int, confidence: float) -> None:
+        scientific, common = self.engine.labels[label]
+        self.detections += 1
+        detection = BirdDetection(
+            filename="live",
+            filepath="",
+            source_device=source,
+            start_time=0.0,
+            end_time=WINDOW_SEC,
+            scientific_name=scientific,
+            common_name=common,
+            confidence=confidence,
+            lat=config.birdnet.lat,
+            lon=config.birdnet.lon,
+            timestamp=started,
+        )
+
+        try:
+            payload = {"type": "live_detection", **detection.model_dump(mode="json", by_alias=True)}
+            self._redis.publish(LIVE_CHANNEL, json.dumps(payload))
+        except Exception as e:
+            logger.error(f"Failed to publish live detection: {e}")
+
+        if not self.watchlist.should_alert(scientific, confidence):
+            return
+        # One alert per singing bird: later hits within the dedup span only extend it
+        already_alerted = self.live_log.seen(source, scientific, started)
+        self.live_log.record(source, scientific, started)
+        if not already_alerted:
+            logger.info(f"Live detection of {common} on '{source}' ({confidence:.2f}), alerting.")
+            self.alert(detection)
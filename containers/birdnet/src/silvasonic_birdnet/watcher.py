@@ -11,14 +11,27 @@ import redis
 from watchdog.events import FileClosedEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
-from silvasonic_birdnet.analyzer import BirdNETAnalyzer
+from silvasonic_birdnet.analyzer import BatchFailed, BirdNETAnalyzer, trigger_alert
 from silvasonic_birdnet.config import config
+from silvasonic_birdnet.engine import installed_model_version
+from silvasonic_birdnet.jobqueue import Job, JobQueue, SourceRouter, create_job_queue
+from silvasonic_birdnet.loadshed import NORMAL, LoadShedder, parse_hours
+from silvasonic_birdnet.pool import (
+    AnalyzerWorker,
+    LocalWorker,
+    ProcessWorker,
+    pin_to_cores,
+    plan_core_sets,
+)
+from silvasonic_birdnet.reanalysis import ReanalysisRunner
+from silvasonic_birdnet.reconciler import BacklogReconciler
+from silvasonic_birdnet.stream import StreamAnalyzer
 
 logger = logging.getLogger("Watcher")
 
 
 class AudioFileHandler(FileSystemEventHandler):  # type: ignore[misc]
-    def __init__(self, file_queue: "queue.Queue[str]"):
+    def __init__(self, file_queue: JobQueue):
         self.file_queue = file_queue
 
     def on_closed(self, event: FileClosedEvent) -> None:
@@ -31,26 +44,99 @@ class AudioFileHandler(FileSystemEventHandler):  # type: ignore[misc]
             return
 
         logger.info(f"New audio file detected: {src_path_str}")
-        self.file_queue.put(src_path_str)
+        try:
+            self.file_queue.put(src_path_str)
+        except Exception as e:
+            # Not lost for good: the backlog reconciler picks it up on the next start
+            logger.error(f"Failed to queue {src_path_str}: {e}")
 
 
 class WatcherService:
     def __init__(self) -> None:
-        self.analyzer = BirdNETAnalyzer()
+        self.analyzer: BirdNETAnalyzer | None = None
+        self.workers: list[AnalyzerWorker] = self._create_workers()
         self.observer = Observer()
-        self.file_queue: queue.Queue[str] = queue.Queue()
-        self.is_processing = False
-        self._current_file: str | None = None
-        self._current_file_start_time: float | None = None
+        self.file_queue: JobQueue = create_job_queue(config.JOB_QUEUE)
         self._last_error: str | None = None
         self._last_error_time: float | None = None
         self._stop_event = threading.Event()
-        self._worker_thread: threading.Thread | None = None
+        self._worker_threads: list[threading.Thread] = []
+        # Pool: every source is analysed by the same worker (per-source analyzer state)
+        self.router: SourceRouter | None = None
+        if len(self.workers) > 1:
+            self.router = SourceRouter(
+                self.file_queue,
+                len(self.workers),
+                f"{socket.gethostname()}-router",
+                inbox_size=2 * config.BATCH_SIZE,
+            )
+        self.reconciler = BacklogReconciler(
+            config.INPUT_DIR,
+            self.file_queue,
+            policy=config.BACKLOG_POLICY,
+            rate=config.BACKLOG_RATE,
+            recursive=config.RECURSIVE_WATCH,
+            low_water=config.BATCH_SIZE,
+        )
+        self.shedder: LoadShedder | None = None
+        if config.LOAD_SHEDDING:
+            self.shedder = LoadShedder(
+                max_load=config.LOAD_SHED_MAX_LOAD,
+                max_queue_age=config.LOAD_SHED_MAX_QUEUE_AGE,
+                hold_sec=config.LOAD_SHED_HOLD_SEC,
+                every_nth=config.LOAD_SHED_EVERY_NTH,
+                night_hours=parse_hours(config.LOAD_SHED_NIGHT),
+                workers=len(self.workers),
+            )
+        # Shed files already handed back to the reconciler (see _update_load_level)
+        self._shed_caught_up = 0
+        self.reanalysis: ReanalysisRunner | None = None
+        if config.REANALYSIS:
+            self.reanalysis = ReanalysisRunner(
+                config.INPUT_DIR,
+                self.file_queue,
+                installed_model_version(config.MODEL_VERSION),
+                rate=config.REANALYSIS_RATE,
+                low_water=config.BATCH_SIZE,
+                paused=self._shedding_load,
+            )
+        self.stream: StreamAnalyzer | None = None
+        if config.STREAM_ANALYSIS:
+            self.stream = StreamAnalyzer(
+                config.stream_ports(),
+                config.STREAM_HOP_SEC,
+                alert=lambda detection: trigger_alert(detection, live=True),
+                watchlist=self.analyzer.watchlist if self.analyzer is not None else None,
+            )
 
-    def run(self) -> None:
-        logger.info("Scanning existing files...")
-        self.scan_existing()
+    def _create_workers(self) -> list[AnalyzerWorker]:
+        """One in-process analyzer, or a pool of analyzer processes."""
+        count = config.ANALYZER_WORKERS
+        core_sets: list[list[int] | None] = [None] * count
+        if config.CPU_PINNING:
+            core_sets = list(plan_core_sets(count, config.RESERVED_CORES))
+
+        if count == 1:
+            if core_sets[0]:
+                pin_to_cores(core_sets[0])
+            self.analyzer = BirdNETAnalyzer()
+            return [LocalWorker(self.analyzer, core_sets[0])]
+
+        logger.info(f"Starting pool of {count} analyzer processes (cores: {core_sets}).")
+        threads = config.birdnet.threads
+        return [
+            ProcessWorker(i, cores, threads=min(threads, len(cores)) if cores else threads)
+            for i, cores in enumerate(core_sets)
+        ]
+
+    def _shedding_load(self) -> bool:
+        return self.shedder is not None and self.shedder.level > NORMAL
 
+    @property
+    def is_processing(self) -> bool:
+        return any(worker.state == "busy" for worker in self.workers)
+
+    def run(self) -> None:
         # Start Watcher
         logger.info(
             f"Starting Watchdog on {config.INPUT_DIR} (Recursive: {config.RECURSIVE_WATCH})"
@@ -67,77 +153,196 @@ class WatcherService:
         )
         self.observer.start()
 
-        # Start Worker Thread
-        self._worker_thread = threading.Thread(target=self._worker, daemon=True)
-        self._worker_thread.start()
+        # Keep the in-memory watchlist in sync with dashboard changes
+        # (pool workers run their own listener)
+        if self.analyzer is not None:
+            self.analyzer.watchlist.start()
+
+        # Provisional detections from the live streams, confirmed later by the file pass
+        if self.stream is not None and not self.stream.start():
+            self.stream = None
+
+        # One dispatcher thread per analyzer worker
+        self._worker_threads = [
+            threading.Thread(target=self._worker, args=(worker,), daemon=True)
+            for worker in self.workers
+        ]
+        if self.router is not None:
+            self._worker_threads.append(
+                threading.Thread(
+                    target=self.router.run,
+                    args=(self._stop_event, config.BATCH_SIZE * len(self.workers)),
+                    daemon=True,
+                )
+            )
+        for thread in self._worker_threads:
+            thread.start()
+
+        # Live files are watched from here on, catch up on everything before that
+        logger.info("Scanning existing files...")
+        self.scan_existing()
 
         try:
             while True:
+                self._update_load_level()
                 status = "Processing" if self.is_processing else "Idle (Watching)"
                 self.write_status(status)
                 time.sleep(5)  # Update status every 5s
         except KeyboardInterrupt:
             logger.info("Stopping...")
-            self._stop_event.set()
-            self.observer.stop()
+            self._shutdown()
         except Exception as e:
             logger.error(f"Watcher crashed: {e}")
             self.write_status("Error: Crashed", error=e)
-            self._stop_event.set()
-            self.observer.stop()
+            self._shutdown()
 
         # Wait for loose ends (optional, mostly for clean join)
         self.observer.join()
-        if self._worker_thread:
-            self._worker_thread.join(timeout=2.0)
+        for thread in self._worker_threads:
+            thread.join(timeout=2.0)
+        for worker in self.workers:
+            worker.stop()
+
+    def _shutdown(self) -> None:
+        self._stop_event.set()
+        self.reconciler.stop()
+        if self.reanalysis is not None:
+            self.reanalysis.stop()
+        self.observer.stop()
+        if self.analyzer is not None:
+            self.analyzer.watchlist.stop()
+        if self.stream is not None:
+            self.stream.stop()
+
+    def _worker(self, worker: AnalyzerWorker | None = None) -> None:
+        """Dispatcher thread: feeds batches from the queue to one analyzer worker."""
+        worker = worker or self.workers[0]
+        logger.info(f"Worker thread {worker.worker_id} started.")
+
+        # Pool workers load their model in a fresh process first
+        while not self._stop_event.is_set() and not worker.start():
+            self._stop_event.wait(10)
 
-    def _worker(self) -> None:
-        """Background thread to process files from the queue."""
-        logger.info("Worker thread started.")
         while not self._stop_event.is_set():
             try:
                 # Check for files
                 try:
                     # Timeout allows checking stop_event periodically
-                    file_path = self.file_queue.get(timeout=1.0)
+                    jobs = self._next_batch(worker)
                 except queue.Empty:
                     continue
-
-                self.is_processing = True
-                self._current_file = os.path.basename(file_path)
-                self._current_file_start_time = time.time()
+                batch = [job.path for job in jobs]
+                if self.shedder is not None:
+                    batch = [path for path in batch if self.shedder.admit(path)]
+                    if not batch:
+                        self._ack(jobs)
+                        continue
 
                 # Update status immediately to show "Processing..."
                 self.write_status("Processing")
 
+                audio_before, busy_before = worker.audio_seconds, worker.busy_seconds
                 try:
-                    # Give a small grace period (logic moved from Handler, but fine here too)
-                    time.sleep(0.5)
-                    self.analyzer.process_file(file_path)
+                    worker.process_batch(batch)
+                except BatchFailed as e:
+                    # The rest of the batch is stored, only these files go round again
+                    logger.error(f"Error processing batch {batch}: {e}")
+                    self._last_error = str(e)
+                    self._last_error_time = time.time()
+                    self._retry([job for job in jobs if job.path in e.paths])
                 except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
+                    logger.error(f"Error processing batch {batch}: {e}")
                     self._last_error = str(e)
                     self._last_error_time = time.time()
+                    self._retry([job for job in jobs if job.path in batch])
                 finally:
-                    self.is_processing = False
-                    self._current_file = None
-                    self._current_file_start_time = None
-                    self.file_queue.task_done()
-                    # Update status immediately to return to Idle
-                    self.write_status("Idle (Watching)")
+                    if self.shedder is not None:
+                        self.shedder.record(
+                            worker.audio_seconds - audio_before, worker.busy_seconds - busy_before
+                        )
+                    # Failed jobs were re-queued above, the delivered ones are done
+                    self._ack(jobs)
+                    # Update status immediately (Idle once no other worker is busy)
+                    self.write_status("Processing" if self.is_processing else "Idle (Watching)")
 
             except Exception as e:
                 logger.error(f"Worker thread error: {e}")
                 time.sleep(1)
 
+    def _ack(self, jobs: list[Job]) -> None:
+        if self.router is not None:
+            self.router.ack(jobs)
+        else:
+            self.file_queue.ack(jobs)
+
+    def _retry(self, jobs: list[Job]) -> None:
+        """Queue the jobs of a failed batch again, at the back, up to JOB_MAX_ATTEMPTS.
+
+        Files of the batch that were stored before the failure are dropped by the
+        registry when they come round again.
+        """
+        for job in jobs:
+            attempts = job.attempts + 1
+            if attempts >= config.JOB_MAX_ATTEMPTS:
+                logger.error(f"Giving up on {job.path} after {attempts} failed attempt(s).")
+                continue
+            try:
+                self.file_queue.put(job.path, attempts)
+            except Exception as e:
+                # Not lost for good: the backlog reconciler picks it up on the next start
+                logger.error(f"Failed to re-queue {job.path}: {e}")
+
+    def _update_load_level(self) -> None:
+        """Step the load shedding level and hand it to the workers (applied per batch)."""
+        if self.shedder is None:
+            return
+        level = self.shedder.update(self.file_queue.oldest_age())
+        for worker in self.workers:
+            worker.set_load_level(level)
+
+        # Shed files are not registered as processed: once the load is back to
+        # normal, the reconciler feeds them again (behind live files, rate limited)
+        shed = self.shedder.files_shed
+        if level == NORMAL and shed > self._shed_caught_up and not self.reconciler.running:
+            logger.info(
+                f"Load back to normal, catching up on {shed - self._shed_caught_up} shed file(s)."
+            )
+            self._shed_caught_up = shed
+            self.reconciler.start()
+
+    def _next_batch(self, worker: AnalyzerWorker | None = None) -> list[Job]:
+        """Wait for the next file, then drain the queue into a batch.
+
+        Collection stops at BATCH_SIZE files or after BATCH_MAX_WAIT seconds, which
+        also serves as grace period for the freshly closed file. A pool worker takes
+        the files of its sources from the router.
+        Raises queue.Empty if nothing arrived within the poll timeout.
+        """
+        worker = worker or self.workers[0]
+        batch: list[Job]
+        if self.router is not None:
+            batch = self.router.get_batch(
+                worker.worker_id, config.BATCH_SIZE, config.BATCH_MAX_WAIT
+            )
+        else:
+            batch = self.file_queue.get_batch(
+                self._consumer_name(worker), config.BATCH_SIZE, config.BATCH_MAX_WAIT
+            )
+        return batch
+
+    @staticmethod
+    def _consumer_name(worker: AnalyzerWorker) -> str:
+        # Stable across restarts, so a worker re-reads its own unacked jobs first
+        return f"{socket.gethostname()}-{worker.worker_id}"
+
     def write_status(self, status: str, error: Exception | str | None = None) -> None:
         if error:
             self._last_error = str(error)
             self._last_error_time = time.time()
 
-        processing_duration = 0.0
-        if self._current_file_start_time and self.is_processing:
-            processing_duration = time.time() - self._current_file_start_time
+        now = time.time()
+        busy = [w for w in self.workers if w.state == "busy"]
+        processing_duration = max((now - (w.batch_started or now) for w in busy), default=0.0)
 
         try:
             if not hasattr(self, "_redis"):
@@ -145,6 +350,7 @@ class WatcherService:
                     host="silvasonic_redis", port=6379, db=0, socket_connect_timeout=1
                 )
 
+            oldest_age = self.file_queue.oldest_age()
             data = {
                 "service": "birdnet",
                 "timestamp": time.time(),
@@ -155,10 +361,15 @@ class WatcherService:
                     "input_dir": str(config.INPUT_DIR),
                     "recursive": config.RECURSIVE_WATCH,
                     "queue_size": self.file_queue.qsize(),
-                    "current_file": self._current_file,
-                    "processing_duration_sec": round(processing_duration, 2)
-                    if self.is_processing
-                    else None,
+                    "oldest_job_age_sec": round(oldest_age, 1) if oldest_age is not None else None,
+                    "current_file": busy[0].current_file if busy else None,
+                    "batch_size": sum(w.batch_size for w in busy),
+                    "processing_duration_sec": round(processing_duration, 2) if busy else None,
+                    "workers": [w.status() for w in self.workers],
+                    **self.reconciler.status(),
+                    "stream": self.stream.status() if self.stream is not None else None,
+                    "load_shedding": self.shedder.status() if self.shedder is not None else None,
+                    "reanalysis": self.reanalysis.status() if self.reanalysis is not None else None,
                 },
                 "last_error": self._last_error,
                 "last_error_time": self._last_error_time,
@@ -179,6 +390,8 @@ class WatcherService:
         self.write_status("Scanning")
         if not config.INPUT_DIR.exists():
             return
-        # MVP: Skip deep scan for now to avoid CPU storm on restart
-        # Logic: If we enable this, we should iterate file and put to queue
-        pass
+        # Diff against processed_files in the background, rate limited
+        self.reconciler.start()
+        # Re-analysis jobs from the dashboard, fed behind live files and the backlog
+        if self.reanalysis is not None:
+            self.reanalysis.start()
@@ -0,0 +1,92 @@
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from silvasonic_birdnet.database import WATCHLIST_CHANNEL, db
+
+logger = logging.getLogger("Watchlist")
+
+
+class WatchlistCache:
+    """In-memory copy of the enabled watchlist (species -> min_confidence).
+
+    The worker checks detections against this dict only, so the hot path does no I/O.
+    A background thread LISTENs on the Postgres channel the dashboard NOTIFYs when a
+    species is toggled and reloads the dict; a periodic reload covers missed events.
+    """
+
+    def __init__(self, refresh_interval: float = 300.0) -> None:
+        self.refresh_interval = refresh_interval
+        self._entries: dict[str, float] = {}
+        self._loaded_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def should_alert(self, scientific_name: str | None, confidence: float) -> bool:
+        """True if the species is watched and the detection meets its min_confidence."""
+        if not scientific_name:
+            return False
+        min_confidence = self._entries.get(scientific_name)
+        return min_confidence is not None and confidence >= min_confidence
+
+    def refresh(self) -> None:
+        """Reload the enabled watchlist from the database."""
+        items = db.get_watchlist()
+        if items is None:
+            # DB unreachable: keep alerting on the last known list, retried periodically
+            logger.warning(f"Watchlist not reloaded, keeping {len(self._entries)} species.")
+            return
+        # Swap the whole dict so readers never see a half-built state
+        self._entries = {item.scientific_name: item.min_confidence for item in items}
+        self._loaded_at = time.time()
+        logger.info(f"Watchlist loaded: {len(self._entries)} species.")
+
+    def start(self) -> None:
+        """Load once and start the invalidation listener thread."""
+        self.refresh()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._listen_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _listen_loop(self) -> None:
+        """Keeps a LISTEN connection open, reconnecting (and reloading) on failure."""
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(db.db_url)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {WATCHLIST_CHANNEL}")
+                logger.info(f"Listening for watchlist changes on '{WATCHLIST_CHANNEL}'.")
+
+                # Changes may have happened while we were not listening
+                self.refresh()
+                self._wait_for_notifications(conn)
+            except Exception as e:
+                logger.warning(f"Watchlist listener error ({e}). Retrying in 10s...")
+                self._stop_event.wait(10)
+                # Without notifications, keep the cache from going stale indefinitely
+                if time.time() - self._loaded_at > self.refresh_interval:
+                    self.refresh()
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _wait_for_notifications(self, conn: "psycopg2.extensions.connection") -> None:
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([conn], [], [], 5.0)
+            if ready:
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    self.refresh()
+            elif time.time() - self._loaded_at > self.refresh_interval:
+                self.refresh()
@@ -15,7 +15,7 @@ def mock_analyzer():
     with (
         patch("silvasonic_birdnet.analyzer.config") as mock_config,
         patch("silvasonic_birdnet.analyzer.db"),
-        patch("silvasonic_birdnet.analyzer.bn_analyze"),
+        patch("silvasonic_birdnet.analyzer.InferenceEngine"),
     ):
         # Setup specific config mocks if needed
         mock_config.RESULTS_DIR = MagicMock()
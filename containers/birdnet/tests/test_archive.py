@@ -0,0 +1,38 @@
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+from silvasonic_birdnet.archive import ResultArchiver
+from silvasonic_birdnet.engine import DETECTION_DTYPE
+
+LABELS = [("Turdus merula", "Blackbird"), ("Parus major", "Great Tit")]
+HITS = np.array([(0.0, 3.0, 1, 0.91), (3.0, 6.0, 0, 0.75)], dtype=DETECTION_DTYPE)
+
+
+def test_csv_archive_written_in_background(tmp_path):
+    archiver = ResultArchiver(tmp_path, "csv")
+    archiver.submit(Path("/data/rec/a.flac"), HITS, LABELS)
+    archiver.flush()
+
+    with open(tmp_path / "a.flac.csv", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:5] == ["Start (s)", "End (s)", "Scientific name", "Common name", "Confidence"]
+    assert rows[1][:5] == ["0.0", "3.0", "Parus major", "Great Tit", "0.9100"]
+    assert len(rows) == 3
+
+
+def test_json_archive(tmp_path):
+    output = ResultArchiver(tmp_path, "json").write(Path("b.flac"), HITS, LABELS)
+
+    data = json.loads(output.read_text())
+    assert data["file"] == "b.flac"
+    assert data["detections"][1]["scientific_name"] == "Turdus merula"
+    assert data["detections"][1]["start"] == 3.0
+
+
+def test_archive_disabled(tmp_path):
+    archiver = ResultArchiver(tmp_path, "none")
+    archiver.submit(Path("c.flac"), HITS, LABELS)
+    assert archiver._thread is None
+    assert list(tmp_path.iterdir()) == []
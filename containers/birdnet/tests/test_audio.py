@@ -0,0 +1,41 @@
+import numpy as np
+import soundfile as sf
+from silvasonic_birdnet.audio import load_audio, resample
+
+
+def test_load_audio_48k_passthrough(tmp_path):
+    """48 kHz mono is decoded without resampling."""
+    path = tmp_path / "mono.flac"
+    tone = (0.5 * np.sin(2 * np.pi * 1000 * np.arange(48000) / 48000)).astype(np.float32)
+    sf.write(str(path), tone, 48000)
+
+    audio = load_audio(path)
+
+    assert audio.samples.dtype == np.float32
+    assert audio.source_rate == 48000
+    assert audio.duration == 1.0
+    assert len(audio.samples) == 48000
+    np.testing.assert_allclose(audio.samples, tone, atol=1e-4)
+
+
+def test_load_audio_downmixes_and_resamples(tmp_path):
+    """Stereo 96 kHz becomes 48 kHz mono, duration reported from the source."""
+    path = tmp_path / "stereo.wav"
+    stereo = np.zeros((96000 * 2, 2), dtype=np.float32)
+    stereo[:, 0] = 0.4
+    sf.write(str(path), stereo, 96000)
+
+    audio = load_audio(path)
+
+    assert audio.source_rate == 96000
+    assert audio.duration == 2.0
+    assert len(audio.samples) == 96000
+    # Mean of both channels, away from the filter edges
+    assert abs(audio.samples[48000] - 0.2) < 1e-3
+
+
+def test_resample_rational_ratio():
+    """Non-integer ratios (44.1 kHz) use the reduced up/down factors."""
+    out = resample(np.zeros(44100, dtype=np.float32), 44100)
+    assert len(out) == 48000
+    assert out.dtype == np.float32
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from silvasonic_birdnet.bats import BatDetector, iter_blocks
+
+RATE = 384000
+
+
+def fm_sweep(f0=100e3, f1=40e3, duration=0.005, amplitude=0.1, rate=RATE):
+    """A bat-like downward FM pulse with a smooth envelope."""
+    t = np.arange(int(duration * rate)) / rate
+    k = (f1 - f0) / duration
+    pulse = amplitude * np.sin(2 * np.pi * (f0 * t + 0.5 * k * t * t)) * np.hanning(len(t))
+    return pulse.astype(np.float32)
+
+
+def recording(seconds=3.0, pulse_times=(), clicks=(), rate=RATE):
+    rng = np.random.default_rng(0)
+    signal = rng.normal(0, 0.001, int(seconds * rate)).astype(np.float32)
+    pulse = fm_sweep(rate=rate)
+    for t in pulse_times:
+        i = int(t * rate)
+        signal[i : i + len(pulse)] += pulse
+    for t in clicks:
+        i = int(t * rate)
+        signal[i : i + 3] += 0.5
+    return signal
+
+
+def test_detects_fm_pulses_with_frequency_and_bandwidth():
+    times = [0.1, 0.2, 0.3, 1.5]
+    calls = BatDetector().detect_samples(recording(pulse_times=times), RATE)
+
+    assert [round(c.start_time, 2) for c in calls] == times
+    call = calls[0]
+    assert call.end_time - call.start_time == pytest.approx(0.005, abs=0.002)
+    # Hann-shaped 100->40 kHz sweep peaks in the middle of the sweep
+    assert 55e3 < call.peak_freq < 85e3
+    assert 20e3 < call.bandwidth < 60e3
+
+
+def test_rejects_broadband_clicks():
+    assert BatDetector().detect_samples(recording(clicks=[0.5, 1.0, 2.0]), RATE) == []
+
+
+def test_result_independent_of_block_size():
+    """Pulses straddling block boundaries are carried over, not split or lost."""
+    signal = recording(pulse_times=[0.998, 1.999, 2.5])
+    detector = BatDetector()
+
+    whole = detector.detect(iter_blocks(signal, len(signal)), RATE)
+    blocked = detector.detect(iter_blocks(signal, 4099), RATE)
+
+    assert len(whole) == 3
+    assert [c.start_time for c in blocked] == [c.start_time for c in whole]
+
+
+def test_skips_audible_rate_recordings():
+    assert BatDetector().detect_samples(np.ones(48000, dtype=np.float32), 48000) == []
+
+
+def test_detect_file_streams_from_disk(tmp_path):
+    path = tmp_path / "2024-06-01_22-00-00.wav"
+    sf.write(path, recording(pulse_times=[0.5, 1.25]), RATE, subtype="FLOAT")
+
+    calls = BatDetector().detect_file(path)
+
+    assert [round(c.start_time, 2) for c in calls] == [0.5, 1.25]
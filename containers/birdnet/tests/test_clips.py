@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from silvasonic_birdnet.audio import DecodedAudio
+from silvasonic_birdnet.clips import plan_clips, write_clips
+from silvasonic_birdnet.engine import Detection
+
+
+def _det(start, species="Turdus merula", common="Blackbird"):
+    return Detection(start, start + 3.0, species, common, 0.9)
+
+
+def test_plan_clips_merges_overlapping_same_species():
+    """Consecutive windows of one species become one padded interval."""
+    detections = [_det(0.0), _det(3.0), _det(6.0, "Parus major", "Great Tit"), _det(21.0)]
+
+    intervals = plan_clips(detections, duration=30.0)
+
+    blackbird = [i for i in intervals if i.species == "Turdus merula"]
+    assert [(i.start, i.end) for i in blackbird] == [(0.0, 9.0), (18.0, 27.0)]
+    assert blackbird[0].members == [0, 1]
+    tit = [i for i in intervals if i.species == "Parus major"]
+    assert [(i.start, i.end) for i in tit] == [(3.0, 12.0)]
+
+
+def test_plan_clips_merges_adjacent_and_clamps_to_duration():
+    intervals = plan_clips([_det(0.0), _det(9.0)], duration=10.0)
+    # [0, 6] and [6, 10] touch -> merged, end clamped to file duration
+    assert [(i.start, i.end) for i in intervals] == [(0.0, 10.0)]
+
+
+def test_write_clips_one_file_per_interval_with_offsets(tmp_path):
+    audio = DecodedAudio(np.zeros(48000 * 10, dtype=np.float32), 48000, 10.0)
+    detections = [_det(3.0), _det(6.0), _det(0.0, "Parus major", "Great Tit")]
+
+    refs = write_clips(
+        tmp_path / "front" / "2024-05-01_05-00-00.flac", audio, detections, tmp_path / "c"
+    )
+
+    files = sorted((tmp_path / "c").iterdir())
+    assert len(files) == 2
+    assert all(f.suffix == ".flac" for f in files)
+    # Same-named segments of another source get their own clips
+    assert all(f.name.startswith("front_2024-05-01_05-00-00_") for f in files)
+    # Both blackbird detections share one clip starting at 0.0 s
+    assert refs[0].path == refs[1].path
+    assert (refs[0].offset, refs[1].offset) == (3.0, 6.0)
+    assert refs[2].offset == 0.0
+    info = sf.info(refs[0].path)
+    assert info.samplerate == 48000
+    assert info.duration == 10.0
+
+
+def test_write_clips_empty():
+    audio = DecodedAudio(np.zeros(10, dtype=np.float32), 48000, 0.0)
+    assert write_clips(Path("x.flac"), audio, [], Path("/nonexistent")) == []
@@ -1,8 +1,16 @@
+from datetime import UTC, datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
 from silvasonic_birdnet.database import DatabaseHandler
-from silvasonic_birdnet.models import BirdDetection, Watchlist
+from silvasonic_birdnet.models import (
+    BatEvent,
+    BirdDetection,
+    ProcessedFile,
+    ReanalysisJob,
+    Watchlist,
+    WindowScores,
+)
 from sqlalchemy.exc import OperationalError
 from sqlmodel import Session, SQLModel, create_engine, select
 
@@ -36,6 +44,7 @@ def test_db():
                 from sqlalchemy import text
 
                 connection.execute(text("ATTACH DATABASE ':memory:' AS birdnet"))
+                connection.execute(text("ATTACH DATABASE ':memory:' AS bats"))
                 connection.commit()
 
             # SKIPPING SCHEMA CREATION for SQLite
@@ -80,6 +89,18 @@ def test_watchlist_crud(test_db):
     assert len(items) == 0
 
 
+def test_get_watchlist_failure_is_not_an_empty_list(test_db):
+    """A read error must be distinguishable from an empty watchlist."""
+    with patch("silvasonic_birdnet.database.Session") as mock_session:
+        mock_session.return_value.__enter__.return_value.exec.side_effect = OperationalError(
+            "", {}, Exception("down")
+        )
+        assert test_db.get_watchlist() is None
+
+    test_db.engine = None
+    assert test_db.get_watchlist() is None
+
+
 def test_save_detection(test_db):
     """Test saving a detection."""
     detection = BirdDetection(
@@ -117,6 +138,386 @@ def test_log_processed_file(test_db):
         assert log.audio_duration_sec == 10.0
 
 
+def test_save_file_results_single_transaction(test_db):
+    """Detections and the processed_files row are written together and IDs returned in order."""
+    from silvasonic_birdnet.models import ProcessedFile
+
+    detections = [
+        BirdDetection(
+            filename="busy.flac",
+            filepath="/tmp/busy.flac",
+            scientific_name=name,
+            common_name=name,
+            confidence=0.9,
+            start_time=float(i * 3),
+            end_time=float(i * 3 + 3),
+        )
+        for i, name in enumerate(["Turdus merula", "Parus major", "Erithacus rubecula"])
+    ]
+    processed = ProcessedFile(filename="busy.flac", audio_duration_sec=10.0)
+
+    ids = test_db.save_file_results(detections, processed)
+
+    assert len(ids) == 3
+    with Session(test_db.engine) as session:
+        by_id = {d.id: d for d in session.exec(select(BirdDetection)).all()}
+        assert [by_id[i].scientific_name for i in ids] == [
+            "Turdus merula",
+            "Parus major",
+            "Erithacus rubecula",
+        ]
+        assert all(d.timestamp is not None for d in by_id.values())
+        assert session.exec(select(ProcessedFile)).first().filename == "busy.flac"
+
+
+def test_save_file_results_rolls_back_on_error(test_db):
+    """A failing insert leaves neither detections nor the processed row behind."""
+    from silvasonic_birdnet.models import ProcessedFile
+
+    processed = ProcessedFile(filename="bad.flac")
+    with patch("silvasonic_birdnet.database.insert", side_effect=RuntimeError("boom")):
+        detection = BirdDetection(
+            filename="bad.flac", filepath="/tmp/bad.flac", confidence=0.5, start_time=0, end_time=3
+        )
+        with pytest.raises(RuntimeError):
+            test_db.save_file_results([detection], processed)
+
+    with Session(test_db.engine) as session:
+        assert session.exec(select(ProcessedFile)).first() is None
+        assert session.exec(select(BirdDetection)).first() is None
+
+
+def _registered(filename, content_hash=None):
+    return ProcessedFile(
+        filename=filename, source="front", relpath=f"front/{filename}", content_hash=content_hash
+    )
+
+
+def _detection(filename, name="Turdus merula"):
+    return BirdDetection(
+        filename=filename,
+        filepath=f"/data/recording/front/{filename}",
+        source_device="front",
+        scientific_name=name,
+        confidence=0.9,
+        start_time=0.0,
+        end_time=3.0,
+    )
+
+
+def test_save_file_results_is_idempotent(test_db):
+    """A re-delivered file is not registered twice and its detections are not duplicated."""
+    assert test_db.save_file_results([_detection("a.flac")], _registered("a.flac")) == [1]
+    assert test_db.save_file_results([_detection("a.flac")], _registered("a.flac")) is None
+
+    with Session(test_db.engine) as session:
+        assert len(session.exec(select(ProcessedFile)).all()) == 1
+        assert len(session.exec(select(BirdDetection)).all()) == 1
+    assert test_db.get_processed_state("front", "front/a.flac") == ("", "")
+    assert test_db.get_processed_state("front", "front/b.flac") is None
+
+
+def test_save_file_results_replaces_changed_file(test_db):
+    """Same key with another content hash: the old results are replaced, not duplicated."""
+    test_db.save_file_results([_detection("a.flac")], _registered("a.flac", "old"))
+    assert test_db.save_file_results([_detection("a.flac")], _registered("a.flac", "old")) is None
+
+    ids = test_db.save_file_results(
+        [_detection("a.flac", "Parus major")], _registered("a.flac", "new")
+    )
+
+    assert len(ids) == 1
+    with Session(test_db.engine) as session:
+        assert [d.scientific_name for d in session.exec(select(BirdDetection)).all()] == [
+            "Parus major"
+        ]
+        assert [p.content_hash for p in session.exec(select(ProcessedFile)).all()] == ["new"]
+
+
+def test_save_file_results_swaps_in_new_model_version(test_db):
+    """A file re-analysed by another model replaces its results in one go."""
+    old = _registered("a.flac")
+    old.model_version = "V2.4"
+    test_db.save_file_results([_detection("a.flac")], old)
+
+    new = _registered("a.flac")
+    new.model_version = "V2.5"
+    detection = _detection("a.flac", "Parus major")
+    detection.model_version = "V2.5"
+    assert len(test_db.save_file_results([detection], new)) == 1
+
+    with Session(test_db.engine) as session:
+        rows = session.exec(select(BirdDetection)).all()
+        assert [(d.scientific_name, d.model_version) for d in rows] == [("Parus major", "V2.5")]
+    assert test_db.get_processed_state("front", "front/a.flac") == ("", "V2.5")
+
+
+def test_take_over_keeps_other_sources_results(test_db):
+    """Same segment name on two sources: replacing one file leaves the other alone."""
+
+    def scores(source):
+        return WindowScores(
+            filename="a.flac",
+            filepath=f"/data/recording/{source}/a.flac",
+            source=source,
+            top_k=1,
+            starts=b"",
+            labels=b"",
+            logits=b"",
+        )
+
+    back = ProcessedFile(filename="a.flac", source="back", relpath="back/a.flac")
+    back_detection = _detection("a.flac")
+    back_detection.source_device = "back"
+    test_db.save_file_results([back_detection], back, scores("back"))
+    test_db.save_file_results([_detection("a.flac")], _registered("a.flac", "old"), scores("front"))
+
+    test_db.save_file_results(
+        [_detection("a.flac", "Parus major")], _registered("a.flac", "new"), scores("front")
+    )
+
+    with Session(test_db.engine) as session:
+        detections = session.exec(select(BirdDetection)).all()
+        assert sorted((d.source_device, d.scientific_name) for d in detections) == [
+            ("back", "Turdus merula"),
+            ("front", "Parus major"),
+        ]
+        assert sorted(w.source for w in session.exec(select(WindowScores)).all()) == [
+            "back",
+            "front",
+        ]
+
+
+def test_reanalysis_files_selected_by_range_source_and_version(test_db):
+    """Jobs page through registered files that are not yet on the target version."""
+    for name, source, version in [
+        ("2024-05-01_04-00-00.flac", "front", None),
+        ("2024-05-01_05-00-00.flac", "front", "V2.4"),
+        ("2024-05-01_06-00-00.flac", "front", "V2.5"),
+        ("2024-05-01_07-00-00.flac", "back", "V2.4"),
+        ("2024-05-02_05-00-00.flac", "front", "V2.4"),
+    ]:
+        processed = ProcessedFile(
+            filename=name, source=source, relpath=f"{source}/{name}", model_version=version
+        )
+        test_db.save_file_results([], processed)
+    test_db.log_processed_file("legacy.flac", duration=10.0, processing_time=0.1)
+
+    job_id = test_db.create_reanalysis_job(
+        datetime(2024, 5, 1, 4, 30, tzinfo=UTC), datetime(2024, 5, 2, tzinfo=UTC)
+    )
+    job = test_db.next_reanalysis_job()
+    assert job.id == job_id and job.status == "pending"
+
+    files = test_db.get_reanalysis_files(job, "V2.5")
+    assert [relpath for _, relpath in files] == [
+        "front/2024-05-01_05-00-00.flac",
+        "back/2024-05-01_07-00-00.flac",
+    ]
+    assert test_db.get_reanalysis_files(job, "V2.5", after_id=files[0][0], limit=1) == files[1:]
+
+    job.source = "front"
+    assert test_db.count_reanalysis_files(job, "V2.5") == 1
+    assert test_db.count_reanalysis_files(ReanalysisJob(), "V2.5") == 4
+
+
+def test_cancelled_reanalysis_job_stays_cancelled(test_db):
+    job_id = test_db.create_reanalysis_job(source="front")
+    job = test_db.next_reanalysis_job()
+    job.status = "running"
+    job.cursor = 42
+    assert test_db.save_reanalysis_job(job)
+    assert test_db.next_reanalysis_job().cursor == 42
+
+    with Session(test_db.engine) as session:
+        stored = session.get(ReanalysisJob, job_id)
+        stored.status = "cancelled"
+        session.add(stored)
+        session.commit()
+
+    assert not test_db.save_reanalysis_job(job)
+    assert test_db.get_reanalysis_status(job_id) == "cancelled"
+    assert test_db.next_reanalysis_job() is None
+
+
+def test_iter_processed_keys_sorted(test_db):
+    """Registered files are streamed as (filename, source, relpath) in either order."""
+    for source, name in [("front", "b.flac"), ("back", "b.flac"), ("front", "a.flac")]:
+        processed = ProcessedFile(filename=name, source=source, relpath=f"{source}/{name}")
+        test_db.save_file_results([], processed)
+    # Rows from before files had a (source, relpath) key are not matched
+    test_db.log_processed_file("0.flac", duration=10.0, processing_time=0.1)
+
+    expected = [
+        ("a.flac", "front", "front/a.flac"),
+        ("b.flac", "back", "back/b.flac"),
+        ("b.flac", "front", "front/b.flac"),
+    ]
+    assert list(test_db.iter_processed_keys()) == expected
+    assert list(test_db.iter_processed_keys(descending=True)) == expected[::-1]
+    # Paged by key, each page continues after the last one
+    assert list(test_db.iter_processed_keys(page_size=1)) == expected
+    assert list(test_db.iter_processed_keys(descending=True, page_size=2)) == expected[::-1]
+
+
+def test_window_scores_paged_by_recording_time(test_db):
+    """Stored window scores are read back page by page, filtered by recording time."""
+    for hour in range(3):
+        scores = WindowScores(
+            filename=f"{hour}.flac",
+            filepath=f"/data/front/{hour}.flac",
+            recorded_at=datetime(2024, 5, 1, hour, tzinfo=UTC),
+            top_k=1,
+            starts=b"",
+            labels=b"",
+            logits=b"",
+        )
+        processed = ProcessedFile(filename=f"{hour}.flac", audio_duration_sec=10.0)
+        test_db.save_file_results([], processed, scores)
+
+    start, end = datetime(2024, 5, 1, 1, tzinfo=UTC), datetime(2024, 5, 2, tzinfo=UTC)
+    first = test_db.get_window_scores(start, end, limit=1)
+    assert [r.filename for r in first] == ["1.flac"]
+    rest = test_db.get_window_scores(start, end, after_id=first[0].id, limit=10)
+    assert [r.filename for r in rest] == ["2.flac"]
+
+
+def test_replace_detections_keeps_clips(test_db):
+    """Re-derived detections replace a file's rows and inherit clips of matching windows."""
+    old = [
+        BirdDetection(
+            filename="a.flac",
+            filepath="/data/a.flac",
+            scientific_name="Turdus merula",
+            confidence=0.9,
+            start_time=0.0,
+            end_time=3.0,
+            clip_path="/clips/a.flac",
+            clip_offset=0.0,
+        ),
+        BirdDetection(
+            filename="a.flac",
+            filepath="/data/a.flac",
+            scientific_name="Parus major",
+            confidence=0.3,
+            start_time=3.0,
+            end_time=6.0,
+        ),
+    ]
+    for det in old:
+        det.source_device = "front"
+    processed = _registered("a.flac", "h")
+    processed.model_version = "2.4"
+    test_db.save_file_results(old, processed)
+
+    new = BirdDetection(
+        filename="a.flac",
+        filepath="/data/a.flac",
+        scientific_name="Turdus merula",
+        confidence=0.6,
+        start_time=0.0,
+        end_time=3.0,
+        source_device="front",
+    )
+    assert test_db.replace_detections({("front", "a.flac"): [new]}) == 1
+
+    with Session(test_db.engine) as session:
+        rows = session.exec(select(BirdDetection)).all()
+    assert len(rows) == 1
+    assert rows[0].confidence == pytest.approx(0.6)
+    assert rows[0].clip_path == "/clips/a.flac"
+    assert rows[0].model_version == "2.4"
+
+
+def test_take_over_removes_unused_clips(test_db, tmp_path):
+    """Clips of replaced detections are deleted, unless a new detection reuses the file."""
+    kept, dropped = tmp_path / "kept.flac", tmp_path / "dropped.flac"
+    kept.touch()
+    dropped.touch()
+    old = [_detection("a.flac"), _detection("a.flac", "Parus major")]
+    old[0].clip_path, old[1].clip_path = str(kept), str(dropped)
+    test_db.save_file_results(old, _registered("a.flac", "old"))
+
+    new = _detection("a.flac")
+    new.clip_path = str(kept)  # Re-written under the same name
+    test_db.save_file_results([new], _registered("a.flac", "new"))
+
+    assert kept.exists()
+    assert not dropped.exists()
+
+
+def test_replace_detections_removes_clips_of_dropped_species(test_db, tmp_path):
+    clip = tmp_path / "clip.flac"
+    clip.touch()
+    old = _detection("a.flac", "Parus major")
+    old.clip_path = str(clip)
+    test_db.save_file_results([old], _registered("a.flac", "h"))
+
+    assert test_db.replace_detections({("front", "a.flac"): [_detection("a.flac")]}) == 1
+
+    assert not clip.exists()
+
+
+def test_replace_detections_per_source(test_db):
+    """Re-deriving one source's file leaves the same-named file of another source alone."""
+    back = _detection("a.flac")
+    back.source_device = "back"
+    test_db.save_file_results(
+        [back], ProcessedFile(filename="a.flac", source="back", relpath="back/a.flac")
+    )
+    test_db.save_file_results([_detection("a.flac")], _registered("a.flac", "h"))
+
+    new = _detection("a.flac", "Parus major")
+    assert test_db.replace_detections({("front", "a.flac"): [new]}) == 1
+
+    with Session(test_db.engine) as session:
+        rows = session.exec(select(BirdDetection)).all()
+    assert sorted((d.source_device, d.scientific_name) for d in rows) == [
+        ("back", "Turdus merula"),
+        ("front", "Parus major"),
+    ]
+
+
+def _bat_events(filename, source="front"):
+    return [
+        BatEvent(
+            filename=filename,
+            filepath=f"/data/recording/{source}/{filename}",
+            source_device=source,
+            start_time=t,
+            end_time=t + 0.005,
+            peak_freq=45000.0,
+            bandwidth=20000.0,
+        )
+        for t in (0.1, 0.2)
+    ]
+
+
+def test_bat_events_saved_with_file_results(test_db):
+    """Bat calls are written with the file's claim and replaced when its content changes."""
+    test_db.save_file_results([], _registered("a.wav", "old"), bat_events=_bat_events("a.wav"))
+    # Re-delivery: not claimed again, no duplicate calls
+    assert (
+        test_db.save_file_results([], _registered("a.wav", "old"), bat_events=_bat_events("a.wav"))
+        is None
+    )
+    back = ProcessedFile(filename="a.wav", source="back", relpath="back/a.wav")
+    test_db.save_file_results([], back, bat_events=_bat_events("a.wav", "back"))
+
+    with Session(test_db.engine) as session:
+        assert len(session.exec(select(BatEvent)).all()) == 4
+
+    test_db.save_file_results([], _registered("a.wav", "new"), bat_events=_bat_events("a.wav")[:1])
+
+    with Session(test_db.engine) as session:
+        events = session.exec(select(BatEvent)).all()
+    assert sorted((e.source_device, e.filename) for e in events) == [
+        ("back", "a.wav"),
+        ("back", "a.wav"),
+        ("front", "a.wav"),
+    ]
+
+
 @patch("silvasonic_birdnet.database.time.sleep")
 @patch("silvasonic_birdnet.database.create_engine")
 def test_connection_failure(mock_create, mock_sleep):
@@ -0,0 +1,119 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+from silvasonic_birdnet.embeddings import (
+    LEGACY_ROW_DTYPE,
+    ROW_DTYPE,
+    EmbeddingStore,
+    train_centroids,
+)
+
+
+def make_rows(n, filename="a.flac", source="front"):
+    rows = np.zeros(n, dtype=ROW_DTYPE)
+    rows["source"] = source.encode()
+    rows["filename"] = filename.encode()
+    rows["start"] = np.arange(n) * 3.0
+    return rows
+
+
+def test_add_appends_normalised_float16(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    vectors = np.array([[3.0, 4.0], [0.0, 2.0]], dtype=np.float32)
+
+    assert store.add(vectors, make_rows(2))
+    assert store.add(vectors[:1], make_rows(1, "b.flac"))
+
+    assert store.count() == 3
+    stored = np.fromfile(tmp_path / "vectors.f16", dtype="<f2").reshape(3, 2)
+    assert np.allclose(stored[0], [0.6, 0.8], atol=1e-3)
+    rows = np.fromfile(tmp_path / "windows.bin", dtype=ROW_DTYPE)
+    assert rows["filename"].tolist() == [b"a.flac", b"a.flac", b"b.flac"]
+    # No index yet: rows stay unassigned
+    assert np.fromfile(tmp_path / "assign.i2", dtype="<i2").tolist() == [-1, -1, -1]
+    assert json.loads((tmp_path / "header.json").read_text())["dim"] == 2
+
+
+def test_legacy_rows_converted_on_write(tmp_path):
+    """Rows of an older store (keyed by detection ID) get the new layout, source unknown."""
+    store = EmbeddingStore(tmp_path)
+    store.add(np.ones((2, 4), dtype=np.float32), make_rows(2))
+    old = np.zeros(2, dtype=LEGACY_ROW_DTYPE)
+    old["detection_id"] = [5, 6]
+    old["filename"] = b"old.flac"
+    old["start"] = [0.0, 3.0]
+    (tmp_path / "windows.bin").unlink()
+    old.tofile(tmp_path / "rows.bin")
+
+    store.add(np.ones((1, 4), dtype=np.float32), make_rows(1, "b.flac"))
+
+    assert not (tmp_path / "rows.bin").exists()
+    rows = np.fromfile(tmp_path / "windows.bin", dtype=ROW_DTYPE)
+    assert rows["filename"].tolist() == [b"old.flac", b"old.flac", b"b.flac"]
+    assert rows["source"].tolist() == [b"", b"", b"front"]
+    assert rows["start"].tolist() == [0.0, 3.0, 0.0]
+
+
+def test_remove_clears_windows_of_replaced_files(tmp_path):
+    """Only the given (source, file) pairs below `before` are removed."""
+    store = EmbeddingStore(tmp_path)
+    store.add(np.ones((2, 4), dtype=np.float32), make_rows(2))
+    store.add(np.ones((1, 4), dtype=np.float32), make_rows(1, source="back"))
+    store.add(np.ones((1, 4), dtype=np.float32), make_rows(1))  # fresh re-analysis
+
+    assert store.remove({("front", "a.flac")}, before=3) == 2
+
+    rows = np.fromfile(tmp_path / "windows.bin", dtype=ROW_DTYPE)
+    assert rows["filename"].tolist() == [b"", b"", b"a.flac", b"a.flac"]
+    assert rows["source"].tolist() == [b"", b"", b"back", b"front"]
+    assert store.count() == 4
+
+
+def test_add_rejects_other_dimension(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.add(np.ones((1, 4), dtype=np.float32), make_rows(1))
+    assert store.add(np.ones((1, 3), dtype=np.float32), make_rows(1)) is False
+    assert store.count() == 1
+
+
+def test_uncommitted_write_is_dropped(tmp_path):
+    """Bytes of a write that died before its rows were committed are truncated."""
+    store = EmbeddingStore(tmp_path)
+    store.add(np.ones((2, 4), dtype=np.float32), make_rows(2))
+    with open(tmp_path / "vectors.f16", "ab") as f:
+        f.write(b"\0" * 8)
+
+    store.add(np.ones((1, 4), dtype=np.float32), make_rows(1))
+
+    assert (tmp_path / "vectors.f16").stat().st_size == 3 * 4 * 2
+
+
+def test_index_trained_then_extended(tmp_path):
+    """The IVF index is trained once the store is large enough; later rows are assigned on write."""
+    rng = np.random.default_rng(1)
+    clusters = np.eye(8, dtype=np.float32)
+    store = EmbeddingStore(tmp_path)
+
+    with patch("silvasonic_birdnet.embeddings.MIN_TRAIN_ROWS", 64):
+        vectors = clusters[rng.integers(0, 8, size=64)] + rng.normal(0, 0.01, (64, 8))
+        store.add(vectors.astype(np.float32), make_rows(64))
+        assert (tmp_path / "ivf.npy").exists()
+        assert json.loads((tmp_path / "header.json").read_text())["trained_rows"] == 64
+
+        store.add(clusters[:2] * 5, make_rows(2, "b.flac"))
+
+    assign = np.fromfile(tmp_path / "assign.i2", dtype="<i2")
+    assert len(assign) == 66
+    assert (assign >= 0).all()
+    # Rows of the same cluster share a list
+    assert assign[-2] != assign[-1]
+
+
+def test_train_centroids_separates_clusters():
+    rng = np.random.default_rng(0)
+    sample = np.repeat(np.eye(4, dtype=np.float32), 20, axis=0) + rng.normal(0, 0.01, (80, 4))
+    sample /= np.linalg.norm(sample, axis=1, keepdims=True)
+    centroids = train_centroids(sample.astype(np.float32), 4)
+    assign = np.argmax(sample @ centroids.T, axis=1)
+    assert len(set(assign.tolist())) >= 3
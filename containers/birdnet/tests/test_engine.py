@@ -0,0 +1,238 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from silvasonic_birdnet.engine import (
+    SAMPLE_RATE,
+    WINDOW_SAMPLES,
+    InferenceEngine,
+    birdnet_week,
+    detections_from_array,
+    flat_sigmoid,
+    split_windows,
+)
+
+EMBEDDING_INDEX = -1
+
+
+class FakeInterpreter:
+    """Minimal stand-in for a TFLite interpreter: logit = window mean per class."""
+
+    def __init__(self, n_classes=3):
+        self.n_classes = n_classes
+        self.invocations = 0
+        self.allocations = 0
+        self._input = None
+
+    def resize_tensor_input(self, index, shape):
+        pass
+
+    def allocate_tensors(self):
+        self.allocations += 1
+
+    def set_tensor(self, index, value):
+        self._input = value
+
+    def invoke(self):
+        self.invocations += 1
+
+    def get_tensor(self, index):
+        if index == EMBEDDING_INDEX:
+            # Feature vector: (mean, peak) of the window
+            return np.stack([self._input.mean(axis=1), self._input.max(axis=1)], axis=1)
+        means = self._input.mean(axis=1, keepdims=True)
+        return np.repeat(means, self.n_classes, axis=1) * np.arange(self.n_classes)
+
+
+@pytest.fixture
+def engine():
+    eng = InferenceEngine(max_batch_windows=32)
+    eng._interpreter = FakeInterpreter()
+    eng._embedding_index = EMBEDDING_INDEX
+    eng.labels = [("A a", "Alpha"), ("B b", "Beta"), ("C c", "Gamma")]
+    return eng
+
+
+def test_split_windows_pads_like_birdnet():
+    """10 s splits into 4 windows (last one padded), 2.5 s tail would be kept."""
+    windows, starts = split_windows(np.ones(SAMPLE_RATE * 10, dtype=np.float32))
+    assert windows.shape == (4, WINDOW_SAMPLES)
+    assert starts == [0.0, 3.0, 6.0, 9.0]
+    # Last window: 1 s of signal + zero padding
+    assert windows[3, :SAMPLE_RATE].all()
+    assert not windows[3, SAMPLE_RATE:].any()
+
+
+def test_split_windows_drops_short_tail_and_overlap():
+    windows, _ = split_windows(np.ones(int(SAMPLE_RATE * 9.5), dtype=np.float32))
+    assert len(windows) == 3  # 0.5 s tail < MIN_WINDOW_SEC
+
+    _, starts = split_windows(np.ones(SAMPLE_RATE * 6, dtype=np.float32), overlap=1.5)
+    assert starts == [0.0, 1.5, 3.0]
+
+
+@pytest.mark.parametrize("samples", [0, 24000, SAMPLE_RATE - 1])
+def test_split_windows_short_signal_has_no_windows(samples):
+    windows, starts = split_windows(np.ones(samples, dtype=np.float32))
+    assert windows.shape == (0, WINDOW_SAMPLES)
+    assert starts == []
+
+
+def test_flat_sigmoid_sensitivity_shifts_scores():
+    logits = np.zeros((1, 1), dtype=np.float32)
+    assert flat_sigmoid(logits, 1.0)[0, 0] == pytest.approx(0.5)
+    assert flat_sigmoid(logits, 1.25)[0, 0] > 0.5
+    assert flat_sigmoid(logits, 0.75)[0, 0] < 0.5
+
+
+def test_analyze_batches_files_in_one_invocation(engine):
+    loud = np.full(SAMPLE_RATE * 6, 3.0, dtype=np.float32)
+    silent = np.zeros(SAMPLE_RATE * 6, dtype=np.float32)
+
+    results = engine.analyze([silent, loud], min_conf=0.9)
+
+    assert engine._interpreter.invocations == 1
+    assert len(results[0]) == 0
+    # Loud file: classes 1 and 2 exceed threshold in both windows, best first
+    assert results[1]["label"].tolist() == [2, 1, 2, 1]
+    assert results[1]["start"].tolist() == [0.0, 0.0, 3.0, 3.0]
+    assert results[1]["end"].tolist() == [3.0, 3.0, 6.0, 6.0]
+
+
+def test_detections_from_array_resolves_labels(engine):
+    loud = np.full(SAMPLE_RATE * 3, 3.0, dtype=np.float32)
+    (result,) = engine.analyze([loud], min_conf=0.9)
+
+    detections = detections_from_array(result, engine.labels)
+
+    assert [d.common_name for d in detections] == ["Gamma", "Beta"]
+    assert detections[0].scientific_name == "C c"
+    assert detections[0].start_time == 0.0
+    assert detections[0].end_time == 3.0
+    assert detections[0].confidence > detections[1].confidence
+
+
+def test_predict_reuses_tensor_allocation(engine):
+    windows = np.zeros((4, WINDOW_SAMPLES), dtype=np.float32)
+    engine.predict(windows)
+    engine.predict(windows)
+    assert engine._interpreter.allocations == 1
+
+
+def test_species_mask_filters_results(engine):
+    loud = np.full(SAMPLE_RATE * 3, 3.0, dtype=np.float32)
+
+    # Default mask from set_location()
+    engine._species_mask = np.array([True, True, False])
+    (result,) = engine.analyze([loud], min_conf=0.9)
+    assert result["label"].tolist() == [1]
+
+    # Per-file masks override the default, in one batch
+    first, second = engine.analyze(
+        [loud, loud],
+        min_conf=0.9,
+        species_masks=[np.array([True, False, True]), None],
+    )
+    assert first["label"].tolist() == [2]
+    assert second["label"].tolist() == [2, 1]
+    assert engine._interpreter.invocations == 2
+
+
+def test_analyze_returns_embeddings_per_file(engine):
+    """Embeddings come from the same invocation and are split per file like the logits."""
+    quiet = np.full(SAMPLE_RATE * 6, 1.0, dtype=np.float32)
+    loud = np.full(SAMPLE_RATE * 3, 3.0, dtype=np.float32)
+
+    first, second = engine.analyze_scored([quiet, loud], min_conf=0.9, embeddings=True)
+
+    assert engine._interpreter.invocations == 1
+    assert first.embeddings.shape == (2, 2)
+    assert second.embeddings.tolist() == [[3.0, 3.0]]
+    assert engine.analyze_scored([loud], min_conf=0.9)[0].embeddings is None
+
+
+def test_birdnet_week():
+    assert birdnet_week(datetime(2024, 1, 1)) == 1
+    assert birdnet_week(datetime(2024, 1, 8)) == 2
+    assert birdnet_week(datetime(2024, 5, 21)) == 19
+    assert birdnet_week(datetime(2024, 5, 31)) == 20
+    assert birdnet_week(datetime(2024, 12, 31)) == 48
+
+
+class FakeMetaModel:
+    def __init__(self):
+        self.invocations = 0
+        self._input = None
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [{"index": 0}]
+
+    def get_output_details(self):
+        return [{"index": 1}]
+
+    def set_tensor(self, index, value):
+        self._input = value
+
+    def invoke(self):
+        self.invocations += 1
+
+    def get_tensor(self, index):
+        # Species 0 is only plausible in summer weeks
+        week = self._input[0, 2]
+        return np.array([[1.0 if 16 < week < 36 else 0.0, 0.5, 0.0]])
+
+
+def test_species_mask_lru():
+    meta = FakeMetaModel()
+    fake_tflite = MagicMock()
+    fake_tflite.Interpreter.return_value = meta
+    engine = InferenceEngine()
+
+    with (
+        patch("silvasonic_birdnet.engine.tflite", fake_tflite),
+        patch("silvasonic_birdnet.engine.bn_cfg", MagicMock()),
+        patch("silvasonic_birdnet.engine.SPECIES_MASK_CACHE_SIZE", 2),
+    ):
+        summer = engine.species_mask(52.5, 13.4, 24)
+        winter = engine.species_mask(52.5, 13.4, 2)
+        assert summer.tolist() == [True, True, False]
+        assert winter.tolist() == [False, True, False]
+
+        # Cache hit: meta model not run again
+        assert engine.species_mask(52.5, 13.4, 24) is summer
+        assert meta.invocations == 2
+
+        # Least recently used (week 2) is evicted
+        engine.species_mask(52.5, 13.4, 30)
+        engine.species_mask(52.5, 13.4, 2)
+        assert meta.invocations == 4
+
+    assert engine.species_mask(None, None, 24) is None
+
+
+def test_predict_requires_loaded_model():
+    with pytest.raises(RuntimeError):
+        InferenceEngine().predict(np.zeros((1, WINDOW_SAMPLES), dtype=np.float32))
+
+
+def test_analyze_skips_masked_windows(engine):
+    loud = np.full(SAMPLE_RATE * 9, 3.0, dtype=np.float32)
+
+    (result,) = engine.analyze([loud], min_conf=0.9, masks=[np.array([False, True, False])])
+
+    # Only the middle window is scored
+    assert engine._interpreter.invocations == 1
+    assert set(result["start"].tolist()) == {3.0}
+
+
+def test_analyze_all_windows_masked(engine):
+    quiet = np.zeros(SAMPLE_RATE * 3, dtype=np.float32)
+
+    (result,) = engine.analyze([quiet], min_conf=0.1, masks=[np.array([False])])
+
+    assert len(result) == 0
+    assert engine._interpreter.invocations == 0
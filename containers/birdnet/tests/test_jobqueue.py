@@ -0,0 +1,232 @@
+import queue
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import redis
+from silvasonic_birdnet.jobqueue import (
+    Job,
+    JobQueue,
+    LocalJobQueue,
+    RedisJobQueue,
+    SourceRouter,
+    worker_for,
+)
+
+
+def test_queue_backends_implement_the_interface():
+    with pytest.raises(TypeError):
+        JobQueue()  # type: ignore[abstract]
+
+    class Incomplete(JobQueue):
+        def put(self, path):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_local_queue_batches_and_acks():
+    q = LocalJobQueue()
+    for i in range(3):
+        q.put(f"/data/{i}.flac")
+
+    batch = q.get_batch("c", max_items=2, max_wait=0.05)
+
+    assert [job.path for job in batch] == ["/data/0.flac", "/data/1.flac"]
+    assert q.qsize() == 1
+    assert q.oldest_age() >= 0.0
+    q.ack(batch)
+
+    q.get_batch("c", max_items=2, max_wait=0.05)
+    assert q.oldest_age() is None
+    with pytest.raises(queue.Empty):
+        q.get_batch("c", max_items=2, max_wait=0.0)
+
+
+def test_queues_keep_the_attempt_count(client):
+    local = LocalJobQueue()
+    local.put("/data/a.flac", attempts=2)
+    assert local.get_batch("c", max_items=2, max_wait=0.0) == [Job("/data/a.flac", attempts=2)]
+
+    q = RedisJobQueue(client)
+    q._recovered.add("host-0")
+    q.put("/data/b.flac")
+    q.put("/data/b.flac", attempts=1)
+    assert client.xadd.call_args_list[0].args == ("birdnet:jobs", {"path": "/data/b.flac"})
+    assert client.xadd.call_args_list[1].args == (
+        "birdnet:jobs",
+        {"path": "/data/b.flac", "attempts": 1},
+    )
+    client.xreadgroup.side_effect = [
+        [[b"birdnet:jobs", [(b"4-0", {b"path": b"/data/b.flac", b"attempts": b"1"})]]],
+        [],
+    ]
+    assert q.get_batch("host-0", max_items=4, max_wait=0.0) == [
+        Job("/data/b.flac", "4-0", attempts=1)
+    ]
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.xautoclaim.return_value = [b"0-0", [], []]
+    return client
+
+
+def entries(*pairs):
+    return [[b"birdnet:jobs", [(eid, {b"path": path}) for eid, path in pairs]]]
+
+
+def test_redis_queue_recovers_own_pending_first(client):
+    q = RedisJobQueue(client)
+    client.xreadgroup.side_effect = [entries((b"1-0", b"/data/a.flac")), []]
+
+    first = q.get_batch("host-0", max_items=4, max_wait=0.0)
+
+    assert first == [Job("/data/a.flac", "1-0")]
+    client.xgroup_create.assert_called_once_with("birdnet:jobs", "birdnet", id="0", mkstream=True)
+    # Own pending entries are re-read from ID 0 without blocking
+    assert client.xreadgroup.call_args.args[2] == {"birdnet:jobs": "0"}
+
+
+def test_redis_queue_pages_through_own_pending_once(client):
+    """Recovery hands out each pending job once, also without acks in between."""
+    q = RedisJobQueue(client)
+    client.xreadgroup.side_effect = [
+        entries((b"1-0", b"/data/a.flac"), (b"2-0", b"/data/b.flac")),
+        entries((b"3-0", b"/data/c.flac")),
+        [],  # pending list exhausted
+        [],  # no new jobs
+    ]
+
+    first = q.get_batch("router", max_items=2, max_wait=0.0)
+    second = q.get_batch("router", max_items=2, max_wait=0.0)
+    with pytest.raises(queue.Empty):
+        q.get_batch("router", max_items=2, max_wait=0.0)
+
+    assert [job.id for job in first + second] == ["1-0", "2-0", "3-0"]
+    starts = [c.args[2]["birdnet:jobs"] for c in client.xreadgroup.call_args_list]
+    assert starts == ["0", "2-0", "3-0", ">"]
+
+
+def test_redis_queue_reads_new_jobs_and_reclaims(client):
+    q = RedisJobQueue(client)
+    client.xgroup_create.side_effect = redis.ResponseError(
+        "BUSYGROUP Consumer Group name already exists"
+    )
+    client.xreadgroup.side_effect = [
+        [],  # no own pending jobs
+        entries((b"2-0", b"/data/b.flac")),
+        [],  # batching window closes
+    ]
+
+    batch = q.get_batch("host-0", max_items=4, max_wait=0.05)
+
+    assert batch == [Job("/data/b.flac", "2-0")]
+    client.xautoclaim.assert_called_once_with(
+        "birdnet:jobs", "birdnet", "host-0", 300_000, start_id="0-0", count=4
+    )
+    assert client.xreadgroup.call_args_list[1].args[2] == {"birdnet:jobs": ">"}
+
+
+def test_redis_queue_returns_reclaimed_jobs(client):
+    q = RedisJobQueue(client)
+    q._recovered.add("host-1")
+    client.xautoclaim.return_value = [b"0-0", [(b"3-0", {b"path": b"/data/c.flac"})], []]
+
+    assert q.get_batch("host-1", max_items=4, max_wait=0.0) == [Job("/data/c.flac", "3-0")]
+    client.xreadgroup.assert_not_called()
+
+
+def test_redis_queue_empty_raises(client):
+    q = RedisJobQueue(client)
+    q._recovered.add("host-0")
+    client.xreadgroup.return_value = []
+
+    with pytest.raises(queue.Empty):
+        q.get_batch("host-0", max_items=4, max_wait=0.0)
+
+
+def test_redis_queue_ack_deletes_entries(client):
+    q = RedisJobQueue(client)
+    pipe = client.pipeline.return_value
+
+    q.ack([Job("/data/a.flac", "1-0"), Job("/data/b.flac", "2-0")])
+
+    pipe.xack.assert_called_once_with("birdnet:jobs", "birdnet", "1-0", "2-0")
+    pipe.xdel.assert_called_once_with("birdnet:jobs", "1-0", "2-0")
+    pipe.execute.assert_called_once()
+
+
+def test_redis_queue_depth_and_oldest_age(client):
+    q = RedisJobQueue(client)
+    client.xlen.return_value = 7
+    queued_ms = int((time.time() - 60) * 1000)
+    client.xrange.return_value = [(f"{queued_ms}-0".encode(), {b"path": b"/data/a.flac"})]
+
+    assert q.qsize() == 7
+    assert 59 <= q.oldest_age() <= 61
+    client.xrange.assert_called_once_with("birdnet:jobs", "-", "+", count=1)
+
+    client.xrange.return_value = []
+    assert q.oldest_age() is None
+
+
+def test_router_keeps_each_source_on_one_worker():
+    """Every job of a source lands in the same worker's inbox, in queue order."""
+    shared = LocalJobQueue()
+    paths = [f"/data/{source}/{i}.flac" for i in range(4) for source in ("front", "back", "pond")]
+    for path in paths:
+        shared.put(path)
+    router = SourceRouter(shared, workers=2, consumer="host-router", inbox_size=16)
+    stop = threading.Event()
+    thread = threading.Thread(target=router.run, args=(stop, 4), daemon=True)
+    thread.start()
+
+    deadline = time.time() + 2.0
+    while shared.qsize() and time.time() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    thread.join(timeout=2.0)
+
+    received = {
+        worker: [job.path for job in router.get_batch(worker, 16, 0.1)] for worker in (0, 1)
+    }
+
+    for worker, got in received.items():
+        for source in ("front", "back", "pond"):
+            mine = [p for p in paths if f"/{source}/" in p]
+            if worker_for(mine[0], 2) == worker:
+                assert [p for p in got if f"/{source}/" in p] == mine
+            else:
+                assert not [p for p in got if f"/{source}/" in p]
+
+
+def test_router_does_not_dispatch_a_job_twice():
+    """A job delivered again before its ack is dropped; after the ack it is routed again."""
+    shared = MagicMock()
+    deliveries = [[Job("/data/front/a.flac", "1-0")]] * 2
+    stop = threading.Event()
+
+    def get_batch(consumer, max_items, max_wait):
+        if not deliveries:
+            stop.set()
+            raise queue.Empty
+        return deliveries.pop()
+
+    shared.get_batch.side_effect = get_batch
+    router = SourceRouter(shared, workers=1, consumer="host-router", inbox_size=4)
+
+    router.run(stop, 4)
+    batch = router.get_batch(0, 4, 0.0)
+    assert [job.id for job in batch] == ["1-0"]
+    assert router.inboxes[0].empty()
+
+    router.ack(batch)
+    shared.ack.assert_called_once_with(batch)
+    deliveries.append(batch)
+    stop.clear()
+    router.run(stop, 4)
+    assert router.inboxes[0].qsize() == 1
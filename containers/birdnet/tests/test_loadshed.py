@@ -0,0 +1,82 @@
+import threading
+
+from silvasonic_birdnet.loadshed import (
+    EVERY_NTH,
+    NO_OVERLAP,
+    NORMAL,
+    SKIP_NIGHT,
+    LoadShedder,
+    in_hours,
+    parse_hours,
+)
+
+
+def test_steps_up_while_behind_and_back_down_when_relaxed():
+    shedder = LoadShedder(max_load=0.9, max_queue_age=600, hold_sec=60)
+    shedder.record(audio_sec=10.0, busy_sec=12.0)  # slower than real time
+
+    assert shedder.update(queue_age=30, now=1000) == NO_OVERLAP
+    # Held: no further step before hold_sec has passed
+    assert shedder.update(queue_age=30, now=1030) == NO_OVERLAP
+    assert shedder.update(queue_age=30, now=1061) == NO_OVERLAP + 1
+
+    for _ in range(20):
+        shedder.record(audio_sec=10.0, busy_sec=3.0)
+    assert shedder.update(queue_age=10, now=1122) == NO_OVERLAP
+    assert shedder.update(queue_age=10, now=1183) == NORMAL
+    assert shedder.status()["level_name"] == "normal"
+
+
+def test_old_queue_alone_raises_level():
+    shedder = LoadShedder(max_queue_age=600, hold_sec=0)
+    assert shedder.update(queue_age=None, now=1) == NORMAL
+    assert shedder.update(queue_age=1200, now=2) == NO_OVERLAP
+
+
+def test_every_nth_file_per_source():
+    shedder = LoadShedder(every_nth=3)
+    shedder.level = EVERY_NTH
+    front = [shedder.admit(f"/data/front/2024-05-01_12-00-{i:02d}.flac") for i in range(6)]
+    back = [shedder.admit("/data/back/2024-05-01_12-00-00.flac")]
+
+    assert front == [True, False, False, True, False, False]
+    assert back == [True]
+    assert shedder.files_shed == 4
+    # Estimated load accounts for the shed share
+    shedder.record(10.0, 9.0)
+    assert round(shedder.load, 2) == round(0.9 * 3 / 7, 2)
+
+
+def test_every_nth_is_exact_across_dispatcher_threads():
+    """Concurrent admits share the per-source counter without losing updates."""
+    shedder = LoadShedder(every_nth=2)
+    shedder.level = EVERY_NTH
+    results: list[bool] = []
+
+    def dispatch():
+        results.extend(shedder.admit("/data/mic/a.flac") for _ in range(1000))
+
+    threads = [threading.Thread(target=dispatch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(results) == 4000
+    assert shedder.files_shed == 4000
+
+
+def test_night_recordings_skipped_at_last_level():
+    shedder = LoadShedder(every_nth=2, night_hours=(22, 4))
+    shedder.level = SKIP_NIGHT
+    assert shedder.admit("/data/front/2024-05-01_23-10-00.flac") is False
+    assert shedder.admit("/data/back/2024-05-01_12-10-00.flac") is True
+    assert shedder.admit("/data/other/no_timestamp.flac") is True
+
+
+def test_hour_ranges():
+    assert parse_hours("22-4") == (22, 4)
+    assert parse_hours("") is None
+    assert parse_hours("night") is None
+    assert in_hours(23, (22, 4)) and in_hours(3, (22, 4)) and not in_hours(4, (22, 4))
+    assert in_hours(13, (12, 14)) and not in_hours(14, (12, 14))
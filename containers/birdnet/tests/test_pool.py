@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from silvasonic_birdnet.analyzer import BatchFailed
+from silvasonic_birdnet.pool import (
+    AnalyzerWorker,
+    LocalWorker,
+    ProcessWorker,
+    pin_to_cores,
+    plan_core_sets,
+)
+
+
+@patch("silvasonic_birdnet.pool.available_cores", return_value=[0, 1, 2, 3])
+def test_plan_core_sets_reserves_first_core(mock_cores):
+    assert plan_core_sets(1, reserved=1) == [[1, 2, 3]]
+    assert plan_core_sets(2, reserved=1) == [[1, 2], [3]]
+    assert plan_core_sets(3, reserved=1) == [[1], [2], [3]]
+    # More workers than usable cores: shared round-robin
+    assert plan_core_sets(4, reserved=1) == [[1], [2], [3], [1]]
+
+
+@patch("silvasonic_birdnet.pool.available_cores", return_value=[0])
+def test_plan_core_sets_single_core(mock_cores):
+    assert plan_core_sets(2, reserved=1) == [[0], [0]]
+
+
+@patch("silvasonic_birdnet.pool.os.sched_setaffinity", create=True)
+def test_pin_to_cores(mock_affinity):
+    pin_to_cores([2, 3])
+    mock_affinity.assert_called_once_with(0, [2, 3])
+
+
+def test_worker_kinds_must_implement_run_batch():
+    with pytest.raises(TypeError):
+        AnalyzerWorker(0)  # type: ignore[abstract]
+
+
+def test_local_worker_tracks_throughput():
+    analyzer = MagicMock()
+    analyzer.process_batch.return_value = 20.0
+    worker = LocalWorker(analyzer)
+    worker.start()
+
+    worker.process_batch(["/data/a.flac", "/data/b.flac"])
+
+    status = worker.status()
+    assert status["state"] == "idle"
+    assert status["files"] == 2
+    assert status["realtime_factor"] > 0
+    assert worker.audio_seconds == 20.0
+
+
+def test_local_worker_counts_errors():
+    analyzer = MagicMock()
+    analyzer.process_batch.side_effect = RuntimeError("boom")
+    worker = LocalWorker(analyzer)
+
+    with pytest.raises(RuntimeError):
+        worker.process_batch(["/data/a.flac"])
+
+    assert worker.errors == 1
+    assert worker.files_done == 0
+    assert worker.state == "idle"
+
+
+def test_process_worker_round_trip():
+    worker = ProcessWorker(1, cores=[2])
+    worker._process = MagicMock()
+    worker._process.is_alive.return_value = True
+    worker._conn = MagicMock()
+    worker._conn.poll.return_value = True
+    worker._conn.recv.return_value = ("done", 10.0, {"silence_files_skipped": 2})
+
+    worker.process_batch(["/data/a.flac"])
+
+    worker._conn.send.assert_called_once_with(["/data/a.flac"])
+    assert worker.files_done == 1
+    assert worker.status()["cores"] == [2]
+    assert worker.status()["silence"] == {"silence_files_skipped": 2}
+
+
+def test_process_worker_reports_failed_files():
+    worker = ProcessWorker(1)
+    worker._process = MagicMock()
+    worker._process.is_alive.return_value = True
+    worker._conn = MagicMock()
+    worker._conn.poll.return_value = True
+    worker._conn.recv.return_value = ("failed", (["/data/b.flac"], "db down"), {})
+
+    with pytest.raises(BatchFailed) as failure:
+        worker.process_batch(["/data/a.flac", "/data/b.flac"])
+
+    assert failure.value.paths == ["/data/b.flac"]
+    assert worker.errors == 1
+
+
+def test_process_worker_sends_load_level_ahead_of_batch():
+    worker = ProcessWorker(1)
+    worker._process = MagicMock()
+    worker._process.is_alive.return_value = True
+    worker._conn = MagicMock()
+    worker._conn.poll.return_value = True
+    worker._conn.recv.return_value = ("done", 10.0, {})
+
+    worker.set_load_level(2)
+    worker.process_batch(["/data/a.flac"])
+    worker.process_batch(["/data/b.flac"])
+
+    sent = [c[0][0] for c in worker._conn.send.call_args_list]
+    assert sent == [("level", 2), ["/data/a.flac"], ["/data/b.flac"]]
+
+
+def test_process_worker_detects_crash():
+    worker = ProcessWorker(1)
+    worker._process = MagicMock()
+    worker._process.is_alive.side_effect = [True, False]
+    worker._conn = MagicMock()
+    worker._conn.poll.return_value = False
+
+    with pytest.raises(RuntimeError, match="died"):
+        worker.process_batch(["/data/a.flac"])
+    assert worker.state == "dead"
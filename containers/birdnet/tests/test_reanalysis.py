@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from silvasonic_birdnet.jobqueue import LocalJobQueue
+from silvasonic_birdnet.models import ReanalysisJob
+from silvasonic_birdnet.reanalysis import MAX_PASSES, ReanalysisRunner
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    for name in ["a.flac", "b.flac"]:
+        (tmp_path / "front").mkdir(exist_ok=True)
+        (tmp_path / "front" / name).write_bytes(b"")
+    return tmp_path
+
+
+def runner_for(root, file_queue):
+    runner = ReanalysisRunner(root, file_queue, "V2.5", rate=1000.0, low_water=10)
+    # Drained queue: the analyzer has taken the files
+    file_queue.qsize = MagicMock(side_effect=lambda: 0)
+    return runner
+
+
+@patch("silvasonic_birdnet.reanalysis.db")
+def test_job_feeds_files_and_checkpoints(mock_db, recordings):
+    file_queue = LocalJobQueue()
+    # Queued files are analysed right away, only the missing one stays on the old version
+    rows = [(4, "front/a.flac"), (9, "front/gone.flac"), (12, "front/b.flac")]
+    put = MagicMock(
+        side_effect=lambda path: rows.remove(next(r for r in rows if path.endswith(r[1])))
+    )
+    file_queue.put = put
+    runner = runner_for(recordings, file_queue)
+    job = ReanalysisJob(id=1, source="front")
+    saved = []
+    mock_db.save_reanalysis_job.side_effect = lambda j: (
+        saved.append((j.status, j.cursor, j.files_done)) or True
+    )
+    # 3 selected, one of them deleted from disk meanwhile
+    mock_db.get_reanalysis_files.side_effect = lambda job, version, after_id, limit: [
+        row for row in rows if row[0] > after_id
+    ]
+    mock_db.count_reanalysis_files.side_effect = [3] + [1] * 20
+
+    runner.run_job(job)
+
+    assert [c.args[0] for c in put.call_args_list] == [
+        str(recordings / "front" / "a.flac"),
+        str(recordings / "front" / "b.flac"),
+    ]
+    assert mock_db.get_reanalysis_files.call_args_list[1].kwargs["after_id"] == 12
+    # The missing file is looked for again in every sweep, then reported
+    assert job.passes == MAX_PASSES - 1
+    assert saved[0] == ("running", 0, 0)
+    assert saved[1] == ("running", 12, 2)
+    assert saved[-1][0] == "done"
+    assert job.model_version == "V2.5"
+    assert job.error == "1 file(s) could not be re-analysed"
+
+
+@patch("silvasonic_birdnet.reanalysis.db")
+def test_leftover_files_get_another_sweep(mock_db, recordings):
+    runner = runner_for(recordings, LocalJobQueue())
+    job = ReanalysisJob(id=1, model_version="V2.5", cursor=12, files_total=2, files_done=1)
+    mock_db.save_reanalysis_job.return_value = True
+    # Resumed after the cursor: nothing left there, but one file was lost from the queue
+    mock_db.get_reanalysis_files.side_effect = [[], [(4, "front/a.flac")], []]
+    mock_db.count_reanalysis_files.side_effect = [1, 1, 0, 0, 0]
+
+    runner.run_job(job)
+
+    assert [c.kwargs["after_id"] for c in mock_db.get_reanalysis_files.call_args_list] == [
+        12,
+        0,
+        4,
+    ]
+    assert job.passes == 1
+    assert job.status == "done"
+    assert job.files_done == 2
+    assert job.error is None
+
+
+@patch("silvasonic_birdnet.reanalysis.db")
+def test_cancelled_job_stops_feeding(mock_db, recordings):
+    file_queue = LocalJobQueue()
+    runner = runner_for(recordings, file_queue)
+    mock_db.save_reanalysis_job.side_effect = [True, False]
+    mock_db.get_reanalysis_files.return_value = [(4, "front/a.flac")]
+    mock_db.count_reanalysis_files.return_value = 2
+
+    runner.run_job(ReanalysisJob(id=1))
+
+    assert mock_db.get_reanalysis_files.call_count == 1
+
+
+@patch("silvasonic_birdnet.reanalysis.db")
+def test_no_feeding_while_paused(mock_db, recordings):
+    runner = runner_for(recordings, LocalJobQueue())
+    paused = MagicMock(side_effect=[True, True, False])
+    runner.paused = paused
+    runner._stop_event.wait = MagicMock(return_value=False)
+
+    assert runner._wait_for_capacity()
+    assert paused.call_count == 3
+    assert runner._stop_event.wait.call_count == 2
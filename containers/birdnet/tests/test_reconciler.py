@@ -0,0 +1,119 @@
+import os
+import queue
+import time
+from unittest.mock import patch
+
+import pytest
+from silvasonic_birdnet.reconciler import BacklogReconciler
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    """Two devices with interleaved timestamps, older than the settle window."""
+    old = time.time() - 3600
+    for device, names in {
+        "mic_a": ["2024-05-01_10-00-00.flac", "2024-05-01_10-00-20.flac"],
+        "mic_b": ["2024-05-01_10-00-10.flac", "2024-05-01_10-00-30.flac", "notes.txt"],
+    }.items():
+        (tmp_path / device).mkdir()
+        for name in names:
+            path = tmp_path / device / name
+            path.write_bytes(b"")
+            os.utime(path, (old, old))
+    return tmp_path
+
+
+def make_reconciler(root, policy="oldest", **kwargs):
+    return BacklogReconciler(root, queue.Queue(), policy=policy, rate=1000.0, **kwargs)
+
+
+@patch("silvasonic_birdnet.reconciler.db")
+def test_sorted_merge_skips_processed(mock_db, recordings):
+    mock_db.iter_processed_keys.return_value = iter(
+        [
+            ("2024-05-01_09-00-00.flac", "mic_a", "mic_a/2024-05-01_09-00-00.flac"),
+            ("2024-05-01_10-00-10.flac", "mic_b", "mic_b/2024-05-01_10-00-10.flac"),
+        ]
+    )
+    reconciler = make_reconciler(recordings)
+
+    names = [os.path.basename(p) for p in reconciler.iter_unprocessed()]
+
+    assert names == [
+        "2024-05-01_10-00-00.flac",
+        "2024-05-01_10-00-20.flac",
+        "2024-05-01_10-00-30.flac",
+    ]
+    mock_db.iter_processed_keys.assert_called_once_with(descending=False)
+
+
+@patch("silvasonic_birdnet.reconciler.db")
+def test_same_name_in_another_source_is_not_processed(mock_db, recordings):
+    """A file is matched by source and path, not by its name alone."""
+    (recordings / "mic_a" / "2024-05-01_10-00-10.flac").write_bytes(b"")
+    mock_db.iter_processed_keys.return_value = iter(
+        [("2024-05-01_10-00-10.flac", "mic_b", "mic_b/2024-05-01_10-00-10.flac")]
+    )
+    reconciler = make_reconciler(recordings)
+
+    paths = list(reconciler.iter_unprocessed())
+
+    assert str(recordings / "mic_a" / "2024-05-01_10-00-10.flac") in paths
+    assert str(recordings / "mic_b" / "2024-05-01_10-00-10.flac") not in paths
+    assert len(paths) == 4
+
+
+@patch("silvasonic_birdnet.reconciler.db")
+def test_newest_first_policy(mock_db, recordings):
+    mock_db.iter_processed_keys.return_value = iter(
+        [("2024-05-01_10-00-30.flac", "mic_b", "mic_b/2024-05-01_10-00-30.flac")]
+    )
+    reconciler = make_reconciler(recordings, policy="newest")
+
+    paths = list(reconciler.iter_unprocessed())
+
+    assert [os.path.basename(p) for p in paths] == [
+        "2024-05-01_10-00-20.flac",
+        "2024-05-01_10-00-10.flac",
+        "2024-05-01_10-00-00.flac",
+    ]
+    assert paths[1] == str(recordings / "mic_b" / "2024-05-01_10-00-10.flac")
+    mock_db.iter_processed_keys.assert_called_once_with(descending=True)
+
+
+@patch("silvasonic_birdnet.reconciler.db")
+def test_run_feeds_queue_and_skips_fresh_files(mock_db, recordings):
+    mock_db.iter_processed_keys.side_effect = lambda descending: iter([])
+    # A file still being written by the recorder belongs to the live watcher
+    (recordings / "mic_a" / "2024-05-01_11-00-00.flac").write_bytes(b"")
+    reconciler = make_reconciler(recordings, low_water=100)
+
+    reconciler.run()
+
+    fed = [os.path.basename(reconciler.file_queue.get_nowait()) for _ in range(4)]
+    assert fed[0] == "2024-05-01_10-00-00.flac"
+    assert reconciler.file_queue.empty()
+    assert reconciler.fed == 4
+    assert reconciler.status()["backlog_remaining"] == 0
+    assert reconciler.status()["backlog_running"] is False
+    # Counted, then fed from a second streaming pass; nothing is buffered
+    assert mock_db.iter_processed_keys.call_count == 2
+
+
+def test_status_reports_eta(recordings):
+    reconciler = make_reconciler(recordings)
+    reconciler.running = True
+    reconciler.fed = 10
+    reconciler.remaining = 20
+    reconciler._started_at = time.time() - 10  # 1 file/s
+
+    status = reconciler.status()
+
+    assert status["backlog_remaining"] == 20
+    assert 19 <= status["backlog_eta_sec"] <= 20
+
+
+def test_disabled_policy_does_not_start(recordings):
+    reconciler = make_reconciler(recordings, policy="off")
+    reconciler.start()
+    assert reconciler._thread is None
@@ -0,0 +1,65 @@
+from unittest.mock import patch
+
+from silvasonic_birdnet.registry import FileKey, ProcessedRegistry
+
+
+def test_key_is_source_and_relative_path(tmp_path):
+    registry = ProcessedRegistry(tmp_path)
+    assert registry.key(tmp_path / "front" / "a.flac") == FileKey("front", "front/a.flac")
+    # Outside the recording root (manual re-queue): folder and name
+    assert registry.key(tmp_path.parent / "x" / "b.flac") == FileKey("x", "x/b.flac")
+
+
+@patch("silvasonic_birdnet.registry.db")
+def test_recent_keys_skip_without_db_lookup(mock_db, tmp_path):
+    registry = ProcessedRegistry(tmp_path, capacity=2)
+    mock_db.get_processed_state.return_value = None
+    path = tmp_path / "front" / "a.flac"
+
+    key = registry.check(path)
+    assert key is not None
+    registry.mark(key)
+
+    assert registry.check(path) is None
+    mock_db.get_processed_state.assert_called_once()
+
+    # Evicted from the bounded LRU: falls back to the database key
+    registry.mark(FileKey("front", "front/b.flac"))
+    registry.mark(FileKey("front", "front/c.flac"))
+    mock_db.get_processed_state.return_value = ("", "")
+    assert registry.check(path) is None
+    assert mock_db.get_processed_state.call_count == 2
+
+
+@patch("silvasonic_birdnet.registry.db")
+def test_changed_content_is_analysed_again(mock_db, tmp_path):
+    path = tmp_path / "front" / "a.flac"
+    path.parent.mkdir()
+    path.write_bytes(b"new audio")
+    registry = ProcessedRegistry(tmp_path, hashing=True)
+
+    mock_db.get_processed_state.return_value = ("hash-of-old-audio", "")
+    key = registry.check(path)
+    assert key is not None
+    assert len(key.content_hash) == 32
+    assert key.replaces and not key.reanalysis
+
+    mock_db.get_processed_state.return_value = (key.content_hash, "")
+    assert ProcessedRegistry(tmp_path, hashing=True).check(path) is None
+
+
+@patch("silvasonic_birdnet.registry.db")
+def test_other_model_version_is_reanalysed(mock_db, tmp_path):
+    path = tmp_path / "front" / "a.flac"
+    registry = ProcessedRegistry(tmp_path, model_version="V2.5")
+
+    mock_db.get_processed_state.return_value = ("", "V2.4")
+    key = registry.check(path)
+    assert key is not None
+    assert key.reanalysis and key.replaces
+
+    mock_db.get_processed_state.return_value = ("", "V2.5")
+    assert registry.check(path) is None
+    # Without a known model version, registered files are never re-analysed
+    mock_db.get_processed_state.return_value = ("", "V2.4")
+    assert ProcessedRegistry(tmp_path).check(path) is None
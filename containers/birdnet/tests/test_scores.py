@@ -0,0 +1,87 @@
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from silvasonic_birdnet.engine import flat_sigmoid
+from silvasonic_birdnet.models import WindowScores
+from silvasonic_birdnet.rederive import rederive_detections
+from silvasonic_birdnet.scores import TopKScores, derive_hits, top_k_logits
+
+LABELS = [("Turdus merula", "Blackbird"), ("Parus major", "Great Tit"), ("Pica pica", "Magpie")]
+LOGITS = np.array([[2.0, -1.0, 0.5], [-4.0, 1.0, -6.0]], dtype=np.float32)
+
+
+def test_top_k_sorted_best_first():
+    """Only the K best classes per window are kept, best first."""
+    top = top_k_logits(LOGITS, [0.0, 3.0], k=2)
+    assert top.k == 2
+    assert top.labels.tolist() == [[0, 2], [1, 0]]
+    assert top.logits[:, 0].tolist() == [2.0, 1.0]
+
+
+def test_top_k_respects_species_mask():
+    """Classes outside the seasonal species list never make it into the stored scores."""
+    mask = np.array([False, True, True])
+    top = top_k_logits(LOGITS, [0.0, 3.0], k=3, species_mask=mask)
+    assert top.labels[0, 0] == 2
+    # Filler slot for the excluded class can never pass a threshold
+    assert derive_hits(top, min_conf=0.01, sensitivity=1.5)["label"].tolist().count(0) == 0
+
+
+def test_bytes_round_trip():
+    top = top_k_logits(LOGITS, [0.0, 3.0], k=2)
+    restored = TopKScores.from_bytes(*top.to_bytes(), k=2)
+    assert restored.starts.tolist() == [0.0, 3.0]
+    assert np.array_equal(restored.labels, top.labels)
+    assert np.array_equal(restored.logits, top.logits)
+
+
+def test_derive_hits_matches_engine_confidence():
+    """New thresholds and sensitivities give the confidences the engine would produce."""
+    top = top_k_logits(LOGITS, [0.0, 3.0], k=3)
+
+    strict = derive_hits(top, min_conf=0.8, sensitivity=1.0)
+    assert strict["label"].tolist() == [0]
+    assert strict["confidence"][0] == pytest.approx(flat_sigmoid(np.float32(2.0), 1.0), abs=1e-3)
+
+    loose = derive_hits(top, min_conf=0.5, sensitivity=1.0)
+    assert list(zip(loose["start"].tolist(), loose["label"].tolist(), strict=True)) == [
+        (0.0, 0),
+        (0.0, 2),
+        (3.0, 1),
+    ]
+    assert loose["end"].tolist() == [3.0, 3.0, 6.0]
+
+    # Sensitivity shifts the sigmoid, so the same threshold admits more or fewer windows
+    assert len(derive_hits(top, min_conf=0.5, sensitivity=1.5)) == 5
+    assert len(derive_hits(top, min_conf=0.5, sensitivity=0.5)) == 0
+
+
+@patch("silvasonic_birdnet.rederive.db")
+def test_rederive_detections_in_chunks(mock_db):
+    """Stored scores are turned into detection rows chunk by chunk, without inference."""
+    top = top_k_logits(LOGITS, [0.0, 3.0], k=2)
+    starts, labels, logits = top.to_bytes()
+    row = WindowScores(
+        id=7,
+        filename="2024-05-01_06-00-00.flac",
+        filepath="/data/front/2024-05-01_06-00-00.flac",
+        recorded_at=datetime(2024, 5, 1, 6, tzinfo=UTC),
+        top_k=2,
+        starts=starts,
+        labels=labels,
+        logits=logits,
+    )
+    mock_db.get_window_scores.side_effect = [[row], []]
+    mock_db.replace_detections.side_effect = lambda batch: sum(len(v) for v in batch.values())
+
+    start, end = datetime(2024, 5, 1, tzinfo=UTC), datetime(2024, 5, 2, tzinfo=UTC)
+    assert rederive_detections(start, end, 0.7, 1.0, LABELS, chunk_size=1) == 2
+
+    assert mock_db.get_window_scores.call_args_list[1].kwargs["after_id"] == 7
+    batch = mock_db.replace_detections.call_args[0][0]
+    first, second = batch[("front", "2024-05-01_06-00-00.flac")]
+    assert first.common_name == "Blackbird"
+    assert first.source_device == "front"
+    assert second.timestamp == datetime(2024, 5, 1, 6, 0, 3, tzinfo=UTC)
@@ -0,0 +1,66 @@
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+from silvasonic_birdnet.engine import DETECTION_DTYPE, SAMPLE_RATE, WINDOW_SAMPLES
+from silvasonic_birdnet.seams import SEAM_SAMPLES, SEAM_SEC, SeamTracker
+
+START = datetime(2024, 5, 1, 5, 0, tzinfo=UTC)
+
+
+def hits(*rows):
+    return np.array([(s, s + 3.0, label, c) for s, label, c in rows], dtype=DETECTION_DTYPE)
+
+
+def segment(value, seconds=10.0):
+    return np.full(int(seconds * SAMPLE_RATE), value, dtype=np.float32)
+
+
+def test_seam_window_straddles_continuous_segments():
+    tracker = SeamTracker()
+    first, _ = tracker.next_segment("front", START, segment(1.0), 10.0)
+    seam, _ = tracker.next_segment("front", START + timedelta(seconds=10), segment(2.0), 10.0)
+
+    assert first is None
+    assert seam is not None
+    assert len(seam.window) == WINDOW_SAMPLES
+    # First half from the previous segment's tail, second half from the new head
+    assert (seam.window[:SEAM_SAMPLES] == 1.0).all()
+    assert (seam.window[SEAM_SAMPLES:] == 2.0).all()
+
+
+def test_no_seam_across_gaps_or_sources():
+    tracker = SeamTracker()
+    tracker.next_segment("front", START, segment(1.0), 10.0)
+
+    # Other source, then a gap (e.g. recorder restart), then no timestamp at all
+    assert (
+        tracker.next_segment("back", START + timedelta(seconds=10), segment(1.0), 10.0)[0] is None
+    )
+    assert (
+        tracker.next_segment("front", START + timedelta(seconds=30), segment(1.0), 10.0)[0] is None
+    )
+    assert tracker.next_segment("front", None, segment(1.0), 10.0) == (None, None)
+    assert (
+        tracker.next_segment("front", START + timedelta(seconds=40), segment(1.0), 10.0)[0] is None
+    )
+
+
+def test_merge_adds_only_species_missed_on_both_sides():
+    tracker = SeamTracker()
+    _, previous_tail = tracker.next_segment("front", START, segment(1.0), 10.0)
+    # Previous segment detected label 0 in its last window
+    SeamTracker.merge(hits((9.0, 0, 0.9)), 10.0, None, None, previous_tail)
+    assert previous_tail.labels == {0}
+
+    seam, tail = tracker.next_segment("front", START + timedelta(seconds=10), segment(2.0), 10.0)
+    current = hits((0.0, 1, 0.8), (6.0, 3, 0.75))
+    seam_hits = hits((-1.5, 0, 0.95), (-1.5, 1, 0.9), (-1.5, 2, 0.85))
+
+    merged = SeamTracker.merge(current, 10.0, seam, seam_hits, tail)
+
+    # 0 was detected before the boundary, 1 after it: only 2 is new
+    assert merged["label"].tolist() == [2, 1, 3]
+    assert merged["start"][0] == 0.0
+    assert merged["end"][0] == SEAM_SEC
+    # The window at 6-9 s reaches into this segment's tail
+    assert tail.labels == {3}
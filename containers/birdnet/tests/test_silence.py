@@ -0,0 +1,88 @@
+import numpy as np
+from silvasonic_birdnet.silence import WARMUP_FILES, SilenceGate, window_levels
+
+RATE = 48000
+rng = np.random.default_rng(0)
+
+
+def tone(freq, seconds, amplitude):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def noise(seconds, amplitude):
+    return (amplitude * rng.standard_normal(int(RATE * seconds))).astype(np.float32)
+
+
+def test_window_levels_band_vs_broadband():
+    # Loud 200 Hz rumble (wind-like) vs a quieter 4 kHz call
+    rumble = tone(200, 3, 0.5)
+    call = tone(4000, 3, 0.05)
+
+    rms_db, band_db = window_levels(np.concatenate([rumble, call]), RATE)
+
+    assert len(rms_db) == 2
+    assert rms_db[0] > rms_db[1]  # Rumble is louder overall...
+    assert band_db[1] > band_db[0] + 20  # ...but has no energy in the 1-12 kHz band
+    # A full-scale sine in band: 20*log10(0.05/sqrt(2)) ~ -29 dBFS
+    assert abs(band_db[1] - (-29.0)) < 1.0
+
+
+def test_gate_learns_floor_and_skips_quiet_windows():
+    gate = SilenceGate(margin_db=6.0)
+    for _ in range(WARMUP_FILES):
+        assert gate.check("mic", noise(9, 0.001), RATE).all()  # Ungated while warming up
+
+    signal = np.concatenate(
+        [noise(3, 0.001), noise(3, 0.001) + tone(4000, 3, 0.05), noise(3, 0.001)]
+    )
+    active = gate.check("mic", signal, RATE)
+
+    assert active.tolist() == [False, True, False]
+    assert gate.windows_skipped == 2
+    assert gate.files_skipped == 0
+
+
+def test_gate_skips_digital_silence_immediately():
+    gate = SilenceGate()
+
+    active = gate.check("mic", np.zeros(RATE * 6, dtype=np.float32), RATE)
+
+    assert not active.any()
+    assert gate.files_skipped == 1
+
+
+def test_file_without_a_full_window_is_silent():
+    gate = SilenceGate()
+    gate.check("mic", noise(3, 0.01), RATE)
+    floor = gate._floors["mic"]
+
+    active = gate.check("mic", noise(0.5, 0.01), RATE)
+
+    assert active.shape == (0,)
+    assert gate.files_skipped == 1
+    assert gate._floors["mic"] == floor
+
+
+def test_floor_is_per_source_and_rises_slowly():
+    gate = SilenceGate()
+    gate.check("quiet", noise(3, 0.001), RATE)
+    gate.check("loud", noise(3, 0.1), RATE)
+    quiet_floor = gate._floors["quiet"]
+
+    gate.check("quiet", noise(3, 0.1), RATE)  # 40 dB louder
+
+    assert gate._floors["loud"] > quiet_floor + 30
+    assert gate._floors["quiet"] - quiet_floor < 2.0
+
+
+def test_time_saved_estimate():
+    gate = SilenceGate()
+    gate.record_inference(windows=4, seconds=2.0)
+
+    gate.check("mic", np.zeros(RATE * 9, dtype=np.float32), RATE)
+
+    stats = gate.stats()
+    assert stats["silence_windows_skipped"] == 3
+    assert stats["silence_inference_sec_saved"] == 1.5
+    assert "mic" in stats["noise_floor_db"]
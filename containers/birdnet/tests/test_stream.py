@@ -0,0 +1,127 @@
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from silvasonic_birdnet.engine import SAMPLE_RATE, WINDOW_SAMPLES
+from silvasonic_birdnet.stream import LiveAlertLog, SlidingWindow, StreamAnalyzer
+
+LABELS = [("Turdus merula", "Blackbird"), ("Parus major", "Great Tit")]
+
+
+class FakeRedis:
+    """The sorted-set subset of redis-py used by LiveAlertLog."""
+
+    def __init__(self):
+        self.sets = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        low = float(low)
+        self.sets[key] = {m: s for m, s in self.sets.get(key, {}).items() if not low <= s <= high}
+
+    def expire(self, key, ttl):
+        pass
+
+    def zcount(self, key, low, high):
+        return sum(1 for s in self.sets.get(key, {}).values() if low <= s <= high)
+
+
+def test_sliding_window_emits_every_hop():
+    windowing = SlidingWindow(hop=SAMPLE_RATE)
+    signal = np.arange(5 * SAMPLE_RATE, dtype=np.float32)
+
+    # Irregular packet sizes, like UDP datagrams
+    windows = []
+    for chunk in np.array_split(signal, 37):
+        windows += windowing.push(chunk)
+
+    # Full 3 s windows ending at 3, 4 and 5 s
+    assert len(windows) == 3
+    for i, window in enumerate(windows):
+        assert len(window) == WINDOW_SAMPLES
+        assert window[0] == i * SAMPLE_RATE
+
+
+def test_sliding_window_reset_waits_for_a_full_window():
+    windowing = SlidingWindow(hop=SAMPLE_RATE)
+    windowing.push(np.ones(2 * SAMPLE_RATE, dtype=np.float32))
+    windowing.reset()
+
+    assert windowing.push(np.zeros(2 * SAMPLE_RATE, dtype=np.float32)) == []
+    window = windowing.push(np.zeros(SAMPLE_RATE, dtype=np.float32))[0]
+    assert not window.any()
+
+
+def test_live_log_matches_within_dedup_span():
+    log = LiveAlertLog(dedup_sec=300, client=FakeRedis())
+    heard = datetime(2024, 5, 1, 5, 0, tzinfo=UTC)
+    log.record("front", "Turdus merula", heard)
+
+    assert log.seen("front", "Turdus merula", heard + timedelta(seconds=120))
+    assert not log.seen("front", "Turdus merula", heard + timedelta(seconds=400))
+    assert not log.seen("back", "Turdus merula", heard)
+    assert not log.seen("front", "Parus major", heard)
+
+
+def test_live_log_lookup_failure_is_not_a_match():
+    client = MagicMock()
+    client.zcount.side_effect = ConnectionError("down")
+    log = LiveAlertLog(client=client)
+    assert log.seen("front", "Turdus merula", datetime.now(UTC)) is False
+
+
+@pytest.fixture
+def stream():
+    with patch("silvasonic_birdnet.stream.InferenceEngine"):
+        analyzer = StreamAnalyzer(
+            {"front": 12001},
+            hop_sec=1.0,
+            alert=MagicMock(),
+            watchlist=MagicMock(),
+            live_log=LiveAlertLog(client=FakeRedis()),
+            client=MagicMock(),
+        )
+    analyzer.engine.labels = LABELS
+    analyzer.engine.species_mask.return_value = None
+    return analyzer
+
+
+def test_queue_drops_oldest_window(stream):
+    for i in range(20):
+        stream.enqueue("front", np.zeros(1, dtype=np.float32), float(i))
+
+    assert stream.dropped == 4
+    assert stream.windows.get_nowait()[1] == 4.0
+
+
+@patch("silvasonic_birdnet.stream.config")
+def test_process_publishes_hits_and_alerts_once(mock_config, stream):
+    mock_config.birdnet.min_conf = 0.7
+    mock_config.birdnet.sensitivity = 1.0
+    mock_config.birdnet.week = -1
+    mock_config.birdnet.lat = None
+    mock_config.birdnet.lon = None
+    stream.engine.predict.return_value = np.array([[0.9, 0.2], [0.95, 0.8]], dtype=np.float32)
+    stream.watchlist.should_alert.side_effect = lambda name, conf: name == "Turdus merula"
+
+    now = datetime.now(UTC).timestamp()
+    window = np.zeros(WINDOW_SAMPLES, dtype=np.float32)
+    stream.process([("front", now - 1, window), ("front", now, window)])
+
+    # Every hit is published, the watched species alerts for the first window only
+    assert stream._redis.publish.call_count == 3
+    stream.alert.assert_called_once()
+    detection = stream.alert.call_args[0][0]
+    assert detection.scientific_name == "Turdus merula"
+    assert detection.source_device == "front"
+    assert stream.live_log.seen("front", "Turdus merula", detection.timestamp)
+    assert stream.status()["windows_analysed"] == 2
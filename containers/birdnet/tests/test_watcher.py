@@ -1,9 +1,12 @@
 import json
 import queue
+import threading
 import time
 from unittest.mock import MagicMock, patch
 
 import pytest
+from silvasonic_birdnet.analyzer import BatchFailed
+from silvasonic_birdnet.pool import AnalyzerWorker, ProcessWorker
 from silvasonic_birdnet.watcher import AudioFileHandler, WatcherService
 
 
@@ -12,6 +15,7 @@ def watcher():
     with (
         patch("silvasonic_birdnet.watcher.BirdNETAnalyzer"),
         patch("silvasonic_birdnet.watcher.Observer"),
+        patch("silvasonic_birdnet.watcher.config.JOB_QUEUE", "memory"),
     ):
         return WatcherService()
 
@@ -70,7 +74,7 @@ def test_worker_process(watcher):
     watcher.file_queue.put("/tmp/test.wav")
 
     # Configure analyzer mock
-    watcher.analyzer.process_file = MagicMock()
+    watcher.analyzer.process_batch = MagicMock()
 
     # We need to run worker briefly then stop
     # Since worker is an infinite loop, we run it in a thread or just call the body logic?
@@ -87,13 +91,203 @@ def test_worker_process(watcher):
 
     import threading
 
-    t = threading.Thread(target=watcher._worker, daemon=True)
-    t.start()
+    with (
+        patch("silvasonic_birdnet.watcher.config.BATCH_MAX_WAIT", 0.05),
+        patch.object(watcher, "write_status"),
+    ):
+        t = threading.Thread(target=watcher._worker, daemon=True)
+        t.start()
+
+        time.sleep(0.3)  # Give it time to pick up item
+
+        watcher._stop_event.set()
+        t.join(timeout=2.0)
+
+    # Verify analyzer was called and the job acknowledged
+    watcher.analyzer.process_batch.assert_called_with(["/tmp/test.wav"])
+    assert watcher.file_queue.qsize() == 0
+    assert watcher.file_queue.oldest_age() is None
+
+
+def test_failed_batch_is_requeued_up_to_max_attempts(watcher):
+    """A batch that fails is queued again at the back, until JOB_MAX_ATTEMPTS is reached."""
+    watcher.file_queue.put("/data/front/2024-05-01_05-00-00.flac")
+    watcher.analyzer.process_batch = MagicMock(side_effect=RuntimeError("decoder crashed"))
+
+    with (
+        patch("silvasonic_birdnet.watcher.config.BATCH_MAX_WAIT", 0.05),
+        patch("silvasonic_birdnet.watcher.config.JOB_MAX_ATTEMPTS", 3),
+        patch.object(watcher, "write_status"),
+    ):
+        t = threading.Thread(target=watcher._worker, daemon=True)
+        t.start()
+        time.sleep(0.5)
+        watcher._stop_event.set()
+        t.join(timeout=2.0)
+
+    assert watcher.analyzer.process_batch.call_count == 3
+    assert watcher.file_queue.qsize() == 0
+    assert watcher.file_queue.oldest_age() is None
+
+
+def test_only_failed_files_of_a_batch_are_requeued(watcher):
+    """Files the analyzer reports as not stored are retried, the stored ones are done."""
+    stored, lost = "/data/front/2024-05-01_05-00-00.flac", "/data/front/2024-05-01_05-00-10.flac"
+    watcher.file_queue.put(stored)
+    watcher.file_queue.put(lost)
+
+    with (
+        patch("silvasonic_birdnet.watcher.config.JOB_MAX_ATTEMPTS", 3),
+        patch.object(watcher, "write_status"),
+        patch.object(watcher, "_retry") as retry,
+    ):
+        watcher.analyzer.process_batch = MagicMock(side_effect=BatchFailed([lost], "db down"))
+        with patch("silvasonic_birdnet.watcher.config.BATCH_MAX_WAIT", 0.05):
+            t = threading.Thread(target=watcher._worker, daemon=True)
+            t.start()
+            time.sleep(0.3)
+            watcher._stop_event.set()
+            t.join(timeout=2.0)
+
+    assert [job.path for job in retry.call_args_list[0].args[0]] == [lost]
+    assert watcher.file_queue.qsize() == 0
+
+
+def test_shed_files_are_acked_without_analysis(watcher):
+    """Files dropped by the load shedder never reach the analyzer but leave the queue."""
+    import threading
+
+    watcher.file_queue.put("/data/front/2024-05-01_23-00-00.flac")
+    watcher.analyzer.process_batch = MagicMock()
+    watcher.shedder = MagicMock()
+    watcher.shedder.admit.return_value = False
+
+    with (
+        patch("silvasonic_birdnet.watcher.config.BATCH_MAX_WAIT", 0.05),
+        patch.object(watcher, "write_status"),
+    ):
+        t = threading.Thread(target=watcher._worker, daemon=True)
+        t.start()
+        time.sleep(0.3)
+        watcher._stop_event.set()
+        t.join(timeout=2.0)
+
+    watcher.analyzer.process_batch.assert_not_called()
+    assert watcher.file_queue.qsize() == 0
+    assert watcher.file_queue.oldest_age() is None
+
+
+def test_load_level_handed_to_workers(watcher):
+    watcher.shedder = MagicMock()
+    watcher.shedder.update.return_value = 3
 
-    time.sleep(0.1)  # Give it time to pick up item
+    watcher._update_load_level()
+
+    assert all(worker.load_level == 3 for worker in watcher.workers)
+
+
+def test_shed_files_caught_up_when_load_is_normal(watcher):
+    """Once shedding stops, the reconciler runs again for the files that were skipped."""
+    watcher.shedder = MagicMock()
+    watcher.shedder.files_shed = 5
+    watcher.reconciler = MagicMock()
+    watcher.reconciler.running = False
+
+    watcher.shedder.update.return_value = 3
+    watcher._update_load_level()
+    watcher.reconciler.start.assert_not_called()
+
+    watcher.shedder.update.return_value = 0
+    watcher._update_load_level()
+    watcher._update_load_level()
+    watcher.reconciler.start.assert_called_once()
+
+
+def test_next_batch_drains_queue(watcher):
+    """Queued files are collected into one batch up to BATCH_SIZE."""
+    for i in range(5):
+        watcher.file_queue.put(f"/tmp/{i}.wav")
+
+    with (
+        patch("silvasonic_birdnet.watcher.config.BATCH_SIZE", 3),
+        patch("silvasonic_birdnet.watcher.config.BATCH_MAX_WAIT", 0.05),
+    ):
+        assert [j.path for j in watcher._next_batch()] == ["/tmp/0.wav", "/tmp/1.wav", "/tmp/2.wav"]
+        assert [j.path for j in watcher._next_batch()] == ["/tmp/3.wav", "/tmp/4.wav"]
+
+    with pytest.raises(queue.Empty):
+        watcher._next_batch()
+
+
+def test_pool_mode_creates_process_workers():
+    """ANALYZER_WORKERS > 1 spawns analyzer processes instead of a local analyzer."""
+    with (
+        patch("silvasonic_birdnet.watcher.BirdNETAnalyzer") as mock_analyzer,
+        patch("silvasonic_birdnet.watcher.Observer"),
+        patch("silvasonic_birdnet.watcher.config.JOB_QUEUE", "memory"),
+        patch("silvasonic_birdnet.watcher.config.ANALYZER_WORKERS", 3),
+        patch("silvasonic_birdnet.watcher.config.CPU_PINNING", True),
+        patch("silvasonic_birdnet.watcher.plan_core_sets", return_value=[[1], [2], [3]]),
+    ):
+        service = WatcherService()
+
+    mock_analyzer.assert_not_called()
+    assert service.analyzer is None
+    assert [w.cores for w in service.workers] == [[1], [2], [3]]
+    assert all(isinstance(w, ProcessWorker) for w in service.workers)
+    assert all(w.threads == 1 for w in service.workers)
+
+
+class RecordingWorker(AnalyzerWorker):
+    """Stand-in for a worker process: records the batches it is given."""
+
+    def __init__(self, worker_id):
+        super().__init__(worker_id)
+        self.batches = []
+
+    def _run_batch(self, files):
+        self.batches.append(files)
+        return 0.0
+
+
+def test_pool_routes_each_source_to_one_worker():
+    """With two workers, all segments of a source are analysed by the same one, in order."""
+    with (
+        patch("silvasonic_birdnet.watcher.Observer"),
+        patch("silvasonic_birdnet.watcher.config.JOB_QUEUE", "memory"),
+        patch("silvasonic_birdnet.watcher.config.ANALYZER_WORKERS", 2),
+        patch("silvasonic_birdnet.watcher.config.CPU_PINNING", False),
+        patch("silvasonic_birdnet.watcher.config.BATCH_SIZE", 2),
+        patch("silvasonic_birdnet.watcher.config.BATCH_MAX_WAIT", 0.05),
+    ):
+        service = WatcherService()
+        service.workers = [RecordingWorker(0), RecordingWorker(1)]
+        sources = ["front", "back", "pond", "field"]
+        paths = [f"/data/{source}/{i:02d}.flac" for i in range(5) for source in sources]
+        for path in paths:
+            service.file_queue.put(path)
 
-    watcher._stop_event.set()
-    t.join(timeout=1.0)
+        threads = [
+            threading.Thread(target=service.router.run, args=(service._stop_event, 4), daemon=True)
+        ] + [
+            threading.Thread(target=service._worker, args=(worker,), daemon=True)
+            for worker in service.workers
+        ]
+        with patch.object(service, "write_status"):
+            for t in threads:
+                t.start()
+            deadline = time.time() + 3.0
+            while service.file_queue.qsize() and time.time() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.2)
+            service._stop_event.set()
+            for t in threads:
+                t.join(timeout=2.0)
 
-    # Verify analyzer was called
-    watcher.analyzer.process_file.assert_called_with("/tmp/test.wav")
+    handled = {w.worker_id: [f for batch in w.batches for f in batch] for w in service.workers}
+    assert sorted(handled[0] + handled[1]) == sorted(paths)
+    for source in sources:
+        owners = [wid for wid, files in handled.items() if any(f"/{source}/" in f for f in files)]
+        assert len(owners) == 1
+        in_order = [f for f in handled[owners[0]] if f"/{source}/" in f]
+        assert in_order == sorted(in_order)
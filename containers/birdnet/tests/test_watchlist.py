@@ -0,0 +1,70 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from silvasonic_birdnet.models import Watchlist
+from silvasonic_birdnet.watchlist import WatchlistCache
+
+
+@pytest.fixture
+def mock_db():
+    with patch("silvasonic_birdnet.watchlist.db") as mock:
+        mock.get_watchlist.return_value = [
+            Watchlist(scientific_name="Turdus merula", min_confidence=0.0),
+            Watchlist(scientific_name="Bubo bubo", min_confidence=0.8),
+        ]
+        yield mock
+
+
+@pytest.fixture
+def cache(mock_db):
+    return WatchlistCache()
+
+
+def test_should_alert_uses_min_confidence(cache):
+    cache.refresh()
+
+    assert cache.should_alert("Turdus merula", 0.1) is True
+    assert cache.should_alert("Bubo bubo", 0.79) is False
+    assert cache.should_alert("Bubo bubo", 0.85) is True
+    assert cache.should_alert("Parus major", 0.99) is False
+    assert cache.should_alert(None, 0.99) is False
+
+
+def test_lookup_does_no_io(cache, mock_db):
+    cache.refresh()
+    mock_db.get_watchlist.reset_mock()
+
+    for _ in range(100):
+        cache.should_alert("Turdus merula", 0.9)
+
+    mock_db.get_watchlist.assert_not_called()
+
+
+def test_failed_reload_keeps_last_entries(cache, mock_db):
+    """A DB outage must not switch off alerts."""
+    cache.refresh()
+    mock_db.get_watchlist.return_value = None
+
+    cache.refresh()
+
+    assert cache.should_alert("Bubo bubo", 0.85) is True
+
+
+def test_notification_triggers_reload(cache, mock_db):
+    """A NOTIFY on the channel reloads the dict, then the loop exits on stop."""
+    conn = MagicMock()
+    conn.notifies = []
+
+    def poll():
+        conn.notifies.append(MagicMock(payload="Turdus merula"))
+        mock_db.get_watchlist.return_value = []
+        cache.stop()
+
+    conn.poll.side_effect = poll
+
+    cache.refresh()
+    with patch("silvasonic_birdnet.watchlist.select.select", return_value=([conn], [], [])):
+        cache._wait_for_notifications(conn)
+
+    assert conn.notifies == []
+    assert cache.should_alert("Turdus merula", 0.9) is False
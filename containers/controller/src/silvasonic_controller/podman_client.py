@@ -77,6 +77,11 @@ class PodmanOrchestrator:
             "SILVASONIC_DATA_DIR=/mnt/data/services/silvasonic",
         ]
 
+        # Optional second PCM feed for live BirdNET analysis (same port, other host)
+        analysis_target = os.environ.get("ANALYSIS_STREAM_TARGET")
+        if analysis_target:
+            env_vars += ["-e", f"ANALYSIS_STREAM_TARGET={analysis_target}"]
+
         host_data_dir = os.environ.get("HOST_SILVASONIC_DATA_DIR", "/mnt/data/services/silvasonic")
 
         volumes = [
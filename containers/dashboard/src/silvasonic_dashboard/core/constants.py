@@ -9,6 +9,7 @@ LOG_DIR = os.getenv("LOG_DIR", "/var/log/silvasonic")
 AUDIO_DIR = os.getenv("AUDIO_DIR", "/data/recording")
 ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "/data/processed/artifacts")
 CLIPS_DIR = "/data/db/results/clips"
+EMBEDDINGS_DIR = os.getenv("EMBEDDINGS_DIR", "/data/db/results/embeddings")
 
 # App Info
 VERSION = "0.1.0"
@@ -1,4 +1,5 @@
 import asyncio
+import datetime
 import json
 import os
 import typing
@@ -6,12 +7,13 @@ import typing
 import aiofiles
 import redis
 import structlog
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import RedirectResponse, StreamingResponse
+from pydantic import BaseModel
 
 from silvasonic_dashboard.auth import require_auth
 from silvasonic_dashboard.core.templates import templates
-from silvasonic_dashboard.services import SystemService
+from silvasonic_dashboard.services import BirdNetService, SimilarCallsService, SystemService
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -161,3 +163,61 @@ async def get_service_logs(
             return {"content": content}
     except Exception as e:
         return {"content": f"Error reading logs: {str(e)}"}
+
+
+@router.get("/api/birdnet/detections/{detection_id}/similar")
+async def get_similar_calls(
+    detection_id: int,
+    limit: int = Query(default=10, ge=1, le=100),
+    auth: typing.Any = Depends(require_auth),
+) -> typing.Any:
+    """Calls from other recordings that sound most like this detection."""
+    if isinstance(auth, RedirectResponse):
+        return auth
+    return await SimilarCallsService.find_similar(detection_id, limit)
+
+
+class ReanalysisRequest(BaseModel):
+    """Recordings to re-analyse: recording time range (UTC) and/or one source folder."""
+
+    date_from: datetime.datetime | None = None
+    date_to: datetime.datetime | None = None
+    source: str | None = None
+
+
+@router.post("/api/birdnet/reanalysis")
+async def create_reanalysis_job(
+    request: ReanalysisRequest, auth: typing.Any = Depends(require_auth)
+) -> typing.Any:
+    """Re-analyse processed recordings with the current BirdNET model (low priority)."""
+    if isinstance(auth, RedirectResponse):
+        return auth
+    if request.date_from and request.date_to and request.date_from >= request.date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    job_id = await BirdNetService.create_reanalysis_job(
+        request.date_from, request.date_to, request.source
+    )
+    if job_id is None:
+        raise HTTPException(status_code=500, detail="Could not create re-analysis job")
+    return {"id": job_id, "status": "pending"}
+
+
+@router.get("/api/birdnet/reanalysis")
+async def list_reanalysis_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    auth: typing.Any = Depends(require_auth),
+) -> typing.Any:
+    if isinstance(auth, RedirectResponse):
+        return auth
+    return await BirdNetService.get_reanalysis_jobs(limit)
+
+
+@router.post("/api/birdnet/reanalysis/{job_id}/cancel")
+async def cancel_reanalysis_job(
+    job_id: int, auth: typing.Any = Depends(require_auth)
+) -> typing.Any:
+    if isinstance(auth, RedirectResponse):
+        return auth
+    if not await BirdNetService.cancel_reanalysis_job(job_id):
+        raise HTTPException(status_code=404, detail="No unfinished job with this id")
+    return {"id": job_id, "status": "cancelled"}
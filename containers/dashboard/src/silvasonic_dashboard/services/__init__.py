@@ -4,6 +4,7 @@ from .common import LOG_DIR, REC_DIR, STATUS_DIR
 from .database import DatabaseHandler, db
 from .health import HealthCheckerService
 from .recorder import RecorderService
+from .similar_calls import SimilarCallsService
 from .system import SystemService
 from .uploader import UploaderService
 from .weather import WeatherService
@@ -19,6 +20,7 @@ __all__ = [
     "db",
     "HealthCheckerService",
     "RecorderService",
+    "SimilarCallsService",
     "SystemService",
     "WeatherService",
 ]
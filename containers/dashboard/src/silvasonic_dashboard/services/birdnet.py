@@ -436,6 +436,11 @@ class BirdNetService:
                         ins, {"sci": sci_name, "com": com_name, "en": 1 if enabled else 0}
                     )
 
+                # Tell the BirdNET workers to reload their cached watchlist (sent on commit)
+                await conn.execute(
+                    text("SELECT pg_notify('birdnet_watchlist', :sci)"), {"sci": sci_name}
+                )
+
                 await conn.commit()
                 return True
         except Exception as e:
@@ -460,6 +465,85 @@ class BirdNetService:
             logger.error(f"Watchlist status error: {e}", exc_info=True)
             return {}
 
+    @staticmethod
+    async def create_reanalysis_job(
+        date_from: datetime.datetime | None,
+        date_to: datetime.datetime | None,
+        source: str | None,
+    ) -> int | None:
+        """Queue a re-analysis of processed recordings with the current BirdNET model.
+
+        The birdnet service picks the job up from birdnet.reanalysis_jobs and feeds
+        the files to its worker pool behind live recordings.
+        """
+        try:
+            async with db.get_connection() as conn:
+                query = text(
+                    """
+                    INSERT INTO birdnet.reanalysis_jobs
+                        (status, date_from, date_to, source, cursor, passes, files_done, created_at)
+                    VALUES ('pending', :date_from, :date_to, :source, 0, 0, 0, NOW())
+                    RETURNING id
+                """
+                )
+                result = await conn.execute(
+                    query, {"date_from": date_from, "date_to": date_to, "source": source or None}
+                )
+                job_id = result.scalar_one()
+                await conn.commit()
+                return int(job_id)
+        except Exception as e:
+            logger.error(f"Error creating re-analysis job: {e}", exc_info=True)
+            return None
+
+    @staticmethod
+    async def get_reanalysis_jobs(limit: int = 20) -> list[dict[str, typing.Any]]:
+        """Latest re-analysis jobs with their progress."""
+        try:
+            async with db.get_connection() as conn:
+                query = text(
+                    """
+                    SELECT id, status, date_from, date_to, source, model_version,
+                           files_total, files_done, passes, error, created_at, updated_at
+                    FROM birdnet.reanalysis_jobs
+                    ORDER BY id DESC
+                    LIMIT :limit
+                """
+                )
+                result = await conn.execute(query, {"limit": limit})
+                items = []
+                for row in result:
+                    d = dict(row._mapping)
+                    total = d.get("files_total")
+                    d["progress"] = round(100 * d["files_done"] / total, 1) if total else None
+                    for key in ("date_from", "date_to", "created_at", "updated_at"):
+                        if d.get(key):
+                            d[key] = d[key].isoformat()
+                    items.append(d)
+                return items
+        except Exception as e:
+            logger.error(f"Error getting re-analysis jobs: {e}", exc_info=True)
+            return []
+
+    @staticmethod
+    async def cancel_reanalysis_job(job_id: int) -> bool:
+        """Stop an unfinished job; files already re-analysed keep their new results."""
+        try:
+            async with db.get_connection() as conn:
+                query = text(
+                    """
+                    UPDATE birdnet.reanalysis_jobs
+                    SET status = 'cancelled', updated_at = NOW()
+                    WHERE id = :id AND status IN ('pending', 'running')
+                """
+                )
+                result = await conn.execute(query, {"id": job_id})
+                await conn.commit()
+                return bool(result.rowcount)
+        except Exception as e:
+            logger.error(f"Error cancelling re-analysis job {job_id}: {e}", exc_info=True)
+            return False
+
     @staticmethod
     async def get_recent_processed_files(limit: int = 50) -> list[dict[str, typing.Any]]:
         """Get list of recently processed files (raw recordings)."""
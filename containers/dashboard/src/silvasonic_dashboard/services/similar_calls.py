@@ -0,0 +1,289 @@
+import datetime
+import json
+import os
+import threading
+import time
+import typing
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import text
+
+from silvasonic_dashboard.core.constants import EMBEDDINGS_DIR
+
+from .common import REC_DIR, logger, run_in_executor
+from .database import db
+
+# Must match the store written by silvasonic_birdnet.embeddings
+ROW_DTYPE = np.dtype(
+    [
+        ("source", "S50"),
+        ("filename", "S64"),  # empty: removed
+        ("start", "<f4"),
+        ("label", "<i2"),
+        ("confidence", "<f4"),
+    ]
+)
+ROWS_FILE = "windows.bin"
+LEGACY_ROW_DTYPE = np.dtype(
+    [
+        ("detection_id", "<i8"),
+        ("filename", "S64"),
+        ("start", "<f4"),
+        ("label", "<i2"),
+        ("confidence", "<f4"),
+    ]
+)
+LEGACY_ROWS_FILE = "rows.bin"
+
+DEFAULT_NPROBE = 8  # IVF lists scanned per query
+CHUNK_ROWS = 65536
+MAX_FILE_ROWS = 4096  # Windows of one recording, far above any segment length
+
+
+class EmbeddingIndex:
+    """Read-only view of the BirdNET embedding store (memory-mapped, no RAM copy).
+
+    Files are re-mapped on every search, so rows appended by the birdnet worker
+    are visible immediately. Rows appended after the last IVF assignment are
+    always scanned, so new data is never missed. A recording's windows are written
+    in one block; the first row of each (source, filename) block is kept in a
+    dict that is extended with the rows appended since the last search.
+    """
+
+    def __init__(self, root: str = EMBEDDINGS_DIR, nprobe: int = DEFAULT_NPROBE) -> None:
+        self.root = root
+        self.nprobe = nprobe
+        self._files: dict[tuple[bytes, bytes], int] = {}
+        self._indexed = 0  # Rows already in _files
+        self._indexed_file: tuple[int, int] | None = None  # (device, inode) they came from
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _open(self) -> tuple[npt.NDArray[np.void], np.memmap[typing.Any, typing.Any]] | None:
+        try:
+            with open(self._path("header.json")) as f:
+                dim = int(json.load(f)["dim"])
+            if os.path.exists(self._path(ROWS_FILE)):
+                stat = os.stat(self._path(ROWS_FILE))
+                n = stat.st_size // ROW_DTYPE.itemsize
+                rows: npt.NDArray[np.void] = np.memmap(
+                    self._path(ROWS_FILE), dtype=ROW_DTYPE, mode="r", shape=(n,)
+                )
+            else:
+                # Store not yet converted by the worker: source unknown
+                stat = os.stat(self._path(LEGACY_ROWS_FILE))
+                legacy = np.fromfile(self._path(LEGACY_ROWS_FILE), dtype=LEGACY_ROW_DTYPE)
+                n = len(legacy)
+                rows = np.zeros(n, dtype=ROW_DTYPE)
+                for name in ("filename", "start", "label", "confidence"):
+                    rows[name] = legacy[name]
+        except (OSError, ValueError, KeyError):
+            return None
+        if n == 0:
+            return None
+        vectors = np.memmap(self._path("vectors.f16"), dtype="<f2", mode="r", shape=(n, dim))
+        self._update_files(rows, (stat.st_dev, stat.st_ino))
+        return rows, vectors
+
+    def _update_files(self, rows: npt.NDArray[np.void], file_id: tuple[int, int]) -> None:
+        """Add the blocks of rows appended since the last call to the lookup dict."""
+        with self._lock:
+            if file_id != self._indexed_file or len(rows) < self._indexed:
+                self._files, self._indexed, self._indexed_file = {}, 0, file_id
+            new = rows[self._indexed :]
+            if len(new) == 0:
+                return
+            first = np.ones(len(new), dtype=bool)
+            first[1:] = (new["source"][1:] != new["source"][:-1]) | (
+                new["filename"][1:] != new["filename"][:-1]
+            )
+            for i in np.flatnonzero(first):
+                key = (bytes(new["source"][i]), bytes(new["filename"][i]))
+                if key[1]:
+                    # A re-analysed file is appended again: its newest block wins
+                    self._files[key] = self._indexed + int(i)
+            self._indexed = len(rows)
+
+    def find_row(
+        self, rows: npt.NDArray[np.void], source: str, filename: str, start: float
+    ) -> int | None:
+        """Row of the window (source, filename, start); rows of unknown source match any."""
+        key = (source.encode(), filename.encode())
+        with self._lock:
+            first = self._files.get(key)
+            if first is None:
+                key = (b"", key[1])
+                first = self._files.get(key)
+        if first is None:
+            return None
+        block = rows[first : first + MAX_FILE_ROWS]
+        in_file = (block["source"] == key[0]) & (block["filename"] == key[1])
+        # The block ends at the first row of another file (or a removed row)
+        end = int(np.argmin(in_file)) if not in_file.all() else len(block)
+        hits = np.flatnonzero(np.abs(block["start"][:end] - start) < 0.05)
+        return first + int(hits[0]) if len(hits) else None
+
+    def _candidates(self, query: npt.NDArray[np.float32], n: int) -> npt.NDArray[np.intp]:
+        """Rows in the nprobe closest IVF lists plus every unassigned row."""
+        try:
+            centroids = np.load(self._path("ivf.npy"))
+            assign = np.fromfile(self._path("assign.i2"), dtype="<i2")[:n]
+        except (OSError, ValueError):
+            return np.arange(n)
+
+        probe = np.argsort(-(centroids @ query))[: self.nprobe]
+        selected = np.isin(assign, probe) | (assign < 0)
+        tail = np.arange(len(assign), n)  # Written after the assignment file was read
+        return np.concatenate([np.flatnonzero(selected), tail])
+
+    def search(
+        self, source: str, filename: str, start: float, limit: int = 10
+    ) -> list[dict[str, typing.Any]]:
+        """The `limit` windows most similar to a window, from other recordings."""
+        opened = self._open()
+        if opened is None:
+            return []
+        rows, vectors = opened
+
+        row = self.find_row(rows, source, filename, start)
+        if row is None:
+            return []
+        query = np.asarray(vectors[row], dtype=np.float32)
+
+        candidates = self._candidates(query, len(rows))
+        found = rows[candidates]
+        same_file = (found["source"] == rows["source"][row]) & (
+            found["filename"] == rows["filename"][row]
+        )
+        candidates = candidates[~same_file & (found["filename"] != b"")]
+        if len(candidates) == 0:
+            return []
+
+        # Cosine similarity (vectors are stored normalised), chunked to bound memory
+        similarity = np.empty(len(candidates), dtype=np.float32)
+        for offset in range(0, len(candidates), CHUNK_ROWS):
+            idx = candidates[offset : offset + CHUNK_ROWS]
+            similarity[offset : offset + len(idx)] = (
+                np.asarray(vectors[idx], dtype=np.float32) @ query
+            )
+
+        k = min(limit, len(candidates))
+        best = np.argpartition(-similarity, k - 1)[:k]
+        best = best[np.argsort(-similarity[best])]
+
+        results = []
+        for i in best:
+            match = rows[candidates[i]]
+            results.append(
+                {
+                    "source": match["source"].decode(),
+                    "filename": match["filename"].decode(),
+                    "start_time": round(float(match["start"]), 1),
+                    "similarity": round(float(similarity[i]), 4),
+                }
+            )
+        return results
+
+
+class SimilarCallsService:
+    index = EmbeddingIndex()
+
+    @staticmethod
+    def best_detections(
+        rows: typing.Iterable[dict[str, typing.Any]],
+    ) -> dict[tuple[str, str, float], dict[str, typing.Any]]:
+        """Highest-confidence detection per window, keyed like the store's rows.
+
+        Each detection is also filed under ("", filename, start) for rows written
+        before the store knew the source.
+        """
+        best: dict[tuple[str, str, float], dict[str, typing.Any]] = {}
+        for d in rows:
+            window = round(float(d["start_time"]), 1)
+            for key in (
+                (d["source_device"] or "", d["filename"], window),
+                ("", d["filename"], window),
+            ):
+                if key not in best or d["confidence"] > best[key]["confidence"]:
+                    best[key] = d
+        return best
+
+    @staticmethod
+    async def find_similar(detection_id: int, limit: int = 10) -> dict[str, typing.Any]:
+        """Most similar detection windows to a detection, enriched from the database.
+
+        Windows are matched to detections by (source, filename, start) at query time,
+        so results follow re-derived and re-analysed detections.
+        """
+        started = time.perf_counter()
+        try:
+            async with db.get_connection() as conn:
+                query = text(
+                    "SELECT source_device, filename, start_time "
+                    "FROM birdnet.detections WHERE id = :id"
+                )
+                source = (await conn.execute(query, {"id": detection_id})).fetchone()
+                if not source:
+                    return {"detection_id": detection_id, "results": [], "search_ms": 0.0}
+
+                matches = await run_in_executor(
+                    SimilarCallsService.index.search,
+                    source.source_device or "",
+                    source.filename,
+                    float(source.start_time),
+                    limit,
+                )
+
+                details: dict[tuple[str, str, float], dict[str, typing.Any]] = {}
+                filenames = sorted({m["filename"] for m in matches})
+                if filenames:
+                    query_details = text(
+                        """
+                        SELECT id, source_device, filepath, filename, start_time, end_time,
+                               confidence, common_name as com_name, scientific_name as sci_name,
+                               timestamp, clip_path
+                        FROM birdnet.detections
+                        WHERE filename = ANY(:filenames)
+                    """
+                    )
+                    rows = await conn.execute(query_details, {"filenames": filenames})
+                    details = SimilarCallsService.best_detections(
+                        dict(row._mapping) for row in rows
+                    )
+
+            results = []
+            for match in matches:
+                d = details.get((match["source"], match["filename"], match["start_time"]), {})
+                ts = d.get("timestamp")
+                if ts and ts.tzinfo is None:
+                    ts = ts.replace(tzinfo=datetime.UTC)
+
+                playback_url = None
+                if d.get("clip_path"):
+                    playback_url = f"/api/clips/{os.path.basename(d['clip_path'])}"
+                elif d.get("filepath", "").startswith(REC_DIR):
+                    playback_url = f"/api/audio/{d['filepath'][len(REC_DIR) :].lstrip('/')}"
+
+                results.append(
+                    {
+                        **match,
+                        "detection_id": d.get("id"),
+                        "com_name": d.get("com_name"),
+                        "sci_name": d.get("sci_name"),
+                        "confidence": d.get("confidence"),
+                        "iso_timestamp": ts.isoformat() if ts else "",
+                        "playback_url": playback_url,
+                    }
+                )
+
+            return {
+                "detection_id": detection_id,
+                "results": results,
+                "search_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        except Exception as e:
+            logger.error(f"Similar calls search failed: {e}", exc_info=True)
+            return {"detection_id": detection_id, "results": [], "search_ms": 0.0}
@@ -134,3 +134,38 @@ async def test_get_all_species_triggers_enrichment():
 
             assert len(species_list) == 1
             assert species_list[0]["image_url"] == "enriched_side_effect.jpg"
+
+
+@pytest.mark.asyncio
+async def test_reanalysis_jobs_report_progress():
+    """Re-analysis jobs are listed with their progress in percent."""
+    mock_conn = AsyncMock()
+    mock_row = MagicMock()
+    mock_row._mapping = {
+        "id": 3,
+        "status": "running",
+        "date_from": datetime.datetime(2024, 5, 1),
+        "date_to": None,
+        "source": "front",
+        "model_version": "V2.4",
+        "files_total": 400,
+        "files_done": 100,
+        "passes": 0,
+        "error": None,
+        "created_at": datetime.datetime(2024, 6, 1, 12, 0, 0),
+        "updated_at": None,
+    }
+    mock_result = MagicMock()
+    mock_result.__iter__.return_value = [mock_row]
+    mock_conn.execute.return_value = mock_result
+
+    with patch("silvasonic_dashboard.services.birdnet.db.get_connection") as mock_db_ctx:
+        mock_ctx = mock_db_ctx.return_value
+        mock_ctx.__aenter__ = AsyncMock(return_value=mock_conn)
+        mock_ctx.__aexit__ = AsyncMock(return_value=None)
+
+        jobs = await BirdNetService.get_reanalysis_jobs()
+
+    assert jobs[0]["progress"] == 25.0
+    assert jobs[0]["date_from"] == "2024-05-01T00:00:00"
+    assert jobs[0]["updated_at"] is None
@@ -0,0 +1,148 @@
+import json
+
+import numpy as np
+from silvasonic_dashboard.services.similar_calls import (
+    LEGACY_ROW_DTYPE,
+    ROW_DTYPE,
+    EmbeddingIndex,
+    SimilarCallsService,
+)
+
+
+def write_store(root, vectors, rows, centroids=None, assign=None):
+    """Lay out a store the way the birdnet worker writes it."""
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    (root / "header.json").write_text(json.dumps({"dim": vectors.shape[1]}))
+    vectors.astype("<f2").tofile(root / "vectors.f16")
+    rows.tofile(root / "windows.bin")
+    if centroids is not None:
+        np.save(root / "ivf.npy", centroids.astype(np.float32))
+        assign.astype("<i2").tofile(root / "assign.i2")
+
+
+def make_rows(n, filenames, source="front"):
+    rows = np.zeros(n, dtype=ROW_DTYPE)
+    rows["source"] = source.encode()
+    rows["filename"] = [f.encode() for f in filenames]
+    rows["start"] = np.arange(n) * 3.0
+    return rows
+
+
+def test_search_ranks_by_cosine_and_skips_same_file(tmp_path):
+    vectors = np.array([[1, 0, 0], [1, 0.05, 0], [1, 0.1, 0], [0.9, 0.5, 0], [0, 1, 0]], np.float32)
+    rows = make_rows(5, ["a.flac", "a.flac", "b.flac", "c.flac", "d.flac"])
+    write_store(tmp_path, vectors, rows)
+
+    results = EmbeddingIndex(str(tmp_path)).search("front", "a.flac", 0.0, limit=2)
+
+    # Row 1 is the closest vector but comes from the same recording
+    assert [(r["filename"], r["start_time"]) for r in results] == [("b.flac", 6.0), ("c.flac", 9.0)]
+    assert results[0]["source"] == "front"
+    assert results[0]["similarity"] > results[1]["similarity"]
+
+
+def test_same_filename_of_another_source_is_another_recording(tmp_path):
+    vectors = np.array([[1, 0], [1, 0.1], [0, 1]], np.float32)
+    rows = make_rows(3, ["a.flac", "a.flac", "b.flac"])
+    rows["source"] = [b"front", b"back", b"front"]
+    rows["start"] = 0.0
+    write_store(tmp_path, vectors, rows)
+
+    results = EmbeddingIndex(str(tmp_path)).search("back", "a.flac", 0.0)
+
+    assert [(r["source"], r["filename"]) for r in results] == [
+        ("front", "a.flac"),
+        ("front", "b.flac"),
+    ]
+
+
+def test_search_probes_ivf_lists_and_unassigned_tail(tmp_path):
+    """Only the closest lists are scanned, but rows not yet assigned are always included."""
+    vectors = np.array([[1, 0], [0.9, 0.1], [0, 1], [0.95, 0.05]], np.float32)
+    rows = make_rows(4, ["q.flac", "x.flac", "y.flac", "z.flac"])
+    centroids = np.array([[1, 0], [0, 1]])
+    # The last row was appended after the assignment file
+    write_store(tmp_path, vectors, rows, centroids, assign=np.array([0, 0, 1]))
+
+    index = EmbeddingIndex(str(tmp_path), nprobe=1)
+    results = index.search("front", "q.flac", 0.0, limit=10)
+
+    assert {r["filename"] for r in results} == {"x.flac", "z.flac"}
+
+
+def test_find_row_by_file_block_and_start(tmp_path):
+    """Files are found by dict, windows within the file's block by start."""
+    rows = make_rows(4, ["a.flac", "b.flac", "b.flac", "c.flac"])
+    write_store(tmp_path, np.ones((4, 2), np.float32), rows)
+    index = EmbeddingIndex(str(tmp_path))
+    rows, _ = index._open()
+
+    assert index.find_row(rows, "front", "b.flac", 6.0) == 2
+    assert index.find_row(rows, "front", "b.flac", 9.0) is None  # c.flac's window
+    assert index.find_row(rows, "back", "b.flac", 3.0) is None
+
+
+def test_lookup_follows_appended_and_removed_rows(tmp_path):
+    """Rows appended after a search are indexed; a re-analysed file's newest block wins."""
+    rows = make_rows(2, ["a.flac", "b.flac"])
+    write_store(tmp_path, np.ones((2, 2), np.float32), rows)
+    index = EmbeddingIndex(str(tmp_path))
+    index._open()
+
+    # The worker removes a.flac's window and appends its re-analysis
+    rows["source"][0] = rows["filename"][0] = b""
+    more = make_rows(1, ["a.flac"])
+    write_store(tmp_path, np.ones((3, 2), np.float32), np.concatenate([rows, more]))
+
+    rows, _ = index._open()
+    assert index.find_row(rows, "front", "a.flac", 0.0) == 2
+
+
+def test_legacy_rows_match_any_source(tmp_path):
+    """A store not yet converted by the worker is read with the source left empty."""
+    legacy = np.zeros(2, dtype=LEGACY_ROW_DTYPE)
+    legacy["filename"] = [b"a.flac", b"b.flac"]
+    (tmp_path / "header.json").write_text('{"dim": 2}')
+    np.array([[1, 0], [1, 0]], "<f2").tofile(tmp_path / "vectors.f16")
+    legacy.tofile(tmp_path / "rows.bin")
+
+    results = EmbeddingIndex(str(tmp_path)).search("front", "a.flac", 0.0)
+
+    assert [(r["source"], r["filename"]) for r in results] == [("", "b.flac")]
+
+
+def test_detections_resolved_per_window():
+    """The best detection of each window, found for rows of known and unknown source."""
+    detections = [
+        {
+            "id": 1,
+            "source_device": "front",
+            "filename": "a.flac",
+            "start_time": 3.0,
+            "confidence": 0.5,
+        },
+        {
+            "id": 2,
+            "source_device": "front",
+            "filename": "a.flac",
+            "start_time": 3.0,
+            "confidence": 0.8,
+        },
+        {
+            "id": 3,
+            "source_device": "back",
+            "filename": "a.flac",
+            "start_time": 3.0,
+            "confidence": 0.6,
+        },
+    ]
+
+    best = SimilarCallsService.best_detections(detections)
+
+    assert best[("front", "a.flac", 3.0)]["id"] == 2
+    assert best[("back", "a.flac", 3.0)]["id"] == 3
+    assert best[("", "a.flac", 3.0)]["id"] == 2
+
+
+def test_search_without_store(tmp_path):
+    assert EmbeddingIndex(str(tmp_path / "missing")).search("front", "a.flac", 0.0) == []
@@ -54,6 +54,9 @@ logger = structlog.get_logger()
 
 # Config
 BASE_DIR = "/mnt/data/services/silvasonic"
+# Redis Stream of pending BirdNET analysis jobs (written by the birdnet container)
+BIRDNET_JOB_STREAM = "birdnet:jobs"
+
 SERVICES_CONFIG = {
     "uploader": ServiceConfig(name="Uploader", timeout=3600),  # 60 mins
     "recorder": ServiceConfig(name="Recorder", timeout=120),  # 2 mins
@@ -115,6 +118,23 @@ def load_timeout_overrides() -> dict[str, int]:
         return {}
 
 
+def get_job_queue_stats(r: redis.Redis) -> dict[str, float | int | None]:
+    """Depth and oldest-job age of the BirdNET job stream (XLEN + first entry, O(1))."""
+    try:
+        depth = int(r.xlen(BIRDNET_JOB_STREAM))
+        first = cast(
+            list[tuple[bytes, dict[bytes, bytes]]], r.xrange(BIRDNET_JOB_STREAM, "-", "+", count=1)
+        )
+        oldest_age = None
+        if first:
+            queued_ms = int(first[0][0].decode().split("-")[0])
+            oldest_age = round(max(0.0, time.time() - queued_ms / 1000), 1)
+        return {"queue_depth": depth, "oldest_job_age_sec": oldest_age}
+    except Exception as e:
+        logger.error("job_queue_stats_error", error=str(e))
+        return {}
+
+
 def check_services_status(mailer: Mailer, service_states: dict[str, str]) -> None:
     """Checks Redis status keys for all services and produces a consolidated system status."""
     current_time = time.time()
@@ -210,6 +230,9 @@ def check_services_status(mailer: Mailer, service_states: dict[str, str]) -> Non
             if getattr(status_obj, "state", None):
                 service_data["state"] = status_obj.state
 
+            if service_type == "birdnet":
+                service_data.update(get_job_queue_stats(r))
+
             # Timeout Logic (Redis TTL handles cleanup, but if key exists it might be stale if strict consistency is needed?
             # Redis TTL removes key. If key is here, it is likely valid.
             # But let's check timestamp just in case clock drift or manual set without TTL.
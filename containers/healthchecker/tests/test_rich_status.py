@@ -2,7 +2,11 @@ import json
 import time
 from unittest.mock import MagicMock, patch
 
-from silvasonic_healthchecker.main import SERVICES_CONFIG, check_services_status
+from silvasonic_healthchecker.main import (
+    SERVICES_CONFIG,
+    check_services_status,
+    get_job_queue_stats,
+)
 from silvasonic_healthchecker.models import ServiceConfig
 
 # Mock SERVICES_CONFIG to include a test service
@@ -52,3 +56,17 @@ def test_rich_status_passthrough(mock_redis_cls, tmp_path):
     assert service_data["message"] == "Processing Job #123"
     assert service_data["state"] == "Processing"
     assert service_data["status"] == "Running"
+
+
+def test_job_queue_stats():
+    """BirdNET queue depth and oldest job age come straight from the stream."""
+    mock_redis = MagicMock()
+    mock_redis.xlen.return_value = 3
+    queued_ms = int((time.time() - 30) * 1000)
+    mock_redis.xrange.return_value = [(f"{queued_ms}-0".encode(), {b"path": b"/a.flac"})]
+
+    stats = get_job_queue_stats(mock_redis)
+
+    assert stats["queue_depth"] == 3
+    assert 29 <= stats["oldest_job_age_sec"] <= 31
+    mock_redis.xrange.assert_called_once_with("birdnet:jobs", "-", "+", count=1)
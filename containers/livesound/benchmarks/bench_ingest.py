@@ -0,0 +1,201 @@
+"""Throughput and latency of the LiveSound UDP ingestion modes.
+
+Run from containers/livesound with:
+
+    PYTHONPATH=src python benchmarks/bench_ingest.py --sources 4 --viewers 3 --seconds 10
+
+For every INGEST_MODE ("threads", "asyncio") the ingestor is started on loopback
+UDP ports with `--viewers` spectrogram and audio subscribers per source, then
+fed in two phases:
+
+* real time: every source sends `--packet` samples at the audio rate for
+  `--seconds`; reports the delay from sendto() to the audio subscriber (p50/p99)
+  and the number of call_soon_threadsafe() hops into the event loop per second.
+* flat out: every source sends `--burst` packets as fast as possible; reports
+  the packets per second that get through to the subscribers and the share
+  delivered (the rest is dropped by the kernel or by full subscriber queues).
+
+Both phases also report the packets per audio delivery, i.e. how many datagrams
+the asyncio mode joins per flush (INGEST_FLUSH_MS / INGEST_FLUSH_BYTES; always
+1 in threads mode). Each packet carries its number in the first 4 bytes, so
+latency is measured per packet even when several are joined into one delivery.
+
+Prints a JSON report.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import struct
+import threading
+import time
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+from silvasonic_livesound.config import settings
+from silvasonic_livesound.live.hub import Subscription
+from silvasonic_livesound.live.processor import AudioIngestor
+
+MODES = ("threads", "asyncio")
+
+
+def _send(
+    ports: list[int], packet_samples: int, count: int, rate: float | None, sent: list[float]
+) -> None:
+    """Send `count` packets to every port, paced to `rate` packets/s (None: flat out)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    noise = (np.random.default_rng(0).normal(0, 3000, packet_samples)).astype(np.int16).tobytes()
+    start = time.perf_counter()
+    for i in range(count):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        packet = struct.pack("<I", i) + noise[4:]
+        sent.append(time.perf_counter())
+        for port in ports:
+            sock.sendto(packet, ("127.0.0.1", port))
+    sock.close()
+
+
+async def _drain(
+    queue: Subscription[bytes],
+    packet_bytes: int,
+    arrivals: dict[int, float],
+    deliveries: list[int],
+    done: asyncio.Event,
+) -> None:
+    while not done.is_set():
+        try:
+            data = await asyncio.wait_for(queue.get(), timeout=0.1)
+        except TimeoutError:
+            continue
+        now = time.perf_counter()
+        deliveries.append(len(data) // packet_bytes)
+        for offset in range(0, len(data), packet_bytes):
+            (index,) = struct.unpack_from("<I", data, offset)
+            arrivals.setdefault(index, now)
+
+
+async def _drain_spectrogram(queue: Subscription[Any], done: asyncio.Event) -> None:
+    while not done.is_set():
+        try:
+            await asyncio.wait_for(queue.get(), timeout=0.1)
+        except TimeoutError:
+            continue
+
+
+async def run_phase(
+    mode: str, args: argparse.Namespace, count: int, rate: float | None
+) -> dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    hops = 0
+    original = loop.call_soon_threadsafe
+
+    def counting(*a: Any, **kw: Any) -> Any:
+        nonlocal hops
+        hops += 1
+        return original(*a, **kw)
+
+    with (
+        patch.object(settings, "INGEST_MODE", mode),
+        patch.object(settings, "HOST", "127.0.0.1"),
+        patch.object(settings, "LISTEN_PORTS", {}),
+    ):
+        ingestor = AudioIngestor()
+        for i in range(args.sources):
+            ingestor.add_source(f"mic{i}", 0)
+        ports = [ingestor.sockets[f"mic{i}"].getsockname()[1] for i in range(args.sources)]
+
+        done = asyncio.Event()
+        arrivals: list[dict[int, float]] = []
+        deliveries: list[int] = []
+        tasks = []
+        for i in range(args.sources):
+            for _ in range(args.viewers):
+                received: dict[int, float] = {}
+                arrivals.append(received)
+                audio_q = await ingestor.subscribe_audio(f"mic{i}")
+                spec_q = await ingestor.subscribe_spectrogram(f"mic{i}")
+                tasks.append(
+                    asyncio.create_task(
+                        _drain(audio_q, args.packet * 2, received, deliveries, done)
+                    )
+                )
+                tasks.append(asyncio.create_task(_drain_spectrogram(spec_q, done)))
+
+        ingestor.start(loop)
+        await asyncio.sleep(0.2)  # Endpoints/threads up
+        loop.call_soon_threadsafe = counting  # type: ignore[method-assign]
+
+        sent: list[float] = []
+        started = time.perf_counter()
+        sender = threading.Thread(target=_send, args=(ports, args.packet, count, rate, sent))
+        sender.start()
+        while sender.is_alive():
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)  # Let the tail arrive
+        elapsed = time.perf_counter() - started
+
+        loop.call_soon_threadsafe = original  # type: ignore[method-assign]
+        done.set()
+        await asyncio.gather(*tasks)
+        ingestor.stop()
+
+    latencies = np.array(
+        [at - sent[index] for received in arrivals for index, at in received.items()]
+    )
+    delivered = sum(len(received) for received in arrivals)
+    expected = count * len(arrivals)
+    result: dict[str, Any] = {
+        "delivered_share": round(delivered / expected, 4) if expected else None,
+        "threadsafe_calls_per_sec": round(hops / elapsed, 1),
+        "packets_per_delivery": round(sum(deliveries) / len(deliveries), 2) if deliveries else None,
+    }
+    if rate:
+        result["latency_ms_p50"] = round(float(np.percentile(latencies, 50)) * 1000, 3)
+        result["latency_ms_p99"] = round(float(np.percentile(latencies, 99)) * 1000, 3)
+    elif delivered:
+        # Packets that made it through, per second from the first send to the last arrival
+        last = max(at for received in arrivals for at in received.values())
+        processed = delivered / args.viewers
+        result["processed_packets_per_sec"] = round(processed / (last - sent[0]), 1)
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    rate = settings.SAMPLE_RATE / args.packet
+    report: dict[str, Any] = {
+        "python": platform.python_version(),
+        "sources": args.sources,
+        "viewers": args.viewers,
+        "packet_samples": args.packet,
+        "flush_ms": settings.INGEST_FLUSH_MS,
+        "flush_bytes": settings.INGEST_FLUSH_BYTES,
+        "modes": {},
+    }
+    for mode in MODES:
+        report["modes"][mode] = {
+            "real_time": await run_phase(mode, args, int(args.seconds * rate), rate),
+            "flat_out": await run_phase(mode, args, args.burst, None),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sources", type=int, default=4)
+    parser.add_argument("--viewers", type=int, default=3, help="subscribers per source")
+    parser.add_argument("--seconds", type=float, default=10.0, help="real-time phase length")
+    parser.add_argument("--packet", type=int, default=1024, help="samples per UDP packet")
+    parser.add_argument("--burst", type=int, default=2000, help="packets per source, flat out")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
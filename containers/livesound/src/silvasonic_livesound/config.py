@@ -1,5 +1,5 @@
 import socket
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -21,6 +21,40 @@ class Settings(BaseSettings):
     CHUNK_SIZE: int = Field(default=4096, description="Processing chunk size (samples)")
     FFT_WINDOW: int = Field(default=2048, description="FFT Window size")
     HOP_LENGTH: int = Field(default=512, description="FFT Hop length")
+    SPEC_DB_MIN: float = Field(
+        default=-100.0, description="Spectrogram level (dBFS) shown as the lowest colour"
+    )
+    SPEC_DB_MAX: float = Field(
+        default=-10.0, description="Spectrogram level (dBFS) shown as the highest colour"
+    )
+    SPEC_BATCH_MS: int = Field(
+        default=100, description="Spectrogram columns are sent in one message per interval (ms)"
+    )
+    SUBSCRIBER_QUEUE_SIZE: int = Field(
+        default=100,
+        description="Items kept per spectrogram/audio subscriber; the oldest are dropped beyond",
+    )
+    STREAM_GRACE_SEC: float = Field(
+        default=10.0, description="Seconds a source's MP3 encoder keeps running without listeners"
+    )
+    STREAM_RING_CHUNKS: int = Field(
+        default=64, description="Encoded MP3 chunks kept per source for slow listeners"
+    )
+    INGEST_MODE: Literal["asyncio", "threads"] = Field(
+        default="asyncio",
+        description='UDP ingestion: "asyncio" (all sources on the event loop) '
+        'or "threads" (one receive thread per source)',
+    )
+    INGEST_FLUSH_MS: float = Field(
+        default=10.0,
+        description="asyncio ingestion: datagrams received within this interval (ms) are "
+        "processed together; 0 processes every loop iteration",
+    )
+    INGEST_FLUSH_BYTES: int = Field(
+        default=8192,
+        description="asyncio ingestion: a source is processed as soon as this much audio "
+        "(bytes) is pending",
+    )
 
     # Port Configuration
     LISTEN_PORTS: dict[str, int] = Field(
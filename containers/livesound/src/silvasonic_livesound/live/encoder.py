@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import typing
+from collections import deque
+
+from ..config import settings
+from .hub import Subscription
+from .processor import processor
+
+logger = logging.getLogger("LiveEncoder")
+
+# Layer III bitrates (kbit/s) by bitrate index, MPEG-1 and MPEG-2/2.5
+BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+# Sample rates by version bits (3: MPEG-1, 2: MPEG-2, 0: MPEG-2.5)
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def frame_length(header: bytes | bytearray) -> int | None:
+    """Length of the MPEG Layer III frame starting with these 4 bytes, None if no header."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    rate = SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        return 144000 * BITRATES_V1[bitrate_index] // rate + padding
+    return 72000 * BITRATES_V2[bitrate_index] // rate + padding
+
+
+def complete_frames(buf: bytes | bytearray) -> tuple[int, int]:
+    """(start, end) of the complete frames at the beginning of `buf`.
+
+    Bytes before `start` are not part of a frame and can be dropped along with the
+    frames; bytes from `end` on are an incomplete frame (or unchecked data).
+    """
+    start = end = pos = 0
+    while pos + 4 <= len(buf):
+        length = frame_length(buf[pos : pos + 4])
+        if length is None:
+            if end > start:
+                break  # Hand out the frames so far, resync on the next call
+            pos += 1
+            start = end = pos
+            continue
+        if pos + length > len(buf):
+            break
+        pos += length
+        end = pos
+    return start, end
+
+
+class SharedEncoder:
+    """One ffmpeg MP3 encoder for a source, fanned out to any number of listeners.
+
+    Encoded output is cut at MP3 frame boundaries and kept in a ring of the last
+    `ring_chunks` chunks, numbered consecutively. A listener starts with the next
+    chunk (i.e. at a frame boundary) and reads at its own pace; one that falls more
+    than the ring behind skips ahead to the oldest chunk still held.
+    """
+
+    def __init__(self, source: str, ring_chunks: int = 64) -> None:
+        self.source = source
+        self.listeners = 0
+        self.closed = False
+
+        self._ring: deque[bytes] = deque(maxlen=max(ring_chunks, 1))
+        self._next_seq = 0  # Number of the next chunk to be published
+        self._published = asyncio.Event()
+        self._proc: asyncio.subprocess.Process | None = None
+        self._queue: Subscription[bytes] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def start(self) -> bool:
+        # FFmpeg command: Read PCM from Pipe, Write MP3 to Pipe
+        cmd = [
+            "ffmpeg",
+            "-f",
+            "s16le",  # Input format: Signed 16-bit Little Endian
+            "-ar",
+            str(settings.SAMPLE_RATE),  # Input Sample Rate
+            "-ac",
+            "1",  # Input Channels
+            "-i",
+            "pipe:0",  # Input from Stdin
+            "-f",
+            "mp3",  # Output format
+            "-b:a",
+            "128k",  # Bitrate
+            "-ar",
+            "44100",  # Output Sample Rate (Standard for Web)
+            "-id3v2_version",
+            "0",  # Plain frames: no tag at the start of the stream
+            "-write_xing",
+            "0",
+            "pipe:1",  # Output to Stdout
+        ]
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,  # Silence logs
+        )
+        self._proc = proc
+
+        if not proc.stdin or not proc.stdout:
+            logger.error(f"Failed to start FFmpeg process pipes [{self.source}]")
+            await self.stop()
+            return False
+
+        self._queue = await processor.subscribe_audio(self.source, client="mp3-encoder")
+        self._tasks = [
+            asyncio.create_task(feed_input(proc.stdin, self._queue)),
+            asyncio.create_task(self._read_output(proc.stdout)),
+        ]
+        logger.info(f"MP3 encoder started [{self.source}]")
+        return True
+
+    async def stop(self) -> None:
+        self._close()
+        for task in self._tasks:
+            task.cancel()
+        if self._queue is not None:
+            processor.unsubscribe_audio(self._queue, self.source)
+            self._queue = None
+
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            try:
+                proc.terminate()
+                await proc.wait()
+            except Exception:
+                pass
+            logger.info(f"MP3 encoder stopped [{self.source}]")
+
+    def _close(self) -> None:
+        self.closed = True
+        self._published.set()
+
+    def _publish(self, chunk: bytes) -> None:
+        self._ring.append(chunk)
+        self._next_seq += 1
+        # Wake all waiting listeners, later ones wait on a fresh event
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    async def _read_output(self, stdout: asyncio.StreamReader) -> None:
+        pending = bytearray()
+        try:
+            while True:
+                out_data = await stdout.read(4096)
+                if not out_data:
+                    break
+                pending += out_data
+                start, end = complete_frames(pending)
+                if end > start:
+                    self._publish(bytes(pending[start:end]))
+                del pending[:end]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stream Error [{self.source}]: {e}")
+        # Encoder gone: listeners finish the chunks they have and end
+        self._close()
+
+    async def listen(self) -> typing.AsyncGenerator[bytes, None]:
+        cursor = self._next_seq
+        while True:
+            published = self._published
+            if cursor == self._next_seq:
+                if self.closed:
+                    return
+                await published.wait()
+                continue
+            oldest = self._next_seq - len(self._ring)
+            if cursor < oldest:
+                logger.debug(f"Listener lagging [{self.source}]: skipped {oldest - cursor} chunks")
+                cursor = oldest
+            yield self._ring[cursor - oldest]
+            cursor += 1
+
+
+class EncoderPool:
+    """Starts one SharedEncoder per source on demand.
+
+    The encoder starts with the first listener and stops `grace_sec` after the last
+    one left, so a page reload or a short network hiccup does not restart ffmpeg.
+    """
+
+    def __init__(self, grace_sec: float = 10.0, ring_chunks: int = 64) -> None:
+        self.grace_sec = grace_sec
+        self.ring_chunks = ring_chunks
+        self.encoders: dict[str, SharedEncoder] = {}
+        self._lock = asyncio.Lock()
+        self._stop_tasks: dict[str, asyncio.Task[None]] = {}
+
+    async def _acquire(self, source: str) -> SharedEncoder | None:
+        async with self._lock:
+            stop_task = self._stop_tasks.pop(source, None)
+            if stop_task is not None:
+                stop_task.cancel()
+            encoder = self.encoders.get(source)
+            if encoder is None or encoder.closed:
+                if encoder is not None:
+                    await encoder.stop()
+                encoder = SharedEncoder(source, self.ring_chunks)
+                if not await encoder.start():
+                    self.encoders.pop(source, None)
+                    return None
+                self.encoders[source] = encoder
+            encoder.listeners += 1
+            return encoder
+
+    async def _release(self, encoder: SharedEncoder) -> None:
+        encoder.listeners -= 1
+        if encoder.listeners > 0:
+            return
+        if encoder.closed or self.grace_sec <= 0:
+            await self._stop(encoder)
+        else:
+            self._stop_tasks[encoder.source] = asyncio.create_task(self._stop_later(encoder))
+
+    async def _stop_later(self, encoder: SharedEncoder) -> None:
+        await asyncio.sleep(self.grace_sec)
+        self._stop_tasks.pop(encoder.source, None)
+        await self._stop(encoder)
+
+    async def _stop(self, encoder: SharedEncoder) -> None:
+        async with self._lock:
+            if encoder.listeners > 0:
+                return
+            if self.encoders.get(encoder.source) is encoder:
+                del self.encoders[encoder.source]
+            await encoder.stop()
+
+    async def listen(self, source: str) -> typing.AsyncGenerator[bytes, None]:
+        """MP3 chunks of a source for one listener, starting at the next frame boundary."""
+        source = processor.resolve_source(source)
+        encoder = await self._acquire(source)
+        if encoder is None:
+            return
+        try:
+            async for chunk in encoder.listen():
+                yield chunk
+        finally:
+            await self._release(encoder)
+
+    async def stop(self) -> None:
+        for task in self._stop_tasks.values():
+            task.cancel()
+        self._stop_tasks.clear()
+        async with self._lock:
+            encoders = list(self.encoders.values())
+            self.encoders.clear()
+        for encoder in encoders:
+            await encoder.stop()
+
+
+async def feed_input(stdin_writer: asyncio.StreamWriter, queue: Subscription[bytes]) -> None:
+    """Feeds audio chunks from queue to FFmpeg stdin"""
+    try:
+        while True:
+            chunk = await queue.get()
+            stdin_writer.write(chunk)
+            await stdin_writer.drain()
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logger.error(f"Feed Input Error: {e}")
+
+
+# Singleton
+encoders = EncoderPool(settings.STREAM_GRACE_SEC, settings.STREAM_RING_CHUNKS)
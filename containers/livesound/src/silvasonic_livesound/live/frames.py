@@ -0,0 +1,87 @@
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+# Binary spectrogram message (little endian), version 1:
+#   u8  version
+#   u8  reserved (0)
+#   u16 source id (see /sources)
+#   u32 sequence number of the first column (per source, wraps around)
+#   f64 timestamp of the first column (Unix seconds)
+#   f32 seconds between columns (hop / sample rate)
+#   u16 n_mels
+#   u16 column count
+# followed by count * n_mels uint8 values, column after column, low bands first.
+FRAME_VERSION = 1
+HEADER = struct.Struct("<BBHIdfHH")
+HEADER_SIZE = HEADER.size  # 24 bytes
+SEQ_MODULO = 1 << 32
+
+
+@dataclass
+class ColumnBatch:
+    """Consecutive spectrogram columns of one source, as produced per UDP packet."""
+
+    seq: int  # Sequence number of the first column
+    timestamp: float  # Unix time of the first column
+    columns: npt.NDArray[np.uint8]  # (count, n_mels)
+
+    @property
+    def next_seq(self) -> int:
+        return (self.seq + len(self.columns)) % SEQ_MODULO
+
+
+@dataclass
+class SpectrogramMessage:
+    source_id: int
+    seq: int
+    timestamp: float
+    column_sec: float
+    columns: npt.NDArray[np.uint8]  # (count, n_mels)
+
+
+def encode_frames(
+    source_id: int,
+    seq: int,
+    timestamp: float,
+    column_sec: float,
+    columns: npt.NDArray[np.uint8],
+) -> bytes:
+    """One binary message for a run of consecutive columns."""
+    count, n_mels = columns.shape
+    header = HEADER.pack(
+        FRAME_VERSION, 0, source_id, seq % SEQ_MODULO, timestamp, column_sec, n_mels, count
+    )
+    return header + np.ascontiguousarray(columns, dtype=np.uint8).tobytes()
+
+
+def decode_frames(data: bytes) -> SpectrogramMessage:
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"Spectrogram message too short ({len(data)} bytes)")
+    version, _, source_id, seq, timestamp, column_sec, n_mels, count = HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported spectrogram message version {version}")
+    if len(data) != HEADER_SIZE + count * n_mels:
+        raise ValueError("Spectrogram message length does not match its header")
+    columns = np.frombuffer(data, dtype=np.uint8, offset=HEADER_SIZE).reshape(count, n_mels)
+    return SpectrogramMessage(source_id, seq, timestamp, column_sec, columns)
+
+
+def coalesce(batches: list[ColumnBatch]) -> list[ColumnBatch]:
+    """Merge batches into runs of consecutive columns (a dropped batch starts a new run)."""
+    runs: list[list[ColumnBatch]] = []
+    for batch in batches:
+        if not len(batch.columns):
+            continue
+        if runs and runs[-1][-1].next_seq == batch.seq:
+            runs[-1].append(batch)
+        else:
+            runs.append([batch])
+    return [
+        ColumnBatch(run[0].seq, run[0].timestamp, np.concatenate([b.columns for b in run]))
+        if len(run) > 1
+        else run[0]
+        for run in runs
+    ]
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import typing
+from collections import deque
+
+from .models import SubscriberStatus
+
+T = typing.TypeVar("T")
+
+
+class Subscription(typing.Generic[T]):
+    """Fixed-size ring of one subscriber; when full, the oldest item is dropped.
+
+    Single consumer, used on the event loop thread. `get`/`get_nowait`/`empty`
+    behave like asyncio.Queue, so a stalled client costs at most `maxsize` items
+    and never blocks or slows the publisher.
+    """
+
+    def __init__(self, kind: str, maxsize: int, client: str = "") -> None:
+        self.kind = kind
+        self.client = client
+        self.maxsize = max(maxsize, 1)
+        self.delivered = 0
+        self.dropped = 0
+
+        self._items: deque[tuple[float, T]] = deque()
+        self._waiter: asyncio.Future[None] | None = None
+
+    def put(self, item: T) -> None:
+        if len(self._items) >= self.maxsize:
+            self._items.popleft()
+            self.dropped += 1
+        self._items.append((time.monotonic(), item))
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self) -> T:
+        while not self._items:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self.get_nowait()
+
+    def get_nowait(self) -> T:
+        if not self._items:
+            raise asyncio.QueueEmpty
+        _, item = self._items.popleft()
+        self.delivered += 1
+        return item
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    @property
+    def lag_sec(self) -> float:
+        """Age of the oldest item not yet taken by the client."""
+        try:
+            queued_at = self._items[0][0]
+        except IndexError:
+            return 0.0
+        return time.monotonic() - queued_at
+
+    def status(self) -> SubscriberStatus:
+        return SubscriberStatus(
+            kind=self.kind,
+            client=self.client,
+            queued=len(self._items),
+            lag_sec=round(self.lag_sec, 3),
+            delivered=self.delivered,
+            dropped=self.dropped,
+        )
+
+
+class Hub(typing.Generic[T]):
+    """Fan-out of one stream to any number of bounded subscriptions.
+
+    `publish` must run on the event loop thread (threads hand items over with one
+    call_soon_threadsafe per hub, not per subscriber).
+    """
+
+    def __init__(self, kind: str, maxsize: int) -> None:
+        self.kind = kind
+        self.maxsize = maxsize
+        self._subscriptions: set[Subscription[T]] = set()
+
+    def subscribe(self, client: str = "") -> Subscription[T]:
+        sub: Subscription[T] = Subscription(self.kind, self.maxsize, client)
+        self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription[T]) -> bool:
+        if sub in self._subscriptions:
+            self._subscriptions.remove(sub)
+            return True
+        return False
+
+    def publish(self, item: T) -> None:
+        for sub in list(self._subscriptions):
+            sub.put(item)
+
+    def status(self) -> list[SubscriberStatus]:
+        return [sub.status() for sub in list(self._subscriptions)]
+
+    def __contains__(self, sub: object) -> bool:
+        return sub in self._subscriptions
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
@@ -8,11 +8,24 @@ class SourceConfig(BaseModel):
     port: int = Field(..., description="UDP port to listen on")
 
 
+class SubscriberStatus(BaseModel):
+    """Backlog of one spectrogram/audio subscriber."""
+
+    kind: str = Field(..., description="'spectrogram' or 'audio'")
+    client: str = Field(default="", description="Client address or consumer name")
+    queued: int = Field(default=0, description="Items waiting for the client")
+    lag_sec: float = Field(default=0.0, description="Age of the oldest waiting item")
+    delivered: int = Field(default=0, description="Items taken by the client")
+    dropped: int = Field(default=0, description="Items dropped because the client fell behind")
+
+
 class SourceStatus(BaseModel):
     """Real-time status of an audio source."""
 
     name: str
     port: int
+    source_id: int = Field(default=0, description="Source ID in binary spectrogram messages")
     active: bool = Field(..., description="Whether the ingestion thread is running")
     rms_db: float = Field(default=-100.0, description="Current RMS level in dB")
     packets_received: int = Field(default=0, description="Total packets received")
+    subscribers: list[SubscriberStatus] = Field(default_factory=list)
@@ -3,18 +3,26 @@ import logging
 import math
 import socket
 import threading
+import time
 import typing
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import dataclass, field
 
-import librosa
 import numpy as np
-import orjson
 
 from ..config import settings
+from .frames import ColumnBatch
+from .hub import Hub, Subscription
 from .models import SourceStatus
+from .stft import StreamingSTFT
 
 logger = logging.getLogger("LiveProcessor")
 
+RECV_BUFFER_BYTES = 1 << 20  # Per-socket kernel receive buffer
+
+
+Deliver = Callable[[Hub[typing.Any], typing.Any], None]
+
 
 @dataclass
 class StreamMetrics:
@@ -22,8 +30,52 @@ class StreamMetrics:
     rms_db: float = -100.0
 
 
+def _new_stft() -> StreamingSTFT:
+    # Window, mel basis and ring buffer are set up once per stream
+    return StreamingSTFT(
+        settings.SAMPLE_RATE,
+        n_fft=settings.FFT_WINDOW,
+        hop=settings.HOP_LENGTH,
+        n_mels=128,
+        fmin=100,
+        fmax=14000,  # Birds range
+        db_min=settings.SPEC_DB_MIN,
+        db_max=settings.SPEC_DB_MAX,
+    )
+
+
+@dataclass
+class SpectrogramState:
+    """Per-stream spectrogram state, kept across packets."""
+
+    stft: StreamingSTFT = field(default_factory=_new_stft)
+    seq: int = 0  # Column sequence number, lets clients spot dropped columns
+    watched: bool = False
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, ingestor: "AudioIngestor", source: str) -> None:
+        self.ingestor = ingestor
+        self.source = source
+
+    def datagram_received(self, data: bytes, addr: tuple[str | typing.Any, int]) -> None:
+        self.ingestor._on_datagram(self.source, data)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.error(f"Ingest Error [{self.source}]: {exc}")
+
+
 class AudioIngestor:
-    """Ingests audio from multiple UDP streams and processes them for visualization."""
+    """Ingests audio from multiple UDP streams and processes them for visualization.
+
+    INGEST_MODE "asyncio" receives all sources on the event loop: datagrams that
+    arrive within INGEST_FLUSH_MS are processed together (one STFT push and one
+    delivery per source, earlier once INGEST_FLUSH_BYTES are pending), and
+    subscriber queues are fed directly. The loop reads about one datagram per
+    source and iteration, so flushing every iteration would hardly join any.
+    "threads" runs one blocking receive thread per source, which hands every
+    packet to the loop with call_soon_threadsafe.
+    """
 
     def __init__(self) -> None:
         """Initialize the AudioIngestor."""
@@ -31,9 +83,17 @@ class AudioIngestor:
         self.sockets: dict[str, socket.socket] = {}
         # Port mapping: {source_name: port}
         self.source_ports: dict[str, int] = {}
+        # IDs in binary spectrogram messages: {source_name: id}, stable for the process
+        self.source_ids: dict[str, int] = {}
 
-        # Threads: {source_name: thread}
+        # Threads: {source_name: thread} (INGEST_MODE "threads")
         self.threads: dict[str, threading.Thread] = {}
+        # Datagram transports: {source_name: transport} (INGEST_MODE "asyncio")
+        self.transports: dict[str, asyncio.DatagramTransport] = {}
+        self._states: dict[str, SpectrogramState] = {}
+        self._pending: dict[str, list[bytes]] = {}
+        self._pending_bytes: dict[str, int] = {}
+        self._flush_handle: asyncio.Handle | None = None
         # Metrics: {source_name: StreamMetrics}
         self.metrics: dict[str, StreamMetrics] = {}
 
@@ -44,9 +104,9 @@ class AudioIngestor:
         # Thread-safe integration with AsyncIO
         self.loop: asyncio.AbstractEventLoop | None = None
 
-        # Listeners: {source_name: set(queues)}
-        self._spectrogram_queues: dict[str, set[asyncio.Queue[bytes]]] = {}
-        self._audio_queues: dict[str, set[asyncio.Queue[bytes]]] = {}
+        # Listeners: {source_name: hub}, bounded per subscriber (drop oldest)
+        self._spectrogram_hubs: dict[str, Hub[ColumnBatch]] = {}
+        self._audio_hubs: dict[str, Hub[bytes]] = {}
 
         # Initialize sockets from static config (env vars)
         self.update_sources(settings.LISTEN_PORTS)
@@ -70,11 +130,14 @@ class AudioIngestor:
             try:
                 self._setup_socket(name, port)
                 self.source_ports[name] = port
+                self.source_ids.setdefault(name, len(self.source_ids))
+                # Set up before packets arrive (building the mel basis takes a while)
+                self._states[name] = SpectrogramState()
                 self.metrics[name] = StreamMetrics()
 
-                # Start thread if running
+                # Start receiving if running
                 if self.running and name in self.sockets:
-                    self._start_ingestion_thread(name)
+                    self._start_ingestion(name)
             except Exception as e:
                 logger.error(f"Failed to add source {name}: {e}")
 
@@ -84,8 +147,14 @@ class AudioIngestor:
         sock = self.sockets.pop(name, None)
         self.source_ports.pop(name, None)
         self.metrics.pop(name, None)
-
-        if sock:
+        self._states.pop(name, None)
+        self._pending.pop(name, None)
+        self._pending_bytes.pop(name, None)
+
+        transport = self.transports.pop(name, None)
+        if transport:
+            transport.close()
+        elif sock:
             try:
                 sock.close()
             except Exception:
@@ -100,23 +169,45 @@ class AudioIngestor:
         with self._lock:
             for name, port in self.source_ports.items():
                 m = self.metrics.get(name, StreamMetrics())
-                active = name in self.threads and self.threads[name].is_alive()
+                active = self._is_active(name)
+                hubs: list[Hub[typing.Any] | None] = [
+                    self._spectrogram_hubs.get(name),
+                    self._audio_hubs.get(name),
+                ]
                 stats.append(
                     SourceStatus(
                         name=name,
                         port=port,
+                        source_id=self.source_ids.get(name, 0),
                         active=active,
                         rms_db=m.rms_db,
                         packets_received=m.packets_received,
+                        subscribers=[sub for hub in hubs if hub for sub in hub.status()],
                     )
                 )
         return stats
 
+    def get_source_stats_threadsafe(self, timeout: float = 2.0) -> list[SourceStatus]:
+        """get_source_stats() for other threads (e.g. the Redis heartbeat).
+
+        Hub subscriptions are only changed on the event loop, so the snapshot is
+        taken there rather than by reading them from this thread.
+        """
+        loop = self.loop
+        if loop is None or not loop.is_running():
+            return self.get_source_stats()
+        return asyncio.run_coroutine_threadsafe(self._source_stats(), loop).result(timeout)
+
+    async def _source_stats(self) -> list[SourceStatus]:
+        return self.get_source_stats()
+
     def _setup_socket(self, source: str, port: int) -> None:
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             # Allow reuse address to recover quickly
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            # Room for bursts while the loop is busy (e.g. sending websocket messages)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_BYTES)
             sock.bind((settings.HOST, port))
             self.sockets[source] = sock
             logger.info(f"Bound source '{source}' to UDP {settings.HOST}:{port}")
@@ -125,15 +216,39 @@ class AudioIngestor:
             raise
 
     def start(self, loop: asyncio.AbstractEventLoop) -> None:
-        """Start the ingestion threads."""
+        """Start receiving on all sources."""
         self.loop = loop
         self.running = True
 
-        # Start existing threads
         for source in list(self.sockets.keys()):
+            self._start_ingestion(source)
+
+        logger.info(f"Audio ingestion started (mode: {settings.INGEST_MODE}).")
+
+    def _is_active(self, source: str) -> bool:
+        if source in self.transports:
+            return not self.transports[source].is_closing()
+        return source in self.threads and self.threads[source].is_alive()
+
+    def _start_ingestion(self, source: str) -> None:
+        if settings.INGEST_MODE == "threads":
             self._start_ingestion_thread(source)
+        elif self.loop is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._open_endpoint(source, self.sockets[source]), self.loop
+            )
 
-        logger.info("Audio ingestion threads started.")
+    async def _open_endpoint(self, source: str, sock: socket.socket) -> None:
+        if source in self.transports or self.sockets.get(source) is not sock:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self, source), sock=sock
+            )
+            self.transports[source] = transport
+        except Exception as e:
+            logger.error(f"Failed to start receiving on source '{source}': {e}")
 
     def _start_ingestion_thread(self, source: str) -> None:
         if source not in self.threads or not self.threads[source].is_alive():
@@ -143,8 +258,14 @@ class AudioIngestor:
             t.start()
 
     def stop(self) -> None:
-        """Stop the ingestion threads."""
+        """Stop receiving on all sources."""
         self.running = False
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for transport in self.transports.values():
+            transport.close()
+        self.transports.clear()
         for sock in self.sockets.values():
             try:
                 sock.close()
@@ -153,95 +274,117 @@ class AudioIngestor:
         self.sockets.clear()
         # Threads will exit when sock.recv returns empty or error
 
-    async def subscribe_spectrogram(self, source: str = "default") -> asyncio.Queue[bytes]:
-        """Subscribe to spectrogram updates for a specific source."""
-        # Use first available source if default requested but not present (fallback)
+    def resolve_source(self, source: str) -> str:
+        """Use first available source if default requested but not present (fallback)."""
         if source == "default":
             if "default" not in self.sockets and self.sockets:
                 source = next(iter(self.sockets))
+        return source
 
-        with self._lock:
-            if source not in self._spectrogram_queues:
-                self._spectrogram_queues.setdefault(source, set())
+    def source_id(self, source: str) -> int:
+        """ID of a source in binary spectrogram messages."""
+        return self.source_ids.get(self.resolve_source(source), 0)
 
-            q: asyncio.Queue[bytes] = asyncio.Queue()
-            self._spectrogram_queues[source].add(q)
+    def _hub(self, hubs: dict[str, Hub[typing.Any]], kind: str, source: str) -> Hub[typing.Any]:
+        if source not in hubs:
+            hubs[source] = Hub(kind, settings.SUBSCRIBER_QUEUE_SIZE)
+        return hubs[source]
 
-        return q
-
-    def unsubscribe_spectrogram(self, q: asyncio.Queue[bytes], source: str = "default") -> None:
-        """Unsubscribe from spectrogram updates."""
+    def _unsubscribe(
+        self, hubs: dict[str, Hub[typing.Any]], sub: Subscription[typing.Any], source: str
+    ) -> None:
         with self._lock:
-            # If we don't know the source, check all (expensive but safe) or require source
-            if source in self._spectrogram_queues and q in self._spectrogram_queues[source]:
-                self._spectrogram_queues[source].remove(q)
+            if source in hubs and hubs[source].unsubscribe(sub):
                 return
 
-            # Fallback cleanup
-            for s in self._spectrogram_queues:
-                if q in self._spectrogram_queues[s]:
-                    self._spectrogram_queues[s].remove(q)
+            # Fallback cleanup (e.g. "default" resolved to another source)
+            for hub in hubs.values():
+                if hub.unsubscribe(sub):
+                    return
 
-    async def subscribe_audio(self, source: str = "default") -> asyncio.Queue[bytes]:
-        """Subscribe to raw audio updates."""
-        if source == "default":
-            if "default" not in self.sockets and self.sockets:
-                source = next(iter(self.sockets))
+    async def subscribe_spectrogram(
+        self, source: str = "default", client: str = ""
+    ) -> Subscription[ColumnBatch]:
+        """Subscribe to spectrogram updates for a specific source."""
+        source = self.resolve_source(source)
 
         with self._lock:
-            if source not in self._audio_queues:
-                self._audio_queues.setdefault(source, set())
+            sub: Subscription[ColumnBatch] = self._hub(
+                self._spectrogram_hubs, "spectrogram", source
+            ).subscribe(client)
+        return sub
+
+    def unsubscribe_spectrogram(
+        self, sub: Subscription[ColumnBatch], source: str = "default"
+    ) -> None:
+        """Unsubscribe from spectrogram updates."""
+        self._unsubscribe(self._spectrogram_hubs, sub, source)
 
-            # Limit queue size to prevent memory explosion if client is slow
-            q: asyncio.Queue[bytes] = asyncio.Queue(maxsize=100)
-            self._audio_queues[source].add(q)
-        return q
+    async def subscribe_audio(
+        self, source: str = "default", client: str = ""
+    ) -> Subscription[bytes]:
+        """Subscribe to raw audio updates."""
+        source = self.resolve_source(source)
 
-    def unsubscribe_audio(self, q: asyncio.Queue[bytes], source: str = "default") -> None:
-        """Unsubscribe from raw audio updates."""
         with self._lock:
-            if source in self._audio_queues and q in self._audio_queues[source]:
-                self._audio_queues[source].remove(q)
-                return
+            sub: Subscription[bytes] = self._hub(self._audio_hubs, "audio", source).subscribe(
+                client
+            )
+        return sub
 
-            for s in self._audio_queues:
-                if q in self._audio_queues[s]:
-                    self._audio_queues[s].remove(q)
+    def unsubscribe_audio(self, sub: Subscription[bytes], source: str = "default") -> None:
+        """Unsubscribe from raw audio updates."""
+        self._unsubscribe(self._audio_hubs, sub, source)
 
-    def _broadcast_safe(self, queues: set[asyncio.Queue[typing.Any]], data: typing.Any) -> None:
-        """Helper to put data into queues from a thread safely."""
-        if not self.loop or not self.running:
+    def _broadcast_safe(self, hub: Hub[typing.Any], data: typing.Any) -> None:
+        """Helper to hand data to a hub from a thread safely (one loop wakeup per hub)."""
+        if not self.loop or not self.running or not hub:
             return
+        try:
+            self.loop.call_soon_threadsafe(hub.publish, data)
+        except RuntimeError:
+            pass  # Loop closed during shutdown
 
-        # Snapshot the queues under lock to avoid "Set changed size during iteration"
-        with self._lock:
-            if not queues:
-                return
-            target_queues = list(queues)
+    def _broadcast_local(self, hub: Hub[typing.Any], data: typing.Any) -> None:
+        """Hand data to a hub, on the event loop thread."""
+        hub.publish(data)
 
-        for q in target_queues:
-            try:
-                self.loop.call_soon_threadsafe(q.put_nowait, data)
-            except asyncio.QueueFull:
-                # Drop frames if client is too slow (Backpressure)
-                pass
-            except Exception:
-                pass
+    def _on_datagram(self, source: str, data: bytes) -> None:
+        """Collect a datagram; processed with the others of its source at the next flush."""
+        if not data:
+            return
+        self._pending.setdefault(source, []).append(data)
+        pending_bytes = self._pending_bytes.get(source, 0) + len(data)
+        self._pending_bytes[source] = pending_bytes
+        if pending_bytes >= settings.INGEST_FLUSH_BYTES:
+            self._flush_source(source)
+        elif self._flush_handle is None and self.loop is not None:
+            delay = settings.INGEST_FLUSH_MS / 1000
+            if delay > 0:
+                self._flush_handle = self.loop.call_later(delay, self._flush_pending)
+            else:
+                self._flush_handle = self.loop.call_soon(self._flush_pending)
+
+    def _flush_pending(self) -> None:
+        self._flush_handle = None
+        for source in list(self._pending):
+            self._flush_source(source)
+
+    def _flush_source(self, source: str) -> None:
+        packets = self._pending.pop(source, None)
+        self._pending_bytes.pop(source, None)
+        state = self._states.get(source)
+        if not packets or state is None:
+            return
+        data = packets[0] if len(packets) == 1 else b"".join(packets)
+        try:
+            self._process(source, data, len(packets), state, self._broadcast_local)
+        except Exception as e:
+            logger.error(f"Ingest Error [{source}]: {e}")
 
     def _ingest_loop(self, source: str, sock: socket.socket) -> None:
         buffer_size = settings.CHUNK_SIZE * 2 * 2  # Safety buffer
-
-        # Pre-calculate mel basis for performance
-        mel_basis = librosa.filters.mel(
-            sr=settings.SAMPLE_RATE,
-            n_fft=settings.FFT_WINDOW,
-            n_mels=128,
-            fmin=100,
-            fmax=14000,  # Birds range
-        )
-
-        rb_size = settings.FFT_WINDOW + settings.CHUNK_SIZE
-        ring_buffer = np.zeros(rb_size, dtype=np.float32)
+        state = self._states.get(source) or SpectrogramState()
 
         logger.info(f"Ingestion loop started for {source}")
 
@@ -250,59 +393,7 @@ class AudioIngestor:
                 data, _ = sock.recvfrom(buffer_size)
                 if not data:
                     continue
-
-                # --- 1. Update Metrics ---
-                # We need a rough RMS estimate.
-                # int16 -> float
-                audio_chunk_int16 = np.frombuffer(data, dtype=np.int16)
-                new_samples = audio_chunk_int16.astype(np.float32) / 32768.0
-
-                rms = float(np.sqrt(np.mean(new_samples**2)))
-                rms_db = 20 * math.log10(rms) if rms > 1e-9 else -100.0
-
-                if source in self.metrics:
-                    self.metrics[source].packets_received += 1
-                    self.metrics[source].rms_db = round(rms_db, 1)
-
-                # --- 2. Distribute Raw Audio (Bytes) ---
-                if source in self._audio_queues:
-                    self._broadcast_safe(self._audio_queues[source], data)
-
-                # OPTIMIZATION: Skip processing if no one is watching the spectrogram
-                if source not in self._spectrogram_queues or not self._spectrogram_queues[source]:
-                    continue
-
-                # --- 3. Process Spectrogram ---
-                n_new = len(new_samples)
-
-                # Shift left
-                ring_buffer[:-n_new] = ring_buffer[n_new:]
-                # Append new
-                ring_buffer[-n_new:] = new_samples
-
-                # Extract the analysis window (latest fft_window samples)
-                y = ring_buffer[-settings.FFT_WINDOW :]
-
-                # Compute STFT
-                stft_matrix = librosa.stft(
-                    y, n_fft=settings.FFT_WINDOW, hop_length=settings.HOP_LENGTH
-                )
-                power_spectrogram = np.abs(stft_matrix) ** 2
-
-                # Mel Spectrogram
-                mel_spec = mel_basis.dot(power_spectrogram)
-
-                # Power to dB
-                log_mel_spec = librosa.power_to_db(mel_spec, ref=np.max)
-
-                # Normalize -80dB to 0dB -> 0 to 255
-                normalized_spec = np.clip((log_mel_spec + 80) * (255 / 80), 0, 255).astype(np.uint8)
-
-                # Provide a flat list of the latest spectral frame
-                if normalized_spec.shape[1] > 0:
-                    frame = np.mean(normalized_spec, axis=1).astype(np.uint8)
-                    payload = orjson.dumps(frame, option=orjson.OPT_SERIALIZE_NUMPY)
-                    self._broadcast_safe(self._spectrogram_queues[source], payload)
+                self._process(source, data, 1, state, self._broadcast_safe)
 
             except OSError:
                 # Socket closed or similar
@@ -312,6 +403,48 @@ class AudioIngestor:
                 if self.running:
                     logger.error(f"Ingest Error [{source}]: {e}")
 
+    def _process(
+        self, source: str, data: bytes, packets: int, state: SpectrogramState, deliver: Deliver
+    ) -> None:
+        """Metrics, raw audio and spectrogram columns for `packets` received packets."""
+        # --- 1. Update Metrics ---
+        # We need a rough RMS estimate.
+        # int16 -> float
+        audio_chunk_int16 = np.frombuffer(data, dtype=np.int16)
+        new_samples = audio_chunk_int16.astype(np.float32) / 32768.0
+
+        rms = float(np.sqrt(np.mean(new_samples**2)))
+        rms_db = 20 * math.log10(rms) if rms > 1e-9 else -100.0
+
+        if source in self.metrics:
+            self.metrics[source].packets_received += packets
+            self.metrics[source].rms_db = round(rms_db, 1)
+
+        # --- 2. Distribute Raw Audio (Bytes) ---
+        if source in self._audio_hubs:
+            deliver(self._audio_hubs[source], data)
+
+        # OPTIMIZATION: Skip processing if no one is watching the spectrogram
+        if source not in self._spectrogram_hubs or not self._spectrogram_hubs[source]:
+            if state.watched:
+                # Start the next viewer from silence, not from stale audio
+                state.stft.reset()
+                state.watched = False
+            return
+        state.watched = True
+
+        # --- 3. Process Spectrogram ---
+        # One column per hop (none or several per packet), one batch per call;
+        # the websocket coalesces batches into messages
+        columns = state.stft.push(new_samples)
+        if len(columns):
+            column_sec = settings.HOP_LENGTH / settings.SAMPLE_RATE
+            # The latest column ended `pending` samples before the end of this data
+            ended = time.time() - state.stft.pending / settings.SAMPLE_RATE
+            batch = ColumnBatch(state.seq, ended - (len(columns) - 1) * column_sec, columns)
+            state.seq = batch.next_seq
+            deliver(self._spectrogram_hubs[source], batch)
+
 
 # Singleton
 processor = AudioIngestor()
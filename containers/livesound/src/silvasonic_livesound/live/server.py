@@ -7,6 +7,9 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, StreamingResponse
 
+from ..config import settings
+from .encoder import encoders
+from .frames import coalesce, encode_frames
 from .models import SourceConfig, SourceStatus
 from .processor import processor
 
@@ -20,6 +23,7 @@ async def lifespan(app: FastAPI) -> typing.AsyncGenerator[None, None]:
     processor.start(loop)
     yield
     # Shutdown
+    await encoders.stop()
     processor.stop()
 
 
@@ -66,23 +70,37 @@ async def remove_source(name: str) -> dict[str, str]:
 
 
 @app.websocket("/ws/spectrogram")
-async def websocket_endpoint(websocket: WebSocket, source: str = "default") -> None:
+async def websocket_endpoint(
+    websocket: WebSocket, source: str = "default", batch_ms: int | None = None
+) -> None:
     """WebSocket endpoint for spectrogram data.
-    Usage: ws://host/ws/spectrogram?source=front
+    Usage: ws://host/ws/spectrogram?source=front[&batch_ms=100]
+
+    Columns are collected for `batch_ms` and sent as binary messages (see frames.py),
+    one per run of consecutive columns.
     """
     await websocket.accept()
     logger.debug(f"WS Connected [Source: {source}]")
 
-    queue = await processor.subscribe_spectrogram(source)
+    interval = min(max(settings.SPEC_BATCH_MS if batch_ms is None else batch_ms, 0), 1000)
+    column_sec = settings.HOP_LENGTH / settings.SAMPLE_RATE
+    source_id = processor.source_id(source)
+    client = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else ""
+    queue = await processor.subscribe_spectrogram(source, client=client)
 
     try:
         while True:
-            # Wait for new frame
-            data = await queue.get()
-
-            # Send binary (orjson already returned bytes)
-            # We send the raw bytes directly to ensure maximum performance.
-            await websocket.send_bytes(data)
+            # Wait for new columns, then give the rest of the interval time to arrive
+            batches = [await queue.get()]
+            if interval:
+                await asyncio.sleep(interval / 1000)
+            while not queue.empty():
+                batches.append(queue.get_nowait())
+
+            for run in coalesce(batches):
+                await websocket.send_bytes(
+                    encode_frames(source_id, run.seq, run.timestamp, column_sec, run.columns)
+                )
 
     except WebSocketDisconnect:
         logger.debug("WS Disconnected")
@@ -103,80 +121,6 @@ async def stream_audio(source: str = "default") -> StreamingResponse:
 
 
 async def audio_stream_generator(source: str) -> typing.AsyncGenerator[bytes, None]:
-    """1. Subscribes to Raw Audio Queue.
-    2. Spawns FFmpeg process (Async).
-    3. Writes Queue Data -> FFmpeg Stdin (Background Task).
-    4. Reads FFmpeg Stdout -> Buffer -> Yield.
-    """
-    # FFmpeg command: Read PCM from Pipe, Write MP3 to Pipe
-    cmd = [
-        "ffmpeg",
-        "-f",
-        "s16le",  # Input format: Signed 16-bit Little Endian
-        "-ar",
-        "48000",  # Input Sample Rate
-        "-ac",
-        "1",  # Input Channels
-        "-i",
-        "pipe:0",  # Input from Stdin
-        "-f",
-        "mp3",  # Output format
-        "-b:a",
-        "128k",  # Bitrate
-        "-ar",
-        "44100",  # Output Sample Rate (Standard for Web)
-        "pipe:1",  # Output to Stdout
-    ]
-
-    # Create async subprocess
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.DEVNULL,  # Silence logs
-    )
-
-    if not proc.stdin or not proc.stdout:
-        logger.error("Failed to start FFmpeg process pipes")
-        if proc.returncode is None:
-            proc.kill()
-        return
-
-    queue = await processor.subscribe_audio(source)
-
-    # Start background task to feed input to FFmpeg
-    input_task = asyncio.create_task(feed_input(proc.stdin, queue))
-
-    try:
-        while True:
-            # Read output (Async non-blocking)
-            out_data = await proc.stdout.read(4096)
-            if not out_data:
-                break
-            yield out_data
-
-    except Exception as e:
-        logger.error(f"Stream Error: {e}")
-    finally:
-        # Cleanup
-        input_task.cancel()
-        processor.unsubscribe_audio(queue, source)
-
-        try:
-            proc.terminate()
-            await proc.wait()
-        except Exception:
-            pass
-
-
-async def feed_input(stdin_writer: asyncio.StreamWriter, queue: asyncio.Queue[bytes]) -> None:
-    """Feeds audio chunks from queue to FFmpeg stdin"""
-    try:
-        while True:
-            chunk = await queue.get()
-            stdin_writer.write(chunk)
-            await stdin_writer.drain()
-    except asyncio.CancelledError:
-        pass
-    except Exception as e:
-        logger.error(f"Feed Input Error: {e}")
+    """MP3 chunks from the source's shared encoder (one ffmpeg per source, see encoder.py)."""
+    async for chunk in encoders.listen(source):
+        yield chunk
@@ -0,0 +1,109 @@
+import librosa
+import numpy as np
+import numpy.typing as npt
+
+AMIN = 1e-10  # Power floor before log10
+
+
+class StreamingSTFT:
+    """Incremental mel spectrogram over a sample stream.
+
+    Samples go into a circular buffer of one FFT window; every `hop` samples the
+    latest window is cut out as one frame, so the stream yields exactly one column
+    per hop no matter how it is split into packets. All frames completed by a packet
+    go through one batched rfft and one mel projection.
+
+    Columns are in dB relative to a full-scale sine (fixed reference, so the colour
+    scale does not follow the loudest sound of the moment), mapped from
+    [db_min, db_max] to 0-255.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        n_fft: int = 2048,
+        hop: int = 512,
+        n_mels: int = 128,
+        fmin: float = 100.0,
+        fmax: float = 14000.0,
+        db_min: float = -100.0,
+        db_max: float = -10.0,
+    ) -> None:
+        if not 0 < hop <= n_fft:
+            raise ValueError(f"hop must be in 1..{n_fft}, got {hop}")
+        self.n_fft = n_fft
+        self.hop = hop
+        self.n_mels = n_mels
+        self.db_min = db_min
+        self.db_max = db_max
+
+        # Periodic Hann window, as librosa.stft uses
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+        # Unnormalised triangles (peak 1): a sine at a filter centre keeps its level
+        mel_basis = librosa.filters.mel(
+            sr=sample_rate, n_fft=n_fft, n_mels=n_mels, fmin=fmin, fmax=fmax, norm=None
+        )
+        self._mel_t = np.ascontiguousarray(mel_basis.T, dtype=np.float32)
+        # Power of a full-scale sine in its rfft bin
+        self._ref_db = 20 * np.log10(float(self.window.sum()) / 2)
+
+        self._buffer = np.zeros(n_fft, dtype=np.float32)
+        self._pos = 0  # Next write index (= oldest sample)
+        self._until_hop = hop
+        self._frames = np.zeros((0, n_fft), dtype=np.float32)
+
+    @property
+    def pending(self) -> int:
+        """Samples received since the latest column."""
+        return self.hop - self._until_hop
+
+    def reset(self) -> None:
+        self._buffer.fill(0.0)
+        self._pos = 0
+        self._until_hop = self.hop
+
+    def push(self, samples: npt.NDArray[np.float32]) -> npt.NDArray[np.uint8]:
+        """Add samples; returns the columns completed by them, shape (k, n_mels)."""
+        n = len(samples)
+        max_frames = (n + self.hop - 1) // self.hop + 1
+        if len(self._frames) < max_frames:
+            self._frames = np.zeros((max_frames, self.n_fft), dtype=np.float32)
+
+        count = 0
+        offset = 0
+        while offset < n:
+            take = min(self._until_hop, n - offset)
+            self._write(samples[offset : offset + take])
+            offset += take
+            self._until_hop -= take
+            if self._until_hop == 0:
+                self._until_hop = self.hop
+                self._read_frame(self._frames[count])
+                count += 1
+
+        if count == 0:
+            return np.zeros((0, self.n_mels), dtype=np.uint8)
+        return self._columns(self._frames[:count])
+
+    def _write(self, chunk: npt.NDArray[np.float32]) -> None:
+        """Copy up to n_fft samples into the ring, wrapping at the end."""
+        n = len(chunk)
+        first = min(n, self.n_fft - self._pos)
+        self._buffer[self._pos : self._pos + first] = chunk[:first]
+        self._buffer[: n - first] = chunk[first:]
+        self._pos = (self._pos + n) % self.n_fft
+
+    def _read_frame(self, out: npt.NDArray[np.float32]) -> None:
+        """The current window in time order (oldest sample first)."""
+        tail = self.n_fft - self._pos
+        out[:tail] = self._buffer[self._pos :]
+        out[tail:] = self._buffer[: self._pos]
+
+    def _columns(self, frames: npt.NDArray[np.float32]) -> npt.NDArray[np.uint8]:
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = (spectrum.real**2 + spectrum.imag**2).astype(np.float32)
+        mel = power @ self._mel_t
+        db = 10 * np.log10(np.maximum(mel, AMIN)) - self._ref_db
+        scaled = (db - self.db_min) * (255 / (self.db_max - self.db_min))
+        columns: npt.NDArray[np.uint8] = np.clip(scaled, 0, 255).astype(np.uint8)
+        return columns
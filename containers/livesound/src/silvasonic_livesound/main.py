@@ -93,7 +93,7 @@ def write_status() -> None:
             # Retrieve Live Source Stats (Option B)
             from .live.processor import processor
 
-            source_stats = [stats.model_dump() for stats in processor.get_source_stats()]
+            source_stats = [stats.model_dump() for stats in processor.get_source_stats_threadsafe()]
 
             data = {
                 "service": "livesound",
@@ -0,0 +1,121 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from silvasonic_livesound.live.encoder import (
+    EncoderPool,
+    SharedEncoder,
+    complete_frames,
+    frame_length,
+)
+from silvasonic_livesound.live.processor import processor
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, without / with padding
+HEADER = b"\xff\xfb\x90\x64"
+HEADER_PADDED = b"\xff\xfb\x92\x64"
+
+
+def frame(fill=b"\x00", header=HEADER):
+    return header + fill * (frame_length(header) - 4)
+
+
+def test_frame_length():
+    assert frame_length(HEADER) == 417
+    assert frame_length(HEADER_PADDED) == 418
+    # MPEG-2 Layer III, 64 kbit/s, 22.05 kHz
+    assert frame_length(b"\xff\xf3\x80\x64") == 208
+    assert frame_length(b"ID3\x04") is None
+    assert frame_length(b"\xff\xfb\xf0\x64") is None  # Bad bitrate index
+
+
+def test_complete_frames_skips_junk_and_keeps_partial_frame():
+    data = b"junk" + frame(b"\x01") + frame(b"\x02", HEADER_PADDED) + frame()[:50]
+
+    start, end = complete_frames(data)
+
+    assert start == 4
+    assert data[start:end] == frame(b"\x01") + frame(b"\x02", HEADER_PADDED)
+    assert complete_frames(frame()[:50]) == (0, 0)
+
+
+async def drain(gen, count):
+    return [await gen.__anext__() for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_listeners_share_chunks_and_late_joiner_starts_at_next_chunk():
+    encoder = SharedEncoder("front", ring_chunks=4)
+    first = encoder.listen()
+    waiting = asyncio.ensure_future(drain(first, 2))
+    await asyncio.sleep(0)
+
+    encoder._publish(b"a")
+    await asyncio.sleep(0)
+    late = encoder.listen()
+    late_task = asyncio.ensure_future(drain(late, 1))
+    await asyncio.sleep(0)
+    encoder._publish(b"b")
+
+    assert await waiting == [b"a", b"b"]
+    assert await late_task == [b"b"]
+
+
+@pytest.mark.asyncio
+async def test_slow_listener_skips_to_oldest_chunk_in_ring():
+    encoder = SharedEncoder("front", ring_chunks=2)
+    slow = encoder.listen()
+    pending = asyncio.ensure_future(slow.__anext__())
+    await asyncio.sleep(0)
+    encoder._publish(b"a")
+    assert await pending == b"a"
+
+    for chunk in [b"b", b"c", b"d"]:
+        encoder._publish(chunk)
+    encoder._close()
+
+    assert [chunk async for chunk in slow] == [b"c", b"d"]
+
+
+def mock_process():
+    proc = AsyncMock()
+    proc.stdout = AsyncMock()
+
+    async def read(n):
+        await asyncio.Event().wait()  # Encoder running, no output yet
+
+    proc.stdout.read = read
+    proc.terminate = Mock()
+    return proc
+
+
+@pytest.mark.asyncio
+async def test_one_encoder_per_source_stopped_after_grace_period():
+    pool = EncoderPool(grace_sec=0.05)
+    proc = mock_process()
+
+    with (
+        patch("asyncio.create_subprocess_exec", return_value=proc) as mock_exec,
+        patch.object(processor, "subscribe_audio", return_value=asyncio.Queue()),
+        patch.object(processor, "unsubscribe_audio") as mock_unsub,
+        patch("silvasonic_livesound.live.encoder.feed_input", new_callable=AsyncMock),
+    ):
+        listeners = [pool.listen("front"), pool.listen("front")]
+        tasks = [asyncio.ensure_future(gen.__anext__()) for gen in listeners]
+        await asyncio.sleep(0.01)
+
+        assert mock_exec.call_count == 1
+        encoder = pool.encoders["front"]
+        assert encoder.listeners == 2
+
+        # Clients disconnect
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Kept running through the grace period
+        assert "front" in pool.encoders
+        proc.terminate.assert_not_called()
+
+        await asyncio.sleep(0.1)
+        assert "front" not in pool.encoders
+        proc.terminate.assert_called_once()
+        mock_unsub.assert_called_once()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from silvasonic_livesound.live.frames import (
+    HEADER_SIZE,
+    SEQ_MODULO,
+    ColumnBatch,
+    coalesce,
+    decode_frames,
+    encode_frames,
+)
+
+
+def columns(count, n_mels=128, start=0):
+    return ((np.arange(count * n_mels) + start) % 256).astype(np.uint8).reshape(count, n_mels)
+
+
+def test_roundtrip():
+    data = encode_frames(2, 41, 1700000000.25, 512 / 48000, columns(5))
+
+    # Raw uint8 values instead of JSON numbers
+    assert len(data) == HEADER_SIZE + 5 * 128
+    msg = decode_frames(data)
+    assert (msg.source_id, msg.seq, msg.timestamp) == (2, 41, 1700000000.25)
+    assert msg.column_sec == pytest.approx(512 / 48000)
+    np.testing.assert_array_equal(msg.columns, columns(5))
+
+
+def test_rejects_unknown_version_and_bad_length():
+    data = encode_frames(0, 0, 0.0, 0.01, columns(2))
+    with pytest.raises(ValueError, match="version"):
+        decode_frames(b"\x02" + data[1:])
+    with pytest.raises(ValueError, match="length"):
+        decode_frames(data[:-1])
+    with pytest.raises(ValueError, match="short"):
+        decode_frames(data[:10])
+
+
+def test_coalesce_merges_consecutive_batches_only():
+    batches = [
+        ColumnBatch(10, 1.0, columns(2)),
+        ColumnBatch(12, 1.02, columns(3, start=1)),
+        ColumnBatch(15, 1.05, columns(0)),
+        # Batch 15-16 was dropped (slow client)
+        ColumnBatch(17, 1.07, columns(1, start=2)),
+    ]
+
+    runs = coalesce(batches)
+
+    assert [(r.seq, r.timestamp, len(r.columns)) for r in runs] == [(10, 1.0, 5), (17, 1.07, 1)]
+    np.testing.assert_array_equal(runs[0].columns[2:], columns(3, start=1))
+
+
+def test_sequence_wraps_around():
+    batches = [ColumnBatch(SEQ_MODULO - 1, 1.0, columns(1)), ColumnBatch(0, 1.01, columns(1))]
+
+    assert [len(r.columns) for r in coalesce(batches)] == [2]
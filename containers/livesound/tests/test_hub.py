@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from silvasonic_livesound.live.hub import Hub
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_all_subscribers():
+    hub: Hub[int] = Hub("spectrogram", maxsize=4)
+    a = hub.subscribe("a")
+    b = hub.subscribe("b")
+
+    waiting = asyncio.ensure_future(a.get())
+    await asyncio.sleep(0)
+    hub.publish(1)
+
+    assert await waiting == 1
+    assert b.get_nowait() == 1
+    assert a.empty() and b.empty()
+    with pytest.raises(asyncio.QueueEmpty):
+        a.get_nowait()
+
+
+@pytest.mark.asyncio
+async def test_full_ring_drops_oldest_and_counts():
+    hub: Hub[int] = Hub("audio", maxsize=2)
+    sub = hub.subscribe()
+    for i in range(5):
+        hub.publish(i)
+
+    assert sub.qsize() == 2
+    assert sub.dropped == 3
+    assert [await sub.get(), await sub.get()] == [3, 4]
+    status = sub.status()
+    assert (status.queued, status.delivered, status.dropped, status.lag_sec) == (0, 2, 3, 0.0)
+
+
+def test_unsubscribe():
+    hub: Hub[int] = Hub("audio", maxsize=2)
+    sub = hub.subscribe()
+
+    assert sub in hub and len(hub) == 1
+    assert hub.unsubscribe(sub)
+    assert not hub.unsubscribe(sub)
+    hub.publish(1)
+    assert sub.empty() and not hub
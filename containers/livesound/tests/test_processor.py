@@ -1,9 +1,12 @@
 import asyncio
+import socket
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 # Assuming src is in path via conftest
+from silvasonic_livesound.live.hub import Subscription
 from silvasonic_livesound.live.processor import AudioIngestor
 
 
@@ -31,12 +34,12 @@ async def test_subscribe_spectrogram():
 
     # Test valid subscription
     q = await ingestor.subscribe_spectrogram("default")
-    assert isinstance(q, asyncio.Queue)
-    assert q in ingestor._spectrogram_queues["default"]
+    assert isinstance(q, Subscription)
+    assert q in ingestor._spectrogram_hubs["default"]
 
     # Test unsubscribe
     ingestor.unsubscribe_spectrogram(q, "default")
-    assert q not in ingestor._spectrogram_queues["default"]
+    assert q not in ingestor._spectrogram_hubs["default"]
 
 
 @pytest.mark.asyncio
@@ -44,11 +47,11 @@ async def test_subscribe_audio():
     ingestor = AudioIngestor()
 
     q = await ingestor.subscribe_audio("default")
-    assert isinstance(q, asyncio.Queue)
-    assert q in ingestor._audio_queues["default"]
+    assert isinstance(q, Subscription)
+    assert q in ingestor._audio_hubs["default"]
 
     ingestor.unsubscribe_audio(q, "default")
-    assert q not in ingestor._audio_queues["default"]
+    assert q not in ingestor._audio_hubs["default"]
 
 
 @pytest.mark.asyncio
@@ -58,6 +61,7 @@ async def test_ingest_loop_logic():
         mock_settings.HOST = "0.0.0.0"
         mock_settings.LISTEN_PORTS = {"test_mic": 9999}
         mock_settings.CHUNK_SIZE = 1024  # Custom chunk size for this test
+        mock_settings.SUBSCRIBER_QUEUE_SIZE = 100
         mock_settings.SAMPLE_RATE = 48000
         mock_settings.FFT_WINDOW = 2048
         mock_settings.HOP_LENGTH = 512
@@ -94,7 +98,7 @@ async def test_ingest_loop_logic():
 
             # Checks
             assert mock_broadcast.called
-            # Check call args: (queues_set, data)
+            # Check call args: (hub, data)
             args, _ = mock_broadcast.call_args
             assert audio_q in args[0]
             assert args[1] == fake_audio
@@ -112,9 +116,132 @@ async def test_dynamic_update_sources():
         # Update with new source
         new_ports = {"new_mic": 8888}
 
-        with patch("threading.Thread") as mock_thread:
+        with (
+            patch("threading.Thread") as mock_thread,
+            patch("silvasonic_livesound.live.processor.settings.INGEST_MODE", "threads"),
+        ):
             ingestor.update_sources(new_ports)
 
             assert "new_mic" in ingestor.sockets
             mock_sock.bind.assert_called_with(("0.0.0.0", 8888))
             assert mock_thread.called  # Should start a new thread
+
+
+@pytest.mark.asyncio
+async def test_asyncio_ingestion_batches_datagrams():
+    """Datagrams of one flush interval are processed in one go, without threads."""
+    ingestor = AudioIngestor()
+    with patch("silvasonic_livesound.live.processor.settings.HOST", "127.0.0.1"):
+        ingestor.add_source("udp_mic", 0)
+    port = ingestor.sockets["udp_mic"].getsockname()[1]
+    audio_q = await ingestor.subscribe_audio("udp_mic")
+    spec_q = await ingestor.subscribe_spectrogram("udp_mic")
+
+    with patch("threading.Thread") as mock_thread:
+        ingestor.start(asyncio.get_running_loop())
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if "udp_mic" in ingestor.transports:
+                break
+
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        packets = [bytes([i]) * 1024 for i in range(1, 5)]
+        for packet in packets:
+            sender.sendto(packet, ("127.0.0.1", port))
+        sender.close()
+
+        received = b""
+        while len(received) < 4096:
+            received += await asyncio.wait_for(audio_q.get(), timeout=2)
+
+    try:
+        assert not mock_thread.called
+        assert received == b"".join(packets)
+        # 2048 samples at hop 512: four columns
+        columns = 0
+        while not spec_q.empty():
+            columns += len(spec_q.get_nowait().columns)
+        assert columns == 4
+        stats = {s.name: s for s in ingestor.get_source_stats()}
+        assert stats["udp_mic"].active
+        assert stats["udp_mic"].packets_received == 4
+    finally:
+        ingestor.stop()
+
+
+@pytest.mark.asyncio
+async def test_asyncio_flush_by_time_and_size():
+    """Pending datagrams are joined until the interval ends or enough bytes are pending."""
+    ingestor = AudioIngestor()
+    with patch("silvasonic_livesound.live.processor.settings.HOST", "127.0.0.1"):
+        ingestor.add_source("udp_mic", 0)
+    ingestor.loop = asyncio.get_running_loop()
+    audio_q = await ingestor.subscribe_audio("udp_mic")
+
+    try:
+        with (
+            patch("silvasonic_livesound.live.processor.settings.INGEST_FLUSH_MS", 20.0),
+            patch("silvasonic_livesound.live.processor.settings.INGEST_FLUSH_BYTES", 3000),
+        ):
+            for i in range(1, 4):
+                ingestor._on_datagram("udp_mic", bytes([i]) * 1024)
+                await asyncio.sleep(0)
+            # The third packet crossed the byte threshold
+            assert audio_q.qsize() == 1
+            assert len(audio_q.get_nowait()) == 3072
+
+            ingestor._on_datagram("udp_mic", b"\x04" * 1024)
+            ingestor._on_datagram("udp_mic", b"\x05" * 1024)
+            await asyncio.sleep(0)
+            assert audio_q.empty()
+            # The interval started with the first packet ends with one delivery for both
+            assert (
+                await asyncio.wait_for(audio_q.get(), timeout=1) == b"\x04" * 1024 + b"\x05" * 1024
+            )
+        assert ingestor.metrics["udp_mic"].packets_received == 5
+    finally:
+        ingestor.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_reported_in_source_stats():
+    ingestor = AudioIngestor()
+    ingestor.running = True
+    ingestor.loop = asyncio.get_running_loop()
+    with patch("silvasonic_livesound.live.processor.settings.SUBSCRIBER_QUEUE_SIZE", 3):
+        slow = await ingestor.subscribe_audio("default", client="10.0.0.5:5123")
+        fast = await ingestor.subscribe_audio("default")
+
+    for i in range(5):
+        ingestor._broadcast_local(ingestor._audio_hubs["default"], bytes([i]))
+        assert await fast.get() == bytes([i])
+
+    stats = {s.name: s for s in ingestor.get_source_stats()}["default"]
+    slow_stats = next(s for s in stats.subscribers if s.client == "10.0.0.5:5123")
+    assert (slow_stats.kind, slow_stats.queued, slow_stats.dropped) == ("audio", 3, 2)
+    assert slow_stats.lag_sec >= 0
+    fast_stats = next(s for s in stats.subscribers if s.client == "")
+    assert (fast_stats.delivered, fast_stats.dropped) == (5, 0)
+    # Oldest dropped: the slow client continues with the latest items
+    assert [slow.get_nowait() for _ in range(3)] == [b"\x02", b"\x03", b"\x04"]
+
+
+@pytest.mark.asyncio
+async def test_source_stats_from_another_thread_run_on_the_loop():
+    """The heartbeat thread's snapshot is taken on the event loop, not beside it."""
+    ingestor = AudioIngestor()
+    ingestor.loop = asyncio.get_running_loop()
+    await ingestor.subscribe_audio("default", client="10.0.0.5:5123")
+    seen = []
+    get_source_stats = ingestor.get_source_stats
+
+    def recording_stats():
+        seen.append(threading.get_ident())
+        return get_source_stats()
+
+    with patch.object(ingestor, "get_source_stats", side_effect=recording_stats):
+        stats = await asyncio.to_thread(ingestor.get_source_stats_threadsafe)
+
+    assert seen == [threading.get_ident()]
+    default = next(s for s in stats if s.name == "default")
+    assert [s.client for s in default.subscribers] == ["10.0.0.5:5123"]
@@ -1,8 +1,10 @@
 import asyncio
 from unittest.mock import AsyncMock, patch
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
+from silvasonic_livesound.live.frames import ColumnBatch, decode_frames
 from silvasonic_livesound.live.server import app, processor
 
 
@@ -21,25 +23,31 @@ async def test_root_endpoint(client):
 @pytest.mark.asyncio
 async def test_websocket_spectrogram(client):
     """Test WebSocket connection and data reception."""
-    import json
-
     # Mock processor.subscribe_spectrogram to return a dummy queue
     mock_queue = asyncio.Queue()
-    # Processor sends bytes (verified in server.py: await websocket.send_bytes(data))
-    # Processor creates bytes via: orjson.dumps(frame)
-    # We simulate this by sending bytes of a JSON list
-    await mock_queue.put(b"[1, 2, 3]")  # Fake spectrogram frame (bytes)
+    # Two consecutive batches, then one after a dropped batch
+    columns = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    await mock_queue.put(ColumnBatch(7, 100.0, columns[:1]))
+    await mock_queue.put(ColumnBatch(8, 100.01, columns[1:2]))
+    await mock_queue.put(ColumnBatch(10, 100.03, columns[2:]))
 
     with patch.object(processor, "subscribe_spectrogram", return_value=mock_queue) as mock_sub:
         with patch.object(processor, "unsubscribe_spectrogram") as mock_unsub:
-            with client.websocket_connect("/ws/spectrogram?source=test_mic") as websocket:
-                # Server sends binary frame
-                data_bytes = websocket.receive_bytes()
-                data = json.loads(data_bytes)
-
-                assert data == [1, 2, 3]
-
-            mock_sub.assert_called_with("test_mic")
+            with patch.object(processor, "source_id", return_value=3):
+                with client.websocket_connect(
+                    "/ws/spectrogram?source=test_mic&batch_ms=0"
+                ) as websocket:
+                    # Server sends one binary message per run of consecutive columns
+                    first = decode_frames(websocket.receive_bytes())
+                    second = decode_frames(websocket.receive_bytes())
+
+            assert first.source_id == 3
+            assert (first.seq, first.timestamp) == (7, 100.0)
+            assert first.columns.tolist() == columns[:2].tolist()
+            assert second.seq == 10
+            assert second.columns.tolist() == columns[2:].tolist()
+
+            mock_sub.assert_called_with("test_mic", client="testclient:50000")
             mock_unsub.assert_called()
 
 
@@ -47,19 +55,23 @@ async def test_websocket_spectrogram(client):
 async def test_stream_endpoint_ffmpeg_mock(client):
     """Test the audio streaming endpoint by mocking the subprocess."""
 
-    # Needs to mock asyncio.create_subprocess_exec used in audio_stream_generator
+    # Needs to mock asyncio.create_subprocess_exec used by the shared encoder
     # And processor.subscribe_audio
 
     mock_audio_queue = asyncio.Queue()
     await mock_audio_queue.put(b"audio_chunk_1")
     await mock_audio_queue.put(b"audio_chunk_2")
 
+    # Two MPEG-1 Layer III frames (128 kbit/s, 44.1 kHz: 417 bytes each)
+    frame_1 = b"\xff\xfb\x90\x64" + b"\x01" * 413
+    frame_2 = b"\xff\xfb\x90\x64" + b"\x02" * 413
+
     # Mock Process
     mock_proc = AsyncMock()
     mock_proc.stdin = AsyncMock()
     mock_proc.stdout = AsyncMock()
-    # Simulate reading stdout (MP3 output)
-    mock_proc.stdout.read.side_effect = [b"mp3_frame_1", b"mp3_frame_2", b""]
+    # Simulate reading stdout (MP3 output), split mid-frame
+    mock_proc.stdout.read.side_effect = [frame_1 + frame_2[:100], frame_2[100:], b""]
     mock_proc.returncode = None
     # terminate is NOT async in asyncio.subprocess.Process
     from unittest.mock import Mock
@@ -69,16 +81,16 @@ async def test_stream_endpoint_ffmpeg_mock(client):
     with patch("asyncio.create_subprocess_exec", return_value=mock_proc) as mock_exec:
         with patch.object(processor, "subscribe_audio", return_value=mock_audio_queue):
             with patch(
-                "silvasonic_livesound.live.server.feed_input", new_callable=AsyncMock
+                "silvasonic_livesound.live.encoder.feed_input", new_callable=AsyncMock
             ) as _:  # Prevent actual feeding loop
                 response = client.get("/stream?source=test_mic")
                 assert response.status_code == 200
 
-                # Consume stream (response.content contains full body)
-                assert b"mp3_frame_1" in response.content
-                assert b"mp3_frame_2" in response.content
+                # Consume stream (response.content contains full body), cut at frame boundaries
+                assert response.content == frame_1 + frame_2
 
                 # Verify FFmpeg called
                 mock_exec.assert_called_once()
                 args = mock_exec.call_args[0]
                 assert "ffmpeg" in args
+                mock_proc.terminate.assert_called_once()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from silvasonic_livesound.live.stft import StreamingSTFT
+
+RATE = 48000
+
+
+def tone(freq, seconds, level_db=0.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (10 ** (level_db / 20) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_one_column_per_hop_regardless_of_packet_size():
+    signal = tone(1000, 0.5)
+    whole = StreamingSTFT(RATE).push(signal)
+
+    stft = StreamingSTFT(RATE)
+    sizes = [100, 700, 1316, 2048, 33, 4096]
+    parts = []
+    offset = 0
+    for size in sizes * 20:
+        chunk = signal[offset : offset + size]
+        if not len(chunk):
+            break
+        parts.append(stft.push(chunk))
+        offset += size
+
+    assert len(whole) == len(signal) // 512
+    # Small packets yield no column until a hop is complete, large ones several
+    counts = [len(p) for p in parts]
+    assert 0 in counts and max(counts) > 1
+    np.testing.assert_array_equal(np.concatenate(parts), whole)
+
+
+def test_fixed_reference_tracks_absolute_level():
+    """Same tone 20 dB quieter: darker columns instead of a renormalised image."""
+    loud = StreamingSTFT(RATE).push(tone(2000, 0.2, -20.0))[-1]
+    quiet = StreamingSTFT(RATE).push(tone(2000, 0.2, -40.0))[-1]
+
+    band = int(np.argmax(loud))
+    assert band == int(np.argmax(quiet))
+    # 90 dB over 255 steps: 20 dB are ~57 steps
+    assert loud[band] - quiet[band] == pytest.approx(20 * 255 / 90, abs=3)
+    # -20 dBFS sine at a filter peak: 80 dB above the floor of the scale
+    assert loud[band] == pytest.approx(80 * 255 / 90, abs=15)
+
+
+def test_reset_clears_history():
+    stft = StreamingSTFT(RATE)
+    stft.push(tone(3000, 0.1))
+    stft.reset()
+    assert stft.push(np.zeros(512, dtype=np.float32)).max() == 0
+
+
+def test_invalid_hop():
+    with pytest.raises(ValueError):
+        StreamingSTFT(RATE, n_fft=1024, hop=2048)
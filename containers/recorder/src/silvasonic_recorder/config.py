@@ -15,6 +15,14 @@ class Settings(BaseSettings):
         default="silvasonic_livesound", description="Hostname for live stream target"
     )
     LIVE_STREAM_PORT: int = Field(default=8010, description="Port for live stream target")
+    # Optional second PCM feed for near-real-time BirdNET analysis (same port, other host).
+    # Empty disables it; skipped (recording goes on) if the host does not resolve.
+    ANALYSIS_STREAM_TARGET: str = Field(
+        default="", description="Hostname for the BirdNET analysis stream (empty = off)"
+    )
+    ANALYSIS_STREAM_RATE: int = Field(
+        default=48000, description="Sample rate of the analysis stream (BirdNET input rate)"
+    )
 
     # Hardware Selection
     RECORDER_ID: str | None = Field(
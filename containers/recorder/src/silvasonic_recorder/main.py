@@ -11,6 +11,7 @@ import logging
 import logging.handlers
 import os
 import signal
+import socket
 import subprocess
 import sys
 import threading
@@ -241,6 +242,19 @@ class Recorder:
             udp_url,
         ]
 
+        # Output 3 (optional): Analysis stream, already at BirdNET's sample rate
+        analysis_url = self._analysis_stream_url()
+        if analysis_url:
+            cmd += [
+                "-f",
+                "s16le",
+                "-ac",
+                "1",
+                "-ar",
+                str(settings.ANALYSIS_STREAM_RATE),
+                analysis_url,
+            ]
+
         logger.info(f"Starting FFmpeg: {' '.join(cmd)}")
 
         self.process = subprocess.Popen(
@@ -253,6 +267,22 @@ class Recorder:
         if self.process.poll() is not None:
             raise RuntimeError("FFmpeg died immediately.")
 
+    def _analysis_stream_url(self) -> str | None:
+        """UDP URL of the analysis stream, None if it is off or its host does not resolve.
+
+        ffmpeg refuses to start when any output host is unknown, so a missing
+        BirdNET container must not take the recordings down with it.
+        """
+        host = settings.ANALYSIS_STREAM_TARGET
+        if not host:
+            return None
+        try:
+            socket.getaddrinfo(host, settings.LIVE_STREAM_PORT, type=socket.SOCK_DGRAM)
+        except OSError as e:
+            logger.warning(f"Analysis stream target {host} not resolvable, skipping it: {e}")
+            return None
+        return f"udp://{host}:{settings.LIVE_STREAM_PORT}"
+
     def _consume_stderr(self, proc: subprocess.Popen[bytes]) -> None:
         """Reads stderr in a separate thread."""
         try:
@@ -1,3 +1,4 @@
+import socket
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -28,6 +29,8 @@ class TestRecorder(unittest.TestCase):
         self.mock_settings.STRICT_HARDWARE_MATCH = False
         self.mock_settings.LIVE_STREAM_TARGET = "localhost"
         self.mock_settings.LIVE_STREAM_PORT = 8010
+        self.mock_settings.ANALYSIS_STREAM_TARGET = ""
+        self.mock_settings.ANALYSIS_STREAM_RATE = 48000
 
         with patch("silvasonic_recorder.main.os.makedirs"):
             self.recorder = Recorder()
@@ -95,6 +98,44 @@ class TestRecorder(unittest.TestCase):
         # Verify strategy tasks started
         self.strategy.start_background_tasks.assert_called_once_with(process_mock)
 
+    @patch("silvasonic_recorder.main.socket.getaddrinfo")
+    @patch("silvasonic_recorder.main.subprocess.Popen")
+    def test_start_ffmpeg_analysis_stream(
+        self, mock_popen: MagicMock, mock_getaddrinfo: MagicMock
+    ) -> None:
+        """An analysis target adds a 48 kHz PCM output on the recorder's stream port."""
+        mock_popen.return_value.poll.return_value = None
+        output_dir = Path("/tmp/audio/test_profile")
+
+        self.recorder._start_ffmpeg(self.profile, self.device, output_dir, self.strategy)
+        self.assertFalse(any("silvasonic_birdnet" in arg for arg in mock_popen.call_args[0][0]))
+
+        self.mock_settings.ANALYSIS_STREAM_TARGET = "silvasonic_birdnet"
+        self.recorder._start_ffmpeg(self.profile, self.device, output_dir, self.strategy)
+
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[-1], "udp://silvasonic_birdnet:8010")
+        self.assertEqual(cmd[-3:-1], ["-ar", "48000"])
+        mock_getaddrinfo.assert_called_once()
+
+    @patch("silvasonic_recorder.main.socket.getaddrinfo")
+    @patch("silvasonic_recorder.main.subprocess.Popen")
+    def test_start_ffmpeg_unresolvable_analysis_target(
+        self, mock_popen: MagicMock, mock_getaddrinfo: MagicMock
+    ) -> None:
+        """An analysis host that does not resolve is left out, recording still starts."""
+        mock_popen.return_value.poll.return_value = None
+        mock_getaddrinfo.side_effect = socket.gaierror(-2, "Name or service not known")
+        self.mock_settings.ANALYSIS_STREAM_TARGET = "silvasonic_birdnet"
+
+        self.recorder._start_ffmpeg(
+            self.profile, self.device, Path("/tmp/audio/test_profile"), self.strategy
+        )
+
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[-1], "udp://localhost:8010")
+        self.assertFalse(any("silvasonic_birdnet" in arg for arg in cmd))
+
 
 if __name__ == "__main__":
     unittest.main()